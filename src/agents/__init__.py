@@ -7,13 +7,26 @@ from openai import AsyncOpenAI
 from . import _config
 from .agent import Agent
 from .agent_output import AgentOutputSchema
+from .cancellation import CancellationToken
+from .checkpoint import CheckpointStore, FileCheckpointStore, RunState, SQLiteCheckpointStore
+from .compaction import (
+    CompactionPipeline,
+    HistoryCompactor,
+    SlidingWindowCompactor,
+    SupersededReasoningCompactor,
+    ToolOutputElisionCompactor,
+)
 from .computer import AsyncComputer, Button, Computer, Environment
 from .exceptions import (
     AgentsException,
+    BatchRequestError,
+    DeadlineExceeded,
     InputGuardrailTripwireTriggered,
     MaxTurnsExceeded,
     ModelBehaviorError,
+    ModelStreamStalled,
     OutputGuardrailTripwireTriggered,
+    StreamSubscriberDisconnected,
     UserError,
 )
 from .guardrail import (
@@ -40,19 +53,39 @@ from .items import (
 )
 from .lifecycle import AgentHooks, RunHooks
 from .model_settings import ModelSettings
+from .models.batched import BatchedModel
+from .models.hedging import HedgedModel, HedgeStats
+from .models.http_client_pool import HTTPClientPool, HTTPPoolStats
 from .models.interface import Model, ModelProvider, ModelTracing
 from .models.openai_chatcompletions import OpenAIChatCompletionsModel
 from .models.openai_provider import OpenAIProvider
 from .models.openai_responses import OpenAIResponsesModel
-from .result import RunResult, RunResultStreaming
+from .models.rate_limiter import RateLimit, RateLimiter, RateLimiterStats
+from .models.routing import EndpointStats, RoutingEndpoint, RoutingModelProvider
+from .models.singleflight import SingleflightModel, SingleflightStats
+from .prompt_cache import PrefixFingerprint
+from .result import BatchRunGroup, BatchRunResult, RunResult, RunResultStreaming
+from .retention import RetentionPolicy, load_raw_responses
 from .run import RunConfig, Runner
 from .run_context import RunContextWrapper, TContext
+from .scheduler import ModelCallScheduler, PriorityClass, QueueWaitStats, ScheduledCall
+from .schema_minifier import (
+    SchemaMinificationReport,
+    SchemaSavings,
+    get_schema_minification_report,
+    minify_json_schema,
+)
+from .session import InMemorySession, Session, SessionHistory, SQLiteSession
+from .stream_broadcast import SlowConsumerPolicy, StreamBroadcaster, StreamSubscription
 from .stream_events import (
     AgentUpdatedStreamEvent,
     RawResponsesStreamEvent,
+    RetryStreamEvent,
     RunItemStreamEvent,
     StreamEvent,
 )
+from .token_attribution import TokenAttribution, attribute_tokens
+from .tokenizer import BPETokenizer, HeuristicTokenizer, Tokenizer, set_default_tokenizer
 from .tool import (
     ComputerTool,
     FileSearchTool,
@@ -62,6 +95,7 @@ from .tool import (
     default_tool_error_function,
     function_tool,
 )
+from .tool_selection import BM25ToolSelector, ToolSelection, ToolSelector
 from .tracing import (
     AgentSpanData,
     CustomSpanData,
@@ -127,6 +161,28 @@ def set_default_openai_api(api: Literal["chat_completions", "responses"]) -> Non
     _config.set_default_openai_api(api)
 
 
+def set_default_openai_rate_limiter(rate_limiter: RateLimiter | None) -> None:
+    """Set the rate limiter to use for OpenAI LLM requests from every model that doesn't have its
+    own. By default, no client-side rate limiting is done. Pass None to disable it again.
+
+    Args:
+        rate_limiter: The rate limiter to share between all OpenAI models in the process.
+    """
+    _config.set_default_openai_rate_limiter(rate_limiter)
+
+
+def set_default_openai_http_client_pool(pool: HTTPClientPool | None) -> None:
+    """Set the pool of HTTP clients that OpenAI clients created by the SDK use. By default, a pool
+    with the default connection limits is used. Pass None to restore the default.
+
+    This has no effect on clients you provide yourself, e.g. via `set_default_openai_client()`.
+
+    Args:
+        pool: The pool to create the HTTP clients with.
+    """
+    _config.set_default_openai_http_client_pool(pool)
+
+
 def enable_verbose_stdout_logging():
     """Enables verbose logging to stdout. This is useful for debugging."""
     logger = logging.getLogger("openai.agents")
@@ -142,19 +198,37 @@ __all__ = [
     "ModelTracing",
     "ModelSettings",
     "OpenAIChatCompletionsModel",
+    "BatchedModel",
     "OpenAIProvider",
+    "RoutingModelProvider",
+    "RoutingEndpoint",
+    "EndpointStats",
+    "SingleflightModel",
+    "SingleflightStats",
+    "HedgedModel",
+    "HedgeStats",
+    "HTTPClientPool",
+    "HTTPPoolStats",
+    "RateLimit",
+    "RateLimiter",
+    "RateLimiterStats",
     "OpenAIResponsesModel",
     "AgentOutputSchema",
+    "CancellationToken",
     "Computer",
     "AsyncComputer",
     "Environment",
     "Button",
     "AgentsException",
+    "BatchRequestError",
+    "DeadlineExceeded",
     "InputGuardrailTripwireTriggered",
     "OutputGuardrailTripwireTriggered",
     "MaxTurnsExceeded",
     "ModelBehaviorError",
+    "ModelStreamStalled",
     "UserError",
+    "StreamSubscriberDisconnected",
     "InputGuardrail",
     "InputGuardrailResult",
     "OutputGuardrail",
@@ -182,16 +256,55 @@ __all__ = [
     "RunContextWrapper",
     "TContext",
     "RunResult",
+    "Session",
+    "SessionHistory",
+    "InMemorySession",
+    "SQLiteSession",
+    "RetentionPolicy",
+    "RunState",
+    "CheckpointStore",
+    "FileCheckpointStore",
+    "SQLiteCheckpointStore",
+    "load_raw_responses",
+    "BatchRunResult",
+    "BatchRunGroup",
+    "PrefixFingerprint",
+    "HistoryCompactor",
+    "SlidingWindowCompactor",
+    "ToolOutputElisionCompactor",
+    "SupersededReasoningCompactor",
+    "CompactionPipeline",
+    "Tokenizer",
+    "HeuristicTokenizer",
+    "BPETokenizer",
+    "set_default_tokenizer",
+    "TokenAttribution",
+    "attribute_tokens",
+    "minify_json_schema",
+    "get_schema_minification_report",
+    "SchemaMinificationReport",
+    "SchemaSavings",
     "RunResultStreaming",
     "RunConfig",
+    "ModelCallScheduler",
+    "PriorityClass",
+    "QueueWaitStats",
+    "ScheduledCall",
     "RawResponsesStreamEvent",
     "RunItemStreamEvent",
+    "RetryStreamEvent",
     "AgentUpdatedStreamEvent",
     "StreamEvent",
+    "StreamBroadcaster",
+    "StreamSubscription",
+    "SlowConsumerPolicy",
     "FunctionTool",
     "ComputerTool",
     "FileSearchTool",
     "Tool",
+    "ToolSelector",
+    "ToolSelection",
+    "BM25ToolSelector",
     "WebSearchTool",
     "function_tool",
     "Usage",
@@ -220,6 +333,8 @@ __all__ = [
     "set_default_openai_key",
     "set_default_openai_client",
     "set_default_openai_api",
+    "set_default_openai_rate_limiter",
+    "set_default_openai_http_client_pool",
     "set_tracing_export_api_key",
     "enable_verbose_stdout_logging",
     "gen_trace_id",
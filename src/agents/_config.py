@@ -2,6 +2,8 @@ from openai import AsyncOpenAI
 from typing_extensions import Literal
 
 from .models import _openai_shared
+from .models.http_client_pool import HTTPClientPool
+from .models.rate_limiter import RateLimiter
 from .tracing import set_tracing_export_api_key
 
 
@@ -24,3 +26,11 @@ def set_default_openai_api(api: Literal["chat_completions", "responses"]) -> Non
         _openai_shared.set_use_responses_by_default(False)
     else:
         _openai_shared.set_use_responses_by_default(True)
+
+
+def set_default_openai_rate_limiter(rate_limiter: RateLimiter | None) -> None:
+    _openai_shared.set_default_rate_limiter(rate_limiter)
+
+
+def set_default_openai_http_client_pool(pool: HTTPClientPool | None) -> None:
+    _openai_shared.set_default_http_client_pool(pool)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import dataclasses
+import sys
+from typing import TypeVar
+
+from typing_extensions import dataclass_transform
+
+_T = TypeVar("_T")
+
+
+@dataclass_transform(field_specifiers=(dataclasses.field,))
+def slotted_dataclass(cls: type[_T]) -> type[_T]:
+    """Like `@dataclass`, but with `__slots__` instead of a `__dict__` per instance, for classes
+    that are created in large numbers during runs (run items, stream events, usage...). Slots
+    require Python 3.10; on Python 3.9, this is a regular dataclass.
+
+    As the class is recreated with slots, methods of slotted classes can't use `super()` without
+    arguments.
+    """
+    if sys.version_info >= (3, 10):
+        return dataclasses.dataclass(slots=True)(cls)
+    return dataclasses.dataclass(cls)
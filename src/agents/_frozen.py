@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import copy
+from typing import Any, NoReturn
+
+
+def _readonly(self: Any, *args: Any, **kwargs: Any) -> NoReturn:
+    raise TypeError(
+        f"{type(self).__name__} is read-only: input items are shared across turns rather than "
+        "copied. Copy it first, e.g. with copy.deepcopy(), which returns a mutable copy."
+    )
+
+
+class FrozenDict(dict):  # type: ignore[type-arg]
+    """A read-only dict. Copies (`copy.copy()` and `copy.deepcopy()`) are mutable dicts, so code
+    that needs to change an item copies it, and everything else shares it."""
+
+    __slots__ = ()
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self) -> dict[Any, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> dict[Any, Any]:
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):  # type: ignore[type-arg]
+    """A read-only list. Copies (`copy.copy()` and `copy.deepcopy()`) are mutable lists."""
+
+    __slots__ = ()
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __iadd__ = _readonly
+    __imul__ = _readonly
+    append = _readonly
+    extend = _readonly
+    insert = _readonly
+    pop = _readonly
+    remove = _readonly
+    clear = _readonly
+    sort = _readonly
+    reverse = _readonly
+
+    def __copy__(self) -> list[Any]:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> list[Any]:
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (FrozenList, (list(self),))
+
+
+def thaw(value: Any) -> Any:
+    """Returns a mutable copy of a JSON-like value, with new dicts and lists. Immutable values
+    (e.g. strings) are shared."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(thaw(item) for item in value)
+    return value
+
+
+def freeze(value: Any) -> Any:
+    """Returns a read-only version of a JSON-like value, i.e. with read-only dicts and lists.
+    Frozen values are returned as is, without traversing them, and immutable values (e.g. strings,
+    such as base64 encoded images) are shared, so only the containers that aren't frozen yet are
+    copied."""
+    if type(value) is FrozenDict or type(value) is FrozenList:
+        return value
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, tuple):
+        return tuple(freeze(item) for item in value)
+    return value
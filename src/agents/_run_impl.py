@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any
 
 from openai.types.responses import (
@@ -26,6 +25,7 @@ from openai.types.responses.response_input_param import ComputerCallOutput
 from openai.types.responses.response_reasoning_item import ResponseReasoningItem
 
 from . import _utils
+from ._dataclasses import slotted_dataclass
 from .agent import Agent
 from .agent_output import AgentOutputSchema
 from .computer import AsyncComputer, Computer
@@ -71,25 +71,25 @@ class QueueCompleteSentinel:
 QUEUE_COMPLETE_SENTINEL = QueueCompleteSentinel()
 
 
-@dataclass
+@slotted_dataclass
 class ToolRunHandoff:
     handoff: Handoff
     tool_call: ResponseFunctionToolCall
 
 
-@dataclass
+@slotted_dataclass
 class ToolRunFunction:
     tool_call: ResponseFunctionToolCall
     function_tool: FunctionTool
 
 
-@dataclass
+@slotted_dataclass
 class ToolRunComputerAction:
     tool_call: ResponseComputerToolCall
     computer_tool: ComputerTool
 
 
-@dataclass
+@slotted_dataclass
 class ProcessedResponse:
     new_items: list[RunItem]
     handoffs: list[ToolRunHandoff]
@@ -108,22 +108,22 @@ class ProcessedResponse:
         )
 
 
-@dataclass
+@slotted_dataclass
 class NextStepHandoff:
     new_agent: Agent[Any]
 
 
-@dataclass
+@slotted_dataclass
 class NextStepFinalOutput:
     output: Any
 
 
-@dataclass
+@slotted_dataclass
 class NextStepRunAgain:
     pass
 
 
-@dataclass
+@slotted_dataclass
 class SingleStepResult:
     original_input: str | list[TResponseInputItem]
     """The input items i.e. the items before run() was called. May be mutated by handoff input
@@ -539,11 +539,13 @@ class RunImpl:
                     )
                     raise UserError(f"Invalid input filter result: {filtered}")
 
-                original_input = (
-                    filtered.input_history
-                    if isinstance(filtered.input_history, str)
-                    else list(filtered.input_history)
-                )
+                # Filters that keep the history as is don't need it converted back and frozen
+                if filtered.input_history is not handoff_input_data.input_history:
+                    original_input = (
+                        filtered.input_history
+                        if isinstance(filtered.input_history, str)
+                        else ItemHelpers.input_to_frozen_input_list(list(filtered.input_history))
+                    )
                 pre_step_items = list(filtered.pre_handoff_items)
                 new_step_items = list(filtered.new_items)
 
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from typing import TypeVar
+
+from .cancellation import uncancel_current_task
+from .exceptions import ModelStreamStalled
+
+T = TypeVar("T")
+
+
+async def watch_stream(stream: AsyncIterator[T], idle_timeout: float | None) -> AsyncIterator[T]:
+    """Yields the events of `stream`, raising `ModelStreamStalled` if no event arrives within
+    `idle_timeout` seconds (including the first one). The clock only runs while we're waiting on
+    the stream, not while the caller processes an event.
+
+    Rather than wrapping each `__anext__` in `asyncio.wait_for`, which runs it in a separate task,
+    the watchdog cancels the current task. That keeps the stream, and the tracing spans it opens,
+    in the caller's context.
+    """
+    if idle_timeout is None:
+        async for event in stream:
+            yield event
+        return
+
+    task = asyncio.current_task()
+    assert task is not None
+    loop = asyncio.get_running_loop()
+    stalled = False
+
+    def on_stall() -> None:
+        nonlocal stalled
+        stalled = True
+        task.cancel()
+
+    while True:
+        timer = loop.call_later(idle_timeout, on_stall)
+        try:
+            event = await stream.__anext__()
+        except StopAsyncIteration:
+            return
+        except asyncio.CancelledError:
+            if not stalled:
+                raise
+            uncancel_current_task()
+            raise ModelStreamStalled(
+                f"Model stream stalled: no event received for {idle_timeout} seconds"
+            ) from None
+        finally:
+            timer.cancel()
+        yield event
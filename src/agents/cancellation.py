@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from typing import Callable
+
+
+class CancellationToken:
+    """A token that lets you cancel an in-progress agent run, e.g. when the client that requested
+    the run disconnects. Pass it to `Runner.run()` (or the other run methods) via `cancel_token`,
+    then call `cancel()` from anywhere. Cancelling is idempotent.
+
+    When a run is cancelled, the in-flight model request (including any open response stream) and
+    any running tools and guardrails are cancelled right away, which releases the underlying HTTP
+    connection instead of letting the generation run to completion.
+    """
+
+    def __init__(self) -> None:
+        self._cancelled = False
+        self._callbacks: list[Callable[[], object]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether `cancel()` has been called."""
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """Cancel every run that this token was passed to."""
+        if self._cancelled:
+            return
+
+        self._cancelled = True
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], object]) -> Callable[[], None]:
+        """Register a callback to be invoked when the token is cancelled. If the token is already
+        cancelled, the callback is invoked immediately.
+
+        Returns:
+            A function that unregisters the callback.
+        """
+        if self._cancelled:
+            callback()
+            return lambda: None
+
+        self._callbacks.append(callback)
+
+        def remove() -> None:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+        return remove
+
+
+def cancel_task_on_token(
+    token: CancellationToken, task: asyncio.Task[object]
+) -> Callable[[], None]:
+    """Cancel `task` when `token` is cancelled. `token.cancel()` may be called from any thread.
+
+    Returns:
+        A function that detaches the task from the token. It must be called before the task
+        finishes its work, so that a late cancellation can't leak into the caller.
+    """
+    loop = task.get_loop()
+    detached = False
+
+    def cancel_task() -> None:
+        if not detached and not task.done():
+            task.cancel()
+
+    remove_callback = token.add_callback(lambda: loop.call_soon_threadsafe(cancel_task))
+
+    def detach() -> None:
+        nonlocal detached
+        detached = True
+        remove_callback()
+
+    return detach
+
+
+def uncancel_current_task() -> None:
+    """Undo a cancellation request on the current task after the resulting `CancelledError` has
+    been handled, so that subsequent awaits in the task aren't cancelled too."""
+    task = asyncio.current_task()
+    if task is not None and sys.version_info >= (3, 11):
+        task.uncancel()
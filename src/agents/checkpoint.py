@@ -0,0 +1,442 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import dataclasses
+import functools
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pydantic import TypeAdapter
+
+from .exceptions import UserError
+from .items import (
+    HandoffCallItem,
+    HandoffOutputItem,
+    MessageOutputItem,
+    ReasoningItem,
+    RunItem,
+    ToolCallItem,
+    ToolCallOutputItem,
+    TResponseInputItem,
+    TResponseOutputItem,
+)
+from .tracing import get_current_trace
+from .tracing.traces import NoOpTrace
+from .usage import Usage
+
+if TYPE_CHECKING:
+    from .agent import Agent
+
+
+@dataclass
+class RunState:
+    """A checkpoint of a run, saved by the runner after each completed turn when
+    `RunConfig.checkpoint_store` is set. Pass it to `Runner.resume()` to continue the run from the
+    next turn, e.g. after the process crashed or was restarted by a deploy, without paying for the
+    completed turns again.
+    """
+
+    run_id: str
+    """The ID of the run, i.e. `RunConfig.run_id` or a generated one."""
+
+    original_input: str | list[TResponseInputItem]
+    """The input of the run, after any changes by handoff input filters."""
+
+    generated_items: list[dict[str, Any]]
+    """The items generated so far, in a JSON-serializable form. They are turned back into run
+    items by `Runner.resume()`, which looks up the agents they refer to by name."""
+
+    current_agent: str
+    """The name of the agent that runs the next turn."""
+
+    current_turn: int
+    """The number of completed turns."""
+
+    usage: Usage = field(default_factory=Usage)
+    """The usage of the completed turns."""
+
+    trace_id: str | None = None
+    """The ID of the run's trace, if tracing is enabled. The resumed run continues this trace."""
+
+    group_id: str | None = None
+    """The group ID of the run's trace."""
+
+
+class CheckpointStore(abc.ABC):
+    """Stores the latest checkpoint of runs. Checkpoints are saved incrementally: the items that
+    a previous checkpoint of the run already saved are not passed again.
+    """
+
+    @abc.abstractmethod
+    async def save(self, state: RunState, start: int) -> None:
+        """Saves the latest checkpoint of a run.
+
+        Args:
+            state: The checkpoint.
+            start: The number of items at the start of `state.generated_items` that the previous
+                checkpoint of the run saved, and that haven't changed since; only the items from
+                `start` on need to be saved. If 0, the whole state must be saved, including
+                `original_input`, which can only change when `start` is 0.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def load(self, run_id: str) -> RunState | None:
+        """Returns the latest checkpoint of a run, or None if there is none."""
+        pass
+
+    @abc.abstractmethod
+    async def delete(self, run_id: str) -> None:
+        """Deletes the checkpoint of a run. Called by the runner once the run is complete."""
+        pass
+
+    @abc.abstractmethod
+    async def list_runs(self) -> list[str]:
+        """Returns the IDs of the runs that have a checkpoint, i.e. that haven't completed. Use it
+        to resume the runs that were interrupted, e.g. when a process starts."""
+        pass
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _dump_header(state: RunState) -> dict[str, Any]:
+    return {
+        "current_agent": state.current_agent,
+        "current_turn": state.current_turn,
+        "usage": dataclasses.asdict(state.usage),
+        "trace_id": state.trace_id,
+        "group_id": state.group_id,
+    }
+
+
+def _load_state(
+    run_id: str,
+    original_input: str | list[TResponseInputItem],
+    items: list[dict[str, Any]],
+    header: dict[str, Any],
+) -> RunState:
+    return RunState(
+        run_id=run_id,
+        original_input=original_input,
+        generated_items=items,
+        current_agent=header["current_agent"],
+        current_turn=header["current_turn"],
+        usage=Usage(**header["usage"]),
+        trace_id=header["trace_id"],
+        group_id=header["group_id"],
+    )
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Stores checkpoints in a directory, in a JSON Lines file per run. Each checkpoint appends a
+    line with the items added since the previous one, so saving a checkpoint doesn't get slower as
+    the run grows. A line that was only partly written, e.g. because the process crashed, is
+    ignored when loading. Full rewrites are written to a temporary file that then replaces the
+    run's file, so a crash during a rewrite leaves the previous checkpoint in place.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        """
+        Args:
+            directory: The directory to store the checkpoints in. Created if it doesn't exist.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, run_id: str) -> Path:
+        if not run_id or not all(c.isalnum() or c in "-_." for c in run_id):
+            raise UserError(f"Invalid run ID for a file checkpoint store: {run_id!r}")
+        return self.directory / f"{run_id}.jsonl"
+
+    async def save(self, state: RunState, start: int) -> None:
+        record: dict[str, Any] = {
+            "start": start,
+            "items": state.generated_items[start:],
+            **_dump_header(state),
+        }
+        if start == 0:
+            record["input"] = state.original_input
+        line = _dumps(record) + "\n"
+        path = self._path(state.run_id)
+
+        def write() -> None:
+            if start > 0:
+                with path.open("a", encoding="utf-8") as f:
+                    f.write(line)
+                return
+            temp_path = path.with_name(f"{path.name}.tmp")
+            with temp_path.open("w", encoding="utf-8") as f:
+                f.write(line)
+            os.replace(temp_path, path)
+
+        await asyncio.to_thread(write)
+
+    def _read(self, run_id: str) -> RunState | None:
+        path = self._path(run_id)
+        if not path.exists():
+            return None
+        original_input: str | list[TResponseInputItem] = []
+        items: list[dict[str, Any]] = []
+        header: dict[str, Any] | None = None
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if "input" in record:
+                    original_input = record["input"]
+                del items[record["start"] :]
+                items.extend(record["items"])
+                header = record
+        return _load_state(run_id, original_input, items, header) if header else None
+
+    async def load(self, run_id: str) -> RunState | None:
+        return await asyncio.to_thread(self._read, run_id)
+
+    async def delete(self, run_id: str) -> None:
+        await asyncio.to_thread(self._path(run_id).unlink, missing_ok=True)
+
+    async def list_runs(self) -> list[str]:
+        return sorted(path.stem for path in self.directory.glob("*.jsonl"))
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Stores checkpoints in a SQLite database, with a row per item, so that each checkpoint only
+    inserts the items added since the previous one. Database calls run in a thread, so they don't
+    block the event loop.
+    """
+
+    def __init__(self, db_path: str | Path, table_name: str = "agent_checkpoints") -> None:
+        """
+        Args:
+            db_path: The path of the database file.
+            table_name: The name of the table to store the runs in. The items are stored in a
+                table with the same name and an `_items` suffix.
+        """
+        if not table_name.isidentifier():
+            raise UserError(f"Invalid table name: {table_name}")
+        self.table_name = table_name
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name} (run_id TEXT PRIMARY KEY, "
+                "input TEXT NOT NULL, header TEXT NOT NULL)"
+            )
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name}_items (run_id TEXT NOT NULL, "
+                "position INTEGER NOT NULL, item TEXT NOT NULL, PRIMARY KEY (run_id, position))"
+            )
+
+    async def save(self, state: RunState, start: int) -> None:
+        header = _dumps(_dump_header(state))
+        original_input = _dumps(state.original_input) if start == 0 else None
+        rows = [
+            (state.run_id, position, _dumps(item))
+            for position, item in enumerate(state.generated_items[start:], start)
+        ]
+
+        def write() -> None:
+            with self._lock, self._connection:
+                if original_input is not None:
+                    self._connection.execute(
+                        f"INSERT OR REPLACE INTO {self.table_name} (run_id, input, header) "
+                        "VALUES (?, ?, ?)",
+                        (state.run_id, original_input, header),
+                    )
+                else:
+                    self._connection.execute(
+                        f"UPDATE {self.table_name} SET header = ? WHERE run_id = ?",
+                        (header, state.run_id),
+                    )
+                self._connection.execute(
+                    f"DELETE FROM {self.table_name}_items WHERE run_id = ? AND position >= ?",
+                    (state.run_id, start),
+                )
+                self._connection.executemany(
+                    f"INSERT INTO {self.table_name}_items (run_id, position, item) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+
+        await asyncio.to_thread(write)
+
+    def _read(self, run_id: str) -> RunState | None:
+        with self._lock, self._connection:
+            run = self._connection.execute(
+                f"SELECT input, header FROM {self.table_name} WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if run is None:
+                return None
+            rows = self._connection.execute(
+                f"SELECT item FROM {self.table_name}_items WHERE run_id = ? ORDER BY position",
+                (run_id,),
+            ).fetchall()
+        items = [json.loads(row[0]) for row in rows]
+        return _load_state(run_id, json.loads(run[0]), items, json.loads(run[1]))
+
+    async def load(self, run_id: str) -> RunState | None:
+        return await asyncio.to_thread(self._read, run_id)
+
+    async def delete(self, run_id: str) -> None:
+        def delete() -> None:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    f"DELETE FROM {self.table_name} WHERE run_id = ?", (run_id,)
+                )
+                self._connection.execute(
+                    f"DELETE FROM {self.table_name}_items WHERE run_id = ?", (run_id,)
+                )
+
+        await asyncio.to_thread(delete)
+
+    async def list_runs(self) -> list[str]:
+        def select() -> list[str]:
+            with self._lock, self._connection:
+                rows = self._connection.execute(
+                    f"SELECT run_id FROM {self.table_name} ORDER BY run_id"
+                ).fetchall()
+            return [row[0] for row in rows]
+
+        return await asyncio.to_thread(select)
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._connection.close()
+
+
+def _serialize_item(item: RunItem) -> dict[str, Any]:
+    # The raw items are dumped once and cached by the items themselves
+    data: dict[str, Any] = {
+        "type": item.type,
+        "agent": item.agent.name,
+        "raw_item": item._to_frozen_input_item(),
+    }
+    if isinstance(item, ToolCallOutputItem):
+        data["output"] = item.output
+    elif isinstance(item, HandoffOutputItem):
+        data["source_agent"] = item.source_agent.name
+        data["target_agent"] = item.target_agent.name
+    return data
+
+
+@functools.cache
+def _get_output_item_adapter() -> TypeAdapter[TResponseOutputItem]:
+    return TypeAdapter(TResponseOutputItem)
+
+
+def _deserialize_item(data: Mapping[str, Any], agents: Mapping[str, Agent[Any]]) -> RunItem:
+    def get_agent(name: str) -> Agent[Any]:
+        if name not in agents:
+            raise UserError(f"Agent {name!r} of the checkpoint is not in the agent registry")
+        return agents[name]
+
+    agent = get_agent(data["agent"])
+    raw_item = data["raw_item"]
+    item_type = data["type"]
+    if item_type == "tool_call_output_item":
+        return ToolCallOutputItem(agent=agent, raw_item=raw_item, output=data["output"])
+    if item_type == "handoff_output_item":
+        return HandoffOutputItem(
+            agent=agent,
+            raw_item=raw_item,
+            source_agent=get_agent(data["source_agent"]),
+            target_agent=get_agent(data["target_agent"]),
+        )
+
+    output_item: Any = _get_output_item_adapter().validate_python(raw_item)
+    if item_type == "message_output_item":
+        return MessageOutputItem(agent=agent, raw_item=output_item)
+    if item_type == "handoff_call_item":
+        return HandoffCallItem(agent=agent, raw_item=output_item)
+    if item_type == "tool_call_item":
+        return ToolCallItem(agent=agent, raw_item=output_item)
+    if item_type == "reasoning_item":
+        return ReasoningItem(agent=agent, raw_item=output_item)
+    raise UserError(f"Unknown item type in checkpoint: {item_type}")
+
+
+def _get_agent_registry(
+    agents: Mapping[str, Agent[Any]] | Sequence[Agent[Any]],
+) -> Mapping[str, Agent[Any]]:
+    if isinstance(agents, Mapping):
+        return agents
+    return {agent.name: agent for agent in agents}
+
+
+class _Checkpointer:
+    """Saves the checkpoints of a single run, serializing only the items added since the previous
+    checkpoint."""
+
+    def __init__(self, store: CheckpointStore, run_id: str | None) -> None:
+        self.store = store
+        self.run_id = run_id or f"run_{uuid.uuid4().hex}"
+        self._input: str | list[TResponseInputItem] | None = None
+        self._items: list[RunItem] = []
+        self._serialized_items: list[dict[str, Any]] = []
+        self._rewrite = False
+
+    def restore(
+        self,
+        original_input: str | list[TResponseInputItem],
+        items: list[RunItem],
+        serialized_items: list[dict[str, Any]],
+    ) -> None:
+        """Continues from a checkpoint, whose items were already serialized. The first checkpoint
+        is saved in full though, since the process that saved the previous one may have crashed
+        while saving it."""
+        self._input = original_input
+        self._items = list(items)
+        self._serialized_items = list(serialized_items)
+        self._rewrite = True
+
+    async def save(
+        self,
+        original_input: str | list[TResponseInputItem],
+        generated_items: list[RunItem],
+        current_agent: Agent[Any],
+        current_turn: int,
+        usage: Usage,
+    ) -> None:
+        # Only the items after the previous checkpoint's are new, unless a handoff input filter
+        # changed the input (then everything is saved again) or some of the earlier items
+        start = 0
+        if original_input is self._input:
+            start = min(len(self._items), len(generated_items))
+            for i in range(start):
+                if generated_items[i] is not self._items[i]:
+                    start = i
+                    break
+
+        self._serialized_items[start:] = [_serialize_item(item) for item in generated_items[start:]]
+        self._items = list(generated_items)
+        self._input = original_input
+        trace = get_current_trace()
+        if isinstance(trace, NoOpTrace):
+            trace = None
+        state = RunState(
+            run_id=self.run_id,
+            original_input=original_input,
+            generated_items=list(self._serialized_items),
+            current_agent=current_agent.name,
+            current_turn=current_turn,
+            usage=dataclasses.replace(usage),
+            trace_id=trace.trace_id if trace else None,
+            group_id=getattr(trace, "group_id", None),
+        )
+        await self.store.save(state, 0 if self._rewrite else start)
+        self._rewrite = False
+
+    async def delete(self) -> None:
+        await self.store.delete(self.run_id)
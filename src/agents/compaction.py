@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import abc
+from collections.abc import Sequence
+from typing import Any, cast
+
+from .exceptions import UserError
+from .items import TResponseInputItem
+from .token_attribution import count_input_tokens
+from .tokenizer import get_default_tokenizer
+
+_MODEL_OUTPUT_TYPES = (
+    "reasoning",
+    "function_call",
+    "computer_call",
+    "file_search_call",
+    "web_search_call",
+)
+_TOOL_OUTPUT_TYPES = ("function_call_output", "computer_call_output")
+_INSTRUCTION_ROLES = ("system", "developer")
+
+
+def estimate_tokens(items: Sequence[TResponseInputItem]) -> int:
+    """Estimates the number of tokens of a list of input items with the default tokenizer (see
+    `set_default_tokenizer()`)."""
+    return count_input_tokens(items)
+
+
+def _is_model_output(item: TResponseInputItem) -> bool:
+    item_type = item.get("type")
+    if item_type in _MODEL_OUTPUT_TYPES:
+        return True
+    return item.get("role") == "assistant"
+
+
+def _is_tool_output(item: TResponseInputItem) -> bool:
+    return item.get("type") in _TOOL_OUTPUT_TYPES
+
+
+def _is_instruction(item: TResponseInputItem) -> bool:
+    return item.get("role") in _INSTRUCTION_ROLES
+
+
+def _is_user_message(item: TResponseInputItem) -> bool:
+    return item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+def split_turns(items: Sequence[TResponseInputItem]) -> list[list[TResponseInputItem]]:
+    """Splits a history into turns. A turn is either an input message (e.g. from the user), or
+    the output items of a model response followed by the outputs of the tools it called, so a
+    tool call and its output are always in the same turn."""
+    turns: list[list[TResponseInputItem]] = []
+    previous: TResponseInputItem | None = None
+    for item in items:
+        starts_turn = (
+            previous is None
+            or not (_is_model_output(item) or _is_tool_output(item))
+            or (_is_model_output(item) and not _is_model_output(previous))
+        )
+        if starts_turn:
+            turns.append([])
+        turns[-1].append(item)
+        previous = item
+    return turns
+
+
+def _call_ids(items: Sequence[TResponseInputItem], types: Sequence[str]) -> set[str]:
+    return {
+        cast(str, item["call_id"])  # type: ignore[typeddict-item]
+        for item in items
+        if item.get("type") in types and item.get("call_id")
+    }
+
+
+def ensure_tool_calls_are_paired(
+    items: list[TResponseInputItem], original_items: Sequence[TResponseInputItem]
+) -> list[TResponseInputItem]:
+    """Removes tool outputs whose call was removed, and tool calls whose output was removed, so
+    the API doesn't reject the compacted history. Calls that had no output to begin with (e.g.
+    hosted tool calls) are kept."""
+    call_types = ("function_call", "computer_call")
+    calls = _call_ids(items, call_types)
+    outputs = _call_ids(items, _TOOL_OUTPUT_TYPES)
+    removed_outputs = _call_ids(original_items, _TOOL_OUTPUT_TYPES) - outputs
+    return [
+        item
+        for item in items
+        if not (_is_tool_output(item) and item.get("call_id") not in calls)
+        and not (item.get("type") in call_types and item.get("call_id") in removed_outputs)
+    ]
+
+
+class HistoryCompactor(abc.ABC):
+    """Compacts the history sent to the model before each model call, so that long-running agent
+    loops don't send an ever-growing input. Only the model input is compacted: the run's items and
+    result keep the full history.
+
+    Subclasses implement `compact_items()`. A compactor only runs once the estimated size of the
+    history exceeds its token budget (`max_tokens`), if one is set, and tool calls and their
+    outputs are always kept or removed together.
+    """
+
+    def __init__(self, max_tokens: int | None = None) -> None:
+        """
+        Args:
+            max_tokens: The token budget of the history. If set, the history is only compacted if
+                its estimated size exceeds it, and strategies that can remove more stop once the
+                history fits. If None, the history is always compacted.
+        """
+        if max_tokens is not None and max_tokens < 1:
+            raise UserError("max_tokens must be at least 1")
+        self.max_tokens = max_tokens
+
+    def estimate_tokens(self, items: Sequence[TResponseInputItem]) -> int:
+        """Estimates the number of tokens of the items. Uses the default tokenizer (see
+        `set_default_tokenizer()`); override to use another one."""
+        return estimate_tokens(items)
+
+    def fits_budget(self, items: Sequence[TResponseInputItem]) -> bool:
+        """Whether the items fit the token budget. Always False if there is no budget."""
+        return self.max_tokens is not None and self.estimate_tokens(items) <= self.max_tokens
+
+    def compact(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        """Returns the compacted history. The items themselves are never modified."""
+        if self.fits_budget(items):
+            return items
+        return self._compact(items)
+
+    def _compact(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        compacted = self.compact_items(items)
+        if compacted is items:
+            return items
+        return ensure_tool_calls_are_paired(compacted, items)
+
+    @abc.abstractmethod
+    def compact_items(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        """Returns a compacted copy of the history.
+
+        Args:
+            items: The full history: the run's input followed by the items generated so far.
+        """
+        pass
+
+
+class SlidingWindowCompactor(HistoryCompactor):
+    """Keeps the most recent turns of the history (see `split_turns()`), along with any system or
+    developer messages and, by default, the first user message, which usually holds the task."""
+
+    def __init__(
+        self,
+        max_turns: int | None = None,
+        max_tokens: int | None = None,
+        keep_first_user_message: bool = True,
+    ) -> None:
+        """
+        Args:
+            max_turns: The number of recent turns to keep. If None, turns are only dropped to fit
+                the token budget.
+            max_tokens: The token budget. Once the history exceeds it, the oldest turns are
+                dropped until it fits, but the latest turn is always kept.
+            keep_first_user_message: Whether to always keep the first user message.
+        """
+        if max_turns is None and max_tokens is None:
+            raise UserError("Either max_turns or max_tokens must be set")
+        if max_turns is not None and max_turns < 1:
+            raise UserError("max_turns must be at least 1")
+        super().__init__(max_tokens)
+        self.max_turns = max_turns
+        self.keep_first_user_message = keep_first_user_message
+
+    def compact(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        # The window applies even if the history fits the budget
+        if self.max_turns is None:
+            return super().compact(items)
+        return self._compact(items)
+
+    def compact_items(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        pinned: list[TResponseInputItem] = []
+        turns: list[list[TResponseInputItem]] = []
+        first_user_message_seen = False
+        for turn in split_turns(items):
+            item = turn[0]
+            if _is_instruction(item):
+                pinned.extend(turn)
+            elif (
+                self.keep_first_user_message
+                and not first_user_message_seen
+                and _is_user_message(item)
+            ):
+                first_user_message_seen = True
+                pinned.extend(turn)
+            else:
+                turns.append(turn)
+
+        kept = turns[-self.max_turns :] if self.max_turns is not None else turns
+        if self.max_tokens is not None:
+            tokens = self.estimate_tokens(pinned) + sum(self.estimate_tokens(t) for t in kept)
+            while len(kept) > 1 and tokens > self.max_tokens:
+                tokens -= self.estimate_tokens(kept[0])
+                kept = kept[1:]
+
+        if len(kept) == len(turns):
+            return items
+        kept_ids = {id(item) for turn in kept for item in turn} | {id(item) for item in pinned}
+        return [item for item in items if id(item) in kept_ids]
+
+
+class ToolOutputElisionCompactor(HistoryCompactor):
+    """Shortens the outputs of earlier function calls that exceed a size, keeping their start and
+    noting how much was elided. The outputs of the latest turn are kept in full, as the model is
+    usually about to act on them."""
+
+    def __init__(
+        self,
+        max_output_tokens: int = 500,
+        max_tokens: int | None = None,
+        keep_last_turns: int = 1,
+    ) -> None:
+        """
+        Args:
+            max_output_tokens: The estimated size above which a tool output is shortened, and the
+                size it is shortened to.
+            max_tokens: The token budget. If set, outputs are only shortened once the history
+                exceeds it, oldest first, until it fits.
+            keep_last_turns: The number of recent turns whose outputs are kept in full.
+        """
+        if max_output_tokens < 1:
+            raise UserError("max_output_tokens must be at least 1")
+        super().__init__(max_tokens)
+        self.max_output_tokens = max_output_tokens
+        self.keep_last_turns = keep_last_turns
+
+    def compact_items(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        turns = split_turns(items)
+        older = turns[: -self.keep_last_turns] if self.keep_last_turns > 0 else turns
+        replacements: dict[int, TResponseInputItem] = {}
+        tokenizer = get_default_tokenizer()
+        tokens = self.estimate_tokens(items) if self.max_tokens is not None else 0
+        for item in (item for turn in older for item in turn):
+            if self.max_tokens is not None and tokens <= self.max_tokens:
+                break
+            output = item.get("output")
+            if item.get("type") != "function_call_output" or not isinstance(output, str):
+                continue
+            output_tokens = tokenizer.count(output)
+            if output_tokens <= self.max_output_tokens:
+                continue
+            kept = output[: len(output) * self.max_output_tokens // output_tokens]
+            elided_tokens = output_tokens - tokenizer.count(kept)
+            replacement = cast(
+                TResponseInputItem,
+                {
+                    **cast(dict[str, Any], item),
+                    "output": f"{kept}\n[... {elided_tokens} tokens elided]",
+                },
+            )
+            tokens -= self.estimate_tokens([item]) - self.estimate_tokens([replacement])
+            replacements[id(item)] = replacement
+
+        if not replacements:
+            return items
+        return [replacements.get(id(item), item) for item in items]
+
+
+class SupersededReasoningCompactor(HistoryCompactor):
+    """Drops the reasoning items from before the latest user message. The model only uses the
+    reasoning of the current user turn, so earlier reasoning just takes up space."""
+
+    def compact_items(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        last_user_message = max(
+            (index for index, item in enumerate(items) if _is_user_message(item)), default=-1
+        )
+        compacted = [
+            item
+            for index, item in enumerate(items)
+            if index > last_user_message or item.get("type") != "reasoning"
+        ]
+        return compacted if len(compacted) < len(items) else items
+
+
+class CompactionPipeline(HistoryCompactor):
+    """Applies several compactors in order, e.g. cheap lossy ones like dropping superseded
+    reasoning first, then a sliding window. Stops as soon as the history fits the budget."""
+
+    def __init__(self, compactors: Sequence[HistoryCompactor], max_tokens: int | None = None):
+        """
+        Args:
+            compactors: The compactors to apply, in order.
+            max_tokens: The token budget. If set, the pipeline is only run if the history exceeds
+                it, and stops once it fits.
+        """
+        super().__init__(max_tokens)
+        self.compactors = list(compactors)
+
+    def compact_items(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+        for compactor in self.compactors:
+            items = compactor.compact(items)
+            if self.fits_budget(items):
+                break
+        return items
@@ -1,7 +1,8 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, Optional
 
 if TYPE_CHECKING:
     from .guardrail import InputGuardrailResult, OutputGuardrailResult
+    from .result import RunResultBase
 
 
 class AgentsException(Exception):
@@ -28,6 +29,51 @@ class ModelBehaviorError(AgentsException):
         self.message = message
 
 
+class ModelStreamStalled(AgentsException):
+    """Exception raised when a model response stream produces no events for longer than
+    `RunConfig.stream_idle_timeout`, and there are no retries left.
+    """
+
+    message: str
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+class BatchRequestError(AgentsException):
+    """Exception raised when a request sent via the Batch API fails, or the batch ends without a
+    result for it.
+    """
+
+    message: str
+    batch_id: Optional[str]
+    """The ID of the batch the request was sent in, if it was submitted."""
+
+    def __init__(self, message: str, batch_id: Optional[str] = None):
+        self.message = message
+        self.batch_id = batch_id
+
+
+class DeadlineExceeded(AgentsException):
+    """Exception raised when the run, a single turn or a single model call takes longer than the
+    timeout configured in `RunConfig`.
+    """
+
+    message: str
+
+    timeout_type: Literal["run", "turn", "model_call"]
+    """Which of the `RunConfig` timeouts was exceeded."""
+
+    partial_result: Optional["RunResultBase"]
+    """The result of the run up to the last completed turn. `final_output` is None. For streamed
+    runs, this is the `RunResultStreaming` object itself."""
+
+    def __init__(self, message: str, timeout_type: Literal["run", "turn", "model_call"]):
+        self.message = message
+        self.timeout_type = timeout_type
+        self.partial_result = None
+
+
 class UserError(AgentsException):
     """Exception raised when the user makes an error using the SDK."""
 
@@ -37,6 +83,17 @@ class UserError(AgentsException):
         self.message = message
 
 
+class StreamSubscriberDisconnected(AgentsException):
+    """Exception raised when a `StreamBroadcaster` subscriber that uses the "disconnect" slow
+    consumer policy falls too far behind.
+    """
+
+    message: str
+
+    def __init__(self, message: str):
+        self.message = message
+
+
 class InputGuardrailTripwireTriggered(AgentsException):
     """Exception raised when a guardrail tripwire is triggered."""
 
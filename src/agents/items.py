@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import abc
 import copy
-from dataclasses import dataclass
+from dataclasses import field
 from typing import TYPE_CHECKING, Any, Generic, Literal, TypeVar, Union
 
 from openai.types.responses import (
@@ -23,6 +23,8 @@ from openai.types.responses.response_reasoning_item import ResponseReasoningItem
 from pydantic import BaseModel
 from typing_extensions import TypeAlias
 
+from ._dataclasses import slotted_dataclass
+from ._frozen import freeze, thaw
 from .exceptions import AgentsException, ModelBehaviorError
 from .usage import Usage
 
@@ -44,7 +46,7 @@ TResponseStreamEvent = ResponseStreamEvent
 T = TypeVar("T", bound=Union[TResponseOutputItem, TResponseInputItem])
 
 
-@dataclass
+@slotted_dataclass
 class RunItemBase(Generic[T], abc.ABC):
     agent: Agent[Any]
     """The agent whose run caused this item to be generated."""
@@ -53,21 +55,52 @@ class RunItemBase(Generic[T], abc.ABC):
     """The raw Responses item from the run. This will always be a either an output item (i.e.
     `openai.types.responses.ResponseOutputItem` or an input item
     (i.e. `openai.types.responses.ResponseInputItemParam`).
+
+    Output items are converted to input items once, and the result is reused until `raw_item` is
+    replaced. To change an item, e.g. to redact a message in a hook, replace its raw item rather
+    than modifying it in place:
+
+    ```python
+    raw_item = item.raw_item.model_copy(deep=True)
+    raw_item.content[0].text = "[redacted]"
+    item.raw_item = raw_item
+    ```
     """
 
+    _input_item: TResponseInputItem | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _input_item_source: T | None = field(default=None, init=False, repr=False, compare=False)
+
     def to_input_item(self) -> TResponseInputItem:
-        """Converts this item into an input item suitable for passing to the model."""
+        """Converts this item into a new, mutable input item suitable for passing to the model.
+        Changes to `raw_item` are only picked up if it's replaced (see `raw_item`)."""
+        return thaw(self._to_frozen_input_item())  # type: ignore[no-any-return]
+
+    def _to_frozen_input_item(self) -> TResponseInputItem:
+        """Converts this item into a read-only input item, for the runner to share across turns.
+
+        Output items are converted once, and the result is cached on the item until `raw_item` is
+        replaced, as the history is rebuilt from the same items on every turn.
+        """
         if isinstance(self.raw_item, dict):
             # We know that input items are dicts, so we can ignore the type error
             return self.raw_item  # type: ignore
         elif isinstance(self.raw_item, BaseModel):
-            # All output items are Pydantic models that can be converted to input items.
-            return self.raw_item.model_dump(exclude_unset=True)  # type: ignore
+            if self._input_item is None or self._input_item_source is not self.raw_item:
+                # All output items are Pydantic models that can be converted to input items.
+                self._input_item = _dump_output_item(self.raw_item)
+                self._input_item_source = self.raw_item
+            return self._input_item
         else:
             raise AgentsException(f"Unexpected raw item type: {type(self.raw_item)}")
 
 
-@dataclass
+def _dump_output_item(item: BaseModel) -> TResponseInputItem:
+    return freeze(item.model_dump(exclude_unset=True))  # type: ignore[no-any-return]
+
+
+@slotted_dataclass
 class MessageOutputItem(RunItemBase[ResponseOutputMessage]):
     """Represents a message from the LLM."""
 
@@ -77,7 +110,7 @@ class MessageOutputItem(RunItemBase[ResponseOutputMessage]):
     type: Literal["message_output_item"] = "message_output_item"
 
 
-@dataclass
+@slotted_dataclass
 class HandoffCallItem(RunItemBase[ResponseFunctionToolCall]):
     """Represents a tool call for a handoff from one agent to another."""
 
@@ -87,7 +120,7 @@ class HandoffCallItem(RunItemBase[ResponseFunctionToolCall]):
     type: Literal["handoff_call_item"] = "handoff_call_item"
 
 
-@dataclass
+@slotted_dataclass
 class HandoffOutputItem(RunItemBase[TResponseInputItem]):
     """Represents the output of a handoff."""
 
@@ -112,7 +145,7 @@ ToolCallItemTypes: TypeAlias = Union[
 """A type that represents a tool call item."""
 
 
-@dataclass
+@slotted_dataclass
 class ToolCallItem(RunItemBase[ToolCallItemTypes]):
     """Represents a tool call e.g. a function call or computer action call."""
 
@@ -122,7 +155,7 @@ class ToolCallItem(RunItemBase[ToolCallItemTypes]):
     type: Literal["tool_call_item"] = "tool_call_item"
 
 
-@dataclass
+@slotted_dataclass
 class ToolCallOutputItem(RunItemBase[Union[FunctionCallOutput, ComputerCallOutput]]):
     """Represents the output of a tool call."""
 
@@ -135,7 +168,7 @@ class ToolCallOutputItem(RunItemBase[Union[FunctionCallOutput, ComputerCallOutpu
     type: Literal["tool_call_output_item"] = "tool_call_output_item"
 
 
-@dataclass
+@slotted_dataclass
 class ReasoningItem(RunItemBase[ResponseReasoningItem]):
     """Represents a reasoning item."""
 
@@ -156,7 +189,7 @@ RunItem: TypeAlias = Union[
 """An item generated by an agent."""
 
 
-@dataclass
+@slotted_dataclass
 class ModelResponse:
     output: list[TResponseOutputItem]
     """A list of outputs (messages, tool calls, etc) generated by the model"""
@@ -169,12 +202,40 @@ class ModelResponse:
     model. Not supported by all model providers.
     """
 
+    prefix_fingerprint: str | None = None
+    """The fingerprint of the prompt prefix of the request (instructions, tools, output schema and
+    the start of the conversation history), set by the runner. Requests with the same fingerprint
+    can be served from the prompt cache.
+    """
+
+    _input_items: list[TResponseInputItem] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _input_items_source: tuple[TResponseOutputItem, ...] = field(
+        default=(), init=False, repr=False, compare=False
+    )
+
     def to_input_items(self) -> list[TResponseInputItem]:
-        """Convert the output into a list of input items suitable for passing to the model."""
-        # We happen to know that the shape of the Pydantic output items are the same as the
-        # equivalent TypedDict input items, so we can just convert each one.
-        # This is also tested via unit tests.
-        return [it.model_dump(exclude_unset=True) for it in self.output]  # type: ignore
+        """Convert the output into a list of new, mutable input items suitable for passing to the
+        model."""
+        return [thaw(item) for item in self._to_frozen_input_items()]
+
+    def _to_frozen_input_items(self) -> list[TResponseInputItem]:
+        """Convert the output into a list of read-only input items, for the runner to share. Like
+        `RunItemBase._to_frozen_input_item()`, the items are cached, until output items are added,
+        removed or replaced."""
+        source = tuple(self.output)
+        if (
+            self._input_items is None
+            or len(source) != len(self._input_items_source)
+            or any(a is not b for a, b in zip(source, self._input_items_source))
+        ):
+            # We happen to know that the shape of the Pydantic output items are the same as the
+            # equivalent TypedDict input items, so we can just convert each one.
+            # This is also tested via unit tests.
+            self._input_items = [_dump_output_item(it) for it in self.output]
+            self._input_items_source = source
+        return list(self._input_items)
 
 
 class ItemHelpers:
@@ -216,6 +277,26 @@ class ItemHelpers:
             ]
         return copy.deepcopy(input)
 
+    @classmethod
+    def input_to_frozen_input_list(
+        cls, input: str | list[TResponseInputItem]
+    ) -> list[TResponseInputItem]:
+        """Converts a string or list of input items into a list of read-only input items. Unlike
+        `input_to_new_input_list()`, items that are already read-only are shared rather than
+        copied, and strings (e.g. base64 encoded images) are never copied. Read-only items raise a
+        `TypeError` when modified; `copy.deepcopy()` returns a mutable copy."""
+        if isinstance(input, str):
+            return cls.input_to_new_input_list(input)
+        return [freeze(item) for item in input]
+
+    @classmethod
+    def input_to_input_list(cls, input: str | list[TResponseInputItem]) -> list[TResponseInputItem]:
+        """Converts a string or list of input items into a new list of input items, without
+        copying the items themselves. For code that only reads the items."""
+        if isinstance(input, str):
+            return cls.input_to_new_input_list(input)
+        return list(input)
+
     @classmethod
     def text_message_outputs(cls, items: list[RunItem]) -> str:
         """Concatenates all the text content from a list of message output items."""
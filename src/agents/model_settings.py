@@ -39,6 +39,15 @@ class ModelSettings:
     max_tokens: int | None = None
     """The maximum number of output tokens to generate."""
 
+    timeout: float | None = None
+    """The timeout for the model request, in seconds. The runner sets this to the remaining time
+    budget of the run, if `RunConfig` has timeouts configured."""
+
+    previous_response_id: str | None = None
+    """The ID of a previous response to continue from, so that the input only needs to contain the
+    items that follow it. Only supported by the Responses API. The runner sets this if
+    `RunConfig.use_previous_response_id` is enabled."""
+
     def resolve(self, override: ModelSettings | None) -> ModelSettings:
         """Produce a new ModelSettings by overlaying any non-None values from the
         override on top of this instance."""
@@ -53,4 +62,6 @@ class ModelSettings:
             parallel_tool_calls=override.parallel_tool_calls or self.parallel_tool_calls,
             truncation=override.truncation or self.truncation,
             max_tokens=override.max_tokens or self.max_tokens,
+            timeout=override.timeout or self.timeout,
+            previous_response_id=override.previous_response_id or self.previous_response_id,
         )
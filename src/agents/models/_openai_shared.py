@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from openai import AsyncOpenAI
 
+if TYPE_CHECKING:
+    from .http_client_pool import HTTPClientPool
+    from .rate_limiter import RateLimiter
+
 _default_openai_key: str | None = None
 _default_openai_client: AsyncOpenAI | None = None
 _use_responses_by_default: bool = True
+_default_rate_limiter: RateLimiter | None = None
+_default_http_client_pool: HTTPClientPool | None = None
 
 
 def set_default_openai_key(key: str) -> None:
@@ -32,3 +40,26 @@ def set_use_responses_by_default(use_responses: bool) -> None:
 
 def get_use_responses_by_default() -> bool:
     return _use_responses_by_default
+
+
+def set_default_rate_limiter(rate_limiter: RateLimiter | None) -> None:
+    global _default_rate_limiter
+    _default_rate_limiter = rate_limiter
+
+
+def get_default_rate_limiter() -> RateLimiter | None:
+    return _default_rate_limiter
+
+
+def set_default_http_client_pool(pool: HTTPClientPool | None) -> None:
+    global _default_http_client_pool
+    _default_http_client_pool = pool
+
+
+def get_default_http_client_pool() -> HTTPClientPool:
+    global _default_http_client_pool
+    if _default_http_client_pool is None:
+        from .http_client_pool import HTTPClientPool
+
+        _default_http_client_pool = HTTPClientPool()
+    return _default_http_client_pool
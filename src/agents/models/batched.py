@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Literal
+
+from openai import AsyncOpenAI, NotGiven
+from openai.types import Batch, ChatModel
+from openai.types.chat import ChatCompletion, ChatCompletionMessageParam
+from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
+
+from ..agent_output import AgentOutputSchema
+from ..exceptions import BatchRequestError, UserError
+from ..handoffs import Handoff
+from ..items import TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from .interface import ModelTracing
+from .openai_chatcompletions import OpenAIChatCompletionsModel
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+_BATCH_ENDPOINT: Literal["/v1/chat/completions"] = "/v1/chat/completions"
+
+# Request options that only apply to individual HTTP requests, not to requests in a batch
+_NON_BATCH_OPTIONS = frozenset({"extra_headers", "timeout", "stream", "stream_options"})
+
+_FINAL_BATCH_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass
+class _PendingRequest:
+    custom_id: str
+    body: dict[str, Any]
+    future: asyncio.Future[ChatCompletion]
+
+
+class _BatchResource:
+    """Stands in for the chat completions resource of the OpenAI client, and adds the requests
+    it's asked to create to the next batch."""
+
+    def __init__(self, model: BatchedModel) -> None:
+        self._model = model
+
+    async def create(self, **kwargs: Any) -> ChatCompletion:
+        body = {
+            key: value
+            for key, value in kwargs.items()
+            if key not in _NON_BATCH_OPTIONS and not isinstance(value, NotGiven)
+        }
+        return await self._model._add_to_batch(body)
+
+
+class BatchedModel(OpenAIChatCompletionsModel):
+    """A model that sends its requests via the OpenAI Batch API, for bulk jobs where cost and
+    throughput matter more than latency.
+
+    Concurrent `get_response()` calls, e.g. from many runs of an overnight job, are collected into
+    a single batch: once `batch_window` seconds have passed since the first request of the batch,
+    or `max_batch_size` requests have been collected, they're written to a JSONL file and
+    submitted. The batch is then polled every `poll_interval` seconds until it ends, and each call
+    returns its own response. Multi-turn runs simply make one call per turn, so they progress one
+    batch at a time.
+
+    Requests use the Chat Completions format. Streaming isn't supported.
+    """
+
+    def __init__(
+        self,
+        model: str | ChatModel,
+        openai_client: AsyncOpenAI,
+        *,
+        batch_window: float = 5.0,
+        max_batch_size: int = 1000,
+        poll_interval: float = 30.0,
+        metadata: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Args:
+            model: The name of the model to use.
+            openai_client: The client to upload the batch files and create the batches with.
+            batch_window: How long to collect requests before submitting a batch, in seconds.
+            max_batch_size: The maximum number of requests per batch. A batch is submitted as soon
+                as it's full.
+            poll_interval: How often to check whether a submitted batch has ended, in seconds.
+            metadata: Metadata to attach to each batch, e.g. to find the batches of a job.
+        """
+        super().__init__(model=model, openai_client=openai_client)
+        if max_batch_size < 1:
+            raise UserError("max_batch_size must be at least 1")
+
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.poll_interval = poll_interval
+        self.metadata = metadata
+        self._pending: list[_PendingRequest] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._batch_tasks: set[asyncio.Task[None]] = set()
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        raise UserError("BatchedModel doesn't support streaming. Use Runner.run() instead.")
+        yield  # Makes this an async generator
+
+    async def _send_request(
+        self,
+        create: Callable[[Any], Awaitable[Any]],
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+        model_settings: ModelSettings,
+    ) -> Any:
+        return await create(_BatchResource(self))
+
+    async def _add_to_batch(self, body: dict[str, Any]) -> ChatCompletion:
+        loop = asyncio.get_running_loop()
+        request = _PendingRequest(
+            custom_id=f"request-{uuid.uuid4().hex}", body=body, future=loop.create_future()
+        )
+        self._pending.append(request)
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self.flush)
+
+        try:
+            return await request.future
+        except asyncio.CancelledError:
+            # If the batch wasn't submitted yet, don't submit the request
+            if request in self._pending:
+                self._pending.remove(request)
+            raise
+
+    def flush(self) -> None:
+        """Submit the requests collected so far as a batch, without waiting for the batch
+        window to end."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        requests, self._pending = self._pending, []
+        if not requests:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(requests))
+        # Keep a reference to the task, so it isn't garbage collected while it runs
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, requests: list[_PendingRequest]) -> None:
+        client = self._get_client()
+        batch_id: str | None = None
+        try:
+            batch_file = "\n".join(
+                json.dumps(
+                    {
+                        "custom_id": request.custom_id,
+                        "method": "POST",
+                        "url": _BATCH_ENDPOINT,
+                        "body": request.body,
+                    }
+                )
+                for request in requests
+            )
+            input_file = await client.files.create(
+                file=("batch.jsonl", batch_file.encode(), "application/jsonl"), purpose="batch"
+            )
+            batch = await client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=_BATCH_ENDPOINT,
+                completion_window="24h",
+                metadata=self.metadata,
+            )
+            batch_id = batch.id
+            logger.debug(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+            while batch.status not in _FINAL_BATCH_STATUSES:
+                if all(request.future.done() for request in requests):
+                    # Every caller was cancelled, so nobody needs the results anymore
+                    logger.debug(f"Cancelling batch {batch.id}, as no request is awaited")
+                    await client.batches.cancel(batch.id)
+                    return
+                await asyncio.sleep(self.poll_interval)
+                batch = await client.batches.retrieve(batch.id)
+
+            results = await self._get_results(client, batch)
+            for request in requests:
+                if request.future.done():
+                    continue
+                result = results.get(request.custom_id)
+                if result is None:
+                    request.future.set_exception(
+                        BatchRequestError(
+                            f"Batch {batch.id} ended with status {batch.status} without a result "
+                            "for the request",
+                            batch_id=batch.id,
+                        )
+                    )
+                    continue
+
+                response = result.get("response") or {}
+                if response.get("status_code") == 200:
+                    request.future.set_result(ChatCompletion.model_validate(response["body"]))
+                else:
+                    error = result.get("error") or response.get("body", {}).get("error")
+                    request.future.set_exception(
+                        BatchRequestError(
+                            f"Request in batch {batch.id} failed: {error}", batch_id=batch.id
+                        )
+                    )
+        except Exception as e:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(
+                        BatchRequestError(f"Batch failed: {e}", batch_id=batch_id)
+                    )
+
+    async def _get_results(self, client: AsyncOpenAI, batch: Batch) -> dict[str, dict[str, Any]]:
+        results: dict[str, dict[str, Any]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    result = json.loads(line)
+                    results[result["custom_id"]] = result
+        return results
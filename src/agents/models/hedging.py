@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Union
+
+from typing_extensions import TypeAlias
+
+from ..agent_output import AgentOutputSchema
+from ..exceptions import UserError
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from .interface import Model, ModelTracing
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+# Events that a stream sends before the model has produced any output. A stream that has only
+# sent these may still be stuck in a slow upstream queue, so we don't commit to it yet.
+_PRELUDE_EVENT_TYPES = frozenset({"response.created", "response.in_progress"})
+
+
+@dataclass
+class HedgeStats:
+    """Statistics about the requests made by a `HedgedModel`."""
+
+    requests: int = 0
+    """The number of calls to the model."""
+
+    hedged_requests: int = 0
+    """The number of calls for which a hedge request was sent."""
+
+    hedge_wins: int = 0
+    """The number of calls that were answered by the hedge request rather than the original one."""
+
+
+class _LatencyWindow:
+    """The most recent latencies of a kind of call, to derive the hedge delay from."""
+
+    def __init__(self, size: int) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def percentile(self, percentile: float) -> float:
+        ordered = sorted(self._samples)
+        rank = math.ceil(percentile / 100 * len(ordered))
+        return ordered[max(rank - 1, 0)]
+
+
+class HedgedModel(Model):
+    """Wraps a model to cut tail latency by hedging: if a call hasn't returned within a delay
+    learned from recent latencies, a duplicate request is sent, and whichever returns first is
+    used. The other request is cancelled.
+
+    For streamed calls, the delay is measured until the first output event, and the model
+    commits to the first stream that produces output.
+
+    Hedging costs extra requests, so the number of hedge requests is capped at `max_hedge_ratio`
+    of all requests.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        *,
+        hedge_model: Model | None = None,
+        percentile: float = 95,
+        max_hedge_ratio: float = 0.05,
+        initial_delay: float | None = None,
+        min_samples: int = 20,
+        window_size: int = 200,
+    ) -> None:
+        """
+        Args:
+            model: The model to send requests to.
+            hedge_model: The model to send hedge requests to. Defaults to `model`. Use this to
+                send hedge requests via a different client or region.
+            percentile: The latency percentile, out of 100, after which a call is hedged. E.g. at
+                95, a hedge is sent for calls that take longer than 95% of recent calls.
+            max_hedge_ratio: The maximum number of hedge requests, as a fraction of all requests.
+            initial_delay: The hedge delay to use until `min_samples` latencies have been
+                recorded. If None, calls aren't hedged until then.
+            min_samples: The number of latencies to record before deriving the hedge delay.
+            window_size: The number of most recent latencies to derive the hedge delay from.
+        """
+        if not 0 < percentile <= 100:
+            raise UserError("percentile must be between 0 and 100")
+        if max_hedge_ratio < 0:
+            raise UserError("max_hedge_ratio must not be negative")
+        if min_samples < 1 or window_size < min_samples:
+            raise UserError("window_size must be at least min_samples, which must be at least 1")
+
+        self.model = model
+        self.hedge_model = hedge_model or model
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.stats = HedgeStats()
+        """Statistics about the requests made so far."""
+
+        self._response_latencies = _LatencyWindow(window_size)
+        self._first_event_latencies = _LatencyWindow(window_size)
+
+    @property
+    def response_hedge_delay(self) -> float | None:
+        """The current hedge delay for `get_response()` calls, in seconds. None if calls aren't
+        hedged yet."""
+        return self._get_hedge_delay(self._response_latencies)
+
+    @property
+    def stream_hedge_delay(self) -> float | None:
+        """The current hedge delay for `stream_response()` calls, in seconds, measured until the
+        first output event. None if calls aren't hedged yet."""
+        return self._get_hedge_delay(self._first_event_latencies)
+
+    def _get_hedge_delay(self, latencies: _LatencyWindow) -> float | None:
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        return latencies.percentile(self.percentile)
+
+    def _try_start_hedge(self) -> bool:
+        if self.stats.hedged_requests + 1 > self.max_hedge_ratio * self.stats.requests:
+            logger.debug("Not hedging model request: hedge budget exhausted")
+            return False
+        self.stats.hedged_requests += 1
+        return True
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        def send(model: Model) -> asyncio.Task[ModelResponse]:
+            return asyncio.ensure_future(
+                model.get_response(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    tracing,
+                )
+            )
+
+        self.stats.requests += 1
+        start = time.monotonic()
+        requests = [send(self.model)]
+        try:
+            delay = self.response_hedge_delay
+            if delay is not None:
+                done, _ = await asyncio.wait(requests, timeout=delay)
+                if not done and self._try_start_hedge():
+                    logger.debug(f"Hedging model request after {delay:.3f}s")
+                    requests.append(send(self.hedge_model))
+
+            pending = set(requests)
+            while pending:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for request in requests:
+                    if request.done() and request.exception() is None:
+                        self._response_latencies.record(time.monotonic() - start)
+                        if request is not requests[0]:
+                            self.stats.hedge_wins += 1
+                        return request.result()
+
+            # Every request failed
+            return requests[0].result()
+        finally:
+            await _cancel_all(requests)
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        def send(model: Model) -> AsyncIterator[TResponseStreamEvent]:
+            return model.stream_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+            )
+
+        self.stats.requests += 1
+        start = time.monotonic()
+        delay = self.stream_hedge_delay
+        hedge_at = start + delay if delay is not None else None
+
+        streams = [_StreamReader(send(self.model))]
+        # The events each stream sent before we committed to one of them
+        buffers: list[list[TResponseStreamEvent]] = [[]]
+        next_items: dict[asyncio.Task[_StreamItem], int] = {streams[0].next_item(): 0}
+        winner: int | None = None
+        finished = False
+        try:
+            while winner is None:
+                timeout = None
+                if hedge_at is not None:
+                    timeout = max(hedge_at - time.monotonic(), 0)
+                done, _ = await asyncio.wait(
+                    next_items, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedge_at = None
+                    if self._try_start_hedge():
+                        logger.debug(f"Hedging model stream after {delay:.3f}s")
+                        streams.append(_StreamReader(send(self.hedge_model)))
+                        buffers.append([])
+                        next_items[streams[1].next_item()] = 1
+                    continue
+
+                for task in sorted(done, key=lambda t: next_items[t]):
+                    index = next_items.pop(task)
+                    item = task.result()
+                    if item is None:
+                        # The stream ended without any output; there's nothing to wait for
+                        winner, finished = index, True
+                        break
+                    if isinstance(item, _StreamFailed):
+                        if next_items:
+                            logger.debug("Hedged model stream failed, using the other stream")
+                            continue
+                        raise item.error
+
+                    buffers[index].append(item)
+                    if item.type not in _PRELUDE_EVENT_TYPES:
+                        winner = index
+                        break
+                    next_items[streams[index].next_item()] = index
+
+            self._first_event_latencies.record(time.monotonic() - start)
+            if winner != 0:
+                self.stats.hedge_wins += 1
+            # Stop the losing stream before handing over the winning one
+            await _cancel_all(next_items)
+            await _cancel_all(stream.task for i, stream in enumerate(streams) if i != winner)
+
+            for event in buffers[winner]:
+                yield event
+            while not finished:
+                item = await streams[winner].queue.get()
+                if item is None:
+                    finished = True
+                elif isinstance(item, _StreamFailed):
+                    raise item.error
+                else:
+                    yield item
+        finally:
+            await _cancel_all(next_items)
+            await _cancel_all(stream.task for stream in streams)
+
+
+@dataclass
+class _StreamFailed:
+    error: Exception
+
+
+_StreamItem: TypeAlias = Union[TResponseStreamEvent, _StreamFailed, None]
+"""An event of a stream, the error it failed with, or None once it has ended."""
+
+
+class _StreamReader:
+    """Reads a stream into a queue, in a task of its own. This way, the stream runs in a single
+    context from start to end, even if we stop reading it, so its spans are closed properly.
+    """
+
+    def __init__(self, stream: AsyncIterator[TResponseStreamEvent]) -> None:
+        self.queue: asyncio.Queue[_StreamItem] = asyncio.Queue()
+        self.task = asyncio.ensure_future(self._read(stream))
+
+    async def _read(self, stream: AsyncIterator[TResponseStreamEvent]) -> None:
+        try:
+            async for event in stream:
+                self.queue.put_nowait(event)
+        except Exception as e:
+            self.queue.put_nowait(_StreamFailed(e))
+        else:
+            self.queue.put_nowait(None)
+
+    def next_item(self) -> asyncio.Task[_StreamItem]:
+        return asyncio.ensure_future(self.queue.get())
+
+
+async def _cancel_all(tasks: Iterable[asyncio.Task[Any]]) -> None:
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    for task in pending:
+        if not task.cancelled():
+            # Retrieve the exception, so it isn't logged as never retrieved
+            task.exception()
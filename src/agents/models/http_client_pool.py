@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+from ..exceptions import UserError
+from ..logger import logger
+
+T = TypeVar("T")
+
+# The first event httpcore traces for a request once it has been assigned a connection: either
+# opening a new connection, or sending the request on an existing one.
+_CONNECTION_ASSIGNED_EVENTS = (
+    "connection.connect_tcp.started",
+    "connection.connect_unix_socket.started",
+    "http11.send_request_headers.started",
+    "http2.send_connection_init.started",
+    "http2.send_request_headers.started",
+)
+
+
+@dataclass
+class HTTPPoolStats:
+    """Statistics of the connections and requests of an `HTTPClientPool`, across event loops."""
+
+    requests: int = 0
+    """The number of requests sent."""
+
+    connections_opened: int = 0
+    """The number of connections opened."""
+
+    pool_waits: int = 0
+    """The number of requests for which the time spent waiting for a connection was measured."""
+
+    total_pool_wait_time: float = 0.0
+    """The total time requests spent waiting for a connection from the pool, in seconds."""
+
+    max_pool_wait_time: float = 0.0
+    """The longest time a request spent waiting for a connection from the pool, in seconds."""
+
+
+class _LoopLocal(Generic[T]):
+    """Holds a value per event loop. Values of closed event loops are discarded."""
+
+    def __init__(self) -> None:
+        self._values: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._loopless_value: T | None = None
+        self._lock = threading.Lock()
+
+    def get(self, factory: Callable[[], T], is_valid: Callable[[T], bool] | None = None) -> T:
+        try:
+            loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        with self._lock:
+            for closed_loop in [loop for loop in self._values if loop.is_closed()]:
+                del self._values[closed_loop]
+
+            value = self._loopless_value if loop is None else self._values.get(loop)
+            if value is None or (is_valid is not None and not is_valid(value)):
+                value = factory()
+                if loop is None:
+                    self._loopless_value = value
+                else:
+                    self._values[loop] = value
+            return value
+
+    def pop(self) -> T | None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            with self._lock:
+                value, self._loopless_value = self._loopless_value, None
+                return value
+        with self._lock:
+            return self._values.pop(loop, None)
+
+
+class HTTPClientPool:
+    """Provides the HTTP clients for the OpenAI clients, one per event loop.
+
+    An HTTP client's connections belong to the event loop they were opened on. Sharing a client
+    between event loops, e.g. when calling `Runner.run_sync()` from several threads, or using a
+    new event loop per test, breaks its connections. This pool creates a separate client for each
+    event loop, and discards the clients of closed event loops.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int | None = 1000,
+        max_keepalive_connections: int | None = 100,
+        keepalive_expiry: float | None = 5.0,
+        http2: bool = False,
+    ) -> None:
+        """
+        Args:
+            max_connections: The maximum number of connections per event loop. Requests wait for
+                a connection once this many are open. If None, there's no limit.
+            max_keepalive_connections: The maximum number of idle connections to keep open per
+                event loop. If None, there's no limit.
+            keepalive_expiry: How long to keep idle connections open, in seconds. If None, idle
+                connections are kept open indefinitely.
+            http2: Whether to use HTTP/2, which multiplexes concurrent requests over a single
+                connection. Requires the `h2` package (`pip install 'httpx[http2]'`).
+        """
+        if http2:
+            try:
+                import h2  # type: ignore # noqa: F401
+            except ImportError as e:
+                raise UserError(
+                    "HTTP/2 requires the `h2` package. Install it with "
+                    "`pip install 'httpx[http2]'`."
+                ) from e
+
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._stats = HTTPPoolStats()
+        self._clients: _LoopLocal[httpx.AsyncClient] = _LoopLocal()
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Returns the HTTP client for the running event loop, creating it if needed."""
+        return self._clients.get(self._create_client, lambda client: not client.is_closed)
+
+    def get_stats(self) -> HTTPPoolStats:
+        """Returns the statistics of the pool's connections and requests."""
+        return self._stats
+
+    def _create_client(self) -> httpx.AsyncClient:
+        return DefaultAsyncHttpxClient(
+            limits=self.limits,
+            http2=self.http2,
+            event_hooks={"request": [self._on_request]},
+        )
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        stats = self._stats
+        stats.requests += 1
+        start = time.monotonic()
+        assigned = False
+        previous_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict[str, Any]) -> None:
+            nonlocal assigned
+            if not assigned and event_name in _CONNECTION_ASSIGNED_EVENTS:
+                assigned = True
+                wait_time = time.monotonic() - start
+                stats.pool_waits += 1
+                stats.total_pool_wait_time += wait_time
+                stats.max_pool_wait_time = max(stats.max_pool_wait_time, wait_time)
+            if event_name in (
+                "connection.connect_tcp.complete",
+                "connection.connect_unix_socket.complete",
+            ):
+                stats.connections_opened += 1
+            if previous_trace is not None:
+                await previous_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+
+    async def warm_up(self, url: str | httpx.URL, *, connections: int = 1) -> None:
+        """Open connections ahead of the first request, so that it doesn't wait for the TCP and
+        TLS handshakes. Call this at startup, on the event loop that will make the requests.
+
+        Args:
+            url: A URL on the server to connect to, e.g. `client.base_url` of your OpenAI client.
+                A HEAD request is sent to it on each connection; its response is ignored.
+            connections: The number of connections to open. With HTTP/2, a single connection
+                serves all requests.
+        """
+        client = self.get_client()
+
+        async def open_connection() -> None:
+            try:
+                await client.head(url)
+            except httpx.HTTPError as e:
+                logger.debug(f"Failed to warm up connection to {url}: {e}")
+
+        await asyncio.gather(*(open_connection() for _ in range(connections)))
+
+    async def aclose(self) -> None:
+        """Close the HTTP client of the running event loop, and its connections."""
+        client = self._clients.pop()
+        if client is not None:
+            await client.aclose()
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
 import json
 import time
-from collections.abc import AsyncIterator, Iterable
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any, Literal, cast, overload
 
@@ -62,14 +63,18 @@ from ..exceptions import AgentsException, UserError
 from ..handoffs import Handoff
 from ..items import ModelResponse, TResponseInputItem, TResponseOutputItem, TResponseStreamEvent
 from ..logger import logger
+from ..prompt_cache import canonicalize, get_cached_tokens
+from ..token_attribution import _attribute_tokens_later
 from ..tool import FunctionTool, Tool
-from ..tracing import generation_span
+from ..tracing import SpanError, generation_span
 from ..tracing.span_data import GenerationSpanData
 from ..tracing.spans import Span
 from ..usage import Usage
 from ..version import __version__
+from . import _openai_shared
 from .fake_id import FAKE_RESPONSES_ID
 from .interface import Model, ModelTracing
+from .rate_limiter import LimitedStream, RateLimiter, estimate_request_tokens
 
 if TYPE_CHECKING:
     from ..model_settings import ModelSettings
@@ -92,9 +97,12 @@ class OpenAIChatCompletionsModel(Model):
         self,
         model: str | ChatModel,
         openai_client: AsyncOpenAI,
+        rate_limiter: RateLimiter | None = None,
     ) -> None:
         self.model = model
         self._client = openai_client
+        self._rate_limiter = rate_limiter
+        self._client_without_retries: AsyncOpenAI | None = None
 
     def _non_null_or_not_given(self, value: Any) -> Any:
         return value if value is not None else NOT_GIVEN
@@ -115,6 +123,12 @@ class OpenAIChatCompletionsModel(Model):
             | {"base_url": str(self._client.base_url)},
             disabled=tracing.is_disabled(),
         ) as span_generation:
+            if not tracing.is_disabled():
+                span_generation.span_data.defer_token_attribution(
+                    _attribute_tokens_later(
+                        system_instructions, input, tools, handoffs, output_schema
+                    )
+                )
             response = await self._fetch_response(
                 system_instructions,
                 input,
@@ -140,6 +154,7 @@ class OpenAIChatCompletionsModel(Model):
                     input_tokens=response.usage.prompt_tokens,
                     output_tokens=response.usage.completion_tokens,
                     total_tokens=response.usage.total_tokens,
+                    cached_input_tokens=get_cached_tokens(response.usage.prompt_tokens_details),
                 )
                 if response.usage
                 else Usage()
@@ -178,6 +193,12 @@ class OpenAIChatCompletionsModel(Model):
             | {"base_url": str(self._client.base_url)},
             disabled=tracing.is_disabled(),
         ) as span_generation:
+            if not tracing.is_disabled():
+                span_generation.span_data.defer_token_attribution(
+                    _attribute_tokens_later(
+                        system_instructions, input, tools, handoffs, output_schema
+                    )
+                )
             response, stream = await self._fetch_response(
                 system_instructions,
                 input,
@@ -193,136 +214,146 @@ class OpenAIChatCompletionsModel(Model):
             usage: CompletionUsage | None = None
             state = _StreamingState()
 
-            async for chunk in stream:
-                if not state.started:
-                    state.started = True
-                    yield ResponseCreatedEvent(
-                        response=response,
-                        type="response.created",
-                    )
-
-                # The usage is only available in the last chunk
-                usage = chunk.usage
-
-                if not chunk.choices or not chunk.choices[0].delta:
-                    continue
-
-                delta = chunk.choices[0].delta
-
-                # Handle text
-                if delta.content:
-                    if not state.text_content_index_and_output:
-                        # Initialize a content tracker for streaming text
-                        state.text_content_index_and_output = (
-                            0 if not state.refusal_content_index_and_output else 1,
-                            ResponseOutputText(
-                                text="",
-                                type="output_text",
-                                annotations=[],
-                            ),
-                        )
-                        # Start a new assistant message stream
-                        assistant_item = ResponseOutputMessage(
-                            id=FAKE_RESPONSES_ID,
-                            content=[],
-                            role="assistant",
-                            type="message",
-                            status="in_progress",
+            try:
+                async for chunk in stream:
+                    if not state.started:
+                        state.started = True
+                        yield ResponseCreatedEvent(
+                            response=response,
+                            type="response.created",
                         )
-                        # Notify consumers of the start of a new output message + first content part
-                        yield ResponseOutputItemAddedEvent(
-                            item=assistant_item,
-                            output_index=0,
-                            type="response.output_item.added",
-                        )
-                        yield ResponseContentPartAddedEvent(
+
+                    # The usage is only available in the last chunk
+                    usage = chunk.usage
+
+                    if not chunk.choices or not chunk.choices[0].delta:
+                        continue
+
+                    delta = chunk.choices[0].delta
+
+                    # Handle text
+                    if delta.content:
+                        if not state.text_content_index_and_output:
+                            # Initialize a content tracker for streaming text
+                            state.text_content_index_and_output = (
+                                0 if not state.refusal_content_index_and_output else 1,
+                                ResponseOutputText(
+                                    text="",
+                                    type="output_text",
+                                    annotations=[],
+                                ),
+                            )
+                            # Start a new assistant message stream
+                            assistant_item = ResponseOutputMessage(
+                                id=FAKE_RESPONSES_ID,
+                                content=[],
+                                role="assistant",
+                                type="message",
+                                status="in_progress",
+                            )
+                            # Notify consumers of the start of a new output message + first content
+                            # part
+                            yield ResponseOutputItemAddedEvent(
+                                item=assistant_item,
+                                output_index=0,
+                                type="response.output_item.added",
+                            )
+                            yield ResponseContentPartAddedEvent(
+                                content_index=state.text_content_index_and_output[0],
+                                item_id=FAKE_RESPONSES_ID,
+                                output_index=0,
+                                part=ResponseOutputText(
+                                    text="",
+                                    type="output_text",
+                                    annotations=[],
+                                ),
+                                type="response.content_part.added",
+                            )
+                        # Emit the delta for this segment of content
+                        yield ResponseTextDeltaEvent(
                             content_index=state.text_content_index_and_output[0],
+                            delta=delta.content,
                             item_id=FAKE_RESPONSES_ID,
                             output_index=0,
-                            part=ResponseOutputText(
-                                text="",
-                                type="output_text",
-                                annotations=[],
-                            ),
-                            type="response.content_part.added",
-                        )
-                    # Emit the delta for this segment of content
-                    yield ResponseTextDeltaEvent(
-                        content_index=state.text_content_index_and_output[0],
-                        delta=delta.content,
-                        item_id=FAKE_RESPONSES_ID,
-                        output_index=0,
-                        type="response.output_text.delta",
-                    )
-                    # Accumulate the text into the response part
-                    state.text_content_index_and_output[1].text += delta.content
-
-                # Handle refusals (model declines to answer)
-                if delta.refusal:
-                    if not state.refusal_content_index_and_output:
-                        # Initialize a content tracker for streaming refusal text
-                        state.refusal_content_index_and_output = (
-                            0 if not state.text_content_index_and_output else 1,
-                            ResponseOutputRefusal(refusal="", type="refusal"),
-                        )
-                        # Start a new assistant message if one doesn't exist yet (in-progress)
-                        assistant_item = ResponseOutputMessage(
-                            id=FAKE_RESPONSES_ID,
-                            content=[],
-                            role="assistant",
-                            type="message",
-                            status="in_progress",
-                        )
-                        # Notify downstream that assistant message + first content part are starting
-                        yield ResponseOutputItemAddedEvent(
-                            item=assistant_item,
-                            output_index=0,
-                            type="response.output_item.added",
+                            type="response.output_text.delta",
                         )
-                        yield ResponseContentPartAddedEvent(
+                        # Accumulate the text into the response part
+                        state.text_content_index_and_output[1].text += delta.content
+
+                    # Handle refusals (model declines to answer)
+                    if delta.refusal:
+                        if not state.refusal_content_index_and_output:
+                            # Initialize a content tracker for streaming refusal text
+                            state.refusal_content_index_and_output = (
+                                0 if not state.text_content_index_and_output else 1,
+                                ResponseOutputRefusal(refusal="", type="refusal"),
+                            )
+                            # Start a new assistant message if one doesn't exist yet (in-progress)
+                            assistant_item = ResponseOutputMessage(
+                                id=FAKE_RESPONSES_ID,
+                                content=[],
+                                role="assistant",
+                                type="message",
+                                status="in_progress",
+                            )
+                            # Notify downstream that assistant message + first content part are
+                            # starting
+                            yield ResponseOutputItemAddedEvent(
+                                item=assistant_item,
+                                output_index=0,
+                                type="response.output_item.added",
+                            )
+                            yield ResponseContentPartAddedEvent(
+                                content_index=state.refusal_content_index_and_output[0],
+                                item_id=FAKE_RESPONSES_ID,
+                                output_index=0,
+                                part=ResponseOutputText(
+                                    text="",
+                                    type="output_text",
+                                    annotations=[],
+                                ),
+                                type="response.content_part.added",
+                            )
+                        # Emit the delta for this segment of refusal
+                        yield ResponseRefusalDeltaEvent(
                             content_index=state.refusal_content_index_and_output[0],
+                            delta=delta.refusal,
                             item_id=FAKE_RESPONSES_ID,
                             output_index=0,
-                            part=ResponseOutputText(
-                                text="",
-                                type="output_text",
-                                annotations=[],
-                            ),
-                            type="response.content_part.added",
+                            type="response.refusal.delta",
                         )
-                    # Emit the delta for this segment of refusal
-                    yield ResponseRefusalDeltaEvent(
-                        content_index=state.refusal_content_index_and_output[0],
-                        delta=delta.refusal,
-                        item_id=FAKE_RESPONSES_ID,
-                        output_index=0,
-                        type="response.refusal.delta",
-                    )
-                    # Accumulate the refusal string in the output part
-                    state.refusal_content_index_and_output[1].refusal += delta.refusal
-
-                # Handle tool calls
-                # Because we don't know the name of the function until the end of the stream, we'll
-                # save everything and yield events at the end
-                if delta.tool_calls:
-                    for tc_delta in delta.tool_calls:
-                        if tc_delta.index not in state.function_calls:
-                            state.function_calls[tc_delta.index] = ResponseFunctionToolCall(
-                                id=FAKE_RESPONSES_ID,
-                                arguments="",
-                                name="",
-                                type="function_call",
-                                call_id="",
-                            )
-                        tc_function = tc_delta.function
-
-                        state.function_calls[tc_delta.index].arguments += (
-                            tc_function.arguments if tc_function else ""
-                        ) or ""
-                        state.function_calls[tc_delta.index].name += (
-                            tc_function.name if tc_function else ""
-                        ) or ""
-                        state.function_calls[tc_delta.index].call_id += tc_delta.id or ""
+                        # Accumulate the refusal string in the output part
+                        state.refusal_content_index_and_output[1].refusal += delta.refusal
+
+                    # Handle tool calls
+                    # Because we don't know the name of the function until the end of the stream,
+                    # we'll save everything and yield events at the end
+                    if delta.tool_calls:
+                        for tc_delta in delta.tool_calls:
+                            if tc_delta.index not in state.function_calls:
+                                state.function_calls[tc_delta.index] = ResponseFunctionToolCall(
+                                    id=FAKE_RESPONSES_ID,
+                                    arguments="",
+                                    name="",
+                                    type="function_call",
+                                    call_id="",
+                                )
+                            tc_function = tc_delta.function
+
+                            state.function_calls[tc_delta.index].arguments += (
+                                tc_function.arguments if tc_function else ""
+                            ) or ""
+                            state.function_calls[tc_delta.index].name += (
+                                tc_function.name if tc_function else ""
+                            ) or ""
+                            state.function_calls[tc_delta.index].call_id += tc_delta.id or ""
+            except asyncio.CancelledError:
+                span_generation.set_error(SpanError(message="Generation cancelled", data={}))
+                raise
+            finally:
+                # Release the connection right away if we stop early, e.g. on cancellation.
+                if isinstance(stream, (AsyncStream, LimitedStream)):
+                    await stream.close()
 
             function_call_starting_index = 0
             if state.text_content_index_and_output:
@@ -420,6 +451,10 @@ class OpenAIChatCompletionsModel(Model):
                         and usage.completion_tokens_details.reasoning_tokens
                         else 0
                     ),
+                    # Not a field of the installed ResponseUsage yet, so it's kept as an extra
+                    input_tokens_details={  # type: ignore[call-arg]
+                        "cached_tokens": get_cached_tokens(usage.prompt_tokens_details)
+                    },
                 )
                 if usage
                 else None
@@ -495,12 +530,13 @@ class OpenAIChatCompletionsModel(Model):
             True if model_settings.parallel_tool_calls and tools and len(tools) > 0 else NOT_GIVEN
         )
         tool_choice = _Converter.convert_tool_choice(model_settings.tool_choice)
-        response_format = _Converter.convert_response_format(output_schema)
+        response_format = canonicalize(_Converter.convert_response_format(output_schema))
 
         converted_tools = [ToolConverter.to_openai(tool) for tool in tools] if tools else []
 
         for handoff in handoffs:
             converted_tools.append(ToolConverter.convert_handoff_tool(handoff))
+        converted_tools = canonicalize(converted_tools)
 
         if _debug.DONT_LOG_MODEL_DATA:
             logger.debug("Calling LLM")
@@ -513,22 +549,26 @@ class OpenAIChatCompletionsModel(Model):
                 f"Response format: {response_format}\n"
             )
 
-        ret = await self._get_client().chat.completions.create(
-            model=self.model,
-            messages=converted_messages,
-            tools=converted_tools or NOT_GIVEN,
-            temperature=self._non_null_or_not_given(model_settings.temperature),
-            top_p=self._non_null_or_not_given(model_settings.top_p),
-            frequency_penalty=self._non_null_or_not_given(model_settings.frequency_penalty),
-            presence_penalty=self._non_null_or_not_given(model_settings.presence_penalty),
-            max_tokens=self._non_null_or_not_given(model_settings.max_tokens),
-            tool_choice=tool_choice,
-            response_format=response_format,
-            parallel_tool_calls=parallel_tool_calls,
-            stream=stream,
-            stream_options={"include_usage": True} if stream else NOT_GIVEN,
-            extra_headers=_HEADERS,
-        )
+        async def create(resource: Any) -> Any:
+            return await resource.create(
+                model=self.model,
+                messages=converted_messages,
+                tools=converted_tools or NOT_GIVEN,
+                temperature=self._non_null_or_not_given(model_settings.temperature),
+                top_p=self._non_null_or_not_given(model_settings.top_p),
+                frequency_penalty=self._non_null_or_not_given(model_settings.frequency_penalty),
+                presence_penalty=self._non_null_or_not_given(model_settings.presence_penalty),
+                max_tokens=self._non_null_or_not_given(model_settings.max_tokens),
+                tool_choice=tool_choice,
+                response_format=response_format,
+                parallel_tool_calls=parallel_tool_calls,
+                stream=stream,
+                stream_options={"include_usage": True} if stream else NOT_GIVEN,
+                extra_headers=_HEADERS,
+                timeout=self._non_null_or_not_given(model_settings.timeout),
+            )
+
+        ret = await self._send_request(create, converted_messages, converted_tools, model_settings)
 
         if isinstance(ret, ChatCompletion):
             return ret
@@ -549,11 +589,40 @@ class OpenAIChatCompletionsModel(Model):
         )
         return response, ret
 
+    async def _send_request(
+        self,
+        create: Callable[[Any], Awaitable[Any]],
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+        model_settings: ModelSettings,
+    ) -> Any:
+        """Sends a request, by calling `create` with the chat completions resource to send it
+        with."""
+        rate_limiter = self._rate_limiter or _openai_shared.get_default_rate_limiter()
+        if rate_limiter is None:
+            return await create(self._get_client().chat.completions)
+
+        # The rate limiter needs the response headers, and retries 429 responses itself.
+        estimated_tokens = estimate_request_tokens(
+            messages, tools, max_output_tokens=model_settings.max_tokens
+        )
+        client = self._get_client_without_retries()
+        return await rate_limiter.call(
+            self.model,
+            estimated_tokens,
+            lambda: create(client.chat.completions.with_raw_response),
+        )
+
     def _get_client(self) -> AsyncOpenAI:
         if self._client is None:
             self._client = AsyncOpenAI()
         return self._client
 
+    def _get_client_without_retries(self) -> AsyncOpenAI:
+        if self._client_without_retries is None:
+            self._client_without_retries = self._get_client().with_options(max_retries=0)
+        return self._client_without_retries
+
 
 class _Converter:
     @classmethod
@@ -1,26 +1,23 @@
 from __future__ import annotations
 
 import httpx
-from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from openai import AsyncOpenAI
 
 from . import _openai_shared
+from .http_client_pool import HTTPClientPool, _LoopLocal
 from .interface import Model, ModelProvider
 from .openai_chatcompletions import OpenAIChatCompletionsModel
 from .openai_responses import OpenAIResponsesModel
+from .rate_limiter import RateLimiter
 
 DEFAULT_MODEL: str = "gpt-4o"
 
 
-_http_client: httpx.AsyncClient | None = None
-
-
 # If we create a new httpx client for each request, that would mean no sharing of connection pools,
-# which would mean worse latency and resource usage. So, we share the client across requests.
+# which would mean worse latency and resource usage. So, we share the client across requests, per
+# event loop.
 def shared_http_client() -> httpx.AsyncClient:
-    global _http_client
-    if _http_client is None:
-        _http_client = DefaultAsyncHttpxClient()
-    return _http_client
+    return _openai_shared.get_default_http_client_pool().get_client()
 
 
 class OpenAIProvider(ModelProvider):
@@ -33,7 +30,27 @@ class OpenAIProvider(ModelProvider):
         organization: str | None = None,
         project: str | None = None,
         use_responses: bool | None = None,
+        rate_limiter: RateLimiter | None = None,
+        http_client_pool: HTTPClientPool | None = None,
     ) -> None:
+        """Create a new OpenAI provider.
+
+        Args:
+            api_key: The API key to use for the OpenAI client. If not provided, we will use the
+                default API key.
+            base_url: The base URL to use for the OpenAI client. If not provided, we will use the
+                default base URL.
+            openai_client: An optional OpenAI client to use. If not provided, we will create a new
+                OpenAI client using the api_key and base_url.
+            organization: The organization to use for the OpenAI client.
+            project: The project to use for the OpenAI client.
+            use_responses: Whether to use the OpenAI responses API.
+            rate_limiter: A client-side rate limiter for the models' requests. If not provided, the
+                default rate limiter set via `set_default_openai_rate_limiter()` is used, if any.
+            http_client_pool: The pool of HTTP clients to create OpenAI clients with. If not
+                provided, the default pool set via `set_default_openai_http_client_pool()` is used.
+                Not used if you provide openai_client.
+        """
         if openai_client is not None:
             assert api_key is None and base_url is None, (
                 "Don't provide api_key or base_url if you provide openai_client"
@@ -46,6 +63,10 @@ class OpenAIProvider(ModelProvider):
             self._stored_organization = organization
             self._stored_project = project
 
+        self._rate_limiter = rate_limiter
+        self._http_client_pool = http_client_pool
+        self._pooled_clients: _LoopLocal[tuple[httpx.AsyncClient, AsyncOpenAI]] = _LoopLocal()
+
         if use_responses is not None:
             self._use_responses = use_responses
         else:
@@ -55,15 +76,28 @@ class OpenAIProvider(ModelProvider):
     # AsyncOpenAI() raises an error if you don't have an API key set.
     def _get_client(self) -> AsyncOpenAI:
         if self._client is None:
-            self._client = _openai_shared.get_default_openai_client() or AsyncOpenAI(
-                api_key=self._stored_api_key or _openai_shared.get_default_openai_key(),
-                base_url=self._stored_base_url,
-                organization=self._stored_organization,
-                project=self._stored_project,
-                http_client=shared_http_client(),
-            )
+            self._client = _openai_shared.get_default_openai_client()
+        if self._client is not None:
+            return self._client
 
-        return self._client
+        # The HTTP client is specific to the running event loop, so we need an OpenAI client per
+        # event loop as well
+        pool = self._http_client_pool or _openai_shared.get_default_http_client_pool()
+        http_client = pool.get_client()
+        _, client = self._pooled_clients.get(
+            lambda: (http_client, self._create_client(http_client)),
+            lambda pooled: pooled[0] is http_client,
+        )
+        return client
+
+    def _create_client(self, http_client: httpx.AsyncClient) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=self._stored_api_key or _openai_shared.get_default_openai_key(),
+            base_url=self._stored_base_url,
+            organization=self._stored_organization,
+            project=self._stored_project,
+            http_client=http_client,
+        )
 
     def get_model(self, model_name: str | None) -> Model:
         if model_name is None:
@@ -72,7 +106,11 @@ class OpenAIProvider(ModelProvider):
         client = self._get_client()
 
         return (
-            OpenAIResponsesModel(model=model_name, openai_client=client)
+            OpenAIResponsesModel(
+                model=model_name, openai_client=client, rate_limiter=self._rate_limiter
+            )
             if self._use_responses
-            else OpenAIChatCompletionsModel(model=model_name, openai_client=client)
+            else OpenAIChatCompletionsModel(
+                model=model_name, openai_client=client, rate_limiter=self._rate_limiter
+            )
         )
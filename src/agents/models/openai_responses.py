@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Awaitable, Callable
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, Literal, overload
 
@@ -23,11 +24,15 @@ from ..exceptions import UserError
 from ..handoffs import Handoff
 from ..items import ItemHelpers, ModelResponse, TResponseInputItem
 from ..logger import logger
+from ..prompt_cache import canonicalize, get_cached_tokens
+from ..token_attribution import _attribute_tokens_later
 from ..tool import ComputerTool, FileSearchTool, FunctionTool, Tool, WebSearchTool
 from ..tracing import SpanError, response_span
 from ..usage import Usage
 from ..version import __version__
+from . import _openai_shared
 from .interface import Model, ModelTracing
+from .rate_limiter import LimitedStream, RateLimiter, estimate_request_tokens
 
 if TYPE_CHECKING:
     from ..model_settings import ModelSettings
@@ -53,9 +58,12 @@ class OpenAIResponsesModel(Model):
         self,
         model: str | ChatModel,
         openai_client: AsyncOpenAI,
+        rate_limiter: RateLimiter | None = None,
     ) -> None:
         self.model = model
         self._client = openai_client
+        self._rate_limiter = rate_limiter
+        self._client_without_retries: AsyncOpenAI | None = None
 
     def _non_null_or_not_given(self, value: Any) -> Any:
         return value if value is not None else NOT_GIVEN
@@ -71,6 +79,12 @@ class OpenAIResponsesModel(Model):
         tracing: ModelTracing,
     ) -> ModelResponse:
         with response_span(disabled=tracing.is_disabled()) as span_response:
+            if not tracing.is_disabled():
+                span_response.span_data.defer_token_attribution(
+                    _attribute_tokens_later(
+                        system_instructions, input, tools, handoffs, output_schema
+                    )
+                )
             try:
                 response = await self._fetch_response(
                     system_instructions,
@@ -96,6 +110,9 @@ class OpenAIResponsesModel(Model):
                         input_tokens=response.usage.input_tokens,
                         output_tokens=response.usage.output_tokens,
                         total_tokens=response.usage.total_tokens,
+                        cached_input_tokens=get_cached_tokens(
+                            getattr(response.usage, "input_tokens_details", None)
+                        ),
                     )
                     if response.usage
                     else Usage()
@@ -116,6 +133,9 @@ class OpenAIResponsesModel(Model):
                 request_id = e.request_id if isinstance(e, APIStatusError) else None
                 logger.error(f"Error getting response: {e}. (request_id: {request_id})")
                 raise
+            except asyncio.CancelledError:
+                span_response.set_error(SpanError(message="Response cancelled", data={}))
+                raise
 
         return ModelResponse(
             output=response.output,
@@ -137,6 +157,12 @@ class OpenAIResponsesModel(Model):
         Yields a partial message as it is generated, as well as the usage information.
         """
         with response_span(disabled=tracing.is_disabled()) as span_response:
+            if not tracing.is_disabled():
+                span_response.span_data.defer_token_attribution(
+                    _attribute_tokens_later(
+                        system_instructions, input, tools, handoffs, output_schema
+                    )
+                )
             try:
                 stream = await self._fetch_response(
                     system_instructions,
@@ -150,15 +176,23 @@ class OpenAIResponsesModel(Model):
 
                 final_response: Response | None = None
 
-                async for chunk in stream:
-                    if isinstance(chunk, ResponseCompletedEvent):
-                        final_response = chunk.response
-                    yield chunk
+                try:
+                    async for chunk in stream:
+                        if isinstance(chunk, ResponseCompletedEvent):
+                            final_response = chunk.response
+                        yield chunk
+                finally:
+                    # Release the connection right away if we stop early, e.g. on cancellation.
+                    if isinstance(stream, (AsyncStream, LimitedStream)):
+                        await stream.close()
 
                 if final_response and tracing.include_data():
                     span_response.span_data.response = final_response
                     span_response.span_data.input = input
 
+            except asyncio.CancelledError:
+                span_response.set_error(SpanError(message="Response cancelled", data={}))
+                raise
             except Exception as e:
                 span_response.set_error(
                     SpanError(
@@ -205,7 +239,7 @@ class OpenAIResponsesModel(Model):
         handoffs: list[Handoff],
         stream: Literal[True] | Literal[False] = False,
     ) -> Response | AsyncStream[ResponseStreamEvent]:
-        list_input = ItemHelpers.input_to_new_input_list(input)
+        list_input = ItemHelpers.input_to_input_list(input)
 
         parallel_tool_calls = (
             True if model_settings.parallel_tool_calls and tools and len(tools) > 0 else NOT_GIVEN
@@ -227,21 +261,55 @@ class OpenAIResponsesModel(Model):
                 f"Response format: {response_format}\n"
             )
 
-        return await self._client.responses.create(
-            instructions=self._non_null_or_not_given(system_instructions),
-            model=self.model,
-            input=list_input,
-            include=converted_tools.includes,
-            tools=converted_tools.tools,
-            temperature=self._non_null_or_not_given(model_settings.temperature),
-            top_p=self._non_null_or_not_given(model_settings.top_p),
-            truncation=self._non_null_or_not_given(model_settings.truncation),
-            max_output_tokens=self._non_null_or_not_given(model_settings.max_tokens),
-            tool_choice=tool_choice,
-            parallel_tool_calls=parallel_tool_calls,
-            stream=stream,
-            extra_headers=_HEADERS,
-            text=response_format,
+        async def create(resource: Any) -> Any:
+            return await resource.create(
+                instructions=self._non_null_or_not_given(system_instructions),
+                model=self.model,
+                input=list_input,
+                previous_response_id=self._non_null_or_not_given(
+                    model_settings.previous_response_id
+                ),
+                include=converted_tools.includes,
+                tools=canonicalize(converted_tools.tools),
+                temperature=self._non_null_or_not_given(model_settings.temperature),
+                top_p=self._non_null_or_not_given(model_settings.top_p),
+                truncation=self._non_null_or_not_given(model_settings.truncation),
+                max_output_tokens=self._non_null_or_not_given(model_settings.max_tokens),
+                tool_choice=tool_choice,
+                parallel_tool_calls=parallel_tool_calls,
+                stream=stream,
+                extra_headers=_HEADERS,
+                timeout=self._non_null_or_not_given(model_settings.timeout),
+                text=canonicalize(response_format),
+            )
+
+        response: Response | AsyncStream[ResponseStreamEvent] = await self._send_request(
+            create, system_instructions, list_input, converted_tools.tools, model_settings
+        )
+        return response
+
+    async def _send_request(
+        self,
+        create: Callable[[Any], Awaitable[Any]],
+        system_instructions: str | None,
+        input: list[TResponseInputItem],
+        tools: list[ToolParam],
+        model_settings: ModelSettings,
+    ) -> Any:
+        """Sends a request, by calling `create` with the responses resource to send it with."""
+        rate_limiter = self._rate_limiter or _openai_shared.get_default_rate_limiter()
+        if rate_limiter is None:
+            return await create(self._get_client().responses)
+
+        # The rate limiter needs the response headers, and retries 429 responses itself.
+        estimated_tokens = estimate_request_tokens(
+            system_instructions, input, tools, max_output_tokens=model_settings.max_tokens
+        )
+        client = self._get_client_without_retries()
+        return await rate_limiter.call(
+            self.model,
+            estimated_tokens,
+            lambda: create(client.responses.with_raw_response),
         )
 
     def _get_client(self) -> AsyncOpenAI:
@@ -249,6 +317,11 @@ class OpenAIResponsesModel(Model):
             self._client = AsyncOpenAI()
         return self._client
 
+    def _get_client_without_retries(self) -> AsyncOpenAI:
+        if self._client_without_retries is None:
+            self._client_without_retries = self._get_client().with_options(max_retries=0)
+        return self._client_without_retries
+
 
 @dataclass
 class ConvertedTools:
@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from collections.abc import AsyncIterator, Awaitable, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Protocol, TypeVar, cast
+
+from openai import APIConnectionError, APIStatusError, AsyncStream, RateLimitError
+
+from ..logger import logger
+from ..token_attribution import count_input_tokens
+from ..tokenizer import get_default_tokenizer
+
+T = TypeVar("T")
+T_co = TypeVar("T_co", covariant=True)
+
+
+class _RawResponse(Protocol[T_co]):
+    """A response of the client's `with_raw_response` API."""
+
+    @property
+    def headers(self) -> Mapping[str, str]: ...
+
+    def parse(self) -> T_co: ...
+
+
+_DEFAULT_RATE_LIMITED_DELAY = 1.0
+"""How long to pause a model after a 429 response that doesn't say when to retry, in seconds."""
+
+_LEARNED_LIMIT_MARGIN = 0.9
+"""The fraction of the limits advertised in the response headers to use, to absorb the jitter
+between admitting a request and the server receiving it."""
+
+_ERROR_RETRY_BASE_DELAY = 0.5
+"""The initial backoff, in seconds, when retrying connection errors and 5xx responses."""
+
+
+@dataclass
+class RateLimit:
+    """The rate limits for a single model. Use slightly lower limits than those of your OpenAI
+    organization/project, to absorb network jitter, or lower ones still if other processes share
+    the same quota.
+    """
+
+    requests_per_minute: float | None = None
+    """The maximum number of requests per minute. If None, learned from the
+    `x-ratelimit-limit-requests` response header."""
+
+    tokens_per_minute: float | None = None
+    """The maximum number of tokens per minute. If None, learned from the
+    `x-ratelimit-limit-tokens` response header."""
+
+    max_concurrency: int | None = None
+    """The maximum number of requests in flight. The limiter adapts the actual limit below this,
+    halving it on every 429 response and slowly increasing it again on success. If None, the
+    concurrency is unlimited until the first 429 response."""
+
+    burst_seconds: float = 1.0
+    """How many seconds' worth of the per-minute limits can be used at once. Lower values spread
+    requests more evenly."""
+
+
+@dataclass
+class RateLimiterStats:
+    """Statistics about the requests for a single model."""
+
+    requests: int = 0
+    """The number of requests sent."""
+
+    rate_limited_responses: int = 0
+    """The number of 429 responses received."""
+
+    total_wait_time: float = 0.0
+    """The total time requests spent waiting on the limiter, in seconds."""
+
+    concurrency_limit: float | None = None
+    """The current adaptive concurrency limit, or None if unlimited."""
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float) -> None:
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """The time until `amount` can be taken. Amounts larger than the capacity can be taken
+        once the bucket is full, leaving it in debt."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def cap(self, remaining: float, now: float) -> None:
+        """Lower the level to what the server says is remaining, e.g. because other processes use
+        the same quota."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class _ModelState:
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+        self.requests: _TokenBucket | None = None
+        self.tokens: _TokenBucket | None = None
+        self.concurrency_limit: float | None = limit.max_concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.stats = RateLimiterStats(concurrency_limit=self.concurrency_limit)
+        self._admission_lock: asyncio.Lock | None = None
+        self._release_waiters: list[asyncio.Future[None]] = []
+        self.set_limits(limit.requests_per_minute, limit.tokens_per_minute)
+
+    @property
+    def admission_lock(self) -> asyncio.Lock:
+        # Created lazily, so that it's bound to the loop of the first request.
+        if self._admission_lock is None:
+            self._admission_lock = asyncio.Lock()
+        return self._admission_lock
+
+    def set_limits(
+        self, requests_per_minute: float | None, tokens_per_minute: float | None
+    ) -> None:
+        if requests_per_minute:
+            self.requests = _TokenBucket(requests_per_minute, self.limit.burst_seconds)
+        if tokens_per_minute:
+            self.tokens = _TokenBucket(tokens_per_minute, self.limit.burst_seconds)
+
+    def delay(self, tokens: int, now: float) -> float:
+        delay = self.paused_until - now
+        if self.requests:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def at_concurrency_limit(self) -> bool:
+        return self.concurrency_limit is not None and self.in_flight >= int(self.concurrency_limit)
+
+    async def wait_for_release(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._release_waiters.append(waiter)
+        await waiter
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        waiters, self._release_waiters = self._release_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def on_success(self) -> None:
+        # Additive increase: roughly +1 per `concurrency_limit` successful requests
+        if self.concurrency_limit is None:
+            return
+        self.concurrency_limit += 1 / self.concurrency_limit
+        if self.limit.max_concurrency is not None:
+            self.concurrency_limit = min(self.concurrency_limit, self.limit.max_concurrency)
+        self.stats.concurrency_limit = self.concurrency_limit
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        # Multiplicative decrease
+        current = self.concurrency_limit if self.concurrency_limit is not None else self.in_flight
+        self.concurrency_limit = max(current / 2, 1.0)
+        self.stats.concurrency_limit = self.concurrency_limit
+        self.stats.rate_limited_responses += 1
+
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + retry_after)
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.cap(0, now)
+
+
+class RateLimitPermit:
+    """Permission to send a single request. Report the outcome of the request to it, so that the
+    limiter can adapt."""
+
+    def __init__(self, state: _ModelState) -> None:
+        self._state = state
+        self._released = False
+        self._held_by_stream = False
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._state.release()
+
+    def _hold_until_closed(self, stream: AsyncStream[T]) -> LimitedStream[T]:
+        """Keeps counting the request towards the concurrency limit until `stream` is exhausted or
+        closed, rather than until the permit's context manager exits."""
+        self._held_by_stream = True
+        return LimitedStream(stream, self._release)
+
+    def record_headers(self, headers: Mapping[str, str]) -> None:
+        """Adapt to the `x-ratelimit-*` headers of a successful response."""
+        state = self._state
+        state.on_success()
+
+        limit_requests = _parse_float(headers.get("x-ratelimit-limit-requests"))
+        limit_tokens = _parse_float(headers.get("x-ratelimit-limit-tokens"))
+        state.set_limits(
+            limit_requests * _LEARNED_LIMIT_MARGIN
+            if limit_requests and not state.requests
+            else None,
+            limit_tokens * _LEARNED_LIMIT_MARGIN if limit_tokens and not state.tokens else None,
+        )
+
+        now = time.monotonic()
+        remaining_requests = _parse_float(headers.get("x-ratelimit-remaining-requests"))
+        if state.requests and remaining_requests is not None:
+            state.requests.cap(remaining_requests, now)
+        remaining_tokens = _parse_float(headers.get("x-ratelimit-remaining-tokens"))
+        if state.tokens and remaining_tokens is not None:
+            state.tokens.cap(remaining_tokens, now)
+
+    def record_rate_limited(self, headers: Mapping[str, str]) -> None:
+        """Back off after a 429 response, using its `retry-after` or `x-ratelimit-reset-*`
+        headers to decide for how long."""
+        retry_after = _parse_float(headers.get("retry-after"))
+        if retry_after is None:
+            resets = [
+                _parse_duration(headers.get("x-ratelimit-reset-requests")),
+                _parse_duration(headers.get("x-ratelimit-reset-tokens")),
+            ]
+            retry_after = max((r for r in resets if r is not None), default=None)
+        self._state.on_rate_limited(
+            retry_after if retry_after is not None else _DEFAULT_RATE_LIMITED_DELAY
+        )
+
+
+class RateLimiter:
+    """A client-side rate limiter for model requests, keyed by model name. Requests wait until
+    they fit within the requests-per-minute and tokens-per-minute limits of their model, instead of
+    being sent and rejected with a 429 response.
+
+    The limiter adapts to the server: it learns limits that weren't configured from the
+    `x-ratelimit-limit-*` response headers, slows down when the `x-ratelimit-remaining-*` headers
+    report less quota than expected (e.g. because other processes share the quota), and on a 429
+    response pauses the model and halves its concurrency (AIMD).
+
+    A single limiter can be shared by all the models in the process, e.g. via
+    `set_default_openai_rate_limiter()`.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, RateLimit] | None = None,
+        *,
+        default_limit: RateLimit | None = None,
+        max_retries: int = 3,
+    ) -> None:
+        """
+        Args:
+            limits: The rate limits per model name.
+            default_limit: The rate limit for models that aren't in `limits`. Defaults to no
+                configured limits, i.e. limits are only learned from the response headers.
+            max_retries: How many times to retry a request that was rejected with a 429 response.
+        """
+        self._limits = dict(limits or {})
+        self._default_limit = default_limit or RateLimit()
+        self.max_retries = max_retries
+        self._states: dict[str, _ModelState] = {}
+
+    def set_limit(self, model: str, limit: RateLimit) -> None:
+        """Set the rate limit for a model. Resets the model's adaptive state."""
+        self._limits[model] = limit
+        self._states.pop(model, None)
+
+    def get_stats(self, model: str) -> RateLimiterStats:
+        """Returns the request statistics for a model."""
+        return self._get_state(model).stats
+
+    def _get_state(self, model: str) -> _ModelState:
+        if model not in self._states:
+            self._states[model] = _ModelState(self._limits.get(model, self._default_limit))
+        return self._states[model]
+
+    @asynccontextmanager
+    async def acquire(self, model: str, estimated_tokens: int) -> AsyncIterator[RateLimitPermit]:
+        """Wait until a request for `model` of about `estimated_tokens` tokens can be sent. The
+        request counts towards the concurrency limit until the context manager exits.
+        """
+        state = self._get_state(model)
+        start = time.monotonic()
+        # Admit requests one at a time, in order, so that waiting requests aren't overtaken.
+        async with state.admission_lock:
+            while True:
+                delay = state.delay(estimated_tokens, time.monotonic())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif state.at_concurrency_limit():
+                    await state.wait_for_release()
+                else:
+                    break
+
+            now = time.monotonic()
+            if state.requests:
+                state.requests.take(1, now)
+            if state.tokens:
+                state.tokens.take(estimated_tokens, now)
+            state.in_flight += 1
+            state.stats.requests += 1
+            state.stats.total_wait_time += now - start
+
+        permit = RateLimitPermit(state)
+        try:
+            yield permit
+        finally:
+            if not permit._held_by_stream:
+                permit._release()
+
+    async def call(
+        self,
+        model: str,
+        estimated_tokens: int,
+        request: Callable[[], Awaitable[_RawResponse[T]]],
+    ) -> T:
+        """Send an OpenAI request through the limiter. Requests rejected with a 429 response are
+        retried once the limiter allows it. Since the client shouldn't retry requests itself,
+        connection errors and 5xx responses are retried too, with exponential backoff.
+
+        A streamed request counts towards the concurrency limit until its stream is exhausted or
+        closed, so it's returned wrapped in a `LimitedStream`.
+
+        Args:
+            model: The model the request is for.
+            estimated_tokens: The estimated token cost of the request.
+            request: Sends the request, using the client's `with_raw_response`, so that the
+                limiter can read the response headers. The client should have `max_retries=0`.
+
+        Returns:
+            The parsed response.
+        """
+        attempt = 0
+        while True:
+            async with self.acquire(model, estimated_tokens) as permit:
+                try:
+                    response = await request()
+                except RateLimitError as e:
+                    permit.record_rate_limited(e.response.headers)
+                    if attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    logger.debug(f"Rate limited on {model}, retrying (attempt {attempt})")
+                    continue
+                except (APIConnectionError, APIStatusError) as e:
+                    retryable = isinstance(e, APIConnectionError) or e.status_code >= 500
+                    if not retryable or attempt >= self.max_retries:
+                        raise
+                    error = e
+                else:
+                    permit.record_headers(response.headers)
+                    parsed = response.parse()
+                    if isinstance(parsed, AsyncStream):
+                        return cast(T, permit._hold_until_closed(parsed))
+                    return parsed
+
+            # Back off outside the limiter, so that we don't hold a concurrency slot while waiting
+            delay = _ERROR_RETRY_BASE_DELAY * 2**attempt
+            attempt += 1
+            logger.debug(f"Request to {model} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+class LimitedStream(Generic[T]):
+    """A streamed response that counts towards the concurrency limit of its model until it's
+    exhausted or closed."""
+
+    def __init__(self, stream: AsyncStream[T], release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        try:
+            async for item in self._stream:
+                yield item
+        finally:
+            self._release()
+
+    async def close(self) -> None:
+        try:
+            await self._stream.close()
+        finally:
+            self._release()
+
+
+def estimate_request_tokens(*payloads: Any, max_output_tokens: int | None = None) -> int:
+    """Roughly estimate the number of tokens a request counts against the tokens-per-minute limit,
+    from its payloads (e.g. instructions, input and tools), counted with the default tokenizer,
+    plus the maximum number of output tokens.
+
+    Lists are counted item by item, like `count_input_tokens()`, so that images count with a fixed
+    cost rather than the size of their (e.g. base64 encoded) data.
+    """
+    tokenizer = get_default_tokenizer()
+    tokens = max_output_tokens or 0
+    for payload in payloads:
+        if payload is None:
+            continue
+        if isinstance(payload, str):
+            tokens += tokenizer.count(payload)
+        elif isinstance(payload, list):
+            tokens += count_input_tokens(payload, tokenizer)
+        else:
+            tokens += tokenizer.count(json.dumps(payload, default=str))
+    return tokens
+
+
+def _parse_float(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_duration(value: str | None) -> float | None:
+    """Parses durations like `1s`, `6m0s` or `20ms`, as used by the `x-ratelimit-reset-*`
+    headers."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import contextlib
+import random
+import time
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Literal
+
+from openai import APIConnectionError, APIStatusError
+from openai.types.responses import (
+    ResponseComputerToolCall,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+)
+
+from ..agent_output import AgentOutputSchema
+from ..exceptions import ModelBehaviorError, UserError
+from ..handoffs import Handoff
+from ..items import ItemHelpers, ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import ComputerTool, FunctionTool, Tool
+from ..tracing import custom_span
+from ..tracing.scope import Scope
+from .interface import Model, ModelProvider, ModelTracing
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+_FailureKind = Literal["endpoint", "model", "other"]
+
+
+@dataclass
+class RoutingEndpoint:
+    """A deployment that can serve model requests, e.g. an API key and project, an
+    Azure-compatible endpoint, or a local OpenAI-compatible server."""
+
+    name: str
+    """A unique name for the endpoint, used in stats and traces."""
+
+    provider: ModelProvider
+    """The provider that creates models for this endpoint, e.g. an `OpenAIProvider` with the
+    endpoint's client."""
+
+    weight: float = 1.0
+    """The endpoint's relative share of the traffic, before adjusting for its latency, error rate
+    and load. Give a canary endpoint a small weight to send it a small share of the traffic."""
+
+    model_names: list[str] | None = None
+    """The names of the models the endpoint serves. If None, the endpoint serves all models."""
+
+    def serves(self, model_name: str | None) -> bool:
+        return self.model_names is None or model_name in self.model_names
+
+
+@dataclass
+class EndpointStats:
+    """Health statistics of a `RoutingEndpoint`, used to route requests."""
+
+    requests: int = 0
+    """The number of requests sent to the endpoint."""
+
+    failures: int = 0
+    """The number of requests that failed because of the endpoint."""
+
+    in_flight: int = 0
+    """The number of requests currently in flight."""
+
+    latency: float | None = None
+    """The moving average of the latency of responses, or of the time to the first event for
+    streamed responses, in seconds. None until the first response."""
+
+    error_rate: float = 0.0
+    """The moving average of the fraction of requests that failed."""
+
+    consecutive_failures: int = 0
+    """The number of requests that failed in a row."""
+
+    ejected_until: float | None = None
+    """If the endpoint is ejected, the `time.monotonic()` time at which it's used again."""
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until is not None and now < self.ejected_until
+
+
+class RoutingModelProvider(ModelProvider):
+    """A model provider that routes each request to one of several endpoints.
+
+    Requests are spread over the endpoints that serve the requested model in proportion to their
+    weight, divided by a cost: the endpoint's average latency, multiplied by its number of
+    requests in flight plus one, and penalized by its error rate. This favors fast, idle, healthy
+    endpoints, while still sending some traffic to the others, so their stats stay current.
+
+    If a request fails because of the endpoint (a connection error, a 429 or a 5xx response), it's
+    retried on another endpoint. An endpoint that fails `eject_after_failures` times in a row is
+    ejected for `ejection_cooldown` seconds.
+
+    If every endpoint of a model failed, the request falls back to the next model in the model's
+    `fallbacks` chain. So does a non-streamed request whose response the runner couldn't use: one
+    that calls a tool the request didn't include, or whose final output doesn't match the output
+    schema.
+
+    Each routing decision is recorded in the `routing` data of the generation or response span of
+    the request: the endpoint and model it was routed to, whether it fell back to another model,
+    and the failed attempts before it.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[RoutingEndpoint],
+        *,
+        fallbacks: dict[str, list[str]] | None = None,
+        latency_smoothing: float = 0.2,
+        error_penalty: float = 10.0,
+        eject_after_failures: int = 3,
+        ejection_cooldown: float = 30.0,
+        rng: random.Random | None = None,
+    ) -> None:
+        """
+        Args:
+            endpoints: The endpoints to route requests to.
+            fallbacks: For each model name, the models to fall back to, in order.
+            latency_smoothing: The weight of each new sample in the latency and error rate moving
+                averages, between 0 and 1.
+            error_penalty: How much an endpoint's error rate increases its cost. At the default of
+                10, an endpoint with a 10% error rate costs twice as much as a healthy one.
+            eject_after_failures: The number of consecutive failures after which an endpoint is
+                ejected.
+            ejection_cooldown: How long an ejected endpoint is skipped, in seconds.
+            rng: The random number generator to pick endpoints with.
+        """
+        if not endpoints:
+            raise UserError("At least one endpoint is required")
+        if len({endpoint.name for endpoint in endpoints}) != len(endpoints):
+            raise UserError("Endpoint names must be unique")
+        if not 0 < latency_smoothing <= 1:
+            raise UserError("latency_smoothing must be between 0 and 1")
+
+        self.endpoints = list(endpoints)
+        self.fallbacks = dict(fallbacks or {})
+        self.latency_smoothing = latency_smoothing
+        self.error_penalty = error_penalty
+        self.eject_after_failures = eject_after_failures
+        self.ejection_cooldown = ejection_cooldown
+        self._rng = rng or random.Random()
+        self._stats = {endpoint.name: EndpointStats() for endpoint in endpoints}
+        self._models: dict[tuple[str, str | None], Model] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        return _RoutedModel(self, model_name)
+
+    def get_stats(self, endpoint_name: str) -> EndpointStats:
+        """Returns the health statistics of an endpoint."""
+        return self._stats[endpoint_name]
+
+    def _get_model_chain(self, model_name: str | None) -> list[str | None]:
+        chain: list[str | None] = [model_name]
+        if model_name is not None:
+            chain.extend(self.fallbacks.get(model_name, []))
+        return chain
+
+    def _get_endpoint_model(self, endpoint: RoutingEndpoint, model_name: str | None) -> Model:
+        key = (endpoint.name, model_name)
+        if key not in self._models:
+            self._models[key] = endpoint.provider.get_model(model_name)
+        return self._models[key]
+
+    def _select_endpoint(self, model_name: str | None, tried: set[str]) -> RoutingEndpoint | None:
+        candidates = [e for e in self.endpoints if e.serves(model_name) and e.name not in tried]
+        if not candidates:
+            return None
+
+        now = time.monotonic()
+        healthy = [e for e in candidates if not self._stats[e.name].is_ejected(now)]
+        if not healthy:
+            # Better to try an ejected endpoint than to fail without trying
+            return min(candidates, key=lambda e: self._stats[e.name].ejected_until or 0)
+
+        known_latencies = [
+            latency for e in healthy if (latency := self._stats[e.name].latency) is not None
+        ]
+        # Endpoints without latency samples yet are assumed to be as fast as the fastest one, so
+        # they get traffic and samples
+        default_latency = min(known_latencies, default=1.0)
+
+        scores = []
+        for endpoint in healthy:
+            stats = self._stats[endpoint.name]
+            latency = stats.latency if stats.latency is not None else default_latency
+            cost = (
+                max(latency, 1e-3)
+                * (stats.in_flight + 1)
+                * (1 + self.error_penalty * stats.error_rate)
+            )
+            scores.append(max(endpoint.weight, 0) / cost)
+
+        if sum(scores) <= 0:
+            return healthy[0]
+        return self._rng.choices(healthy, weights=scores)[0]
+
+    def _start_request(self, endpoint: RoutingEndpoint) -> float:
+        stats = self._stats[endpoint.name]
+        stats.requests += 1
+        stats.in_flight += 1
+        return time.monotonic()
+
+    def _end_request(self, endpoint: RoutingEndpoint) -> None:
+        self._stats[endpoint.name].in_flight -= 1
+
+    def _record_success(self, endpoint: RoutingEndpoint, latency: float) -> None:
+        stats = self._stats[endpoint.name]
+        alpha = self.latency_smoothing
+        stats.latency = (
+            latency if stats.latency is None else (alpha * latency + (1 - alpha) * stats.latency)
+        )
+        stats.error_rate *= 1 - alpha
+        stats.consecutive_failures = 0
+
+    def _record_failure(self, endpoint: RoutingEndpoint) -> None:
+        stats = self._stats[endpoint.name]
+        alpha = self.latency_smoothing
+        stats.failures += 1
+        stats.error_rate = alpha + (1 - alpha) * stats.error_rate
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= self.eject_after_failures:
+            logger.warning(
+                f"Ejecting model endpoint {endpoint.name} for {self.ejection_cooldown}s after "
+                f"{stats.consecutive_failures} consecutive failures"
+            )
+            stats.ejected_until = time.monotonic() + self.ejection_cooldown
+            stats.consecutive_failures = 0
+
+    def _classify_failure(self, endpoint: RoutingEndpoint, error: Exception) -> _FailureKind:
+        if isinstance(error, APIConnectionError) or (
+            isinstance(error, APIStatusError)
+            and (error.status_code == 429 or error.status_code >= 500)
+        ):
+            self._record_failure(endpoint)
+            return "endpoint"
+        if isinstance(error, ModelBehaviorError):
+            return "model"
+        return "other"
+
+
+class _RoutedModel(Model):
+    def __init__(self, provider: RoutingModelProvider, model_name: str | None) -> None:
+        self._provider = provider
+        self._model_name = model_name
+
+    def _routing_scope(
+        self, endpoint: RoutingEndpoint, model_name: str | None, attempts: list[dict[str, Any]]
+    ) -> contextlib.AbstractContextManager[None]:
+        """Makes the routing decision available to the generation or response span that the
+        endpoint's model creates for the request."""
+        return _model_routing(
+            {
+                "model": self._model_name,
+                "endpoint": endpoint.name,
+                "routed_model": model_name,
+                "fallback": model_name != self._model_name,
+                "attempts": list(attempts),
+            }
+        )
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        provider = self._provider
+        last_error: Exception | None = None
+        attempts: list[dict[str, Any]] = []
+        model_chain = provider._get_model_chain(self._model_name)
+        for i, model_name in enumerate(model_chain):
+            tried: set[str] = set()
+            while (endpoint := provider._select_endpoint(model_name, tried)) is not None:
+                tried.add(endpoint.name)
+                model = provider._get_endpoint_model(endpoint, model_name)
+                start = provider._start_request(endpoint)
+                try:
+                    with self._routing_scope(endpoint, model_name, attempts):
+                        response = await model.get_response(
+                            system_instructions,
+                            input,
+                            model_settings,
+                            tools,
+                            output_schema,
+                            handoffs,
+                            tracing,
+                        )
+                except Exception as e:
+                    kind = provider._classify_failure(endpoint, e)
+                    attempts.append(_attempt(endpoint, model_name, e))
+                    if kind == "other":
+                        raise
+                    last_error = e
+                    if kind == "model":
+                        break
+                    continue
+                finally:
+                    provider._end_request(endpoint)
+
+                provider._record_success(endpoint, time.monotonic() - start)
+                # The runner rejects output it can't use, so it's worth checking for it here, when
+                # another model can still be tried. The last model's output is left to the runner.
+                if i < len(model_chain) - 1:
+                    error = _check_response(response, tools, output_schema, handoffs)
+                    if error is not None:
+                        attempts.append(_attempt(endpoint, model_name, error))
+                        last_error = error
+                        break
+                return response
+
+        raise _no_endpoint_error(self._model_name, last_error)
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        provider = self._provider
+        last_error: Exception | None = None
+        attempts: list[dict[str, Any]] = []
+        for model_name in provider._get_model_chain(self._model_name):
+            tried: set[str] = set()
+            while (endpoint := provider._select_endpoint(model_name, tried)) is not None:
+                tried.add(endpoint.name)
+                model = provider._get_endpoint_model(endpoint, model_name)
+                start = provider._start_request(endpoint)
+                started = False
+                try:
+                    with self._routing_scope(endpoint, model_name, attempts):
+                        async for event in model.stream_response(
+                            system_instructions,
+                            input,
+                            model_settings,
+                            tools,
+                            output_schema,
+                            handoffs,
+                            tracing,
+                        ):
+                            if not started:
+                                started = True
+                                provider._record_success(endpoint, time.monotonic() - start)
+                            yield event
+                except Exception as e:
+                    if started:
+                        # We can't take back the events we've already passed on
+                        raise
+                    kind = provider._classify_failure(endpoint, e)
+                    attempts.append(_attempt(endpoint, model_name, e))
+                    if kind == "other":
+                        raise
+                    last_error = e
+                    if kind == "model":
+                        break
+                    continue
+                finally:
+                    provider._end_request(endpoint)
+
+                if not started:
+                    # The stream ended without any events
+                    provider._record_success(endpoint, time.monotonic() - start)
+                return
+
+        raise _no_endpoint_error(self._model_name, last_error)
+
+
+@contextlib.contextmanager
+def _model_routing(routing: dict[str, Any]) -> Iterator[None]:
+    token = Scope.set_current_model_routing(routing)
+    try:
+        yield
+    finally:
+        Scope.reset_current_model_routing(token)
+
+
+def _attempt(endpoint: RoutingEndpoint, model_name: str | None, error: Exception) -> dict[str, Any]:
+    return {"endpoint": endpoint.name, "model": model_name, "error": type(error).__name__}
+
+
+def _check_response(
+    response: ModelResponse,
+    tools: list[Tool],
+    output_schema: AgentOutputSchema | None,
+    handoffs: list[Handoff],
+) -> ModelBehaviorError | None:
+    """Returns the error the runner would raise for output it can't use: calls to tools the
+    request didn't include, or a final output that doesn't match the output schema."""
+    tool_names = {tool.name for tool in tools if isinstance(tool, FunctionTool)}
+    tool_names.update(handoff.tool_name for handoff in handoffs)
+    has_computer_tool = any(isinstance(tool, ComputerTool) for tool in tools)
+    messages = []
+    for item in response.output:
+        if isinstance(item, ResponseFunctionToolCall) and item.name not in tool_names:
+            return ModelBehaviorError(f"Model called unknown tool {item.name}")
+        if isinstance(item, ResponseComputerToolCall) and not has_computer_tool:
+            return ModelBehaviorError("Model produced computer action without a computer tool")
+        if isinstance(item, ResponseOutputMessage):
+            messages.append(item)
+
+    text = ItemHelpers.extract_last_text(messages[-1]) if messages else None
+    if output_schema is None or output_schema.is_plain_text() or not text:
+        return None
+    # Validating attaches errors to the current span, but the request may still succeed on the
+    # next model, so validate in a span that isn't recorded
+    with custom_span("Output check", disabled=True):
+        try:
+            output_schema.validate_json(text)
+        except ModelBehaviorError as e:
+            return e
+    return None
+
+
+def _no_endpoint_error(model_name: str | None, last_error: Exception | None) -> Exception:
+    if last_error is not None:
+        return last_error
+    return UserError(f"No endpoint serves model {model_name}")
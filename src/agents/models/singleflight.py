@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from ..agent_output import AgentOutputSchema
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..tool import Tool, _describe_tool
+from .interface import Model, ModelTracing
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+# Model settings that don't change what the model is asked for, so they don't prevent requests
+# from being shared
+_NON_REQUEST_SETTINGS = frozenset({"timeout"})
+
+
+@dataclass
+class SingleflightStats:
+    """Statistics about the requests made through a `SingleflightModel`."""
+
+    requests: int = 0
+    """The number of calls to the model."""
+
+    upstream_requests: int = 0
+    """The number of requests sent to the wrapped model."""
+
+    shared_requests: int = 0
+    """The number of calls that were answered by a request that was already in flight."""
+
+
+class _InFlightResponse:
+    def __init__(self, task: asyncio.Task[ModelResponse]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _InFlightStream:
+    """The events of a stream that's in flight, read into a buffer that every subscriber reads
+    at its own offset."""
+
+    def __init__(self) -> None:
+        self.events: list[TResponseStreamEvent] = []
+        self.done = False
+        self.error: Exception | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task[None] | None = None
+        self._waiters: list[asyncio.Future[None]] = []
+
+    async def read(self, stream: AsyncIterator[TResponseStreamEvent]) -> None:
+        try:
+            async for event in stream:
+                self.events.append(event)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    async def wait(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+    def _notify(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class SingleflightModel(Model):
+    """Wraps a model so that identical requests that are in flight at the same time share a
+    single request to the wrapped model. E.g. when many users ask the same question at once, only
+    one request is sent, and its response is returned to all of them.
+
+    Nothing is stored: once a request completes, the next identical request is sent again. Streamed
+    requests are shared as well; every caller receives all the events of the shared stream, from
+    the start.
+
+    Sharing a response means that all callers get the same answer. If the model samples (i.e. the
+    temperature isn't set to 0), callers would otherwise get different answers, so such requests
+    are only shared if `share_sampled_requests` is set.
+
+    Model settings that don't affect the response, such as the timeout, aren't compared. A shared
+    request uses the settings of the caller that sent it.
+    """
+
+    def __init__(self, model: Model, *, share_sampled_requests: bool = False) -> None:
+        """
+        Args:
+            model: The model to send requests to.
+            share_sampled_requests: Whether to share requests whose temperature isn't 0. When
+                False, only deterministic requests are shared.
+        """
+        self.model = model
+        self.share_sampled_requests = share_sampled_requests
+        self.stats = SingleflightStats()
+        """Statistics about the requests made so far."""
+
+        self._responses: dict[str, _InFlightResponse] = {}
+        self._streams: dict[str, _InFlightStream] = {}
+
+    def _get_request_key(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+    ) -> str | None:
+        """Returns a key that's the same for identical requests, or None if the request must not
+        be shared."""
+        if model_settings.temperature != 0 and not self.share_sampled_requests:
+            return None
+
+        request = {
+            "system_instructions": system_instructions,
+            "input": input,
+            "model_settings": {
+                field.name: getattr(model_settings, field.name)
+                for field in dataclasses.fields(model_settings)
+                if field.name not in _NON_REQUEST_SETTINGS
+            },
+            "tools": [_describe_tool(tool) for tool in tools],
+            "output_schema": None
+            if output_schema is None or output_schema.is_plain_text()
+            else [output_schema.json_schema(), output_schema.strict_json_schema],
+            "handoffs": [
+                [
+                    handoff.tool_name,
+                    handoff.tool_description,
+                    handoff.input_json_schema,
+                    handoff.strict_json_schema,
+                ]
+                for handoff in handoffs
+            ],
+        }
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=repr)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        self.stats.requests += 1
+        key = self._get_request_key(
+            system_instructions, input, model_settings, tools, output_schema, handoffs
+        )
+        if key is None:
+            self.stats.upstream_requests += 1
+            return await self.model.get_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+            )
+
+        in_flight = self._responses.get(key)
+        if in_flight is None:
+            self.stats.upstream_requests += 1
+            # The request runs in a task of its own, so that it survives if the caller that sent
+            # it is cancelled while others still wait for it
+            task = asyncio.ensure_future(
+                self.model.get_response(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    tracing,
+                )
+            )
+            in_flight = self._responses[key] = _InFlightResponse(task)
+            task.add_done_callback(lambda _: self._forget(self._responses, key, in_flight))
+        else:
+            self.stats.shared_requests += 1
+
+        in_flight.waiters += 1
+        try:
+            response = await asyncio.shield(in_flight.task)
+        finally:
+            in_flight.waiters -= 1
+            if in_flight.waiters == 0 and not in_flight.task.done():
+                # Every caller was cancelled
+                in_flight.task.cancel()
+
+        # Each caller gets its own output list, in case it's modified
+        return dataclasses.replace(response, output=list(response.output))
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        self.stats.requests += 1
+        key = self._get_request_key(
+            system_instructions, input, model_settings, tools, output_schema, handoffs
+        )
+        if key is None:
+            self.stats.upstream_requests += 1
+            async for event in self.model.stream_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+            ):
+                yield event
+            return
+
+        in_flight = self._streams.get(key)
+        if in_flight is None:
+            self.stats.upstream_requests += 1
+            in_flight = self._streams[key] = _InFlightStream()
+            task = asyncio.ensure_future(
+                in_flight.read(
+                    self.model.stream_response(
+                        system_instructions,
+                        input,
+                        model_settings,
+                        tools,
+                        output_schema,
+                        handoffs,
+                        tracing,
+                    )
+                )
+            )
+            task.add_done_callback(lambda _: self._forget(self._streams, key, in_flight))
+            in_flight.task = task
+        else:
+            self.stats.shared_requests += 1
+
+        in_flight.subscribers += 1
+        offset = 0
+        try:
+            while True:
+                if offset < len(in_flight.events):
+                    event = in_flight.events[offset]
+                    offset += 1
+                    yield event
+                elif in_flight.done:
+                    if in_flight.error is not None:
+                        raise in_flight.error
+                    return
+                else:
+                    await in_flight.wait()
+        finally:
+            in_flight.subscribers -= 1
+            if in_flight.subscribers == 0 and in_flight.task and not in_flight.task.done():
+                # Every caller stopped reading
+                in_flight.task.cancel()
+
+    @staticmethod
+    def _forget(in_flight_requests: dict[str, Any], key: str, in_flight: Any) -> None:
+        if in_flight_requests.get(key) is in_flight:
+            del in_flight_requests[key]
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from .agent_output import AgentOutputSchema
+from .handoffs import Handoff
+from .items import ItemHelpers, TResponseInputItem
+from .logger import logger
+from .tool import Tool, _describe_tool
+from .tracing import custom_span
+
+if TYPE_CHECKING:
+    from .agent import Agent
+
+T = TypeVar("T")
+
+
+def canonicalize(value: T) -> T:
+    """Returns a copy of a JSON value in which the keys of every object are sorted, so that equal
+    values are always serialized to the same bytes. Providers only serve a request from their
+    prompt cache if its prefix (instructions, tools, early history) is byte-identical to that of an
+    earlier request.
+
+    The order of the `properties` of a JSON schema is kept, as the model generates the properties
+    in that order.
+    """
+    return _canonicalize(value, is_properties=False)  # type: ignore[no-any-return]
+
+
+def _canonicalize(value: Any, is_properties: bool) -> Any:
+    if isinstance(value, dict):
+        keys = value.keys() if is_properties else sorted(value.keys(), key=str)
+        return {
+            key: _canonicalize(value[key], is_properties=not is_properties and key == "properties")
+            for key in keys
+        }
+    if isinstance(value, list):
+        return [_canonicalize(item, is_properties=False) for item in value]
+    return value
+
+
+def get_cached_tokens(usage_details: Any) -> int:
+    """Returns the number of cached input tokens from the input (or prompt) tokens details of a
+    usage object. The details may be a model or, for fields the installed `openai` package doesn't
+    know about yet, a dict."""
+    if usage_details is None:
+        return 0
+    if isinstance(usage_details, dict):
+        cached_tokens = usage_details.get("cached_tokens")
+    else:
+        cached_tokens = getattr(usage_details, "cached_tokens", None)
+    return cached_tokens or 0
+
+
+def _hash(value: Any) -> str:
+    # Hashed chunk by chunk, so that large inputs (e.g. with base64 encoded images) aren't
+    # serialized into one string
+    digest = hashlib.sha256()
+    for chunk in json.JSONEncoder(separators=(",", ":"), default=repr).iterencode(value):
+        digest.update(chunk.encode())
+    return digest.hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class PrefixFingerprint:
+    """Fingerprints of the parts of a request that make up its prompt prefix. Requests with the
+    same fingerprint start with the same prompt, so they can be served from the prompt cache."""
+
+    instructions: str
+    """The fingerprint of the system prompt."""
+
+    tools: str
+    """The fingerprint of the tools and handoffs."""
+
+    output_schema: str
+    """The fingerprint of the output schema."""
+
+    input: str
+    """The fingerprint of the start of the conversation history: the input of the run's first
+    request, or of the first request after the history was rewritten, e.g. compacted."""
+
+    @property
+    def value(self) -> str:
+        """The fingerprint of the whole prefix."""
+        return _hash([self.instructions, self.tools, self.output_schema, self.input])
+
+    def changed_parts(self, other: PrefixFingerprint) -> list[str]:
+        """Returns the names of the parts whose fingerprints differ from `other`."""
+        return [
+            part
+            for part in ("instructions", "tools", "output_schema", "input")
+            if getattr(self, part) != getattr(other, part)
+        ]
+
+    @classmethod
+    def compute(
+        cls,
+        instructions: str | None,
+        tools: list[Tool],
+        handoffs: list[Handoff],
+        output_schema: AgentOutputSchema | None,
+        input: str | list[TResponseInputItem],
+        input_fingerprint: str | None = None,
+    ) -> PrefixFingerprint:
+        """Computes the fingerprint of a request's prefix.
+
+        Args:
+            instructions: The system prompt.
+            tools: The tools.
+            handoffs: The handoffs.
+            output_schema: The output schema, if any.
+            input: The start of the conversation history.
+            input_fingerprint: The fingerprint of the input, if it's already known. The input can
+                be large, and its start stays the same for as long as the history is only
+                appended to.
+        """
+        return cls(
+            instructions=_hash(instructions),
+            tools=_hash(
+                canonicalize(
+                    [_describe_tool(tool) for tool in tools]
+                    + [
+                        [
+                            handoff.tool_name,
+                            handoff.tool_description,
+                            handoff.input_json_schema,
+                            handoff.strict_json_schema,
+                        ]
+                        for handoff in handoffs
+                    ]
+                )
+            ),
+            output_schema=_hash(
+                None
+                if output_schema is None or output_schema.is_plain_text()
+                else canonicalize([output_schema.json_schema(), output_schema.strict_json_schema])
+            ),
+            input=input_fingerprint or _hash(ItemHelpers.input_to_input_list(input)),
+        )
+
+
+class _PrefixTracker:
+    """Tracks the prompt prefixes of a run's requests. If the prefix changes between consecutive
+    turns of the same agent, the next request misses the prompt cache; this is reported as a
+    `Prompt prefix changed` span, naming the parts that changed."""
+
+    def __init__(self, tracing_disabled: bool = False) -> None:
+        self.tracing_disabled = tracing_disabled
+        self._agent: Agent[Any] | None = None
+        self._fingerprint: PrefixFingerprint | None = None
+        self._input: list[TResponseInputItem] | None = None
+        self._input_fingerprint: str | None = None
+
+    def track(
+        self,
+        agent: Agent[Any],
+        instructions: str | None,
+        tools: list[Tool],
+        handoffs: list[Handoff],
+        output_schema: AgentOutputSchema | None,
+        input: str | list[TResponseInputItem],
+    ) -> PrefixFingerprint:
+        """Computes the fingerprint of the prefix of the agent's next request, and reports if it
+        changed since the agent's previous request. The tools, handoffs, output schema and input
+        are the ones sent to the model, e.g. after tool selection, schema minification and history
+        compaction."""
+        input_list = ItemHelpers.input_to_input_list(input)
+        # If the history was only appended to, it starts the same as before. Otherwise, e.g. if it
+        # was compacted or replaced by a handoff input filter, the whole input is the new start.
+        input_fingerprint = (
+            self._input_fingerprint if self._extends_previous_input(input_list) else None
+        )
+        fingerprint = PrefixFingerprint.compute(
+            instructions, tools, handoffs, output_schema, input_list, input_fingerprint
+        )
+        self._input = input_list
+        self._input_fingerprint = fingerprint.input
+
+        previous = self._fingerprint
+        if agent is self._agent and previous is not None and previous != fingerprint:
+            changed_parts = fingerprint.changed_parts(previous)
+            logger.debug(
+                f"Prompt prefix of agent {agent.name} changed ({', '.join(changed_parts)}), so "
+                "the request can't be served from the prompt cache"
+            )
+            span = custom_span(
+                "Prompt prefix changed",
+                data={
+                    "agent": agent.name,
+                    "changed": changed_parts,
+                    "previous_fingerprint": previous.value,
+                    "fingerprint": fingerprint.value,
+                },
+                disabled=self.tracing_disabled,
+            )
+            span.start()
+            span.finish()
+
+        self._agent = agent
+        self._fingerprint = fingerprint
+        return fingerprint
+
+    def _extends_previous_input(self, input: list[TResponseInputItem]) -> bool:
+        previous = self._input
+        if previous is None or len(input) < len(previous):
+            return False
+        # The runner shares the items across turns, so they're usually identical
+        return all(a is b or a == b for a, b in zip(previous, input))
@@ -4,6 +4,7 @@ import abc
 import asyncio
 from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import TYPE_CHECKING, Any, cast
 
 from typing_extensions import TypeVar
@@ -15,8 +16,10 @@ from .exceptions import InputGuardrailTripwireTriggered, MaxTurnsExceeded
 from .guardrail import InputGuardrailResult, OutputGuardrailResult
 from .items import ItemHelpers, ModelResponse, RunItem, TResponseInputItem
 from .logger import logger
+from .stream_broadcast import SlowConsumerPolicy, StreamBroadcaster, StreamSubscription
 from .stream_events import StreamEvent
 from .tracing import Trace
+from .usage import Usage
 
 if TYPE_CHECKING:
     from ._run_impl import QueueCompleteSentinel
@@ -38,7 +41,9 @@ class RunResultBase(abc.ABC):
     """
 
     raw_responses: list[ModelResponse]
-    """The raw LLM responses generated by the model during the agent run."""
+    """The raw LLM responses generated by the model during the agent run. If the run has a
+    `RunConfig.retention` policy, only the most recent responses may be kept.
+    """
 
     final_output: Any
     """The output of the last agent."""
@@ -84,12 +89,79 @@ class RunResultBase(abc.ABC):
 class RunResult(RunResultBase):
     _last_agent: Agent[Any]
 
+    is_cancelled: bool = False
+    """Whether the run was cancelled via a `CancellationToken`. If so, `final_output` is None and
+    `new_items`/`raw_responses` contain whatever was produced before the cancellation.
+    """
+
+    usage: Usage = field(default_factory=Usage)
+    """The usage of all the model calls of the run, including the ones whose raw responses aren't
+    kept because of the `RunConfig.retention` policy.
+    """
+
+    raw_responses_path: Path | None = None
+    """The file that the raw responses that aren't kept in `raw_responses` were written to, if the
+    `RunConfig.retention` policy spills them to disk. Read them back with `load_raw_responses()`.
+    """
+
     @property
     def last_agent(self) -> Agent[Any]:
         """The last agent that was run."""
         return self._last_agent
 
 
+def _cached_token_ratio(usage: Usage) -> float:
+    return usage.cached_input_tokens / usage.input_tokens if usage.input_tokens else 0.0
+
+
+@dataclass
+class BatchRunGroup:
+    """A group of runs in `Runner.run_batch()` whose first requests share the same prompt prefix."""
+
+    prefix_fingerprint: str
+    """The fingerprint of the prefix the group's runs share: the agent's system prompt, tools and
+    output schema, and the history their inputs share."""
+
+    input_indices: list[int]
+    """The indices of the group's inputs."""
+
+    primed: bool = False
+    """Whether a primer request was sent to cache the prefix before the group's runs started."""
+
+    usage: Usage = field(default_factory=Usage)
+    """The usage of the group's runs, including the primer request."""
+
+    @property
+    def cached_token_ratio(self) -> float:
+        """The share of the group's input tokens that were served from the prompt cache."""
+        return _cached_token_ratio(self.usage)
+
+
+@dataclass
+class BatchRunResult:
+    """The result of `Runner.run_batch()`."""
+
+    results: list[RunResult | Exception]
+    """The result of each run, in the order of the inputs. If a run raised an exception, the
+    exception takes its place."""
+
+    groups: list[BatchRunGroup]
+    """The groups the runs were scheduled in, in the order they were started."""
+
+    @property
+    def usage(self) -> Usage:
+        """The usage of all runs, including the primer requests."""
+        usage = Usage()
+        for group in self.groups:
+            usage.add(group.usage)
+        return usage
+
+    @property
+    def cached_token_ratio(self) -> float:
+        """The share of all input tokens that were served from the prompt cache."""
+        return _cached_token_ratio(self.usage)
+
+
 @dataclass
 class RunResultStreaming(RunResultBase):
     """The result of an agent run in streaming mode. You can use the `stream_events` method to
@@ -119,6 +191,19 @@ class RunResultStreaming(RunResultBase):
     is_complete: bool = False
     """Whether the agent has finished running."""
 
+    is_cancelled: bool = False
+    """Whether the run was cancelled, via `cancel()` or a `CancellationToken`."""
+
+    usage: Usage = field(default_factory=Usage)
+    """The usage of all the model calls of the run, including the ones whose raw responses aren't
+    kept because of the `RunConfig.retention` policy.
+    """
+
+    raw_responses_path: Path | None = None
+    """The file that the raw responses that aren't kept in `raw_responses` were written to, if the
+    `RunConfig.retention` policy spills them to disk. Read them back with `load_raw_responses()`.
+    """
+
     # Queues that the background run_loop writes to
     _event_queue: asyncio.Queue[StreamEvent | QueueCompleteSentinel] = field(
         default_factory=asyncio.Queue, repr=False
@@ -132,6 +217,7 @@ class RunResultStreaming(RunResultBase):
     _input_guardrails_task: asyncio.Task[Any] | None = field(default=None, repr=False)
     _output_guardrails_task: asyncio.Task[Any] | None = field(default=None, repr=False)
     _stored_exception: Exception | None = field(default=None, repr=False)
+    _broadcaster: StreamBroadcaster | None = field(default=None, repr=False)
 
     @property
     def last_agent(self) -> Agent[Any]:
@@ -140,6 +226,21 @@ class RunResultStreaming(RunResultBase):
         """
         return self.current_agent
 
+    def cancel(self) -> None:
+        """Cancel the run. The background agent loop is stopped immediately: the in-flight model
+        call (and its HTTP stream), and any running tools and guardrails are cancelled. Any
+        `stream_events()` consumer finishes without raising, and the result keeps the partial
+        `new_items` and `raw_responses` produced so far. Calling this on a finished run is a no-op.
+        """
+        if self.is_complete:
+            return
+
+        logger.debug("Cancelling streamed run")
+        self.is_cancelled = True
+        self.is_complete = True
+        self._cleanup_tasks()
+        self._event_queue.put_nowait(QueueCompleteSentinel())
+
     async def stream_events(self) -> AsyncIterator[StreamEvent]:
         """Stream deltas for new items as they are generated. We're using the types from the
         OpenAI Responses API, so these are semantic events: each event has a `type` field that
@@ -173,14 +274,46 @@ class RunResultStreaming(RunResultBase):
             yield item
             self._event_queue.task_done()
 
-        if self._trace:
-            self._trace.finish(reset_current=True)
-
+        self._finish_trace()
         self._cleanup_tasks()
 
         if self._stored_exception:
             raise self._stored_exception
 
+    def subscribe(
+        self,
+        *,
+        offset: int = 0,
+        max_buffer_size: int | None = None,
+        slow_consumer_policy: SlowConsumerPolicy | None = None,
+    ) -> StreamSubscription:
+        """Subscribe to the events of the run. Unlike `stream_events()`, which can only be consumed
+        once, any number of subscribers can receive the same events, each at its own pace. See
+        `StreamBroadcaster` for details; you can also create a `StreamBroadcaster` yourself to
+        configure the defaults.
+
+        Don't mix this with calling `stream_events()` directly, since both consume the same events.
+
+        Args:
+            offset: The offset of the first event to receive. Defaults to 0, i.e. replay the run
+                from the start.
+            max_buffer_size: The maximum number of events the subscriber can lag behind.
+            slow_consumer_policy: What to do when the subscriber lags behind by more than
+                `max_buffer_size` events.
+
+        Returns:
+            An async iterator over the events of the run. If you may stop reading before the end
+            of the run, use it as an async context manager, or close it, so that it doesn't hold
+            back the other subscribers.
+        """
+        if self._broadcaster is None:
+            self._broadcaster = StreamBroadcaster(self)
+        return self._broadcaster.subscribe(
+            offset=offset,
+            max_buffer_size=max_buffer_size,
+            slow_consumer_policy=slow_consumer_policy,
+        )
+
     def _check_errors(self):
         if self.current_turn > self.max_turns:
             self._stored_exception = MaxTurnsExceeded(f"Max turns ({self.max_turns}) exceeded")
@@ -191,21 +324,29 @@ class RunResultStreaming(RunResultBase):
             if guardrail_result.output.tripwire_triggered:
                 self._stored_exception = InputGuardrailTripwireTriggered(guardrail_result)
 
-        # Check the tasks for any exceptions
-        if self._run_impl_task and self._run_impl_task.done():
-            exc = self._run_impl_task.exception()
-            if exc and isinstance(exc, Exception):
-                self._stored_exception = exc
-
-        if self._input_guardrails_task and self._input_guardrails_task.done():
-            exc = self._input_guardrails_task.exception()
-            if exc and isinstance(exc, Exception):
-                self._stored_exception = exc
-
-        if self._output_guardrails_task and self._output_guardrails_task.done():
-            exc = self._output_guardrails_task.exception()
-            if exc and isinstance(exc, Exception):
-                self._stored_exception = exc
+        # Check the tasks for any exceptions. Cancelled tasks don't have one.
+        for task in (
+            self._run_impl_task,
+            self._input_guardrails_task,
+            self._output_guardrails_task,
+        ):
+            if task and task.done() and not task.cancelled():
+                exc = task.exception()
+                if exc and isinstance(exc, Exception):
+                    self._stored_exception = exc
+
+    def _finish_trace(self):
+        if not self._trace:
+            return
+
+        trace, self._trace = self._trace, None
+        try:
+            trace.finish(reset_current=True)
+        except ValueError:
+            # The events were consumed from a different task than the one that called
+            # `run_streamed()` (e.g. by a `StreamBroadcaster`), so the trace can't be reset as the
+            # current trace here. The trace itself has been finished at this point.
+            logger.debug("Trace finished outside of the context it was started in")
 
     def _cleanup_tasks(self):
         if self._run_impl_task and not self._run_impl_task.done():
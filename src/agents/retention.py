@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import functools
+import json
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from pydantic import TypeAdapter
+
+from .exceptions import UserError
+from .items import ModelResponse, TResponseOutputItem
+from .usage import Usage
+
+
+@dataclass
+class RetentionPolicy:
+    """Caps the memory that a run's result uses for `raw_responses`, i.e. the full model response
+    of every turn, so that runs with many turns (e.g. computer use or research loops) stay within
+    a fixed memory envelope. The policy only affects the result: the run itself continues from its
+    items, which are always kept, and `RunResult.usage` always covers all of the responses.
+
+    For example:
+    - `RetentionPolicy()` keeps all the responses, like when no policy is set.
+    - `RetentionPolicy(max_raw_responses=5)` keeps the last 5 responses.
+    - `RetentionPolicy(max_raw_responses=0)` keeps the usage only.
+    - `RetentionPolicy(max_raw_responses=0, spill_directory="responses")` writes each response to
+      disk rather than keeping it in memory.
+    """
+
+    max_raw_responses: int | None = None
+    """The number of most recent raw responses to keep in memory. If None, all of them are kept;
+    if 0, none of them are.
+    """
+
+    spill_directory: str | Path | None = None
+    """A directory to write the raw responses that aren't kept in memory to, in a JSON Lines file
+    per run (see `RunResult.raw_responses_path`). Use `load_raw_responses()` to read them back. If
+    None, they are dropped.
+    """
+
+    def __post_init__(self) -> None:
+        if self.max_raw_responses is not None and self.max_raw_responses < 0:
+            raise UserError("max_raw_responses must be at least 0")
+        if self.spill_directory is not None and self.max_raw_responses is None:
+            raise UserError(
+                "spill_directory requires max_raw_responses to be set, since all the responses "
+                "are kept in memory otherwise"
+            )
+
+
+class _ResponseRetainer:
+    """Adds a run's responses to its result, according to the run's retention policy."""
+
+    def __init__(
+        self,
+        policy: RetentionPolicy | None,
+        responses: list[ModelResponse] | None = None,
+        usage: Usage | None = None,
+    ) -> None:
+        self.policy = policy
+        self.responses = responses if responses is not None else []
+        self.usage = usage if usage is not None else Usage()
+        self.path: Path | None = None
+
+    async def add(self, response: ModelResponse) -> None:
+        self.usage.add(response.usage)
+        self.responses.append(response)
+
+        max_responses = self.policy.max_raw_responses if self.policy else None
+        if max_responses is None or len(self.responses) <= max_responses:
+            return
+        excess = len(self.responses) - max_responses
+        if self.policy and self.policy.spill_directory is not None:
+            await asyncio.to_thread(
+                self._spill, Path(self.policy.spill_directory), self.responses[:excess]
+            )
+        del self.responses[:excess]
+
+    def _spill(self, directory: Path, responses: list[ModelResponse]) -> None:
+        if self.path is None:
+            directory.mkdir(parents=True, exist_ok=True)
+            self.path = directory / f"{uuid.uuid4().hex}.jsonl"
+        with self.path.open("a", encoding="utf-8") as f:
+            for response in responses:
+                f.write(_dump_response(response) + "\n")
+
+
+def _dump_response(response: ModelResponse) -> str:
+    return json.dumps(
+        {
+            "output": [item.model_dump(exclude_unset=True) for item in response.output],
+            "usage": dataclasses.asdict(response.usage),
+            "referenceable_id": response.referenceable_id,
+            "prefix_fingerprint": response.prefix_fingerprint,
+        },
+        default=str,
+    )
+
+
+@functools.cache
+def _get_output_adapter() -> TypeAdapter[list[TResponseOutputItem]]:
+    return TypeAdapter(list[TResponseOutputItem])
+
+
+def load_raw_responses(path: str | Path) -> list[ModelResponse]:
+    """Reads the raw responses that a run wrote to disk because of its retention policy, oldest
+    first.
+
+    Args:
+        path: The file the responses were written to, i.e. the result's `raw_responses_path`.
+
+    Returns:
+        The responses, in the order the model returned them.
+    """
+    responses = []
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            data = json.loads(line)
+            responses.append(
+                ModelResponse(
+                    output=_get_output_adapter().validate_python(data["output"]),
+                    usage=Usage(**data["usage"]),
+                    referenceable_id=data["referenceable_id"],
+                    prefix_fingerprint=data["prefix_fingerprint"],
+                )
+            )
+    return responses
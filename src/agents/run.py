@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 import asyncio
-import copy
+import dataclasses
+import json
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping, Sequence
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
-from typing import Any, cast
+from typing import Any, Literal, TypeVar, Union, cast
 
+from openai import APIStatusError
 from openai.types.responses import ResponseCompletedEvent
 
 from . import Model, _utils
@@ -18,14 +23,27 @@ from ._run_impl import (
     TraceCtxManager,
     get_model_tracing_impl,
 )
+from ._stream_watchdog import watch_stream
 from .agent import Agent
 from .agent_output import AgentOutputSchema
+from .cancellation import CancellationToken, cancel_task_on_token, uncancel_current_task
+from .checkpoint import (
+    CheckpointStore,
+    RunState,
+    _Checkpointer,
+    _deserialize_item,
+    _get_agent_registry,
+)
+from .compaction import HistoryCompactor
 from .exceptions import (
     AgentsException,
+    DeadlineExceeded,
     InputGuardrailTripwireTriggered,
     MaxTurnsExceeded,
     ModelBehaviorError,
+    ModelStreamStalled,
     OutputGuardrailTripwireTriggered,
+    UserError,
 )
 from .guardrail import InputGuardrail, InputGuardrailResult, OutputGuardrail, OutputGuardrailResult
 from .handoffs import Handoff, HandoffInputFilter, handoff
@@ -35,15 +53,29 @@ from .logger import logger
 from .model_settings import ModelSettings
 from .models.interface import ModelProvider
 from .models.openai_provider import OpenAIProvider
-from .result import RunResult, RunResultStreaming
+from .prompt_cache import PrefixFingerprint, _PrefixTracker, get_cached_tokens
+from .result import BatchRunGroup, BatchRunResult, RunResult, RunResultStreaming
+from .retention import RetentionPolicy, _ResponseRetainer
 from .run_context import RunContextWrapper, TContext
-from .stream_events import AgentUpdatedStreamEvent, RawResponsesStreamEvent
-from .tracing import Span, SpanError, agent_span, get_current_trace, trace
+from .scheduler import ModelCallScheduler, PriorityClass
+from .schema_minifier import minify_handoff, minify_output_schema, minify_tool
+from .session import Session
+from .stream_events import AgentUpdatedStreamEvent, RawResponsesStreamEvent, RetryStreamEvent
+from .tool import Tool
+from .tool_selection import ToolSelector
+from .tracing import Span, SpanError, agent_span, custom_span, get_current_trace, trace
 from .tracing.span_data import AgentSpanData
 from .usage import Usage
 
 DEFAULT_MAX_TURNS = 10
 
+# The input of the requests that prime the prompt cache, and the fewest output tokens the Responses
+# API accepts
+_PRIMER_INPUT: TResponseInputItem = {"role": "user", "content": "Reply with OK."}
+_PRIMER_MAX_TOKENS = 16
+
+T = TypeVar("T")
+
 
 @dataclass
 class RunConfig:
@@ -103,6 +135,202 @@ class RunConfig:
     An optional dictionary of additional metadata to include with the trace.
     """
 
+    run_timeout: float | None = None
+    """The maximum time, in seconds, for the entire run, including tools and guardrails. If
+    exceeded, a `DeadlineExceeded` exception is raised.
+    """
+
+    turn_timeout: float | None = None
+    """The maximum time, in seconds, for a single turn, i.e. a model call and the tool calls that
+    follow it. If exceeded, a `DeadlineExceeded` exception is raised.
+    """
+
+    model_call_timeout: float | None = None
+    """The maximum time, in seconds, for a single model call. If exceeded, a `DeadlineExceeded`
+    exception is raised. The remaining time budget is also passed to the model as
+    `ModelSettings.timeout`, so that the request itself is aborted in time.
+    """
+
+    stream_idle_timeout: float | None = None
+    """Only applies to streamed runs. The maximum time, in seconds, to wait for the next event from
+    the model's response stream (including the first one). If exceeded, the stream is considered
+    stalled and is aborted. The model call is then retried, up to `stream_stall_retries` times,
+    after which a `ModelStreamStalled` exception is raised.
+    """
+
+    stream_stall_retries: int = 0
+    """The number of times to retry the model call of a turn whose response stream stalled. Each
+    retry is announced with a `RetryStreamEvent`, so consumers can discard the partial output of
+    the stalled attempt.
+    """
+
+    scheduler: ModelCallScheduler | None = None
+    """A scheduler that decides when the run's model calls start, shared with other runs. If None,
+    model calls start right away.
+    """
+
+    priority: PriorityClass = "interactive"
+    """The priority class of the run's model calls, used by the `scheduler`. Use `batch` for bulk
+    jobs, so they don't delay user-facing runs.
+    """
+
+    tenant: str | None = None
+    """The tenant the run belongs to, used by the `scheduler` to share model calls fairly between
+    tenants.
+    """
+
+    use_previous_response_id: bool = False
+    """Whether to let the server keep the conversation between turns. If enabled, each model call
+    only sends the items that were added since the previous response, along with its ID, instead of
+    the full input. Falls back to sending the full input if the history was rewritten (e.g. by a
+    handoff input filter), or if the server rejects the previous response ID. Only supported by
+    models that use the Responses API, and that store their responses.
+    """
+
+    minify_schemas: bool = False
+    """Whether to minify the JSON schemas of tools, handoffs and the output type before sending
+    them to the model, e.g. by removing titles and inlining definitions that are only used once.
+    The minified schemas accept the same values, and are still valid in strict mode. See
+    `get_schema_minification_report()` for the tokens this saves per agent.
+    """
+
+    tool_selector: ToolSelector | None = None
+    """Selects the tools to send to the model on each call, e.g. the tools that are most relevant
+    to the current turn (see `BM25ToolSelector`). The run can still execute any of the agent's
+    tools. If None, all tools are sent.
+    """
+
+    history_compactor: HistoryCompactor | None = None
+    """Compacts the history before each model call, e.g. by only keeping recent turns or by
+    shortening earlier tool outputs. Only the model input is compacted; the run's result keeps the
+    full history. If None, the full history is sent.
+    """
+
+    retention: RetentionPolicy | None = None
+    """Caps the raw model responses that the run's result keeps in memory, e.g. only the last few
+    of them, or only their usage. Useful for runs with many turns. If None, all of them are kept.
+    """
+
+    checkpoint_store: CheckpointStore | None = None
+    """A store to save a checkpoint of the run to after each completed turn, so that the run can
+    be continued with `Runner.resume()` if it's interrupted, e.g. by a crash or a deploy. The
+    checkpoint is deleted once the run completes. If None, no checkpoints are saved.
+    """
+
+    run_id: str | None = None
+    """The ID of the run's checkpoints in the `checkpoint_store`. If None, an ID is generated; use
+    `CheckpointStore.list_runs()` to find the runs to resume.
+    """
+
+
+@dataclass(frozen=True)
+class _Deadline:
+    """A point in time (in terms of `time.monotonic()`) and the timeout it comes from."""
+
+    when: float
+    timeout_type: Literal["run", "turn", "model_call"]
+
+    @classmethod
+    def after(
+        cls, timeout: float | None, timeout_type: Literal["run", "turn", "model_call"]
+    ) -> _Deadline | None:
+        if timeout is None:
+            return None
+        return cls(time.monotonic() + timeout, timeout_type)
+
+    @classmethod
+    def earliest(cls, *deadlines: _Deadline | None) -> _Deadline | None:
+        candidates = [d for d in deadlines if d is not None]
+        return min(candidates, key=lambda d: d.when) if candidates else None
+
+    def remaining(self) -> float:
+        return max(self.when - time.monotonic(), 0.0)
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        try:
+            return await asyncio.wait_for(_wrap_timeout_errors(awaitable), self.remaining())
+        except _WrappedTimeoutError as e:
+            error = e.error
+        except asyncio.TimeoutError:
+            name = self.timeout_type.replace("_", " ").capitalize()
+            raise DeadlineExceeded(f"{name} timeout exceeded", self.timeout_type) from None
+        # A timeout of the awaitable itself, e.g. of a tool or a guardrail, not of the deadline
+        raise error
+
+
+class _WrappedTimeoutError(Exception):
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+async def _wrap_timeout_errors(awaitable: Awaitable[T]) -> T:
+    """Wraps the timeout errors that the awaitable raises, so that they can be told apart from
+    the timeout of `asyncio.wait_for()`."""
+    try:
+        return await awaitable
+    except asyncio.TimeoutError as e:
+        raise _WrappedTimeoutError(e) from None
+
+
+async def _run_with_deadline(awaitable: Awaitable[T], deadline: _Deadline | None) -> T:
+    if deadline is None:
+        return await awaitable
+    return await deadline.run(awaitable)
+
+
+@dataclass
+class _ServerConversation:
+    """The conversation the server holds when `RunConfig.use_previous_response_id` is enabled: the
+    ID of the last response, and the items it continues from, i.e. the input of the request
+    followed by the output of the response.
+    """
+
+    response_id: str | None = None
+    items: list[TResponseInputItem] = field(default_factory=list)
+
+    def get_model_input(
+        self, input: list[TResponseInputItem]
+    ) -> tuple[str | None, list[TResponseInputItem]]:
+        """Returns the previous response ID to send, and the input items to send with it. If the
+        input no longer starts with the items the server holds, the full input is sent."""
+        known = len(self.items)
+        if self.response_id is None or len(input) <= known or input[:known] != self.items:
+            return None, input
+        return self.response_id, input[known:]
+
+    def update(self, input: list[TResponseInputItem], response: ModelResponse) -> None:
+        self.response_id = response.referenceable_id
+        self.items = (
+            input + response._to_frozen_input_items() if self.response_id is not None else []
+        )
+
+
+def _freeze_input(input: str | list[TResponseInputItem]) -> str | list[TResponseInputItem]:
+    """Makes the input items read-only, so that they can be shared across turns and with
+    guardrails, filters and sessions instead of being copied."""
+    if isinstance(input, str):
+        return input
+    return ItemHelpers.input_to_frozen_input_list(input)
+
+
+def _get_checkpointer(
+    run_config: RunConfig,
+    state: RunState | None,
+    original_input: str | list[TResponseInputItem],
+    generated_items: list[RunItem],
+) -> _Checkpointer | None:
+    if run_config.checkpoint_store is None:
+        return None
+    if state is None:
+        return _Checkpointer(run_config.checkpoint_store, run_config.run_id)
+    checkpointer = _Checkpointer(run_config.checkpoint_store, state.run_id)
+    checkpointer.restore(original_input, generated_items, state.generated_items)
+    return checkpointer
+
+
+def _json_size(items: list[TResponseInputItem]) -> int:
+    return len(json.dumps(items, default=str).encode())
+
 
 class Runner:
     @classmethod
@@ -115,6 +343,8 @@ class Runner:
         max_turns: int = DEFAULT_MAX_TURNS,
         hooks: RunHooks[TContext] | None = None,
         run_config: RunConfig | None = None,
+        cancel_token: CancellationToken | None = None,
+        session: Session | None = None,
     ) -> RunResult:
         """Run a workflow starting at the given agent. The agent will run in a loop until a final
         output is generated. The loop runs like so:
@@ -124,9 +354,11 @@ class Runner:
         3. If there's a handoff, we run the loop again, with the new agent.
         4. Else, we run tool calls (if any), and re-run the loop.
 
-        In two cases, the agent may raise an exception:
+        In three cases, the agent may raise an exception:
         1. If the max_turns is exceeded, a MaxTurnsExceeded exception is raised.
         2. If a guardrail tripwire is triggered, a GuardrailTripwireTriggered exception is raised.
+        3. If one of the timeouts in the run config is exceeded, a DeadlineExceeded exception is
+            raised.
 
         Note that only the first agent's input guardrails are run.
 
@@ -139,37 +371,142 @@ class Runner:
                 AI invocation (including any tool calls that might occur).
             hooks: An object that receives callbacks on various lifecycle events.
             run_config: Global settings for the entire agent run.
+            cancel_token: A token that can be used to cancel the run. If the run is cancelled, the
+                in-flight model call, tools and guardrails are cancelled and a partial result is
+                returned, with `is_cancelled` set and `final_output` set to None.
+            session: The session that stores the conversation. If set, the input is appended to
+                the session's history, and the input and new items are added to the session once
+                the run completes. Input guardrails only receive the new input.
 
         Returns:
             A run result containing all the inputs, guardrail results and the output of the last
             agent. Agents may perform handoffs, so we don't know the specific type of the output.
         """
+        return await cls._run(
+            starting_agent,
+            input,
+            context=context,
+            max_turns=max_turns,
+            hooks=hooks,
+            run_config=run_config,
+            cancel_token=cancel_token,
+            session=session,
+        )
+
+    @classmethod
+    async def resume(
+        cls,
+        state: RunState,
+        agent_registry: Mapping[str, Agent[TContext]] | Sequence[Agent[TContext]],
+        *,
+        context: TContext | None = None,
+        max_turns: int = DEFAULT_MAX_TURNS,
+        hooks: RunHooks[TContext] | None = None,
+        run_config: RunConfig | None = None,
+        cancel_token: CancellationToken | None = None,
+    ) -> RunResult:
+        """Resume a run from a checkpoint, saved after a completed turn because the run had a
+        `RunConfig.checkpoint_store`, e.g. after the process running it crashed. The run continues
+        with the next turn, as if it had never stopped: the turns of the checkpoint are not run
+        again, and count towards `max_turns`. The input guardrails, which ran with the first turn,
+        are not run again.
+
+        Args:
+            state: The checkpoint to resume from, e.g. from `CheckpointStore.load()`.
+            agent_registry: The agents that the run may use, either as a list or by name. The
+                agents of the checkpoint are looked up by name.
+            context: The context to run the agent with.
+            max_turns: The maximum number of turns of the run, including the turns of the
+                checkpoint.
+            hooks: An object that receives callbacks on various lifecycle events.
+            run_config: Global settings for the rest of the run. To keep saving checkpoints, set
+                `checkpoint_store`; the run keeps the ID of the checkpoint.
+            cancel_token: A token that can be used to cancel the run.
+
+        Returns:
+            A run result, like the one of `run()`. Its `new_items` include the items generated
+            before the checkpoint, and `raw_responses` only has the responses generated after it.
+        """
+        agents = _get_agent_registry(agent_registry)
+        items = [_deserialize_item(item, agents) for item in state.generated_items]
+        if state.current_agent not in agents:
+            raise UserError(
+                f"Agent {state.current_agent!r} of the checkpoint is not in the agent registry"
+            )
+        return await cls._run(
+            agents[state.current_agent],
+            state.original_input,
+            context=context,
+            max_turns=max_turns,
+            hooks=hooks,
+            run_config=run_config,
+            cancel_token=cancel_token,
+            session=None,
+            resume_from=(state, items),
+        )
+
+    @classmethod
+    async def _run(
+        cls,
+        starting_agent: Agent[TContext],
+        input: str | list[TResponseInputItem],
+        *,
+        context: TContext | None,
+        max_turns: int,
+        hooks: RunHooks[TContext] | None,
+        run_config: RunConfig | None,
+        cancel_token: CancellationToken | None,
+        session: Session | None,
+        resume_from: tuple[RunState, list[RunItem]] | None = None,
+    ) -> RunResult:
         if hooks is None:
             hooks = RunHooks[Any]()
         if run_config is None:
             run_config = RunConfig()
+        state = resume_from[0] if resume_from else None
 
         with TraceCtxManager(
             workflow_name=run_config.workflow_name,
-            trace_id=run_config.trace_id,
-            group_id=run_config.group_id,
+            trace_id=run_config.trace_id or (state.trace_id if state else None),
+            group_id=run_config.group_id or (state.group_id if state else None),
             metadata=run_config.trace_metadata,
             disabled=run_config.tracing_disabled,
         ):
-            current_turn = 0
-            original_input: str | list[TResponseInputItem] = copy.deepcopy(input)
-            generated_items: list[RunItem] = []
-            model_responses: list[ModelResponse] = []
+            current_turn = state.current_turn if state else 0
+            input = _freeze_input(input)
+            original_input: str | list[TResponseInputItem] = input
+            if session is not None:
+                original_input = ItemHelpers.input_to_frozen_input_list(
+                    [*(await session.get_history()), *ItemHelpers.input_to_input_list(input)]
+                )
+            generated_items: list[RunItem] = resume_from[1] if resume_from else []
+            retained_responses = _ResponseRetainer(
+                run_config.retention, usage=dataclasses.replace(state.usage) if state else None
+            )
+            checkpointer = _get_checkpointer(run_config, state, original_input, generated_items)
+            server_conversation = (
+                _ServerConversation() if run_config.use_previous_response_id else None
+            )
+            prefix_tracker = _PrefixTracker(run_config.tracing_disabled)
 
             context_wrapper: RunContextWrapper[TContext] = RunContextWrapper(
                 context=context,  # type: ignore
             )
+            if state:
+                context_wrapper.usage.add(state.usage)
 
             input_guardrail_results: list[InputGuardrailResult] = []
 
             current_span: Span[AgentSpanData] | None = None
             current_agent = starting_agent
             should_run_agent_start_hooks = True
+            run_deadline = _Deadline.after(run_config.run_timeout, "run")
+
+            detach_cancel_token = (
+                cancel_task_on_token(cancel_token, cast(asyncio.Task[Any], asyncio.current_task()))
+                if cancel_token
+                else None
+            )
 
             try:
                 while True:
@@ -206,15 +543,38 @@ class Runner:
                         f"Running agent {current_agent.name} (turn {current_turn})",
                     )
 
+                    turn_deadline = _Deadline.earliest(
+                        run_deadline, _Deadline.after(run_config.turn_timeout, "turn")
+                    )
+                    context_wrapper.deadline = turn_deadline.when if turn_deadline else None
+
                     if current_turn == 1:
-                        input_guardrail_results, turn_result = await asyncio.gather(
-                            cls._run_input_guardrails(
-                                starting_agent,
-                                starting_agent.input_guardrails
-                                + (run_config.input_guardrails or []),
-                                copy.deepcopy(input),
-                                context_wrapper,
+                        input_guardrail_results, turn_result = await _run_with_deadline(
+                            cls._run_with_input_guardrails(
+                                cls._run_input_guardrails(
+                                    starting_agent,
+                                    starting_agent.input_guardrails
+                                    + (run_config.input_guardrails or []),
+                                    input if isinstance(input, str) else list(input),
+                                    context_wrapper,
+                                ),
+                                cls._run_single_turn(
+                                    agent=current_agent,
+                                    original_input=original_input,
+                                    generated_items=generated_items,
+                                    hooks=hooks,
+                                    context_wrapper=context_wrapper,
+                                    run_config=run_config,
+                                    should_run_agent_start_hooks=should_run_agent_start_hooks,
+                                    turn_deadline=turn_deadline,
+                                    server_conversation=server_conversation,
+                                    prefix_tracker=prefix_tracker,
+                                ),
                             ),
+                            turn_deadline,
+                        )
+                    else:
+                        turn_result = await _run_with_deadline(
                             cls._run_single_turn(
                                 agent=current_agent,
                                 original_input=original_input,
@@ -223,39 +583,44 @@ class Runner:
                                 context_wrapper=context_wrapper,
                                 run_config=run_config,
                                 should_run_agent_start_hooks=should_run_agent_start_hooks,
+                                turn_deadline=turn_deadline,
+                                server_conversation=server_conversation,
+                                prefix_tracker=prefix_tracker,
                             ),
-                        )
-                    else:
-                        turn_result = await cls._run_single_turn(
-                            agent=current_agent,
-                            original_input=original_input,
-                            generated_items=generated_items,
-                            hooks=hooks,
-                            context_wrapper=context_wrapper,
-                            run_config=run_config,
-                            should_run_agent_start_hooks=should_run_agent_start_hooks,
+                            turn_deadline,
                         )
                     should_run_agent_start_hooks = False
+                    context_wrapper.deadline = run_deadline.when if run_deadline else None
 
-                    model_responses.append(turn_result.model_response)
+                    await retained_responses.add(turn_result.model_response)
                     original_input = turn_result.original_input
                     generated_items = turn_result.generated_items
 
                     if isinstance(turn_result.next_step, NextStepFinalOutput):
-                        output_guardrail_results = await cls._run_output_guardrails(
-                            current_agent.output_guardrails + (run_config.output_guardrails or []),
-                            current_agent,
-                            turn_result.next_step.output,
-                            context_wrapper,
+                        output_guardrail_results = await _run_with_deadline(
+                            cls._run_output_guardrails(
+                                current_agent.output_guardrails
+                                + (run_config.output_guardrails or []),
+                                current_agent,
+                                turn_result.next_step.output,
+                                context_wrapper,
+                            ),
+                            run_deadline,
                         )
+                        if session is not None:
+                            await cls._save_to_session(session, input, generated_items)
+                        if checkpointer is not None:
+                            await checkpointer.delete()
                         return RunResult(
                             input=original_input,
                             new_items=generated_items,
-                            raw_responses=model_responses,
+                            raw_responses=retained_responses.responses,
                             final_output=turn_result.next_step.output,
                             _last_agent=current_agent,
                             input_guardrail_results=input_guardrail_results,
                             output_guardrail_results=output_guardrail_results,
+                            usage=retained_responses.usage,
+                            raw_responses_path=retained_responses.path,
                         )
                     elif isinstance(turn_result.next_step, NextStepHandoff):
                         current_agent = cast(Agent[TContext], turn_result.next_step.new_agent)
@@ -268,7 +633,65 @@ class Runner:
                         raise AgentsException(
                             f"Unknown next step type: {type(turn_result.next_step)}"
                         )
+
+                    if checkpointer is not None:
+                        await checkpointer.save(
+                            original_input,
+                            generated_items,
+                            current_agent,
+                            current_turn,
+                            retained_responses.usage,
+                        )
+            except DeadlineExceeded as e:
+                if current_span:
+                    _utils.attach_error_to_span(
+                        current_span,
+                        SpanError(
+                            message="Deadline exceeded",
+                            data={"timeout_type": e.timeout_type, "turn": current_turn},
+                        ),
+                    )
+                e.partial_result = RunResult(
+                    input=original_input,
+                    new_items=generated_items,
+                    raw_responses=retained_responses.responses,
+                    final_output=None,
+                    _last_agent=current_agent,
+                    input_guardrail_results=input_guardrail_results,
+                    output_guardrail_results=[],
+                    usage=retained_responses.usage,
+                    raw_responses_path=retained_responses.path,
+                )
+                raise
+            except asyncio.CancelledError:
+                if cancel_token is None or not cancel_token.cancelled:
+                    raise
+
+                uncancel_current_task()
+                logger.debug("Run cancelled")
+                if current_span:
+                    _utils.attach_error_to_span(
+                        current_span,
+                        SpanError(
+                            message="Run cancelled",
+                            data={"turn": current_turn},
+                        ),
+                    )
+                return RunResult(
+                    input=original_input,
+                    new_items=generated_items,
+                    raw_responses=retained_responses.responses,
+                    final_output=None,
+                    _last_agent=current_agent,
+                    input_guardrail_results=input_guardrail_results,
+                    output_guardrail_results=[],
+                    usage=retained_responses.usage,
+                    raw_responses_path=retained_responses.path,
+                    is_cancelled=True,
+                )
             finally:
+                if detach_cancel_token:
+                    detach_cancel_token()
                 if current_span:
                     current_span.finish(reset_current=True)
 
@@ -282,6 +705,8 @@ class Runner:
         max_turns: int = DEFAULT_MAX_TURNS,
         hooks: RunHooks[TContext] | None = None,
         run_config: RunConfig | None = None,
+        cancel_token: CancellationToken | None = None,
+        session: Session | None = None,
     ) -> RunResult:
         """Run a workflow synchronously, starting at the given agent. Note that this just wraps the
         `run` method, so it will not work if there's already an event loop (e.g. inside an async
@@ -295,9 +720,11 @@ class Runner:
         3. If there's a handoff, we run the loop again, with the new agent.
         4. Else, we run tool calls (if any), and re-run the loop.
 
-        In two cases, the agent may raise an exception:
+        In three cases, the agent may raise an exception:
         1. If the max_turns is exceeded, a MaxTurnsExceeded exception is raised.
         2. If a guardrail tripwire is triggered, a GuardrailTripwireTriggered exception is raised.
+        3. If one of the timeouts in the run config is exceeded, a DeadlineExceeded exception is
+            raised.
 
         Note that only the first agent's input guardrails are run.
 
@@ -310,6 +737,12 @@ class Runner:
                 AI invocation (including any tool calls that might occur).
             hooks: An object that receives callbacks on various lifecycle events.
             run_config: Global settings for the entire agent run.
+            cancel_token: A token that can be used to cancel the run. If the run is cancelled, the
+                in-flight model call, tools and guardrails are cancelled and a partial result is
+                returned, with `is_cancelled` set and `final_output` set to None.
+            session: The session that stores the conversation. If set, the input is appended to
+                the session's history, and the input and new items are added to the session once
+                the run completes. Input guardrails only receive the new input.
 
         Returns:
             A run result containing all the inputs, guardrail results and the output of the last
@@ -323,9 +756,179 @@ class Runner:
                 max_turns=max_turns,
                 hooks=hooks,
                 run_config=run_config,
+                cancel_token=cancel_token,
+                session=session,
             )
         )
 
+    @classmethod
+    async def run_batch(
+        cls,
+        starting_agent: Agent[TContext],
+        inputs: Sequence[str | list[TResponseInputItem]],
+        *,
+        context: TContext | None = None,
+        max_turns: int = DEFAULT_MAX_TURNS,
+        hooks: RunHooks[TContext] | None = None,
+        run_config: RunConfig | None = None,
+        max_concurrency: int = 16,
+        prime_cache: bool = True,
+    ) -> BatchRunResult:
+        """Run the agent on many inputs, scheduled so that as many requests as possible are served
+        from the provider's prompt cache.
+
+        The inputs are grouped by the prompt prefix of their first request: the agent's system
+        prompt, tools and output schema, plus the history the inputs share (all their items but the
+        last one). For each group of more than one input, a small primer request with just that
+        prefix is sent first, so that it's cached by the time the group's runs start. The runs of a
+        group are then started together, largest groups first.
+
+        Args:
+            starting_agent: The starting agent of every run.
+            inputs: The input of each run.
+            context: The context to run the agent with, shared by all runs.
+            max_turns: The maximum number of turns of each run.
+            hooks: An object that receives callbacks on various lifecycle events.
+            run_config: Global settings for every run.
+            max_concurrency: The maximum number of runs (and primer requests) in progress at once.
+            prime_cache: Whether to send the primer requests.
+
+        Returns:
+            The results of the runs in the order of the inputs, and the usage and cached-token
+            ratio of each group.
+        """
+        if run_config is None:
+            run_config = RunConfig()
+        if max_concurrency < 1:
+            raise UserError("max_concurrency must be at least 1")
+
+        context_wrapper: RunContextWrapper[TContext] = RunContextWrapper(
+            context=context,  # type: ignore
+        )
+        system_prompt = await starting_agent.get_system_prompt(context_wrapper)
+        handoffs = cls._get_handoffs(starting_agent)
+        output_schema = cls._get_output_schema(starting_agent)
+
+        groups_by_fingerprint: dict[str, BatchRunGroup] = {}
+        shared_histories: dict[str, list[TResponseInputItem]] = {}
+        model_schemas: dict[str, tuple[list[Tool], AgentOutputSchema | None, list[Handoff]]] = {}
+        for index, input in enumerate(inputs):
+            input_list = ItemHelpers.input_to_input_list(input)
+            shared_history = input_list[:-1]
+            # Group by the schemas that the first request of each run sends, as the tool
+            # selector may select different tools for different inputs
+            schemas = cls._get_model_schemas(
+                starting_agent,
+                input_list,
+                output_schema,
+                handoffs,
+                run_config,
+                trace_selection=False,
+            )
+            tools, model_output_schema, model_handoffs = schemas
+            fingerprint = PrefixFingerprint.compute(
+                system_prompt, tools, model_handoffs, model_output_schema, shared_history
+            ).value
+            if fingerprint not in groups_by_fingerprint:
+                groups_by_fingerprint[fingerprint] = BatchRunGroup(
+                    prefix_fingerprint=fingerprint, input_indices=[]
+                )
+                shared_histories[fingerprint] = shared_history
+                model_schemas[fingerprint] = schemas
+            groups_by_fingerprint[fingerprint].input_indices.append(index)
+
+        groups = sorted(groups_by_fingerprint.values(), key=lambda g: -len(g.input_indices))
+        results: list[RunResult | Exception | None] = [None] * len(inputs)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_input(index: int, group: BatchRunGroup) -> None:
+            async with semaphore:
+                try:
+                    result = await cls.run(
+                        starting_agent,
+                        inputs[index],
+                        context=context,
+                        max_turns=max_turns,
+                        hooks=hooks,
+                        run_config=run_config,
+                    )
+                except Exception as e:
+                    results[index] = e
+                    return
+            results[index] = result
+            group.usage.add(result.usage)
+
+        async def run_group(group: BatchRunGroup) -> None:
+            if prime_cache and len(group.input_indices) > 1:
+                async with semaphore:
+                    group.primed = await cls._prime_prompt_cache(
+                        starting_agent,
+                        system_prompt,
+                        shared_histories[group.prefix_fingerprint],
+                        *model_schemas[group.prefix_fingerprint],
+                        run_config,
+                        group.usage,
+                    )
+            await asyncio.gather(*(run_input(index, group) for index in group.input_indices))
+
+        await asyncio.gather(*(run_group(group) for group in groups))
+
+        # Every run has stored its result or exception by now
+        batch_result = BatchRunResult(
+            results=cast(list[Union[RunResult, Exception]], results), groups=groups
+        )
+        logger.debug(
+            f"Ran {len(inputs)} inputs in {len(groups)} prompt prefix groups. "
+            f"Cached token ratio: {batch_result.cached_token_ratio:.1%}"
+        )
+        return batch_result
+
+    @classmethod
+    async def _prime_prompt_cache(
+        cls,
+        agent: Agent[Any],
+        system_prompt: str | None,
+        shared_history: list[TResponseInputItem],
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        run_config: RunConfig,
+        usage: Usage,
+    ) -> bool:
+        """Sends a request with the given prompt prefix and a minimal output, so that the provider
+        caches the prefix. Returns whether it succeeded; failures are only logged. The tools,
+        output schema and handoffs are the ones sent to the model (see `_get_model_schemas()`)."""
+        model = cls._get_model(agent, run_config)
+        model_settings = dataclasses.replace(
+            cls._get_model_settings(agent, run_config, None), max_tokens=_PRIMER_MAX_TOKENS
+        )
+        with TraceCtxManager(
+            workflow_name=f"{run_config.workflow_name} (prompt cache primer)",
+            trace_id=None,
+            group_id=run_config.group_id,
+            metadata=run_config.trace_metadata,
+            disabled=run_config.tracing_disabled,
+        ):
+            try:
+                async with cls._scheduled_model_call(agent, run_config):
+                    response = await model.get_response(
+                        system_instructions=system_prompt,
+                        input=shared_history + [_PRIMER_INPUT],
+                        model_settings=model_settings,
+                        tools=tools,
+                        output_schema=output_schema,
+                        handoffs=handoffs,
+                        tracing=get_model_tracing_impl(
+                            run_config.tracing_disabled, run_config.trace_include_sensitive_data
+                        ),
+                    )
+            except Exception as e:
+                logger.warning(f"Failed to prime the prompt cache: {e}")
+                return False
+
+        usage.add(response.usage)
+        return True
+
     @classmethod
     def run_streamed(
         cls,
@@ -335,6 +938,8 @@ class Runner:
         max_turns: int = DEFAULT_MAX_TURNS,
         hooks: RunHooks[TContext] | None = None,
         run_config: RunConfig | None = None,
+        cancel_token: CancellationToken | None = None,
+        session: Session | None = None,
     ) -> RunResultStreaming:
         """Run a workflow starting at the given agent in streaming mode. The returned result object
         contains a method you can use to stream semantic events as they are generated.
@@ -346,9 +951,11 @@ class Runner:
         3. If there's a handoff, we run the loop again, with the new agent.
         4. Else, we run tool calls (if any), and re-run the loop.
 
-        In two cases, the agent may raise an exception:
+        In three cases, the agent may raise an exception:
         1. If the max_turns is exceeded, a MaxTurnsExceeded exception is raised.
         2. If a guardrail tripwire is triggered, a GuardrailTripwireTriggered exception is raised.
+        3. If one of the timeouts in the run config is exceeded, a DeadlineExceeded exception is
+            raised.
 
         Note that only the first agent's input guardrails are run.
 
@@ -361,6 +968,11 @@ class Runner:
                 AI invocation (including any tool calls that might occur).
             hooks: An object that receives callbacks on various lifecycle events.
             run_config: Global settings for the entire agent run.
+            cancel_token: A token that can be used to cancel the run. Cancelling the token is
+                equivalent to calling `RunResultStreaming.cancel()`.
+            session: The session that stores the conversation. If set, the input is appended to
+                the session's history, and the input and new items are added to the session once
+                the run completes. Input guardrails only receive the new input.
 
         Returns:
             A result object that contains data about the run, as well as a method to stream events.
@@ -394,8 +1006,9 @@ class Runner:
             context=context  # type: ignore
         )
 
+        input = _freeze_input(input)
         streamed_result = RunResultStreaming(
-            input=copy.deepcopy(input),
+            input=input,
             new_items=[],
             current_agent=starting_agent,
             raw_responses=[],
@@ -419,10 +1032,52 @@ class Runner:
                 hooks=hooks,
                 context_wrapper=context_wrapper,
                 run_config=run_config,
+                session=session,
             )
         )
+
+        if cancel_token:
+            loop = asyncio.get_running_loop()
+            remove_callback = cancel_token.add_callback(
+                lambda: loop.call_soon_threadsafe(streamed_result.cancel)
+            )
+            streamed_result._run_impl_task.add_done_callback(lambda _: remove_callback())
+
         return streamed_result
 
+    @classmethod
+    async def _run_with_input_guardrails(
+        cls,
+        guardrails: Awaitable[list[InputGuardrailResult]],
+        turn: Awaitable[SingleStepResult],
+    ) -> tuple[list[InputGuardrailResult], SingleStepResult]:
+        """Runs the input guardrails and the first turn in parallel. As soon as either of them
+        fails, the other one is cancelled. In particular, if a guardrail tripwire is triggered, the
+        in-flight model call and any tools are cancelled, so they stop using tokens immediately.
+        """
+        guardrails_task = asyncio.ensure_future(guardrails)
+        turn_task = asyncio.ensure_future(turn)
+        tasks = [guardrails_task, turn_task]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # If either task failed (or we were cancelled), stop the other one and wait for it to
+            # release its resources, e.g. the HTTP connection of the model call.
+            pending = [t for t in tasks if not t.done()]
+            for t in pending:
+                t.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+        # Both tasks can fail, e.g. if the model call fails before the tripwire is triggered.
+        # Retrieve both exceptions so that neither is reported as unhandled, and raise the first.
+        exceptions = [t.exception() for t in tasks if not t.cancelled()]
+        for exc in exceptions:
+            if exc is not None:
+                raise exc
+
+        return guardrails_task.result(), turn_task.result()
+
     @classmethod
     async def _run_input_guardrails_with_queue(
         cls,
@@ -459,6 +1114,17 @@ class Runner:
                     )
                 queue.put_nowait(result)
                 guardrail_results.append(result)
+                if result.output.tripwire_triggered:
+                    # Stop the run right away rather than when the consumer notices the tripwire,
+                    # so that the in-flight model call and tools stop using tokens. The consumer
+                    # raises the tripwire exception once it reads the sentinel.
+                    for t in guardrail_tasks:
+                        t.cancel()
+                    if streamed_result._run_impl_task and not streamed_result._run_impl_task.done():
+                        streamed_result._run_impl_task.cancel()
+                    streamed_result.is_complete = True
+                    streamed_result._event_queue.put_nowait(QueueCompleteSentinel())
+                    break
         except Exception:
             for t in guardrail_tasks:
                 t.cancel()
@@ -476,15 +1142,31 @@ class Runner:
         hooks: RunHooks[TContext],
         context_wrapper: RunContextWrapper[TContext],
         run_config: RunConfig,
+        session: Session | None = None,
     ):
         current_span: Span[AgentSpanData] | None = None
         current_agent = starting_agent
         current_turn = 0
         should_run_agent_start_hooks = True
+        run_deadline = _Deadline.after(run_config.run_timeout, "run")
+        server_conversation = _ServerConversation() if run_config.use_previous_response_id else None
+        prefix_tracker = _PrefixTracker(run_config.tracing_disabled)
+        retained_responses = _ResponseRetainer(
+            run_config.retention, streamed_result.raw_responses, streamed_result.usage
+        )
+        checkpointer = _get_checkpointer(run_config, None, starting_input, [])
 
         streamed_result._event_queue.put_nowait(AgentUpdatedStreamEvent(new_agent=current_agent))
 
         try:
+            if session is not None:
+                streamed_result.input = ItemHelpers.input_to_frozen_input_list(
+                    [
+                        *(await session.get_history()),
+                        *ItemHelpers.input_to_input_list(starting_input),
+                    ]
+                )
+
             while True:
                 if streamed_result.is_complete:
                     break
@@ -527,26 +1209,36 @@ class Runner:
                         cls._run_input_guardrails_with_queue(
                             starting_agent,
                             starting_agent.input_guardrails + (run_config.input_guardrails or []),
-                            copy.deepcopy(ItemHelpers.input_to_new_input_list(starting_input)),
+                            ItemHelpers.input_to_input_list(starting_input),
                             context_wrapper,
                             streamed_result,
                             current_span,
                         )
                     )
+                turn_deadline = _Deadline.earliest(
+                    run_deadline, _Deadline.after(run_config.turn_timeout, "turn")
+                )
+                context_wrapper.deadline = turn_deadline.when if turn_deadline else None
                 try:
-                    turn_result = await cls._run_single_turn_streamed(
-                        streamed_result,
-                        current_agent,
-                        hooks,
-                        context_wrapper,
-                        run_config,
-                        should_run_agent_start_hooks,
+                    turn_result = await _run_with_deadline(
+                        cls._run_single_turn_streamed(
+                            streamed_result,
+                            current_agent,
+                            hooks,
+                            context_wrapper,
+                            run_config,
+                            should_run_agent_start_hooks,
+                            turn_deadline,
+                            server_conversation,
+                            prefix_tracker,
+                        ),
+                        turn_deadline,
                     )
                     should_run_agent_start_hooks = False
+                    context_wrapper.deadline = run_deadline.when if run_deadline else None
 
-                    streamed_result.raw_responses = streamed_result.raw_responses + [
-                        turn_result.model_response
-                    ]
+                    await retained_responses.add(turn_result.model_response)
+                    streamed_result.raw_responses_path = retained_responses.path
                     streamed_result.input = turn_result.original_input
                     streamed_result.new_items = turn_result.generated_items
 
@@ -560,28 +1252,50 @@ class Runner:
                         )
                     elif isinstance(turn_result.next_step, NextStepFinalOutput):
                         streamed_result._output_guardrails_task = asyncio.create_task(
-                            cls._run_output_guardrails(
-                                current_agent.output_guardrails
-                                + (run_config.output_guardrails or []),
-                                current_agent,
-                                turn_result.next_step.output,
-                                context_wrapper,
+                            _run_with_deadline(
+                                cls._run_output_guardrails(
+                                    current_agent.output_guardrails
+                                    + (run_config.output_guardrails or []),
+                                    current_agent,
+                                    turn_result.next_step.output,
+                                    context_wrapper,
+                                ),
+                                run_deadline,
                             )
                         )
 
                         try:
                             output_guardrail_results = await streamed_result._output_guardrails_task
-                        except Exception:
+                        except Exception as e:
                             # Exceptions will be checked in the stream_events loop
+                            if isinstance(e, DeadlineExceeded):
+                                e.partial_result = streamed_result
                             output_guardrail_results = []
 
+                        if session is not None:
+                            await cls._save_to_session(
+                                session, starting_input, streamed_result.new_items
+                            )
+                        if checkpointer is not None:
+                            await checkpointer.delete()
                         streamed_result.output_guardrail_results = output_guardrail_results
                         streamed_result.final_output = turn_result.next_step.output
                         streamed_result.is_complete = True
                         streamed_result._event_queue.put_nowait(QueueCompleteSentinel())
                     elif isinstance(turn_result.next_step, NextStepRunAgain):
                         pass
+
+                    if checkpointer is not None and not streamed_result.is_complete:
+                        await checkpointer.save(
+                            streamed_result.input,
+                            streamed_result.new_items,
+                            current_agent,
+                            current_turn,
+                            retained_responses.usage,
+                        )
                 except Exception as e:
+                    if isinstance(e, DeadlineExceeded):
+                        e.partial_result = streamed_result
                     if current_span:
                         _utils.attach_error_to_span(
                             current_span,
@@ -595,6 +1309,16 @@ class Runner:
                     raise
 
             streamed_result.is_complete = True
+        except asyncio.CancelledError:
+            if current_span and streamed_result.is_cancelled:
+                _utils.attach_error_to_span(
+                    current_span,
+                    SpanError(
+                        message="Run cancelled",
+                        data={"turn": current_turn},
+                    ),
+                )
+            raise
         finally:
             if current_span:
                 current_span.finish(reset_current=True)
@@ -608,6 +1332,9 @@ class Runner:
         context_wrapper: RunContextWrapper[TContext],
         run_config: RunConfig,
         should_run_agent_start_hooks: bool,
+        turn_deadline: _Deadline | None = None,
+        server_conversation: _ServerConversation | None = None,
+        prefix_tracker: _PrefixTracker | None = None,
     ) -> SingleStepResult:
         if should_run_agent_start_hooks:
             await asyncio.gather(
@@ -629,46 +1356,100 @@ class Runner:
         handoffs = cls._get_handoffs(agent)
 
         model = cls._get_model(agent, run_config)
-        model_settings = agent.model_settings.resolve(run_config.model_settings)
-        final_response: ModelResponse | None = None
+        model_call_deadline = cls._get_model_call_deadline(turn_deadline, run_config)
 
-        input = ItemHelpers.input_to_new_input_list(streamed_result.input)
-        input.extend([item.to_input_item() for item in streamed_result.new_items])
+        input = ItemHelpers.input_to_frozen_input_list(streamed_result.input)
+        input.extend([item._to_frozen_input_item() for item in streamed_result.new_items])
+        input = cls._compact_history(input, run_config)
+        tools, model_output_schema, model_handoffs = cls._get_model_schemas(
+            agent, input, output_schema, handoffs, run_config
+        )
+        prefix_fingerprint = (
+            prefix_tracker.track(
+                agent,
+                system_prompt,
+                tools,
+                model_handoffs,
+                model_output_schema,
+                input,
+            )
+            if prefix_tracker
+            else None
+        )
 
         # 1. Stream the output events
-        async for event in model.stream_response(
-            system_prompt,
-            input,
-            model_settings,
-            agent.tools,
-            output_schema,
-            handoffs,
-            get_model_tracing_impl(
-                run_config.tracing_disabled, run_config.trace_include_sensitive_data
-            ),
-        ):
-            if isinstance(event, ResponseCompletedEvent):
-                usage = (
-                    Usage(
-                        requests=1,
-                        input_tokens=event.response.usage.input_tokens,
-                        output_tokens=event.response.usage.output_tokens,
-                        total_tokens=event.response.usage.total_tokens,
+        async def stream_model_response(
+            model_input: list[TResponseInputItem], previous_response_id: str | None
+        ) -> ModelResponse | None:
+            final_response: ModelResponse | None = None
+            model_settings = cls._get_model_settings(
+                agent, run_config, model_call_deadline, previous_response_id
+            )
+            stream = model.stream_response(
+                system_prompt,
+                model_input,
+                model_settings,
+                tools,
+                model_output_schema,
+                model_handoffs,
+                get_model_tracing_impl(
+                    run_config.tracing_disabled, run_config.trace_include_sensitive_data
+                ),
+            )
+            async for event in watch_stream(stream, run_config.stream_idle_timeout):
+                if isinstance(event, ResponseCompletedEvent):
+                    usage = (
+                        Usage(
+                            requests=1,
+                            input_tokens=event.response.usage.input_tokens,
+                            output_tokens=event.response.usage.output_tokens,
+                            total_tokens=event.response.usage.total_tokens,
+                            cached_input_tokens=get_cached_tokens(
+                                getattr(event.response.usage, "input_tokens_details", None)
+                            ),
+                        )
+                        if event.response.usage
+                        else Usage()
+                    )
+                    final_response = ModelResponse(
+                        output=event.response.output,
+                        usage=usage,
+                        referenceable_id=event.response.id,
+                        prefix_fingerprint=prefix_fingerprint.value if prefix_fingerprint else None,
                     )
-                    if event.response.usage
-                    else Usage()
-                )
-                final_response = ModelResponse(
-                    output=event.response.output,
-                    usage=usage,
-                    referenceable_id=event.response.id,
-                )
 
-            streamed_result._event_queue.put_nowait(RawResponsesStreamEvent(data=event))
+                streamed_result._event_queue.put_nowait(RawResponsesStreamEvent(data=event))
+            return final_response
 
-        # 2. At this point, the streaming is complete for this turn of the agent loop.
-        if not final_response:
-            raise ModelBehaviorError("Model did not produce a final response!")
+        async def get_final_response(
+            model_input: list[TResponseInputItem], previous_response_id: str | None
+        ) -> ModelResponse:
+            attempt = 1
+            while True:
+                try:
+                    async with cls._scheduled_model_call(agent, run_config):
+                        final_response = await _run_with_deadline(
+                            stream_model_response(model_input, previous_response_id),
+                            model_call_deadline,
+                        )
+                    break
+                except ModelStreamStalled as e:
+                    if attempt > run_config.stream_stall_retries:
+                        raise
+                    attempt += 1
+                    logger.debug(f"{e.message}. Retrying (attempt {attempt})")
+                    streamed_result._event_queue.put_nowait(
+                        RetryStreamEvent(attempt=attempt, reason=e.message)
+                    )
+
+            # 2. At this point, the streaming is complete for this turn of the agent loop.
+            if not final_response:
+                raise ModelBehaviorError("Model did not produce a final response!")
+            return final_response
+
+        final_response = await cls._call_model_with_server_conversation(
+            input, server_conversation, run_config, get_final_response
+        )
 
         # 3. Now, we can process the turn as we do in the non-streaming case
         single_step_result = await cls._get_single_step_result_from_response(
@@ -697,6 +1478,9 @@ class Runner:
         context_wrapper: RunContextWrapper[TContext],
         run_config: RunConfig,
         should_run_agent_start_hooks: bool,
+        turn_deadline: _Deadline | None = None,
+        server_conversation: _ServerConversation | None = None,
+        prefix_tracker: _PrefixTracker | None = None,
     ) -> SingleStepResult:
         # Ensure we run the hooks before anything else
         if should_run_agent_start_hooks:
@@ -713,18 +1497,34 @@ class Runner:
 
         output_schema = cls._get_output_schema(agent)
         handoffs = cls._get_handoffs(agent)
-        input = ItemHelpers.input_to_new_input_list(original_input)
-        input.extend([generated_item.to_input_item() for generated_item in generated_items])
+        input = ItemHelpers.input_to_frozen_input_list(original_input)
+        input.extend([generated_item._to_frozen_input_item() for generated_item in generated_items])
+        input = cls._compact_history(input, run_config)
+        tools, model_output_schema, model_handoffs = cls._get_model_schemas(
+            agent, input, output_schema, handoffs, run_config
+        )
+        prefix_fingerprint = (
+            prefix_tracker.track(
+                agent, system_prompt, tools, model_handoffs, model_output_schema, input
+            )
+            if prefix_tracker
+            else None
+        )
 
         new_response = await cls._get_new_response(
             agent,
             system_prompt,
             input,
-            output_schema,
-            handoffs,
+            tools,
+            model_output_schema,
+            model_handoffs,
             context_wrapper,
             run_config,
+            turn_deadline,
+            server_conversation,
         )
+        if prefix_fingerprint:
+            new_response.prefix_fingerprint = prefix_fingerprint.value
 
         return await cls._get_single_step_result_from_response(
             agent=agent,
@@ -852,29 +1652,264 @@ class Runner:
         agent: Agent[TContext],
         system_prompt: str | None,
         input: list[TResponseInputItem],
+        tools: list[Tool],
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         context_wrapper: RunContextWrapper[TContext],
         run_config: RunConfig,
+        turn_deadline: _Deadline | None = None,
+        server_conversation: _ServerConversation | None = None,
     ) -> ModelResponse:
+        """Gets the model's response. The tools, output schema and handoffs are the ones sent to
+        the model (see `_get_model_schemas()`)."""
         model = cls._get_model(agent, run_config)
-        model_settings = agent.model_settings.resolve(run_config.model_settings)
-        new_response = await model.get_response(
-            system_instructions=system_prompt,
-            input=input,
-            model_settings=model_settings,
-            tools=agent.tools,
-            output_schema=output_schema,
-            handoffs=handoffs,
-            tracing=get_model_tracing_impl(
-                run_config.tracing_disabled, run_config.trace_include_sensitive_data
-            ),
+        model_call_deadline = cls._get_model_call_deadline(turn_deadline, run_config)
+
+        async def get_response(
+            model_input: list[TResponseInputItem], previous_response_id: str | None
+        ) -> ModelResponse:
+            async with cls._scheduled_model_call(agent, run_config):
+                model_settings = cls._get_model_settings(
+                    agent, run_config, model_call_deadline, previous_response_id
+                )
+                return await _run_with_deadline(
+                    model.get_response(
+                        system_instructions=system_prompt,
+                        input=model_input,
+                        model_settings=model_settings,
+                        tools=tools,
+                        output_schema=output_schema,
+                        handoffs=handoffs,
+                        tracing=get_model_tracing_impl(
+                            run_config.tracing_disabled, run_config.trace_include_sensitive_data
+                        ),
+                    ),
+                    model_call_deadline,
+                )
+
+        new_response = await cls._call_model_with_server_conversation(
+            input, server_conversation, run_config, get_response
         )
 
         context_wrapper.usage.add(new_response.usage)
 
         return new_response
 
+    @classmethod
+    async def _save_to_session(
+        cls, session: Session, input: str | list[TResponseInputItem], new_items: list[RunItem]
+    ) -> None:
+        """Adds the input of a completed run, and the items it generated, to the session."""
+        await session.add_items(
+            [
+                *ItemHelpers.input_to_input_list(input),
+                *(item._to_frozen_input_item() for item in new_items),
+            ]
+        )
+
+    @classmethod
+    def _compact_history(
+        cls, input: list[TResponseInputItem], run_config: RunConfig
+    ) -> list[TResponseInputItem]:
+        """Compacts the model input with the run's history compactor, if any. If the input was
+        compacted, the items and estimated tokens before and after are recorded as a span."""
+        compactor = run_config.history_compactor
+        if compactor is None:
+            return input
+
+        compacted = compactor.compact(input)
+        if compacted is not input and not run_config.tracing_disabled:
+            span = custom_span(
+                "History compaction",
+                data={
+                    "compactor": type(compactor).__name__,
+                    "input_items": len(input),
+                    "compacted_items": len(compacted),
+                    "input_tokens": compactor.estimate_tokens(input),
+                    "compacted_tokens": compactor.estimate_tokens(compacted),
+                },
+            )
+            span.start()
+            span.finish()
+        return compacted
+
+    @classmethod
+    async def _call_model_with_server_conversation(
+        cls,
+        input: list[TResponseInputItem],
+        server_conversation: _ServerConversation | None,
+        run_config: RunConfig,
+        call_model: Callable[[list[TResponseInputItem], str | None], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        """Calls the model with only the items the server doesn't hold yet, if the run keeps the
+        conversation on the server. The bytes saved are recorded as a span."""
+        if server_conversation is None:
+            return await call_model(input, None)
+
+        previous_response_id, model_input = server_conversation.get_model_input(input)
+        with custom_span(
+            "Model input",
+            data={"previous_response_id": previous_response_id},
+            disabled=run_config.tracing_disabled,
+        ) as span:
+            if not run_config.tracing_disabled:
+                input_bytes = _json_size(input)
+                sent_bytes = _json_size(model_input) if model_input is not input else input_bytes
+                span.span_data.data.update(
+                    {
+                        "input_items": len(input),
+                        "sent_items": len(model_input),
+                        "input_bytes": input_bytes,
+                        "sent_bytes": sent_bytes,
+                        "saved_bytes": input_bytes - sent_bytes,
+                    }
+                )
+
+            try:
+                response = await call_model(model_input, previous_response_id)
+            except APIStatusError as e:
+                if previous_response_id is None or e.status_code not in (400, 404):
+                    raise
+                # E.g. the previous response expired, or belongs to another project
+                logger.debug(
+                    f"Previous response {previous_response_id} was rejected ({e.status_code}). "
+                    "Sending the full input instead."
+                )
+                span.span_data.data.update(
+                    {
+                        "previous_response_id": None,
+                        "fell_back_to_full_input": True,
+                        "sent_items": len(input),
+                        "sent_bytes": span.span_data.data.get("input_bytes"),
+                        "saved_bytes": 0,
+                    }
+                )
+                response = await call_model(input, None)
+
+        server_conversation.update(input, response)
+        return response
+
+    @classmethod
+    @asynccontextmanager
+    async def _scheduled_model_call(
+        cls, agent: Agent[Any], run_config: RunConfig
+    ) -> AsyncIterator[None]:
+        """Waits for the run config's scheduler (if any) to allow a model call, and holds the slot
+        until the call is done. The wait is recorded as a span."""
+        scheduler = run_config.scheduler
+        if scheduler is None:
+            yield
+            return
+
+        provider = cls._get_provider_name(agent, run_config)
+        with custom_span(
+            "Model call queue",
+            data={
+                "priority": run_config.priority,
+                "tenant": run_config.tenant,
+                "provider": provider,
+            },
+        ) as span:
+            scheduled_call = await scheduler.acquire(
+                priority=run_config.priority, tenant=run_config.tenant, provider=provider
+            )
+            span.span_data.data["queue_wait_seconds"] = scheduled_call.wait_time
+
+        try:
+            yield
+        finally:
+            scheduled_call.release()
+
+    @classmethod
+    def _get_model_call_deadline(
+        cls, turn_deadline: _Deadline | None, run_config: RunConfig
+    ) -> _Deadline | None:
+        return _Deadline.earliest(
+            turn_deadline, _Deadline.after(run_config.model_call_timeout, "model_call")
+        )
+
+    @classmethod
+    def _get_model_settings(
+        cls,
+        agent: Agent[Any],
+        run_config: RunConfig,
+        model_call_deadline: _Deadline | None,
+        previous_response_id: str | None = None,
+    ) -> ModelSettings:
+        model_settings = agent.model_settings.resolve(run_config.model_settings)
+        if previous_response_id is not None:
+            model_settings = dataclasses.replace(
+                model_settings, previous_response_id=previous_response_id
+            )
+        if model_call_deadline is None:
+            return model_settings
+
+        # Let the model abort the request itself once the time budget is used up, rather than
+        # only abandoning it on our side.
+        timeout = model_call_deadline.remaining()
+        if model_settings.timeout is not None:
+            timeout = min(timeout, model_settings.timeout)
+        return dataclasses.replace(model_settings, timeout=timeout)
+
+    @classmethod
+    def _get_model_schemas(
+        cls,
+        agent: Agent[Any],
+        input: list[TResponseInputItem],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        run_config: RunConfig,
+        trace_selection: bool = True,
+    ) -> tuple[list[Tool], AgentOutputSchema | None, list[Handoff]]:
+        """Returns the tools, output schema and handoffs to send to the model: the tools selected
+        by the run's tool selector, if any, and minified schemas if `RunConfig.minify_schemas` is
+        enabled."""
+        tools = cls._select_tools(agent, input, run_config, trace_selection)
+        if not run_config.minify_schemas:
+            return tools, output_schema, handoffs
+        return (
+            [minify_tool(tool) for tool in tools],
+            minify_output_schema(output_schema) if output_schema else None,
+            [minify_handoff(handoff) for handoff in handoffs],
+        )
+
+    @classmethod
+    def _select_tools(
+        cls,
+        agent: Agent[Any],
+        input: list[TResponseInputItem],
+        run_config: RunConfig,
+        trace_selection: bool = True,
+    ) -> list[Tool]:
+        """Selects the tools to send with the run's tool selector, if any. If only some of the
+        tools were selected (and `trace_selection` is set), the selection is recorded as a
+        span."""
+        selector = run_config.tool_selector
+        if selector is None:
+            return agent.tools
+
+        model_settings = agent.model_settings.resolve(run_config.model_settings)
+        selection = selector.select_tools(agent, input, tool_choice=model_settings.tool_choice)
+        if (
+            trace_selection
+            and len(selection.tools) < len(agent.tools)
+            and not run_config.tracing_disabled
+        ):
+            span = custom_span(
+                "Tool selection",
+                data={
+                    "selector": type(selector).__name__,
+                    "available_tools": len(agent.tools),
+                    "selected_tools": [tool.name for tool in selection.tools],
+                    "pinned": selection.pinned,
+                    "referenced": selection.referenced,
+                    "scores": {name: round(score, 3) for name, score in selection.scores.items()},
+                },
+            )
+            span.start()
+            span.finish()
+        return selection.tools
+
     @classmethod
     def _get_output_schema(cls, agent: Agent[Any]) -> AgentOutputSchema | None:
         if agent.output_type is None or agent.output_type is str:
@@ -892,6 +1927,14 @@ class Runner:
                 handoffs.append(handoff(handoff_item))
         return handoffs
 
+    @classmethod
+    def _get_provider_name(cls, agent: Agent[Any], run_config: RunConfig) -> str:
+        if isinstance(run_config.model, Model):
+            return type(run_config.model).__name__
+        elif not isinstance(run_config.model, str) and isinstance(agent.model, Model):
+            return type(agent.model).__name__
+        return type(run_config.model_provider).__name__
+
     @classmethod
     def _get_model(cls, agent: Agent[Any], run_config: RunConfig) -> Model:
         if isinstance(run_config.model, Model):
@@ -1,5 +1,6 @@
+import time
 from dataclasses import dataclass, field
-from typing import Any, Generic
+from typing import Any, Generic, Optional
 
 from typing_extensions import TypeVar
 
@@ -24,3 +25,16 @@ class RunContextWrapper(Generic[TContext]):
     """The usage of the agent run so far. For streamed responses, the usage will be stale until the
     last chunk of the stream is processed.
     """
+
+    deadline: Optional[float] = None
+    """The time, in terms of `time.monotonic()`, by which the current turn must be done, based on
+    the `run_timeout` and `turn_timeout` in the `RunConfig`. None if there is no deadline.
+    """
+
+    def remaining_time(self) -> Optional[float]:
+        """The number of seconds left until the deadline, e.g. to bound the time a tool spends on
+        a slow API call. Never negative. None if there is no deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Literal
+
+from typing_extensions import TypeAlias
+
+from .exceptions import UserError
+
+PriorityClass: TypeAlias = Literal["interactive", "batch"]
+"""The priority class of a run. Model calls of `interactive` runs are always started before those
+of `batch` runs."""
+
+_PRIORITY_ORDER: tuple[PriorityClass, ...] = ("interactive", "batch")
+
+
+@dataclass
+class QueueWaitStats:
+    """Queue-wait statistics for one priority class."""
+
+    calls: int = 0
+    """The number of model calls that were started."""
+
+    queued_calls: int = 0
+    """The number of model calls that had to wait for a slot."""
+
+    total_wait_time: float = 0.0
+    """The total time model calls spent waiting, in seconds."""
+
+    max_wait_time: float = 0.0
+    """The longest time a single model call spent waiting, in seconds."""
+
+    def record(self, wait_time: float, queued: bool) -> None:
+        self.calls += 1
+        if queued:
+            self.queued_calls += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
+class ScheduledCall:
+    """A slot for a single model call. Release it once the call completes."""
+
+    def __init__(self, queue: _ProviderQueue, wait_time: float) -> None:
+        self._queue = queue
+        self._released = False
+
+        self.wait_time = wait_time
+        """How long the call waited for its slot, in seconds."""
+
+    def release(self) -> None:
+        """Free the slot for the next queued call. Idempotent."""
+        if not self._released:
+            self._released = True
+            self._queue.release()
+
+
+@dataclass(order=True)
+class _QueuedCall:
+    finish_tag: float
+    sequence: int
+    waiter: asyncio.Future[None] = field(compare=False)
+
+
+class _ProviderQueue:
+    def __init__(self, max_in_flight: int, tenant_weights: dict[str, float]) -> None:
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._tenant_weights = tenant_weights
+        self._queues: dict[PriorityClass, list[_QueuedCall]] = {p: [] for p in _PRIORITY_ORDER}
+        # Weighted fair queuing state, per priority class: the virtual time is the finish tag of
+        # the last started call, and each tenant's last finish tag is where its next call starts.
+        self._virtual_time: dict[PriorityClass, float] = dict.fromkeys(_PRIORITY_ORDER, 0.0)
+        self._last_finish: dict[PriorityClass, dict[str, float]] = {p: {} for p in _PRIORITY_ORDER}
+        self._sequence = itertools.count()
+
+    def _has_queued_calls(self) -> bool:
+        return any(self._queues.values())
+
+    def try_start(self) -> bool:
+        if self.in_flight < self.max_in_flight and not self._has_queued_calls():
+            self.in_flight += 1
+            return True
+        return False
+
+    def enqueue(self, priority: PriorityClass, tenant: str) -> asyncio.Future[None]:
+        weight = self._tenant_weights.get(tenant, 1.0)
+        start = max(self._virtual_time[priority], self._last_finish[priority].get(tenant, 0.0))
+        finish_tag = start + 1 / weight
+        self._last_finish[priority][tenant] = finish_tag
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queues[priority], _QueuedCall(finish_tag, next(self._sequence), waiter)
+        )
+        # There may be free slots, if the calls ahead of us in the queue were cancelled
+        self._dispatch()
+        return waiter
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for priority in _PRIORITY_ORDER:
+            queue = self._queues[priority]
+            while queue and self.in_flight < self.max_in_flight:
+                queued = heapq.heappop(queue)
+                if queued.waiter.done():
+                    # The waiting call was cancelled
+                    continue
+                self._virtual_time[priority] = queued.finish_tag
+                self.in_flight += 1
+                queued.waiter.set_result(None)
+
+
+class ModelCallScheduler:
+    """Schedules model calls across all the runs that share it, e.g. interactive chat runs and
+    bulk jobs in the same process. Pass the same scheduler to every run via `RunConfig.scheduler`.
+
+    At most `max_in_flight` model calls run at once per provider; further calls wait in a queue.
+    Queued calls of `interactive` runs always start before those of `batch` runs. Within a
+    priority class, calls are started in weighted fair order across tenants (`RunConfig.tenant`),
+    so that a tenant with many runs can't starve the others.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int = 32,
+        max_in_flight_per_provider: dict[str, int] | None = None,
+        tenant_weights: dict[str, float] | None = None,
+    ) -> None:
+        """
+        Args:
+            max_in_flight: The default maximum number of concurrent model calls per provider.
+            max_in_flight_per_provider: Overrides `max_in_flight` for specific providers, keyed
+                by provider name. The provider name is the class name of the run's model
+                provider, e.g. `OpenAIProvider`, or of the model, if the agent or run config
+                uses a `Model` instance.
+            tenant_weights: The share of the model calls each tenant gets, relative to the others,
+                when they compete for slots. Tenants default to a weight of 1.
+        """
+        if max_in_flight < 1:
+            raise UserError("max_in_flight must be at least 1")
+
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_provider = dict(max_in_flight_per_provider or {})
+        self.tenant_weights = dict(tenant_weights or {})
+        self._queues: dict[str, _ProviderQueue] = {}
+        self._stats: dict[PriorityClass, QueueWaitStats] = {
+            p: QueueWaitStats() for p in _PRIORITY_ORDER
+        }
+
+    def _get_queue(self, provider: str) -> _ProviderQueue:
+        if provider not in self._queues:
+            self._queues[provider] = _ProviderQueue(
+                self.max_in_flight_per_provider.get(provider, self.max_in_flight),
+                self.tenant_weights,
+            )
+        return self._queues[provider]
+
+    def get_stats(self, priority: PriorityClass) -> QueueWaitStats:
+        """Returns the queue-wait statistics for a priority class."""
+        return self._stats[priority]
+
+    def in_flight(self, provider: str) -> int:
+        """The number of model calls currently running for a provider."""
+        return self._get_queue(provider).in_flight
+
+    async def acquire(
+        self,
+        *,
+        priority: PriorityClass = "interactive",
+        tenant: str | None = None,
+        provider: str = "default",
+    ) -> ScheduledCall:
+        """Wait for a slot to make a model call.
+
+        Args:
+            priority: The priority class of the call.
+            tenant: The tenant the call is made for. Calls without a tenant share a single queue.
+            provider: The name of the provider the call is made to.
+
+        Returns:
+            The slot. Call `release()` on it once the model call is done.
+        """
+        queue = self._get_queue(provider)
+        start = time.monotonic()
+        queued = not queue.try_start()
+        if queued:
+            waiter = queue.enqueue(priority, tenant or "")
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # We were given the slot just as we were cancelled
+                    queue.release()
+                else:
+                    waiter.cancel()
+                raise
+
+        wait_time = time.monotonic() - start
+        self._stats[priority].record(wait_time, queued)
+        return ScheduledCall(queue, wait_time)
+
+    @asynccontextmanager
+    async def schedule(
+        self,
+        *,
+        priority: PriorityClass = "interactive",
+        tenant: str | None = None,
+        provider: str = "default",
+    ) -> AsyncIterator[ScheduledCall]:
+        """Like `acquire()`, but releases the slot when the context manager exits."""
+        call = await self.acquire(priority=priority, tenant=tenant, provider=provider)
+        try:
+            yield call
+        finally:
+            call.release()
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import copy
+import dataclasses
+import json
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Literal
+
+from .agent_output import AgentOutputSchema
+from .handoffs import Handoff, handoff
+from .tokenizer import Tokenizer, get_default_tokenizer
+from .tool import FunctionTool, Tool
+
+if TYPE_CHECKING:
+    from .agent import Agent
+
+# Keywords whose value is a subschema, a list of subschemas, or a mapping of names to subschemas
+_SUBSCHEMA_KEYWORDS = (
+    "items",
+    "additionalProperties",
+    "not",
+    "contains",
+    "if",
+    "then",
+    "else",
+    "propertyNames",
+)
+_SUBSCHEMA_LIST_KEYWORDS = ("anyOf", "allOf", "oneOf", "prefixItems")
+_SUBSCHEMA_MAP_KEYWORDS = ("properties", "patternProperties", "dependentSchemas")
+
+# Keywords that don't change what a schema accepts, with the values that make them no-ops
+_NO_OP_KEYWORDS: dict[str, tuple[Any, ...]] = {
+    "title": (),
+    "$comment": (),
+    "description": ("",),
+    "additionalProperties": (True,),
+    "minItems": (0,),
+    "uniqueItems": (False,),
+    "deprecated": (False,),
+    "readOnly": (False,),
+    "writeOnly": (False,),
+}
+
+_DEFS_PREFIX = "#/$defs/"
+_MAX_CACHED_SCHEMAS = 1024
+
+
+def minify_json_schema(schema: dict[str, Any]) -> dict[str, Any]:
+    """Returns a smaller JSON schema that accepts the same values, and is still valid in strict
+    mode if the original was. The schema itself isn't modified.
+
+    The minified schema has no titles or no-op keywords (e.g. `"additionalProperties": true`),
+    definitions that are only used once are inlined, identical definitions are merged, and large
+    subschemas that appear more than once are moved to `$defs`.
+    """
+    schema = copy.deepcopy(schema)
+    _strip_no_ops(schema)
+    # Only references to top-level definitions are rewritten
+    refs = [node["$ref"] for node in _walk(schema) if "$ref" in node]
+    if all(isinstance(ref, str) and ref.startswith(_DEFS_PREFIX) for ref in refs):
+        defs = schema.get("$defs")
+        if isinstance(defs, dict):
+            _merge_identical_definitions(schema, defs)
+            _inline_single_use_definitions(schema, defs)
+        _move_repeated_subschemas_to_definitions(schema)
+    if schema.get("$defs") == {}:
+        schema.pop("$defs")
+    return schema
+
+
+def _subschemas(schema: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    for keyword in _SUBSCHEMA_KEYWORDS:
+        value = schema.get(keyword)
+        if isinstance(value, dict):
+            yield value
+        elif keyword == "items" and isinstance(value, list):
+            yield from (item for item in value if isinstance(item, dict))
+    for keyword in _SUBSCHEMA_LIST_KEYWORDS:
+        value = schema.get(keyword)
+        if isinstance(value, list):
+            yield from (item for item in value if isinstance(item, dict))
+    for keyword in (*_SUBSCHEMA_MAP_KEYWORDS, "$defs", "definitions"):
+        value = schema.get(keyword)
+        if isinstance(value, dict):
+            yield from (item for item in value.values() if isinstance(item, dict))
+
+
+def _walk(schema: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Yields the schema and all of its subschemas, depth first."""
+    yield schema
+    for subschema in _subschemas(schema):
+        yield from _walk(subschema)
+
+
+def _replace_subschemas(
+    schema: dict[str, Any], replace: Callable[[dict[str, Any]], dict[str, Any] | None]
+) -> None:
+    """Replaces each subschema for which `replace` returns a new schema, and recurses into the
+    others."""
+
+    def visit(subschema: dict[str, Any]) -> dict[str, Any]:
+        replacement = replace(subschema)
+        if replacement is not None:
+            return replacement
+        _replace_subschemas(subschema, replace)
+        return subschema
+
+    # Lists and mappings of subschemas are updated in place, as callers may hold on to them
+    for keyword, value in schema.items():
+        if keyword in _SUBSCHEMA_KEYWORDS and isinstance(value, dict):
+            schema[keyword] = visit(value)
+        elif keyword in (*_SUBSCHEMA_LIST_KEYWORDS, "items") and isinstance(value, list):
+            for index, item in enumerate(value):
+                if isinstance(item, dict):
+                    value[index] = visit(item)
+        elif keyword in (*_SUBSCHEMA_MAP_KEYWORDS, "$defs", "definitions") and isinstance(
+            value, dict
+        ):
+            for name, item in value.items():
+                if isinstance(item, dict):
+                    value[name] = visit(item)
+
+
+def _strip_no_ops(schema: dict[str, Any]) -> None:
+    for node in _walk(schema):
+        for keyword, no_op_values in _NO_OP_KEYWORDS.items():
+            if keyword in node and (not no_op_values or _is_one_of(node[keyword], no_op_values)):
+                node.pop(keyword)
+        for keyword in ("allOf", "anyOf", "oneOf"):
+            variants = node.get(keyword)
+            # A single variant can be merged into the schema, if their keywords don't overlap
+            if (
+                isinstance(variants, list)
+                and len(variants) == 1
+                and isinstance(variants[0], dict)
+                and not (set(variants[0]) & (set(node) - {keyword}))
+            ):
+                node.pop(keyword)
+                node.update(variants[0])
+    for keyword in ("$defs", "definitions"):
+        if schema.get(keyword) == {}:
+            schema.pop(keyword)
+
+
+def _is_one_of(value: Any, values: tuple[Any, ...]) -> bool:
+    # `True == 1` and `False == 0`, so the types are compared too
+    return any(type(value) is type(v) and value == v for v in values)
+
+
+def _serialize(schema: Any) -> str:
+    return json.dumps(schema, sort_keys=True, separators=(",", ":"))
+
+
+def _ref_counts(schema: dict[str, Any]) -> Counter[str]:
+    return Counter(node["$ref"][len(_DEFS_PREFIX) :] for node in _walk(schema) if "$ref" in node)
+
+
+def _rewrite_refs(schema: dict[str, Any], names: dict[str, str]) -> None:
+    for node in _walk(schema):
+        name = node.get("$ref", "")[len(_DEFS_PREFIX) :]
+        if name in names:
+            node["$ref"] = _DEFS_PREFIX + names[name]
+
+
+def _merge_identical_definitions(schema: dict[str, Any], defs: dict[str, Any]) -> None:
+    first_by_body: dict[str, str] = {}
+    duplicates: dict[str, str] = {}
+    for name, body in defs.items():
+        first = first_by_body.setdefault(_serialize(body), name)
+        if first != name:
+            duplicates[name] = first
+    for name in duplicates:
+        defs.pop(name)
+    _rewrite_refs(schema, duplicates)
+
+
+def _references(schema: dict[str, Any]) -> set[str]:
+    return set(_ref_counts(schema))
+
+
+def _is_recursive(name: str, defs: dict[str, Any]) -> bool:
+    seen: set[str] = set()
+    pending = [name]
+    while pending:
+        body = defs.get(pending.pop())
+        if not isinstance(body, dict):
+            continue
+        for reference in _references(body):
+            if reference == name:
+                return True
+            if reference not in seen:
+                seen.add(reference)
+                pending.append(reference)
+    return False
+
+
+def _inline_single_use_definitions(schema: dict[str, Any], defs: dict[str, Any]) -> None:
+    while True:
+        counts = _ref_counts(schema)
+        # Definitions that are no longer referenced (e.g. ones `ensure_strict_json_schema`
+        # already inlined) are dropped, along with the ones used once, which are inlined
+        unused = [name for name in defs if counts[name] == 0]
+        inline = [
+            name
+            for name in defs
+            if counts[name] == 1 and isinstance(defs[name], dict) and not _is_recursive(name, defs)
+        ]
+        if not unused and not inline:
+            return
+        for name in unused:
+            defs.pop(name)
+        if not inline:
+            continue
+        name = inline[0]
+        body = defs.pop(name)
+
+        def replace(node: dict[str, Any], name: str = name, body: Any = body) -> Any:
+            if node.get("$ref") != _DEFS_PREFIX + name:
+                return None
+            # Keywords next to the reference take priority over the definition's
+            return {**body, **{k: v for k, v in node.items() if k != "$ref"}}
+
+        _replace_subschemas(schema, replace)
+
+
+def _move_repeated_subschemas_to_definitions(schema: dict[str, Any]) -> None:
+    defs: dict[str, Any] = schema.get("$defs", {})
+    def_roots = {id(body) for body in defs.values()}
+    while True:
+        counts: Counter[str] = Counter()
+        for node in _walk(schema):
+            if node is not schema and id(node) not in def_roots and "$ref" not in node:
+                counts[_serialize(node)] += 1
+
+        best: tuple[int, str] | None = None
+        for serialized, count in counts.items():
+            if count < 2:
+                continue
+            # Each use becomes a reference, and the schema is written once more as a definition
+            ref_size = len(_serialize({"$ref": _DEFS_PREFIX + "S00"}))
+            saving = (count - 1) * len(serialized) - count * ref_size - len('"S00":,')
+            if saving > 0 and (best is None or saving > best[0]):
+                best = (saving, serialized)
+        if best is None:
+            break
+
+        serialized = best[1]
+        name = next((name for name, body in defs.items() if _serialize(body) == serialized), None)
+        if name is None:
+            index = len(defs)
+            while f"S{index}" in defs:
+                index += 1
+            name = f"S{index}"
+            defs[name] = json.loads(serialized)
+            def_roots.add(id(defs[name]))
+
+        def replace(node: dict[str, Any], serialized: str = serialized, name: str = name) -> Any:
+            if id(node) in def_roots or _serialize(node) != serialized:
+                return None
+            return {"$ref": _DEFS_PREFIX + name}
+
+        _replace_subschemas(schema, replace)
+        if defs and "$defs" not in schema:
+            schema["$defs"] = defs
+
+
+class _MinifiedSchemaCache:
+    """Caches minified schemas, as the same tool and output schemas are sent on every turn."""
+
+    def __init__(self) -> None:
+        self._schemas: dict[str, dict[str, Any]] = {}
+
+    def get(self, schema: dict[str, Any]) -> dict[str, Any]:
+        key = json.dumps(schema, default=str)
+        minified = self._schemas.get(key)
+        if minified is None:
+            if len(self._schemas) >= _MAX_CACHED_SCHEMAS:
+                self._schemas.clear()
+            minified = self._schemas[key] = minify_json_schema(schema)
+        return minified
+
+
+_cache = _MinifiedSchemaCache()
+
+
+def minify_tool(tool: Tool) -> Tool:
+    """Returns a copy of a function tool with a minified parameters schema. Other tools are
+    returned as is."""
+    if not isinstance(tool, FunctionTool):
+        return tool
+    return dataclasses.replace(tool, params_json_schema=_cache.get(tool.params_json_schema))
+
+
+def minify_handoff(handoff: Handoff[Any]) -> Handoff[Any]:
+    """Returns a copy of a handoff with a minified input schema."""
+    if not handoff.input_json_schema:
+        return handoff
+    return dataclasses.replace(handoff, input_json_schema=_cache.get(handoff.input_json_schema))
+
+
+def minify_output_schema(output_schema: AgentOutputSchema) -> AgentOutputSchema:
+    """Returns a copy of an output schema with a minified JSON schema. Outputs are still validated
+    against the output type."""
+    if output_schema.is_plain_text():
+        return output_schema
+    minified = copy.copy(output_schema)
+    minified._output_schema = _cache.get(output_schema.json_schema())
+    return minified
+
+
+@dataclass
+class SchemaSavings:
+    """The tokens saved by minifying one schema."""
+
+    name: str
+    """The name of the tool or handoff, or `output` for the output schema."""
+
+    kind: Literal["tool", "handoff", "output"]
+    """What the schema describes."""
+
+    original_tokens: int
+    """The estimated tokens of the original schema."""
+
+    minified_tokens: int
+    """The estimated tokens of the minified schema."""
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.minified_tokens
+
+
+@dataclass
+class SchemaMinificationReport:
+    """The tokens that minifying an agent's schemas saves on each of its model calls."""
+
+    agent: str
+    """The name of the agent."""
+
+    schemas: list[SchemaSavings] = field(default_factory=list)
+    """The savings of each schema."""
+
+    @property
+    def original_tokens(self) -> int:
+        return sum(schema.original_tokens for schema in self.schemas)
+
+    @property
+    def minified_tokens(self) -> int:
+        return sum(schema.minified_tokens for schema in self.schemas)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.minified_tokens
+
+
+def get_schema_minification_report(
+    agent: Agent[Any], tokenizer: Tokenizer | None = None
+) -> SchemaMinificationReport:
+    """Estimates the tokens that `RunConfig.minify_schemas` saves on each model call of an agent,
+    for its tool, handoff and output schemas.
+
+    Args:
+        agent: The agent.
+        tokenizer: The tokenizer to count with. Defaults to the default tokenizer (see
+            `set_default_tokenizer()`).
+    """
+    tokenizer = tokenizer or get_default_tokenizer()
+
+    def savings(name: str, kind: Any, schema: dict[str, Any]) -> SchemaSavings:
+        return SchemaSavings(
+            name=name,
+            kind=kind,
+            original_tokens=tokenizer.count(json.dumps(schema)),
+            minified_tokens=tokenizer.count(json.dumps(_cache.get(schema))),
+        )
+
+    report = SchemaMinificationReport(agent=agent.name)
+    for tool in agent.tools:
+        if isinstance(tool, FunctionTool):
+            report.schemas.append(savings(tool.name, "tool", tool.params_json_schema))
+    for item in agent.handoffs:
+        agent_handoff = item if isinstance(item, Handoff) else handoff(item)
+        if agent_handoff.input_json_schema:
+            report.schemas.append(
+                savings(agent_handoff.tool_name, "handoff", agent_handoff.input_json_schema)
+            )
+    if agent.output_type is not None and agent.output_type is not str:
+        output_schema = AgentOutputSchema(agent.output_type)
+        report.schemas.append(savings("output", "output", output_schema.json_schema()))
+    return report
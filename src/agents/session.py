@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any, overload
+
+from .exceptions import UserError
+from .items import ItemHelpers, TResponseInputItem
+
+_TOOL_OUTPUT_TYPES = ("function_call_output", "computer_call_output")
+
+
+class SessionHistory(Sequence[TResponseInputItem]):
+    """A read-only view of a range of a session's items, that doesn't copy them. The items
+    themselves are shared with the session, so they must not be modified; the items of an
+    `InMemorySession` are read-only."""
+
+    def __init__(
+        self, items: Sequence[TResponseInputItem], start: int = 0, stop: int | None = None
+    ):
+        self._items = items
+        self._start = start
+        self._stop = len(items) if stop is None else stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> TResponseInputItem: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[TResponseInputItem]: ...
+
+    def __getitem__(self, index: int | slice) -> TResponseInputItem | list[TResponseInputItem]:
+        if isinstance(index, slice):
+            return [self._items[self._start + i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("session history index out of range")
+        return self._items[self._start + index]
+
+    def __iter__(self) -> Iterator[TResponseInputItem]:
+        for i in range(self._start, self._stop):
+            yield self._items[i]
+
+    def __repr__(self) -> str:
+        return f"SessionHistory({len(self)} items)"
+
+
+class Session(abc.ABC):
+    """Stores the history of a conversation, so that each run of the conversation only has to
+    pass the new input. Pass a session to `Runner.run()`: the runner loads the history before the
+    run, and appends the run's input and new items to the session once the run completes.
+    """
+
+    def __init__(self, session_id: str, max_history_items: int | None = None) -> None:
+        """
+        Args:
+            session_id: The ID of the conversation.
+            max_history_items: The maximum number of most recent items to load as the history of
+                each run. If None, the full history is loaded.
+        """
+        if max_history_items is not None and max_history_items < 1:
+            raise UserError("max_history_items must be at least 1")
+        self.session_id = session_id
+        self.max_history_items = max_history_items
+
+    @abc.abstractmethod
+    async def get_items(self, limit: int | None = None) -> Sequence[TResponseInputItem]:
+        """Returns the items of the session, oldest first.
+
+        Args:
+            limit: The maximum number of most recent items to return. If None, all items are
+                returned.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def add_items(self, items: Sequence[TResponseInputItem]) -> None:
+        """Appends items to the session."""
+        pass
+
+    @abc.abstractmethod
+    async def clear(self) -> None:
+        """Removes all items from the session."""
+        pass
+
+    async def get_history(self) -> Sequence[TResponseInputItem]:
+        """Returns the history to start a run with: the last `max_history_items` items, without
+        any tool outputs at the start whose calls were cut off, as the API rejects them."""
+        items = await self.get_items(self.max_history_items)
+        start = 0
+        while start < len(items) and items[start].get("type") in _TOOL_OUTPUT_TYPES:
+            start += 1
+        return items if start == 0 else SessionHistory(items, start)
+
+
+class InMemorySession(Session):
+    """A session that keeps its items in memory. Items are made read-only when they are added
+    (items that already are, e.g. the run's input, are shared rather than copied), and the history
+    is returned as a view, without copying."""
+
+    def __init__(self, session_id: str = "default", max_history_items: int | None = None):
+        super().__init__(session_id, max_history_items)
+        self._items: list[TResponseInputItem] = []
+
+    async def get_items(self, limit: int | None = None) -> Sequence[TResponseInputItem]:
+        # The items are only ever appended to, so the view stays the same after more are added
+        stop = len(self._items)
+        start = max(stop - limit, 0) if limit is not None else 0
+        return SessionHistory(self._items, start, stop)
+
+    async def add_items(self, items: Sequence[TResponseInputItem]) -> None:
+        self._items.extend(ItemHelpers.input_to_frozen_input_list(list(items)))
+
+    async def clear(self) -> None:
+        # Replaced rather than emptied, so that existing views are unaffected
+        self._items = []
+
+
+class SQLiteSession(Session):
+    """A session stored in a SQLite database, one row per item. Only the new items of each run
+    are written, and only the last `max_history_items` items are read. Database calls run in a
+    thread, so they don't block the event loop.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        db_path: str | Path = ":memory:",
+        max_history_items: int | None = None,
+        table_name: str = "agent_session_items",
+    ) -> None:
+        """
+        Args:
+            session_id: The ID of the conversation. Several sessions can share a database.
+            db_path: The path of the database file. Defaults to an in-memory database, which only
+                lives as long as the session.
+            max_history_items: The maximum number of most recent items to load as the history of
+                each run. If None, the full history is loaded.
+            table_name: The name of the table to store the items in.
+        """
+        super().__init__(session_id, max_history_items)
+        if not table_name.isidentifier():
+            raise UserError(f"Invalid table name: {table_name}")
+        self.table_name = table_name
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name} (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "session_id TEXT NOT NULL, item TEXT NOT NULL)"
+            )
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {table_name}_session_id "
+                f"ON {table_name} (session_id, id)"
+            )
+
+    def _execute(self, sql: str, parameters: Sequence[Any] = ()) -> list[Any]:
+        with self._lock, self._connection:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    async def get_items(self, limit: int | None = None) -> Sequence[TResponseInputItem]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            f"SELECT item FROM (SELECT id, item FROM {self.table_name} WHERE session_id = ? "
+            "ORDER BY id DESC LIMIT ?) ORDER BY id",
+            (self.session_id, -1 if limit is None else limit),
+        )
+        return SessionHistory([json.loads(row[0]) for row in rows])
+
+    async def add_items(self, items: Sequence[TResponseInputItem]) -> None:
+        rows = [(self.session_id, json.dumps(item, default=str)) for item in items]
+
+        def insert() -> None:
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    f"INSERT INTO {self.table_name} (session_id, item) VALUES (?, ?)", rows
+                )
+
+        await asyncio.to_thread(insert)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(
+            self._execute, f"DELETE FROM {self.table_name} WHERE session_id = ?", (self.session_id,)
+        )
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._connection.close()
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING, Literal
+
+from typing_extensions import TypeAlias
+
+from .exceptions import StreamSubscriberDisconnected, UserError
+from .logger import logger
+from .stream_events import StreamEvent
+
+if TYPE_CHECKING:
+    from .result import RunResultStreaming
+
+SlowConsumerPolicy: TypeAlias = Literal["drop", "block", "disconnect"]
+"""What to do when a subscriber falls more than `max_buffer_size` events behind:
+
+- `drop`: skip the oldest events the subscriber hasn't read yet. The number of skipped events is
+  available via `StreamSubscription.dropped_events`.
+- `block`: stop reading events from the run until the subscriber catches up. Other subscribers
+  stall as well.
+- `disconnect`: disconnect the subscriber. Its iterator raises `StreamSubscriberDisconnected`.
+"""
+
+
+class StreamBroadcaster:
+    """Fans out the events of a single streamed run to multiple consumers, e.g. a websocket, an
+    audit logger and a metrics tap.
+
+    Events are read once from `RunResultStreaming.stream_events()` into a shared event log, and
+    each subscriber reads the log at its own offset. Event objects are shared between subscribers,
+    not copied, so treat them as read-only. Subscribers can join at any time and replay the log
+    from any retained offset.
+
+    If the run raises an exception, every subscriber raises it once it has read all the events
+    produced before the exception.
+
+    A subscriber that stops reading before the end of the run, e.g. by breaking out of its loop,
+    should close its subscription, so that it doesn't hold back the broadcaster. Use the
+    subscription as an async context manager to close it on exit. Subscriptions that are garbage
+    collected are closed as well.
+    """
+
+    def __init__(
+        self,
+        result: RunResultStreaming,
+        *,
+        max_buffer_size: int = 1000,
+        slow_consumer_policy: SlowConsumerPolicy = "block",
+        max_replay_events: int | None = None,
+    ) -> None:
+        """
+        Args:
+            result: The streamed run to broadcast.
+            max_buffer_size: The default maximum number of events a subscriber can lag behind.
+            slow_consumer_policy: The default policy for subscribers that lag behind by more than
+                their buffer size.
+            max_replay_events: The number of most recent events to retain for late joiners, in
+                addition to the events that active subscribers haven't read yet. If None, the whole
+                event log is retained for the lifetime of the broadcaster.
+        """
+        if max_buffer_size < 1:
+            raise UserError("max_buffer_size must be at least 1")
+
+        self._result = result
+        self.max_buffer_size = max_buffer_size
+        self.slow_consumer_policy: SlowConsumerPolicy = slow_consumer_policy
+        self.max_replay_events = max_replay_events
+
+        self._log: list[StreamEvent] = []
+        # The absolute offset of `self._log[0]`. Increases when old events are discarded.
+        self._log_start = 0
+        # Weak references, so that subscriptions that are dropped without being closed don't hold
+        # back the broadcaster
+        self._subscriptions: weakref.WeakSet[StreamSubscription] = weakref.WeakSet()
+        self._waiters: list[asyncio.Future[None]] = []
+        self._pump_task: asyncio.Task[None] | None = None
+        self._done = False
+        self._exception: Exception | None = None
+
+    @property
+    def next_offset(self) -> int:
+        """The offset that the next event from the run will have. Subscribe at this offset to only
+        receive live events."""
+        return self._log_start + len(self._log)
+
+    @property
+    def is_done(self) -> bool:
+        """Whether all the events of the run have been read into the log."""
+        return self._done
+
+    def subscribe(
+        self,
+        *,
+        offset: int = 0,
+        max_buffer_size: int | None = None,
+        slow_consumer_policy: SlowConsumerPolicy | None = None,
+    ) -> StreamSubscription:
+        """Subscribe to the events of the run. Starts reading events from the run, if that hasn't
+        started yet.
+
+        Args:
+            offset: The offset of the first event to receive. Defaults to 0, i.e. replay the run
+                from the start. If the requested events were already discarded, the subscription
+                starts at the oldest retained event.
+            max_buffer_size: Overrides the broadcaster's default `max_buffer_size`.
+            slow_consumer_policy: Overrides the broadcaster's default `slow_consumer_policy`.
+
+        Returns:
+            An async iterator over the events of the run, which is also an async context manager
+            that closes it on exit.
+        """
+        subscription = StreamSubscription(
+            broadcaster=self,
+            offset=max(offset, 0),
+            max_buffer_size=max_buffer_size or self.max_buffer_size,
+            slow_consumer_policy=slow_consumer_policy or self.slow_consumer_policy,
+        )
+        self._subscriptions.add(subscription)
+        # Wake up the broadcaster when the subscription is dropped, in case it's blocked on it
+        weakref.finalize(subscription, self._notify)
+        if self._pump_task is None:
+            self._pump_task = asyncio.create_task(self._pump())
+        return subscription
+
+    def _unsubscribe(self, subscription: StreamSubscription) -> None:
+        self._subscriptions.discard(subscription)
+        self._notify()
+
+    async def _pump(self) -> None:
+        try:
+            async for event in self._result.stream_events():
+                while any(
+                    s.slow_consumer_policy == "block" and s.lag >= s.max_buffer_size
+                    for s in list(self._subscriptions)
+                ):
+                    await self._wait()
+
+                self._log.append(event)
+                self._apply_buffer_limits()
+                self._discard_old_events()
+                self._notify()
+        except Exception as e:
+            self._exception = e
+        finally:
+            self._done = True
+            self._notify()
+
+    def _apply_buffer_limits(self) -> None:
+        for subscription in list(self._subscriptions):
+            overflow = subscription.lag - subscription.max_buffer_size
+            if overflow <= 0:
+                continue
+
+            if subscription.slow_consumer_policy == "drop":
+                subscription._offset += overflow
+                subscription.dropped_events += overflow
+            elif subscription.slow_consumer_policy == "disconnect":
+                logger.debug("Disconnecting slow stream subscriber")
+                subscription._disconnected = True
+                self._subscriptions.discard(subscription)
+
+    def _discard_old_events(self) -> None:
+        if self.max_replay_events is None:
+            return
+
+        keep_from = self.next_offset - self.max_replay_events
+        for subscription in list(self._subscriptions):
+            keep_from = min(keep_from, subscription._offset)
+
+        if keep_from > self._log_start:
+            del self._log[: keep_from - self._log_start]
+            self._log_start = keep_from
+
+    def _event_at(self, offset: int) -> StreamEvent:
+        return self._log[offset - self._log_start]
+
+    async def _wait(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+    def _notify(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class StreamSubscription:
+    """A single consumer of a `StreamBroadcaster`. Iterate over it to receive the run's events.
+
+    If you may stop before the end of the run, use it as an async context manager, or call
+    `close()`, so that it doesn't hold back the other subscribers:
+
+    ```python
+    async with result.subscribe() as subscription:
+        async for event in subscription:
+            if is_done(event):
+                break
+    ```
+    """
+
+    def __init__(
+        self,
+        broadcaster: StreamBroadcaster,
+        offset: int,
+        max_buffer_size: int,
+        slow_consumer_policy: SlowConsumerPolicy,
+    ) -> None:
+        self._broadcaster = broadcaster
+        self._offset = offset
+        self._closed = False
+        self._disconnected = False
+
+        self.max_buffer_size = max_buffer_size
+        """The maximum number of events this subscriber can lag behind."""
+
+        self.slow_consumer_policy: SlowConsumerPolicy = slow_consumer_policy
+        """What to do when this subscriber lags behind by more than `max_buffer_size` events."""
+
+        self.dropped_events = 0
+        """The number of events this subscriber skipped, because it was too slow or because the
+        events were no longer retained when it subscribed."""
+
+    @property
+    def offset(self) -> int:
+        """The offset of the next event this subscriber will receive."""
+        return self._offset
+
+    @property
+    def lag(self) -> int:
+        """The number of events in the log that this subscriber hasn't read yet."""
+        return max(self._broadcaster.next_offset - self._offset, 0)
+
+    def close(self) -> None:
+        """Stop receiving events. The subscriber no longer holds back the broadcaster."""
+        self._closed = True
+        self._broadcaster._unsubscribe(self)
+
+    async def aclose(self) -> None:
+        """Like `close()`, for code that expects an async close, e.g. `contextlib.aclosing()`."""
+        self.close()
+
+    async def __aenter__(self) -> StreamSubscription:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __aiter__(self) -> AsyncIterator[StreamEvent]:
+        return self
+
+    async def __anext__(self) -> StreamEvent:
+        broadcaster = self._broadcaster
+        while True:
+            if self._closed:
+                raise StopAsyncIteration
+            if self._disconnected:
+                raise StreamSubscriberDisconnected(
+                    f"Subscriber fell more than {self.max_buffer_size} events behind"
+                )
+
+            if self._offset < broadcaster._log_start:
+                self.dropped_events += broadcaster._log_start - self._offset
+                self._offset = broadcaster._log_start
+
+            if self._offset < broadcaster.next_offset:
+                event = broadcaster._event_at(self._offset)
+                self._offset += 1
+                # Wake up the broadcaster in case it's blocked on this subscriber
+                broadcaster._notify()
+                return event
+
+            if broadcaster.is_done:
+                broadcaster._unsubscribe(self)
+                if broadcaster._exception:
+                    raise broadcaster._exception
+                raise StopAsyncIteration
+
+            await broadcaster._wait()
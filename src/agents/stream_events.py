@@ -1,15 +1,15 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 from typing import Any, Literal, Union
 
 from typing_extensions import TypeAlias
 
+from ._dataclasses import slotted_dataclass
 from .agent import Agent
 from .items import RunItem, TResponseStreamEvent
 
 
-@dataclass
+@slotted_dataclass
 class RawResponsesStreamEvent:
     """Streaming event from the LLM. These are 'raw' events, i.e. they are directly passed through
     from the LLM.
@@ -22,7 +22,7 @@ class RawResponsesStreamEvent:
     """The type of the event."""
 
 
-@dataclass
+@slotted_dataclass
 class RunItemStreamEvent:
     """Streaming events that wrap a `RunItem`. As the agent processes the LLM response, it will
     generate these events for new messages, tool calls, tool outputs, handoffs, etc.
@@ -44,7 +44,7 @@ class RunItemStreamEvent:
     type: Literal["run_item_stream_event"] = "run_item_stream_event"
 
 
-@dataclass
+@slotted_dataclass
 class AgentUpdatedStreamEvent:
     """Event that notifies that there is a new agent running."""
 
@@ -54,5 +54,24 @@ class AgentUpdatedStreamEvent:
     type: Literal["agent_updated_stream_event"] = "agent_updated_stream_event"
 
 
-StreamEvent: TypeAlias = Union[RawResponsesStreamEvent, RunItemStreamEvent, AgentUpdatedStreamEvent]
+@slotted_dataclass
+class RetryStreamEvent:
+    """Event that notifies that the model call of the current turn is being retried, e.g. because
+    the response stream stalled. The raw response events received since the start of the turn
+    belong to the abandoned attempt, so discard any partial output you built from them (e.g.
+    streamed text).
+    """
+
+    attempt: int
+    """The number of the new attempt, starting at 2 for the first retry."""
+
+    reason: str
+    """Why the model call is being retried."""
+
+    type: Literal["retry_stream_event"] = "retry_stream_event"
+
+
+StreamEvent: TypeAlias = Union[
+    RawResponsesStreamEvent, RunItemStreamEvent, AgentUpdatedStreamEvent, RetryStreamEvent
+]
 """A streaming event from an agent."""
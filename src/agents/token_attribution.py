@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from .agent_output import AgentOutputSchema
+from .handoffs import Handoff
+from .items import ItemHelpers, TResponseInputItem
+from .tokenizer import Tokenizer, get_default_tokenizer
+from .tool import Tool, _describe_tool
+
+# The API charges images by size. Without decoding them, assume a 512x512 tile at low detail, and
+# a 1024x1024 image (4 tiles) otherwise.
+_LOW_DETAIL_IMAGE_TOKENS = 85
+_IMAGE_TOKENS = 765
+
+_TOOL_OUTPUT_TYPES = ("function_call_output", "computer_call_output")
+
+
+@dataclass
+class TokenAttribution:
+    """The estimated input tokens of a request, split by where they come from."""
+
+    system_instructions: int = 0
+    """The tokens of the system prompt."""
+
+    tool_schemas: int = 0
+    """The tokens of the tool definitions."""
+
+    handoff_schemas: int = 0
+    """The tokens of the handoff definitions."""
+
+    output_schema: int = 0
+    """The tokens of the output schema."""
+
+    history_messages: int = 0
+    """The tokens of the input items, apart from tool outputs and images: messages, reasoning and
+    tool calls."""
+
+    tool_outputs: int = 0
+    """The tokens of the outputs of tool calls, apart from images (e.g. screenshots)."""
+
+    images: int = 0
+    """The estimated tokens of images, in messages and tool outputs."""
+
+    tools: dict[str, int] = field(default_factory=dict)
+    """The tokens of each tool's definition, by tool name."""
+
+    @property
+    def total(self) -> int:
+        """The estimated input tokens of the request."""
+        return (
+            self.system_instructions
+            + self.tool_schemas
+            + self.handoff_schemas
+            + self.output_schema
+            + self.history_messages
+            + self.tool_outputs
+            + self.images
+        )
+
+    def export(self) -> dict[str, Any]:
+        return {**dataclasses.asdict(self), "total": self.total}
+
+
+def _count_json(value: Any, tokenizer: Tokenizer) -> int:
+    return tokenizer.count(json.dumps(value, default=str))
+
+
+def _image_tokens(part: Any) -> int:
+    # Chat completions image parts keep the detail next to the URL
+    image_url = part.get("image_url")
+    detail = image_url.get("detail") if isinstance(image_url, dict) else part.get("detail")
+    return _LOW_DETAIL_IMAGE_TOKENS if detail == "low" else _IMAGE_TOKENS
+
+
+def _is_image(part: Any) -> bool:
+    return isinstance(part, dict) and part.get("type") in (
+        "input_image",
+        "computer_screenshot",
+        "image_url",
+    )
+
+
+def count_item_tokens(
+    item: TResponseInputItem, tokenizer: Tokenizer | None = None
+) -> tuple[int, int]:
+    """Estimates the tokens of an input item.
+
+    Images are estimated separately: their data (e.g. base64 encoded in a data URL) isn't sent to
+    the model as text, and would otherwise dominate the count.
+
+    Returns:
+        The tokens of the item apart from images, and the tokens of its images.
+    """
+    tokenizer = tokenizer or get_default_tokenizer()
+    content = item.get("content")
+    output = item.get("output")
+    if isinstance(content, list) and any(_is_image(part) for part in content):
+        images = sum(_image_tokens(part) for part in content if _is_image(part))
+        text_item = {**item, "content": [part for part in content if not _is_image(part)]}
+        return _count_json(text_item, tokenizer), images
+    if _is_image(output):
+        text_item = {key: value for key, value in item.items() if key != "output"}
+        return _count_json(text_item, tokenizer), _image_tokens(output)
+    return _count_json(item, tokenizer), 0
+
+
+def count_input_tokens(
+    items: Sequence[TResponseInputItem], tokenizer: Tokenizer | None = None
+) -> int:
+    """Estimates the tokens of a list of input items, including images."""
+    return sum(sum(count_item_tokens(item, tokenizer)) for item in items)
+
+
+def attribute_tokens(
+    system_instructions: str | None,
+    input: str | list[TResponseInputItem],
+    tools: list[Tool],
+    handoffs: list[Handoff],
+    output_schema: AgentOutputSchema | None,
+    tokenizer: Tokenizer | None = None,
+) -> TokenAttribution:
+    """Estimates the input tokens of a model request, split by where they come from.
+
+    Args:
+        system_instructions: The system prompt.
+        input: The input items.
+        tools: The tools.
+        handoffs: The handoffs.
+        output_schema: The output schema, if any.
+        tokenizer: The tokenizer to count with. Defaults to the default tokenizer (see
+            `set_default_tokenizer()`).
+    """
+    tokenizer = tokenizer or get_default_tokenizer()
+    attribution = TokenAttribution()
+    if system_instructions:
+        attribution.system_instructions = tokenizer.count(system_instructions)
+
+    for tool in tools:
+        tokens = _count_json(_describe_tool(tool), tokenizer)
+        attribution.tools[tool.name] = tokens
+        attribution.tool_schemas += tokens
+
+    attribution.handoff_schemas = sum(
+        _count_json(
+            {
+                "name": handoff.tool_name,
+                "description": handoff.tool_description,
+                "parameters": handoff.input_json_schema,
+            },
+            tokenizer,
+        )
+        for handoff in handoffs
+    )
+
+    if output_schema is not None and not output_schema.is_plain_text():
+        attribution.output_schema = _count_json(output_schema.json_schema(), tokenizer)
+
+    for item in ItemHelpers.input_to_input_list(input):
+        text_tokens, image_tokens = count_item_tokens(item, tokenizer)
+        if item.get("type") in _TOOL_OUTPUT_TYPES:
+            attribution.tool_outputs += text_tokens
+        else:
+            attribution.history_messages += text_tokens
+        attribution.images += image_tokens
+
+    return attribution
+
+
+def _attribute_tokens_later(
+    system_instructions: str | None,
+    input: str | list[TResponseInputItem],
+    tools: list[Tool],
+    handoffs: list[Handoff],
+    output_schema: AgentOutputSchema | None,
+) -> Callable[[], dict[str, Any]]:
+    """Returns a function that attributes the tokens of a request and exports the result, for
+    spans that only compute the attribution if it's read."""
+    # Copy the lists, in case they're changed before the attribution is computed
+    input = input if isinstance(input, str) else list(input)
+    tools = list(tools)
+    handoffs = list(handoffs)
+    return lambda: attribute_tokens(
+        system_instructions, input, tools, handoffs, output_schema
+    ).export()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import abc
+import base64
+import math
+import re
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+from .exceptions import UserError
+
+# The pre-tokenization split of the `cl100k_base` encoding, written for the standard library's `re`
+# module: `[^\W\d_]` stands in for `\p{L}` (letters) and `\d` for `\p{N}` (numbers).
+_DEFAULT_PATTERN = (
+    r"(?i:'s|'t|'re|'ve|'m|'ll|'d)"
+    r"|(?:[^\r\n\w]|_)?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*"
+    r"|\s*[\r\n]+"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+
+_MAX_CACHED_PIECES = 100_000
+
+
+class Tokenizer(abc.ABC):
+    """Counts the tokens of text locally, without calling the API. Used to estimate the size of
+    requests, e.g. for token budgets and rate limits."""
+
+    @abc.abstractmethod
+    def count(self, text: str) -> int:
+        """Returns the number of tokens of the text."""
+        pass
+
+
+class HeuristicTokenizer(Tokenizer):
+    """Estimates the number of tokens from the length of the text. Fast, and close enough for
+    English text and JSON (about 4 characters per token), but it can be far off for other
+    languages. This is the default tokenizer."""
+
+    def __init__(self, chars_per_token: float = 4.0) -> None:
+        """
+        Args:
+            chars_per_token: The average number of characters per token.
+        """
+        if chars_per_token <= 0:
+            raise UserError("chars_per_token must be positive")
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class BPETokenizer(Tokenizer):
+    """Counts tokens exactly with a byte-pair encoding, loaded from a local vocabulary file, e.g.
+    `o200k_base.tiktoken`. Slower than the heuristic tokenizer, so the tokens of each distinct
+    piece of text (roughly, each word) are cached."""
+
+    def __init__(self, ranks: Mapping[bytes, int], pattern: str | None = None) -> None:
+        """
+        Args:
+            ranks: The merge rank (i.e. the token ID) of each token's bytes. Must include every
+                single byte.
+            pattern: The regular expression that splits text into pieces before they are encoded.
+                Defaults to the split of the `cl100k_base` encoding. Patterns that use Unicode
+                properties (`\\p{...}`) require the `regex` package.
+        """
+        self.ranks = dict(ranks)
+        self._pattern = _compile(pattern) if pattern is not None else re.compile(_DEFAULT_PATTERN)
+        self._cache: dict[str, list[int]] = {}
+
+    @classmethod
+    def from_file(cls, path: str | Path, pattern: str | None = None) -> BPETokenizer:
+        """Loads a vocabulary file in the `tiktoken` format: one token per line, as its base64
+        encoded bytes followed by its rank.
+
+        Args:
+            path: The path of the vocabulary file.
+            pattern: The regular expression that splits text into pieces. See `__init__()`.
+        """
+        ranks: dict[bytes, int] = {}
+        with open(path, "rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+                except ValueError as e:
+                    raise UserError(f"Invalid vocabulary file {path}, line {line_number}") from e
+        return cls(ranks, pattern)
+
+    def encode(self, text: str) -> list[int]:
+        """Returns the token IDs of the text."""
+        tokens: list[int] = []
+        for piece in self._pattern.findall(text):
+            tokens.extend(self._encode_piece(piece))
+        return tokens
+
+    def count(self, text: str) -> int:
+        return sum(len(self._encode_piece(piece)) for piece in self._pattern.findall(text))
+
+    def _encode_piece(self, piece: str) -> list[int]:
+        cached = self._cache.get(piece)
+        if cached is not None:
+            return cached
+
+        data = piece.encode()
+        rank = self.ranks.get(data)
+        tokens = [rank] if rank is not None else _byte_pair_merge(data, self.ranks)
+        if len(self._cache) >= _MAX_CACHED_PIECES:
+            self._cache.clear()
+        self._cache[piece] = tokens
+        return tokens
+
+
+def _compile(pattern: str) -> Any:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        try:
+            import regex  # type: ignore
+        except ImportError:
+            raise UserError(
+                "The tokenizer pattern isn't supported by the `re` module. Patterns that use "
+                "Unicode properties require the `regex` package. Install it with "
+                "`pip install regex`."
+            ) from e
+        return regex.compile(pattern)
+
+
+def _byte_pair_merge(data: bytes, ranks: dict[bytes, int]) -> list[int]:
+    """Encodes bytes by repeatedly merging the adjacent pair of parts with the lowest rank."""
+    parts = [data[i : i + 1] for i in range(len(data))]
+    while len(parts) > 1:
+        best_rank: int | None = None
+        best_index = 0
+        for i in range(len(parts) - 1):
+            rank = ranks.get(parts[i] + parts[i + 1])
+            if rank is not None and (best_rank is None or rank < best_rank):
+                best_rank = rank
+                best_index = i
+        if best_rank is None:
+            break
+        parts[best_index : best_index + 2] = [parts[best_index] + parts[best_index + 1]]
+    try:
+        return [ranks[part] for part in parts]
+    except KeyError as e:
+        raise UserError(f"The vocabulary has no token for the byte {e.args[0]!r}") from None
+
+
+_default_tokenizer: Tokenizer = HeuristicTokenizer()
+
+
+def get_default_tokenizer() -> Tokenizer:
+    """Returns the tokenizer used to estimate the size of requests."""
+    return _default_tokenizer
+
+
+def set_default_tokenizer(tokenizer: Tokenizer | None) -> None:
+    """Sets the tokenizer used to estimate the size of requests, e.g. for history compaction, rate
+    limits and token attribution. Pass None to restore the default heuristic tokenizer.
+
+    Args:
+        tokenizer: The tokenizer to use.
+    """
+    global _default_tokenizer
+    _default_tokenizer = tokenizer if tokenizer is not None else HeuristicTokenizer()
@@ -120,6 +120,20 @@ Tool = Union[FunctionTool, FileSearchTool, WebSearchTool, ComputerTool]
 """A tool that can be used in an agent."""
 
 
+def _describe_tool(tool: Tool) -> dict[str, Any]:
+    """Returns a JSON-serializable description of the definition of a tool that's sent to the
+    model, to hash it or count its tokens."""
+    if isinstance(tool, FunctionTool):
+        return {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.params_json_schema,
+            "strict": tool.strict_json_schema,
+        }
+    # Hosted tools are described by their configuration
+    return {"type": tool.name, "config": repr(tool)}
+
+
 def default_tool_error_function(ctx: RunContextWrapper[Any], error: Exception) -> str:
     """The default tool error function, which just returns a generic error message."""
     return f"An error occurred while running the tool. Please try again. Error: {str(error)}"
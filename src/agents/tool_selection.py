@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import abc
+import math
+import re
+from collections import Counter
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from .compaction import split_turns
+from .exceptions import UserError
+from .items import TResponseInputItem
+from .tool import FunctionTool, Tool
+
+if TYPE_CHECKING:
+    from .agent import Agent
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_CASE_RE = re.compile(r"([a-z0-9])([A-Z])")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it me my of on or please that the "
+    "this to what when where which with you your".split()
+)
+_MAX_CACHED_INDEXES = 256
+
+
+def _tokenize(text: str) -> list[str]:
+    """Splits text into lowercase words, including the parts of snake_case and camelCase names,
+    and folds simple plurals so that e.g. "orders" matches "order"."""
+    words = _WORD_RE.findall(_CAMEL_CASE_RE.sub(r"\1 \2", text).lower())
+    return [
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in words
+        if word not in _STOP_WORDS
+    ]
+
+
+def _schema_text(schema: Any) -> Iterator[str]:
+    """Yields the property names and descriptions of a JSON schema."""
+    if isinstance(schema, list):
+        for item in schema:
+            yield from _schema_text(item)
+    elif isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == "description" and isinstance(value, str):
+                yield value
+            elif key == "properties" and isinstance(value, dict):
+                yield from value
+                yield from _schema_text(list(value.values()))
+            elif isinstance(value, (dict, list)):
+                yield from _schema_text(value)
+
+
+def _tool_text(tool: FunctionTool) -> str:
+    return " ".join([tool.name, tool.description, *_schema_text(tool.params_json_schema)])
+
+
+class _BM25Index:
+    """A BM25 index of the names, descriptions and parameter docs of function tools."""
+
+    def __init__(self, tools: Sequence[FunctionTool], k1: float, b: float) -> None:
+        self.k1 = k1
+        self.b = b
+        self.names = [tool.name for tool in tools]
+        self.term_counts = [Counter(_tokenize(_tool_text(tool))) for tool in tools]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / len(tools) if tools else 0.0
+        document_frequencies: Counter[str] = Counter()
+        for counts in self.term_counts:
+            document_frequencies.update(counts.keys())
+        self.idf = {
+            term: math.log(1 + (len(tools) - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def score(self, query: str) -> dict[str, float]:
+        """Returns the score of each tool that matches at least one word of the query."""
+        terms = [term for term in set(_tokenize(query)) if term in self.idf]
+        scores: dict[str, float] = {}
+        for name, counts, length in zip(self.names, self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            score = sum(
+                self.idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                for term in terms
+                if term in counts
+            )
+            if score > 0:
+                scores[name] = score
+        return scores
+
+
+@dataclass
+class ToolSelection:
+    """The tools selected for a model call, and why each was selected."""
+
+    tools: list[Tool]
+    """The selected tools, in the order of the agent's tools."""
+
+    pinned: list[str] = field(default_factory=list)
+    """The names of the selected tools that are always sent, including the tool named by
+    `tool_choice`."""
+
+    referenced: list[str] = field(default_factory=list)
+    """The names of the selected tools that were called in the recent history."""
+
+    scores: dict[str, float] = field(default_factory=dict)
+    """The relevance scores of the tools that were selected for matching the conversation."""
+
+
+class ToolSelector(abc.ABC):
+    """Selects the tools to send to the model on each call, so that agents with many tools don't
+    pay for every tool schema on every request. Only the model input is affected: the model can
+    only call the selected tools, but all of the agent's tools remain available to the run."""
+
+    @abc.abstractmethod
+    def select_tools(
+        self,
+        agent: Agent[Any],
+        input: list[TResponseInputItem],
+        tool_choice: str | None = None,
+    ) -> ToolSelection:
+        """Selects the agent's tools to send to the model.
+
+        Args:
+            agent: The agent that is about to call the model.
+            input: The model input, i.e. the conversation history.
+            tool_choice: The `tool_choice` of the model call. If it names a tool, that tool must
+                be selected, since the model API rejects requests that force a tool they don't
+                include.
+        """
+        pass
+
+
+class BM25ToolSelector(ToolSelector):
+    """Selects the function tools that best match the current turn of the conversation, ranked
+    with BM25 over their names, descriptions and parameter docs. The index is local, and is built
+    once per agent (and rebuilt if its tools change).
+
+    Pinned tools, the tool named by `tool_choice`, tools that were called in the recent history,
+    and tools that aren't function tools (e.g. hosted tools) are always selected. If an agent has
+    no more than `top_k` function tools, or if no tool matches the current turn (e.g. a follow-up
+    like "yes, go ahead"), all of them are selected.
+    """
+
+    def __init__(
+        self,
+        top_k: int = 10,
+        pinned_tools: Sequence[str] = (),
+        recent_turns: int = 4,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> None:
+        """
+        Args:
+            top_k: The maximum number of function tools to select by relevance, on top of the
+                pinned and recently called tools.
+            pinned_tools: The names of tools that are always selected.
+            recent_turns: The number of most recent turns (see `split_turns()`) whose tool calls
+                keep the called tools selected.
+            k1: The BM25 term frequency saturation.
+            b: The BM25 document length normalization.
+        """
+        if top_k < 1:
+            raise UserError("top_k must be at least 1")
+        if recent_turns < 0:
+            raise UserError("recent_turns must not be negative")
+        self.top_k = top_k
+        self.pinned_tools = set(pinned_tools)
+        self.recent_turns = recent_turns
+        self.k1 = k1
+        self.b = b
+        self._indexes: dict[int, tuple[tuple[FunctionTool, ...], _BM25Index]] = {}
+
+    def _get_index(self, agent: Agent[Any]) -> _BM25Index:
+        """Returns the index of the agent's function tools, building it if the agent is new or
+        its tools changed."""
+        tools = tuple(tool for tool in agent.tools if isinstance(tool, FunctionTool))
+        cached = self._indexes.get(id(agent))
+        # Compare the tools by identity: the cached tuple keeps them alive, so their IDs can't
+        # be reused by other tools.
+        if cached is not None and len(cached[0]) == len(tools):
+            if all(a is b for a, b in zip(cached[0], tools)):
+                return cached[1]
+        if len(self._indexes) >= _MAX_CACHED_INDEXES:
+            self._indexes.clear()
+        index = _BM25Index(tools, self.k1, self.b)
+        self._indexes[id(agent)] = (tools, index)
+        return index
+
+    def select_tools(
+        self,
+        agent: Agent[Any],
+        input: list[TResponseInputItem],
+        tool_choice: str | None = None,
+    ) -> ToolSelection:
+        function_tools = [tool for tool in agent.tools if isinstance(tool, FunctionTool)]
+        if len(function_tools) <= self.top_k:
+            return ToolSelection(tools=agent.tools)
+
+        scores = self._get_index(agent).score(self._current_turn_text(input))
+        if not scores:
+            # Without any match, a selection would only be a guess, and could leave the model
+            # without the tool it needs (or without any tool, e.g. with `tool_choice="required"`)
+            return ToolSelection(tools=agent.tools)
+        referenced = self._recently_called_tools(input)
+        ranked = sorted(scores, key=lambda name: scores[name], reverse=True)[: self.top_k]
+        retrieved = set(ranked)
+        pinned = self.pinned_tools
+        if tool_choice not in (None, "auto", "required", "none"):
+            pinned = pinned | {tool_choice}
+
+        selection = ToolSelection(tools=[])
+        for tool in agent.tools:
+            if not isinstance(tool, FunctionTool):
+                selection.tools.append(tool)
+            elif tool.name in pinned:
+                selection.tools.append(tool)
+                selection.pinned.append(tool.name)
+            elif tool.name in referenced:
+                selection.tools.append(tool)
+                selection.referenced.append(tool.name)
+            elif tool.name in retrieved:
+                selection.tools.append(tool)
+                selection.scores[tool.name] = scores[tool.name]
+        return selection
+
+    def _recently_called_tools(self, input: list[TResponseInputItem]) -> set[str]:
+        if self.recent_turns == 0:
+            return set()
+        recent_items = [item for turn in split_turns(input)[-self.recent_turns :] for item in turn]
+        return {
+            str(item["name"])  # type: ignore[typeddict-item]
+            for item in recent_items
+            if item.get("type") == "function_call"
+        }
+
+    def _current_turn_text(self, input: list[TResponseInputItem]) -> str:
+        """Returns the text of the last user message, and of the items after it."""
+        start = 0
+        for i, item in enumerate(input):
+            if item.get("role") == "user":
+                start = i
+        return " ".join(_item_text(item) for item in input[start:])
+
+
+def _item_text(item: TResponseInputItem) -> str:
+    content = item.get("content", item.get("output"))
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(
+            str(part["text"])
+            for part in content
+            if isinstance(part, dict) and isinstance(part.get("text"), str)
+        )
+    return ""
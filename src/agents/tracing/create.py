@@ -4,6 +4,7 @@ from collections.abc import Mapping, Sequence
 from typing import TYPE_CHECKING, Any
 
 from ..logger import logger
+from .scope import Scope
 from .setup import GLOBAL_TRACE_PROVIDER
 from .span_data import (
     AgentSpanData,
@@ -160,7 +161,8 @@ def generation_span(
 
     This span captures the details of a model generation, including the
     input message sequence, any generated outputs, the model name and
-    configuration, and usage data. If you only need to capture a model
+    configuration, and usage data. If a `RoutingModelProvider` routed the
+    request, the span also records how. If you only need to capture a model
     response identifier, use `response_span()` instead.
 
     Args:
@@ -181,7 +183,12 @@ def generation_span(
     """
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=GenerationSpanData(
-            input=input, output=output, model=model, model_config=model_config, usage=usage
+            input=input,
+            output=output,
+            model=model,
+            model_config=model_config,
+            usage=usage,
+            routing=Scope.get_current_model_routing(),
         ),
         span_id=span_id,
         parent=parent,
@@ -208,7 +215,7 @@ def response_span(
         disabled: If True, we will return a Span but the Span will not be recorded.
     """
     return GLOBAL_TRACE_PROVIDER.create_span(
-        span_data=ResponseSpanData(response=response),
+        span_data=ResponseSpanData(response=response, routing=Scope.get_current_model_routing()),
         span_id=span_id,
         parent=parent,
         disabled=disabled,
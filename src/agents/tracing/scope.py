@@ -16,6 +16,10 @@ _current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar(
     "current_trace", default=None
 )
 
+_current_model_routing: contextvars.ContextVar["dict[str, Any] | None"] = contextvars.ContextVar(
+    "current_model_routing", default=None
+)
+
 
 class Scope:
     @classmethod
@@ -43,3 +47,17 @@ class Scope:
     def reset_current_trace(cls, token: "contextvars.Token[Trace | None]") -> None:
         logger.debug("Resetting current trace")
         _current_trace.reset(token)
+
+    @classmethod
+    def get_current_model_routing(cls) -> "dict[str, Any] | None":
+        return _current_model_routing.get()
+
+    @classmethod
+    def set_current_model_routing(
+        cls, routing: "dict[str, Any] | None"
+    ) -> "contextvars.Token[dict[str, Any] | None]":
+        return _current_model_routing.set(routing)
+
+    @classmethod
+    def reset_current_model_routing(cls, token: "contextvars.Token[dict[str, Any] | None]") -> None:
+        _current_model_routing.reset(token)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import abc
-from collections.abc import Mapping, Sequence
+from collections.abc import Callable, Mapping, Sequence
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
@@ -9,6 +9,8 @@ if TYPE_CHECKING:
 
 
 class SpanData(abc.ABC):
+    __slots__ = ()
+
     @abc.abstractmethod
     def export(self) -> dict[str, Any]:
         pass
@@ -69,13 +71,44 @@ class FunctionSpanData(SpanData):
         }
 
 
-class GenerationSpanData(SpanData):
+class _ModelSpanData(SpanData):
+    """The data of the span of a model request."""
+
+    __slots__ = ("_token_attribution", "_get_token_attribution")
+
+    def __init__(self, token_attribution: dict[str, Any] | None = None) -> None:
+        self._token_attribution = token_attribution
+        self._get_token_attribution: Callable[[], dict[str, Any]] | None = None
+
+    @property
+    def token_attribution(self) -> dict[str, Any] | None:
+        """The estimated input tokens of the request, by where they come from. Not used by the
+        OpenAI trace processors, but useful for other tracing processor implementations.
+        """
+        if self._get_token_attribution is not None:
+            self._token_attribution = self._get_token_attribution()
+            self._get_token_attribution = None
+        return self._token_attribution
+
+    @token_attribution.setter
+    def token_attribution(self, token_attribution: dict[str, Any] | None) -> None:
+        self._token_attribution = token_attribution
+        self._get_token_attribution = None
+
+    def defer_token_attribution(self, get_token_attribution: Callable[[], dict[str, Any]]) -> None:
+        """Sets a function that computes the token attribution the first time it's read, so that
+        requests don't pay for it unless a tracing processor uses it."""
+        self._get_token_attribution = get_token_attribution
+
+
+class GenerationSpanData(_ModelSpanData):
     __slots__ = (
         "input",
         "output",
         "model",
         "model_config",
         "usage",
+        "routing",
     )
 
     def __init__(
@@ -85,12 +118,18 @@ class GenerationSpanData(SpanData):
         model: str | None = None,
         model_config: Mapping[str, Any] | None = None,
         usage: dict[str, Any] | None = None,
+        token_attribution: dict[str, Any] | None = None,
+        routing: dict[str, Any] | None = None,
     ):
+        super().__init__(token_attribution)
         self.input = input
         self.output = output
         self.model = model
         self.model_config = model_config
         self.usage = usage
+        # How a `RoutingModelProvider` routed the request, if it did. Not used by the OpenAI trace
+        # processors, but useful for other tracing processor implementations
+        self.routing = routing
 
     @property
     def type(self) -> str:
@@ -107,18 +146,22 @@ class GenerationSpanData(SpanData):
         }
 
 
-class ResponseSpanData(SpanData):
-    __slots__ = ("response", "input")
+class ResponseSpanData(_ModelSpanData):
+    __slots__ = ("response", "input", "routing")
 
     def __init__(
         self,
         response: Response | None = None,
         input: str | list[ResponseInputItemParam] | None = None,
+        token_attribution: dict[str, Any] | None = None,
+        routing: dict[str, Any] | None = None,
     ) -> None:
+        super().__init__(token_attribution)
         self.response = response
-        # This is not used by the OpenAI trace processors, but is useful for other tracing
+        # These are not used by the OpenAI trace processors, but are useful for other tracing
         # processor implementations
         self.input = input
+        self.routing = routing
 
     @property
     def type(self) -> str:
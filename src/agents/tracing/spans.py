@@ -21,6 +21,8 @@ class SpanError(TypedDict):
 
 
 class Span(abc.ABC, Generic[TSpanData]):
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def trace_id(self) -> str:
@@ -15,6 +15,8 @@ class Trace:
     A trace is the root level object that tracing creates. It represents a logical "workflow".
     """
 
+    __slots__ = ()
+
     @abc.abstractmethod
     def __enter__(self) -> Trace:
         pass
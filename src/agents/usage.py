@@ -1,7 +1,7 @@
-from dataclasses import dataclass
+from ._dataclasses import slotted_dataclass
 
 
-@dataclass
+@slotted_dataclass
 class Usage:
     requests: int = 0
     """Total requests made to the LLM API."""
@@ -15,8 +15,13 @@ class Usage:
     total_tokens: int = 0
     """Total tokens sent and received, across all requests."""
 
+    cached_input_tokens: int = 0
+    """Total input tokens that were served from the provider's prompt cache, across all requests.
+    Only reported by some providers."""
+
     def add(self, other: "Usage") -> None:
         self.requests += other.requests if other.requests else 0
         self.input_tokens += other.input_tokens if other.input_tokens else 0
         self.output_tokens += other.output_tokens if other.output_tokens else 0
         self.total_tokens += other.total_tokens if other.total_tokens else 0
+        self.cached_input_tokens += other.cached_input_tokens if other.cached_input_tokens else 0
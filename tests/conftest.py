@@ -31,6 +31,8 @@ def clear_openai_settings():
     _openai_shared._default_openai_key = None
     _openai_shared._default_openai_client = None
     _openai_shared._use_responses_by_default = True
+    _openai_shared._default_rate_limiter = None
+    _openai_shared._default_http_client_pool = None
 
 
 # This fixture will run after all tests end
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from agents import Agent, BatchedModel, BatchRequestError, Runner, UserError, function_tool
+from agents.model_settings import ModelSettings
+from agents.models.interface import ModelTracing
+
+
+def chat_completion(message: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+class LocalBatchAPI:
+    """A local stand-in for the files and batches endpoints of the OpenAI API. Each batch is
+    completed after being polled `polls_until_done` times, answering each request with `answer`."""
+
+    def __init__(self, polls_until_done: int = 1):
+        self.polls_until_done = polls_until_done
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict[str, Any]] = {}
+        self.batch_requests: list[list[dict[str, Any]]] = []
+        self.cancelled: list[str] = []
+
+    def answer(self, request: dict[str, Any]) -> dict[str, Any]:
+        last_message = request["body"]["messages"][-1]
+        if last_message["role"] == "tool":
+            text = f"tool said {last_message['content']}"
+            return {
+                "status_code": 200,
+                "body": chat_completion({"role": "assistant", "content": text}),
+            }
+        if last_message["content"] == "fail":
+            return {"status_code": 400, "body": {"error": {"message": "bad request"}}}
+        if last_message["content"] == "use tool":
+            return {
+                "status_code": 200,
+                "body": chat_completion(
+                    {
+                        "role": "assistant",
+                        "content": None,
+                        "tool_calls": [
+                            {
+                                "id": "call_1",
+                                "type": "function",
+                                "function": {"name": "get_weather", "arguments": "{}"},
+                            }
+                        ],
+                    }
+                ),
+            }
+        text = f"echo {last_message['content']}"
+        return {"status_code": 200, "body": chat_completion({"role": "assistant", "content": text})}
+
+    def client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key="sk-test",
+            base_url="http://batch.test/v1",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle)),
+        )
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/files":
+            file_id = f"file-{len(self.files)}"
+            # Pick the JSONL lines out of the multipart body
+            self.files[file_id] = b"\n".join(
+                line for line in request.content.splitlines() if line.startswith(b'{"custom_id"')
+            )
+            return httpx.Response(200, json=self.file_object(file_id))
+
+        if request.method == "POST" and path == "/v1/batches":
+            body = json.loads(request.content)
+            requests = [json.loads(line) for line in self.files[body["input_file_id"]].splitlines()]
+            self.batch_requests.append(requests)
+            batch = {
+                "id": f"batch-{len(self.batches)}",
+                "object": "batch",
+                "endpoint": body["endpoint"],
+                "input_file_id": body["input_file_id"],
+                "completion_window": body["completion_window"],
+                "created_at": 0,
+                "status": "validating",
+                "metadata": body.get("metadata"),
+                "polls": 0,
+                "requests": requests,
+            }
+            self.batches[batch["id"]] = batch
+            return httpx.Response(200, json=self.batch_object(batch))
+
+        if path.startswith("/v1/batches/"):
+            batch_id = path.split("/")[3]
+            batch = self.batches[batch_id]
+            if path.endswith("/cancel"):
+                self.cancelled.append(batch_id)
+                batch["status"] = "cancelled"
+            else:
+                batch["polls"] += 1
+                if batch["status"] != "cancelled" and batch["polls"] >= self.polls_until_done:
+                    self.complete(batch)
+                else:
+                    batch["status"] = "in_progress"
+            return httpx.Response(200, json=self.batch_object(batch))
+
+        if request.method == "GET" and path.endswith("/content"):
+            file_id = path.split("/")[3]
+            return httpx.Response(200, content=self.files[file_id])
+
+        return httpx.Response(404, json={"error": {"message": f"Unknown endpoint {path}"}})
+
+    def complete(self, batch: dict[str, Any]) -> None:
+        output: list[str] = []
+        errors: list[str] = []
+        for request in batch["requests"]:
+            response = self.answer(request)
+            result = {"id": "result", "custom_id": request["custom_id"], "response": response}
+            (output if response["status_code"] == 200 else errors).append(json.dumps(result))
+
+        batch["status"] = "completed"
+        for key, lines in (("output_file_id", output), ("error_file_id", errors)):
+            if lines:
+                file_id = f"file-{len(self.files)}"
+                self.files[file_id] = "\n".join(lines).encode()
+                batch[key] = file_id
+
+    def file_object(self, file_id: str) -> dict[str, Any]:
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(self.files[file_id]),
+            "created_at": 0,
+            "filename": "batch.jsonl",
+            "purpose": "batch",
+            "status": "processed",
+        }
+
+    @staticmethod
+    def batch_object(batch: dict[str, Any]) -> dict[str, Any]:
+        return {key: value for key, value in batch.items() if key not in ("polls", "requests")}
+
+
+def get_model(api: LocalBatchAPI, **kwargs: Any) -> BatchedModel:
+    kwargs.setdefault("batch_window", 0.01)
+    kwargs.setdefault("poll_interval", 0.01)
+    return BatchedModel("gpt-4o", api.client(), **kwargs)
+
+
+async def get_text(model: BatchedModel, input: str) -> str:
+    response = await model.get_response(
+        None, input, ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+    return response.output[0].content[0].text  # type: ignore
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_sent_in_one_batch():
+    api = LocalBatchAPI(polls_until_done=2)
+    model = get_model(api, metadata={"job": "nightly"})
+
+    texts = await asyncio.gather(*(get_text(model, f"question {i}") for i in range(5)))
+
+    assert texts == [f"echo question {i}" for i in range(5)]
+    assert len(api.batch_requests) == 1
+    requests = api.batch_requests[0]
+    assert len({request["custom_id"] for request in requests}) == 5
+    assert all(request["url"] == "/v1/chat/completions" for request in requests)
+    assert all(request["body"]["model"] == "gpt-4o" for request in requests)
+    assert all("stream" not in request["body"] for request in requests)
+    assert api.batches["batch-0"]["metadata"] == {"job": "nightly"}
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_full_batches_are_submitted_right_away():
+    api = LocalBatchAPI()
+    model = get_model(api, max_batch_size=2, batch_window=60)
+
+    texts = await asyncio.gather(*(get_text(model, f"q{i}") for i in range(4)))
+
+    assert texts == ["echo q0", "echo q1", "echo q2", "echo q3"]
+    assert [len(requests) for requests in api.batch_requests] == [2, 2]
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_failed_requests_raise_without_affecting_the_others():
+    api = LocalBatchAPI()
+    model = get_model(api)
+
+    results = await asyncio.gather(
+        get_text(model, "hello"), get_text(model, "fail"), return_exceptions=True
+    )
+
+    assert results[0] == "echo hello"
+    assert isinstance(results[1], BatchRequestError)
+    assert results[1].batch_id == "batch-0"
+    assert "bad request" in results[1].message
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_requests_without_a_result_raise():
+    api = LocalBatchAPI()
+    api.complete = lambda batch: batch.update(status="expired")  # type: ignore
+    model = get_model(api)
+
+    with pytest.raises(BatchRequestError, match="expired"):
+        await get_text(model, "hello")
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_errors_submitting_the_batch_are_raised_to_every_caller():
+    api = LocalBatchAPI()
+    api.handle = lambda request: httpx.Response(500, json={"error": {"message": "down"}})  # type: ignore
+    model = get_model(api)
+    model._client = AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://batch.test/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(api.handle)),
+    )
+
+    results = await asyncio.gather(
+        get_text(model, "a"), get_text(model, "b"), return_exceptions=True
+    )
+
+    assert all(isinstance(result, BatchRequestError) for result in results)
+    assert all(result.batch_id is None for result in results)  # type: ignore
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_batch_is_cancelled_when_no_caller_waits():
+    api = LocalBatchAPI(polls_until_done=1000)
+    model = get_model(api)
+
+    task = asyncio.create_task(get_text(model, "hello"))
+    while not api.batches:
+        await asyncio.sleep(0.005)
+    task.cancel()
+    while model._batch_tasks:
+        await asyncio.sleep(0.005)
+
+    assert api.cancelled == ["batch-0"]
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_cancelled_requests_are_not_submitted():
+    api = LocalBatchAPI()
+    model = get_model(api, batch_window=0.05)
+
+    cancelled = asyncio.create_task(get_text(model, "never mind"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await get_text(model, "hello") == "echo hello"
+    assert len(api.batch_requests[0]) == 1
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_streaming_is_not_supported():
+    model = get_model(LocalBatchAPI())
+
+    with pytest.raises(UserError):
+        async for _ in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        ):
+            pass
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_multi_turn_runs_progress_one_batch_per_turn():
+    api = LocalBatchAPI()
+
+    @function_tool
+    def get_weather() -> str:
+        return "sunny"
+
+    agent = Agent(name="test", model=get_model(api), tools=[get_weather])
+
+    results = await asyncio.gather(
+        Runner.run(agent, input="use tool"), Runner.run(agent, input="hello")
+    )
+
+    assert results[0].final_output == "tool said sunny"
+    assert results[1].final_output == "echo hello"
+    # Both runs' first turns share a batch, the tool run's second turn gets its own
+    assert [len(requests) for requests in api.batch_requests] == [2, 1]
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+
+from agents import (
+    Agent,
+    CancellationToken,
+    GuardrailFunctionOutput,
+    InputGuardrail,
+    InputGuardrailTripwireTriggered,
+    Runner,
+    function_tool,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from agents.model_settings import ModelSettings
+from agents.models.interface import ModelTracing
+from agents.run_context import RunContextWrapper
+from agents.tool import Tool
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+class HangingModel(FakeModel):
+    """A model whose responses never complete, until they are cancelled."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def _hang(self) -> None:
+        self.started.set()
+        try:
+            await asyncio.sleep(1000)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        if self.turn_outputs:
+            return await super().get_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+            )
+        await self._hang()
+        raise AssertionError("unreachable")
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        if self.turn_outputs:
+            async for event in super().stream_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+            ):
+                yield event
+            return
+        await self._hang()
+        yield  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_cancel_token_cancels_in_flight_model_call():
+    model = HangingModel()
+    agent = Agent(name="test", model=model)
+    token = CancellationToken()
+
+    task = asyncio.create_task(Runner.run(agent, input="test", cancel_token=token))
+    await asyncio.wait_for(model.started.wait(), timeout=1)
+    token.cancel()
+
+    result = await asyncio.wait_for(task, timeout=1)
+    assert result.is_cancelled
+    assert result.final_output is None
+    assert result.new_items == []
+    assert model.cancelled, "the model call should have been cancelled"
+
+
+@pytest.mark.asyncio
+async def test_cancel_token_returns_partial_results():
+    model = HangingModel()
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "tool_result")])
+    model.set_next_output([get_text_message("a_message"), get_function_tool_call("foo", "")])
+    token = CancellationToken()
+
+    task = asyncio.create_task(Runner.run(agent, input="test", cancel_token=token))
+    await asyncio.wait_for(model.started.wait(), timeout=1)
+    token.cancel()
+
+    result = await asyncio.wait_for(task, timeout=1)
+    assert result.is_cancelled
+    assert len(result.raw_responses) == 1, "the first turn completed before cancellation"
+    assert len(result.new_items) == 3, "message, tool call and tool output from turn 1"
+    assert result.last_agent == agent
+
+
+@pytest.mark.asyncio
+async def test_cancel_token_does_not_affect_completed_run():
+    model = FakeModel()
+    agent = Agent(name="test", model=model)
+    model.set_next_output([get_text_message("done")])
+    token = CancellationToken()
+
+    result = await Runner.run(agent, input="test", cancel_token=token)
+    token.cancel()
+    # Give the loop a chance to process the cancellation callback; it must not leak into us.
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert not result.is_cancelled
+    assert result.final_output == "done"
+
+
+@pytest.mark.asyncio
+async def test_already_cancelled_token_cancels_run_immediately():
+    model = HangingModel()
+    agent = Agent(name="test", model=model)
+    token = CancellationToken()
+    token.cancel()
+
+    result = await asyncio.wait_for(Runner.run(agent, input="test", cancel_token=token), 1)
+    assert result.is_cancelled
+    assert result.raw_responses == []
+
+
+@pytest.mark.asyncio
+async def test_streamed_cancel_stops_background_run():
+    model = HangingModel()
+    agent = Agent(name="test", model=model)
+
+    result = Runner.run_streamed(agent, input="test")
+
+    async def cancel_when_started() -> None:
+        await model.started.wait()
+        result.cancel()
+
+    canceller = asyncio.create_task(cancel_when_started())
+    events = [event async for event in result.stream_events()]
+    await canceller
+
+    assert len(events) == 1, "only the initial agent updated event was produced"
+    assert result.is_cancelled
+    assert result.is_complete
+    assert result.final_output is None
+    assert model.cancelled
+    assert result._run_impl_task is not None and result._run_impl_task.done()
+
+
+@pytest.mark.asyncio
+async def test_streamed_cancel_token():
+    model = HangingModel()
+    agent = Agent(name="test", model=model)
+    token = CancellationToken()
+
+    result = Runner.run_streamed(agent, input="test", cancel_token=token)
+    await asyncio.wait_for(model.started.wait(), timeout=1)
+    token.cancel()
+
+    async for _ in result.stream_events():
+        pass
+
+    assert result.is_cancelled
+    assert model.cancelled
+
+
+@pytest.mark.asyncio
+async def test_streamed_cancel_after_completion_is_noop():
+    model = FakeModel()
+    agent = Agent(name="test", model=model)
+    model.set_next_output([get_text_message("done")])
+
+    result = Runner.run_streamed(agent, input="test")
+    async for _ in result.stream_events():
+        pass
+
+    result.cancel()
+    assert not result.is_cancelled
+    assert result.final_output == "done"
+
+
+def get_tripping_input_guardrail(model: HangingModel) -> InputGuardrail[Any]:
+    async def guardrail_function(
+        context: RunContextWrapper[Any], agent: Agent[Any], input: Any
+    ) -> GuardrailFunctionOutput:
+        # Trip only once the model call is in flight, as with a real guardrail that is slower to
+        # start than the model request.
+        await model.started.wait()
+        return GuardrailFunctionOutput(output_info=None, tripwire_triggered=True)
+
+    return InputGuardrail(guardrail_function=guardrail_function)
+
+
+@pytest.mark.asyncio
+async def test_input_guardrail_tripwire_cancels_in_flight_model_call():
+    model = HangingModel()
+    agent = Agent(name="test", model=model, input_guardrails=[get_tripping_input_guardrail(model)])
+
+    start = time.monotonic()
+    with pytest.raises(InputGuardrailTripwireTriggered):
+        await asyncio.wait_for(Runner.run(agent, input="blocked input"), timeout=1)
+    elapsed = time.monotonic() - start
+
+    # The model call is cancelled before the run returns, so a blocked input costs no more than
+    # the guardrail itself, instead of a full (never-ending, here) model call.
+    assert model.cancelled, "the model call should have been cancelled"
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_input_guardrail_tripwire_cancels_in_flight_model_call_streamed():
+    model = HangingModel()
+    agent = Agent(name="test", model=model, input_guardrails=[get_tripping_input_guardrail(model)])
+
+    start = time.monotonic()
+    result = Runner.run_streamed(agent, input="blocked input")
+    with pytest.raises(InputGuardrailTripwireTriggered):
+        async for _ in result.stream_events():
+            pass
+    elapsed = time.monotonic() - start
+
+    assert model.cancelled, "the model stream should have been cancelled"
+    assert elapsed < 0.5
+    assert result.is_complete
+    assert result._run_impl_task is not None and result._run_impl_task.done()
+    assert result.raw_responses == [], "no model response, so no tokens used"
+    assert len(result.input_guardrail_results) == 1
+
+
+@pytest.mark.asyncio
+async def test_input_guardrail_tripwire_cancels_tools():
+    tool_started = asyncio.Event()
+    tool_cancelled = False
+
+    async def slow_tool() -> str:
+        nonlocal tool_cancelled
+        tool_started.set()
+        try:
+            await asyncio.sleep(1000)
+        except asyncio.CancelledError:
+            tool_cancelled = True
+            raise
+        return "unreachable"
+
+    async def guardrail_function(
+        context: RunContextWrapper[Any], agent: Agent[Any], input: Any
+    ) -> GuardrailFunctionOutput:
+        await tool_started.wait()
+        return GuardrailFunctionOutput(output_info=None, tripwire_triggered=True)
+
+    model = FakeModel()
+    model.set_next_output([get_function_tool_call("slow_tool", "{}")])
+    agent = Agent(
+        name="test",
+        model=model,
+        tools=[function_tool(slow_tool)],
+        input_guardrails=[InputGuardrail(guardrail_function=guardrail_function)],
+    )
+
+    with pytest.raises(InputGuardrailTripwireTriggered):
+        await asyncio.wait_for(Runner.run(agent, input="blocked input"), timeout=1)
+
+    assert tool_cancelled, "the running tool should have been cancelled"
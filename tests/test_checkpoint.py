@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from agents import (
+    Agent,
+    CheckpointStore,
+    FileCheckpointStore,
+    HandoffOutputItem,
+    MaxTurnsExceeded,
+    ModelSettings,
+    RunConfig,
+    Runner,
+    RunState,
+    SQLiteCheckpointStore,
+    ToolCallOutputItem,
+    UserError,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseOutputItem
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+
+from .fake_model import FakeModel
+from .test_responses import (
+    get_function_tool,
+    get_function_tool_call,
+    get_handoff_tool_call,
+    get_text_message,
+)
+from .testing_processor import fetch_traces
+
+
+class RecordingModel(FakeModel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.inputs: list[list[TResponseInputItem]] = []
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        assert isinstance(input, list)
+        self.inputs.append(input)
+        return await super().get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+
+
+class RecordingStore(FileCheckpointStore):
+    """Records the number of items each checkpoint saved."""
+
+    def __init__(self, directory: Path) -> None:
+        super().__init__(directory)
+        self.saves: list[tuple[int, int]] = []
+
+    async def save(self, state: RunState, start: int) -> None:
+        self.saves.append((start, len(state.generated_items) - start))
+        await super().save(state, start)
+
+
+def get_store(backend: str, tmp_path: Path) -> CheckpointStore:
+    if backend == "file":
+        return FileCheckpointStore(tmp_path / "checkpoints")
+    return SQLiteCheckpointStore(tmp_path / "checkpoints.db")
+
+
+def tool_calls(count: int) -> list[list[TResponseOutputItem] | Exception]:
+    return [[get_function_tool_call("foo", f'{{"turn": {i}}}')] for i in range(count)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["file", "sqlite"])
+async def test_run_resumes_after_a_crash(backend: str, tmp_path: Path):
+    store = get_store(backend, tmp_path)
+    model = RecordingModel()
+    model.add_multiple_turn_outputs(
+        tool_calls(3) + [ConnectionError("process died")] + [[get_text_message("done")]]
+    )
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+    run_config = RunConfig(checkpoint_store=store, run_id="run-1")
+
+    with pytest.raises(ConnectionError):
+        await Runner.run(agent, "hi", run_config=run_config)
+
+    assert await store.list_runs() == ["run-1"]
+    state = await store.load("run-1")
+    assert state is not None
+    assert state.current_turn == 3
+    assert state.current_agent == "test"
+    assert state.original_input == "hi"
+    assert len(state.generated_items) == 6
+    assert state.trace_id is not None
+
+    result = await Runner.resume(state, [agent], run_config=run_config)
+
+    assert result.final_output == "done"
+    # The completed turns aren't run again, and the resumed turn has the same input as the one
+    # that crashed
+    assert len(model.inputs) == 5
+    assert model.inputs[4] == model.inputs[3]
+    assert len(model.inputs[4]) == 1 + 6
+    assert len(result.new_items) == 7
+    assert isinstance(result.new_items[1], ToolCallOutputItem)
+    assert result.new_items[1].output == "result"
+    assert len(result.raw_responses) == 1
+    # The checkpoint is deleted once the run completes
+    assert await store.list_runs() == []
+    assert await store.load("run-1") is None
+    # The resumed run continues the trace
+    traces = fetch_traces()
+    assert len(traces) == 2
+    assert traces[1].trace_id == state.trace_id
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streamed", [False, True])
+async def test_checkpoints_only_save_new_items(streamed: bool, tmp_path: Path):
+    store = RecordingStore(tmp_path)
+    model = FakeModel()
+    model.add_multiple_turn_outputs(tool_calls(3) + [[get_text_message("done")]])
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+    run_config = RunConfig(checkpoint_store=store)
+
+    if streamed:
+        result = Runner.run_streamed(agent, "hi", run_config=run_config)
+        async for _ in result.stream_events():
+            pass
+    else:
+        await Runner.run(agent, "hi", run_config=run_config)
+
+    assert store.saves == [(0, 2), (2, 2), (4, 2)]
+    assert await store.list_runs() == []
+
+
+@pytest.mark.asyncio
+async def test_resumed_run_continues_with_the_handoff_target(tmp_path: Path):
+    store = RecordingStore(tmp_path)
+    model = FakeModel()
+    triage = Agent(name="triage", model=model)
+    specialist = Agent(name="specialist", model=model, tools=[get_function_tool("foo", "result")])
+    triage.handoffs = [specialist]
+    model.add_multiple_turn_outputs(
+        [[get_handoff_tool_call(specialist)]]
+        + tool_calls(1)
+        + [ConnectionError("process died")]
+        + tool_calls(1)
+        + [[get_text_message("done")]]
+    )
+    run_config = RunConfig(checkpoint_store=store, run_id="handoff")
+
+    with pytest.raises(ConnectionError):
+        await Runner.run(triage, "hi", run_config=run_config)
+    state = await store.load("handoff")
+    assert state is not None
+    assert state.current_agent == "specialist"
+
+    with pytest.raises(UserError, match="specialist"):
+        await Runner.resume(state, [triage], run_config=run_config)
+
+    result = await Runner.resume(
+        state, {"triage": triage, "specialist": specialist}, run_config=run_config
+    )
+
+    assert result.final_output == "done"
+    assert result.last_agent is specialist
+    handoff_output = result.new_items[1]
+    assert isinstance(handoff_output, HandoffOutputItem)
+    assert handoff_output.source_agent is triage
+    assert handoff_output.target_agent is specialist
+    # The resumed run saves its first checkpoint in full, then only the new items
+    assert store.saves == [(0, 2), (2, 2), (0, 6)]
+
+
+@pytest.mark.asyncio
+async def test_resumed_run_counts_the_turns_of_the_checkpoint(tmp_path: Path):
+    store = FileCheckpointStore(tmp_path)
+    model = FakeModel()
+    model.add_multiple_turn_outputs(tool_calls(3) + [ConnectionError("process died")])
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+    run_config = RunConfig(checkpoint_store=store, run_id="turns")
+
+    with pytest.raises(ConnectionError):
+        await Runner.run(agent, "hi", run_config=run_config)
+    state = await store.load("turns")
+    assert state is not None
+    model.add_multiple_turn_outputs(tool_calls(2))
+
+    with pytest.raises(MaxTurnsExceeded):
+        await Runner.resume(state, [agent], run_config=run_config, max_turns=4)
+
+
+@pytest.mark.asyncio
+async def test_file_store_ignores_a_partly_written_checkpoint(tmp_path: Path):
+    store = FileCheckpointStore(tmp_path)
+    state = RunState(
+        run_id="partial",
+        original_input="hi",
+        generated_items=[{"type": "tool_call_output_item"}],
+        current_agent="test",
+        current_turn=1,
+    )
+    await store.save(state, 0)
+    state.generated_items.append({"type": "tool_call_output_item"})
+    state.current_turn = 2
+    line = json.dumps({"start": 1, "items": state.generated_items[1:]})
+    with (tmp_path / "partial.jsonl").open("a") as f:
+        f.write(line[: len(line) // 2])
+
+    loaded = await store.load("partial")
+
+    assert loaded is not None
+    assert loaded.current_turn == 1
+    assert len(loaded.generated_items) == 1
+
+
+@pytest.mark.asyncio
+async def test_file_store_keeps_the_checkpoint_if_a_rewrite_crashes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    store = FileCheckpointStore(tmp_path)
+    state = RunState(
+        run_id="rewrite",
+        original_input="hi",
+        generated_items=[{"type": "tool_call_output_item"}],
+        current_agent="test",
+        current_turn=1,
+    )
+    await store.save(state, 0)
+
+    def crash(src: str, dst: str) -> None:
+        # The process dies halfway through writing the rewritten checkpoint
+        with open(src, "r+") as f:
+            f.truncate(len(f.read()) // 2)
+        raise SystemExit
+
+    monkeypatch.setattr("agents.checkpoint.os.replace", crash)
+    state.generated_items.append({"type": "tool_call_output_item"})
+    state.current_turn = 2
+    with pytest.raises(SystemExit):
+        await store.save(state, 0)
+
+    loaded = await store.load("rewrite")
+
+    assert loaded is not None
+    assert loaded.current_turn == 1
+    assert len(loaded.generated_items) == 1
+    assert await store.list_runs() == ["rewrite"]
+
+
+def test_invalid_store_arguments_raise(tmp_path: Path):
+    with pytest.raises(UserError):
+        SQLiteCheckpointStore(tmp_path / "db", table_name="runs; DROP TABLE x")
+    with pytest.raises(UserError):
+        FileCheckpointStore(tmp_path)._path("../escape")
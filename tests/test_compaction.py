@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from agents import (
+    Agent,
+    CompactionPipeline,
+    ModelSettings,
+    RunConfig,
+    Runner,
+    SlidingWindowCompactor,
+    SupersededReasoningCompactor,
+    ToolOutputElisionCompactor,
+    UserError,
+    trace,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.compaction import estimate_tokens, split_turns
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+from agents.tracing.span_data import CustomSpanData
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+from .testing_processor import fetch_ordered_spans
+
+
+def user(content: str) -> TResponseInputItem:
+    return {"role": "user", "content": content}
+
+
+def assistant(content: str) -> TResponseInputItem:
+    return {"role": "assistant", "content": content}
+
+
+def reasoning(id: str) -> TResponseInputItem:
+    return {"type": "reasoning", "id": id, "summary": []}
+
+
+def call(call_id: str) -> TResponseInputItem:
+    return {
+        "type": "function_call",
+        "id": f"fc_{call_id}",
+        "call_id": call_id,
+        "name": "foo",
+        "arguments": "{}",
+    }
+
+
+def output(call_id: str, text: str = "ok") -> TResponseInputItem:
+    return {"type": "function_call_output", "call_id": call_id, "output": text}
+
+
+def get_history() -> list[TResponseInputItem]:
+    return [
+        {"role": "system", "content": "Be nice"},
+        user("task"),
+        reasoning("r1"),
+        call("c1"),
+        output("c1", "x" * 4000),
+        reasoning("r2"),
+        call("c2"),
+        call("c3"),
+        output("c2"),
+        output("c3", "y" * 4000),
+        assistant("progress"),
+        user("next"),
+        reasoning("r3"),
+        call("c4"),
+        output("c4", "z" * 4000),
+    ]
+
+
+def test_split_turns_keeps_calls_with_their_outputs():
+    turns = split_turns(get_history())
+
+    assert [len(turn) for turn in turns] == [1, 1, 3, 5, 1, 1, 3]
+
+
+def test_sliding_window_keeps_instructions_task_and_recent_turns():
+    history = get_history()
+
+    compacted = SlidingWindowCompactor(max_turns=2).compact(history)
+
+    assert compacted == [history[0], history[1], history[11], *history[12:]]
+
+
+def test_sliding_window_drops_oldest_turns_to_fit_budget():
+    history = get_history()
+    compactor = SlidingWindowCompactor(max_tokens=2500)
+
+    compacted = compactor.compact(history)
+
+    assert compacted == [history[0], history[1], *history[5:]]
+    assert estimate_tokens(compacted) <= 2500
+    # Histories that fit are left alone
+    assert compactor.compact(compacted) is compacted
+
+
+def test_sliding_window_always_keeps_the_latest_turn():
+    history = get_history()
+
+    compacted = SlidingWindowCompactor(max_tokens=1).compact(history)
+
+    assert compacted == [history[0], history[1], *history[12:]]
+
+
+def test_tool_output_elision_shortens_earlier_outputs():
+    history = get_history()
+
+    compacted = ToolOutputElisionCompactor(max_output_tokens=10).compact(history)
+
+    assert compacted[4]["output"] == "x" * 40 + "\n[... 990 tokens elided]"  # type: ignore
+    assert compacted[9]["output"].startswith("y" * 40 + "\n[...")  # type: ignore
+    # The latest turn's output is kept in full, and nothing is modified in place
+    assert compacted[14] is history[14]
+    assert history[4]["output"] == "x" * 4000  # type: ignore
+
+
+def test_tool_output_elision_stops_once_within_budget():
+    history = get_history()
+
+    compacted = ToolOutputElisionCompactor(max_output_tokens=10, max_tokens=2500).compact(history)
+
+    assert compacted[4] is not history[4]
+    assert compacted[9] is history[9]
+
+
+def test_superseded_reasoning_is_dropped():
+    history = get_history()
+
+    compacted = SupersededReasoningCompactor().compact(history)
+
+    assert [item.get("id") for item in compacted if item.get("type") == "reasoning"] == ["r3"]
+    assert len(compacted) == len(history) - 2
+
+
+def test_tool_calls_stay_paired():
+    class DropOutput(SlidingWindowCompactor):
+        def compact_items(self, items: list[TResponseInputItem]) -> list[TResponseInputItem]:
+            return [item for item in items if item is not items[8]]
+
+    history = get_history()
+
+    compacted = DropOutput(max_turns=1).compact(history)
+
+    assert call("c2") not in compacted
+    assert call("c3") in compacted
+    assert output("c2") not in compacted
+
+
+def test_pipeline_stops_once_within_budget():
+    history = get_history()
+    window = SlidingWindowCompactor(max_turns=1)
+    pipeline = CompactionPipeline(
+        [SupersededReasoningCompactor(), ToolOutputElisionCompactor(max_output_tokens=10), window],
+        max_tokens=1500,
+    )
+
+    compacted = pipeline.compact(history)
+
+    # Eliding the outputs was enough, so the window wasn't applied
+    assert len(compacted) == len(history) - 2
+    assert estimate_tokens(compacted) <= 1500
+
+
+def test_invalid_settings_raise():
+    with pytest.raises(UserError):
+        SlidingWindowCompactor()
+    with pytest.raises(UserError):
+        SlidingWindowCompactor(max_turns=0)
+    with pytest.raises(UserError):
+        ToolOutputElisionCompactor(max_tokens=0)
+
+
+class RecordingModel(FakeModel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.inputs: list[list[TResponseInputItem]] = []
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        assert isinstance(input, list)
+        self.inputs.append(input)
+        return await super().get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+
+    async def stream_response(self, system_instructions, input, *args: Any, **kwargs: Any):
+        assert isinstance(input, list)
+        self.inputs.append(input)
+        async for event in super().stream_response(system_instructions, input, *args, **kwargs):
+            yield event
+
+
+def get_tool_loop_agent(model: RecordingModel) -> Agent[Any]:
+    model.add_multiple_turn_outputs(
+        [
+            [get_function_tool_call("foo")],
+            [get_function_tool_call("foo")],
+            [get_function_tool_call("foo")],
+            [get_text_message("done")],
+        ]
+    )
+    return Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+
+
+@pytest.mark.asyncio
+async def test_runner_compacts_model_input_but_keeps_full_history():
+    model = RecordingModel()
+    run_config = RunConfig(history_compactor=SlidingWindowCompactor(max_turns=1))
+
+    with trace("test"):
+        result = await Runner.run(get_tool_loop_agent(model), input="hi", run_config=run_config)
+
+    assert result.final_output == "done"
+    assert [len(input) for input in model.inputs] == [1, 3, 3, 3]
+    assert len(result.to_input_list()) == 8
+
+    spans = [
+        span.span_data.data
+        for span in fetch_ordered_spans()
+        if isinstance(span.span_data, CustomSpanData)
+        and span.span_data.name == "History compaction"
+    ]
+    assert [(data["input_items"], data["compacted_items"]) for data in spans] == [(5, 3), (7, 3)]
+    assert all(data["compactor"] == "SlidingWindowCompactor" for data in spans)
+    assert all(data["compacted_tokens"] < data["input_tokens"] for data in spans)
+
+
+@pytest.mark.asyncio
+async def test_streamed_runner_compacts_model_input():
+    model = RecordingModel()
+    run_config = RunConfig(history_compactor=SlidingWindowCompactor(max_turns=1))
+
+    result = Runner.run_streamed(get_tool_loop_agent(model), input="hi", run_config=run_config)
+    async for _ in result.stream_events():
+        pass
+
+    assert result.final_output == "done"
+    assert [len(input) for input in model.inputs] == [1, 3, 3, 3]
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import base64
+import copy
+import json
+import pickle
+import tracemalloc
+from typing import Any
+
+import pytest
+
+from agents import Agent, HandoffInputData, ModelSettings, RunConfig, Runner
+from agents._frozen import FrozenDict, FrozenList, freeze
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ItemHelpers, ModelResponse, TResponseInputItem, TResponseOutputItem
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+
+from .fake_model import FakeModel
+from .test_responses import (
+    get_function_tool,
+    get_function_tool_call,
+    get_handoff_tool_call,
+    get_text_message,
+)
+
+
+def get_multimodal_history(size: int = 5_000_000) -> list[TResponseInputItem]:
+    """A history of about `size` bytes, made of user messages with a base64 encoded image each,
+    and assistant replies."""
+    image = base64.b64encode(bytes(75_000)).decode()
+    items: list[TResponseInputItem] = []
+    for i in range(size // len(image)):
+        items.append(
+            {
+                "role": "user",
+                "content": [
+                    {"type": "input_text", "text": f"What is in image {i}?"},
+                    {
+                        "type": "input_image",
+                        "image_url": f"data:image/png;base64,{image}{i}",
+                        "detail": "auto",
+                    },
+                ],
+            }
+        )
+        items.extend({"role": "assistant", "content": f"It's image {i} ({j})"} for j in range(5))
+    items.append({"role": "user", "content": "Describe them all"})
+    return items
+
+
+def test_frozen_items_are_read_only():
+    item = freeze({"role": "user", "content": [{"type": "input_text", "text": "hi"}]})
+
+    assert isinstance(item, FrozenDict)
+    assert isinstance(item["content"], FrozenList)
+    with pytest.raises(TypeError, match="read-only"):
+        item["role"] = "assistant"
+    with pytest.raises(TypeError):
+        item.update(role="assistant")
+    with pytest.raises(TypeError):
+        item["content"].append({"type": "input_text", "text": "more"})
+    with pytest.raises(TypeError):
+        item["content"][0]["text"] = "changed"
+    assert item == {"role": "user", "content": [{"type": "input_text", "text": "hi"}]}
+
+
+def test_frozen_items_copy_to_mutable_items_and_serialize():
+    original = {"role": "user", "content": [{"type": "input_text", "text": "hi"}]}
+    item = freeze(original)
+
+    thawed = copy.deepcopy(item)
+    thawed["content"][0]["text"] = "changed"
+    assert type(thawed) is dict and type(thawed["content"]) is list
+    assert type(copy.copy(item)) is dict
+    assert item["content"][0]["text"] == "hi"
+
+    assert json.dumps(item) == json.dumps(original)
+    unpickled = pickle.loads(pickle.dumps(item))
+    assert isinstance(unpickled, FrozenDict) and unpickled == original
+
+
+def test_freezing_shares_frozen_items_and_strings():
+    history = get_multimodal_history(500_000)
+
+    frozen = ItemHelpers.input_to_frozen_input_list(history)
+    refrozen = ItemHelpers.input_to_frozen_input_list(frozen)
+
+    assert all(a is b for a, b in zip(frozen, refrozen))
+    image = history[0]["content"][1]["image_url"]  # type: ignore
+    assert frozen[0]["content"][1]["image_url"] is image  # type: ignore
+    # The caller's items are left as they are
+    assert type(history[0]) is dict
+    assert ItemHelpers.input_to_new_input_list(frozen) == history
+
+
+class RecordingModel(FakeModel):
+    """Records the model input, and the peak memory allocated between model calls."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.inputs: list[list[TResponseInputItem]] = []
+        self.peaks: list[int] = []
+        self._baseline = 0
+
+    def reset(self) -> None:
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        if tracemalloc.is_tracing():
+            self.peaks.append(tracemalloc.get_traced_memory()[1] - self._baseline)
+            self.reset()
+        assert isinstance(input, list)
+        self.inputs.append(input)
+        return await super().get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+
+
+def get_tool_loop_agent(model: RecordingModel, turns: int) -> Agent[Any]:
+    outputs: list[list[TResponseOutputItem] | Exception] = [
+        [get_function_tool_call("foo", "{}")] for _ in range(turns - 1)
+    ]
+    model.add_multiple_turn_outputs(outputs + [[get_text_message("done")]])
+    return Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+
+
+@pytest.mark.asyncio
+async def test_history_is_shared_across_turns_not_copied():
+    history = get_multimodal_history()
+    model = RecordingModel()
+
+    result = await Runner.run(get_tool_loop_agent(model, 4), history)
+
+    assert result.final_output == "done"
+    first_input = model.inputs[0]
+    for input in model.inputs[1:]:
+        assert all(a is b for a, b in zip(first_input, input[: len(history)]))
+    assert isinstance(result.input, list)
+    assert result.input[0] is first_input[0]
+    generated = model.inputs[-1][len(history) :]
+    assert all(a is b._to_frozen_input_item() for a, b in zip(generated, result.new_items))
+
+
+@pytest.mark.asyncio
+async def test_public_input_lists_are_mutable():
+    model = RecordingModel()
+    result = await Runner.run(get_tool_loop_agent(model, 2), get_multimodal_history(300_000))
+
+    next_input = result.to_input_list()
+    next_input[0]["content"][0]["text"] = "changed"  # type: ignore
+    next_input[-1]["content"][0]["text"] = "changed"  # type: ignore
+    next_input.append({"role": "user", "content": "more"})
+
+    assert model.inputs[0][0]["content"][0]["text"] == "What is in image 0?"  # type: ignore
+    assert result.to_input_list()[-1]["content"][0]["text"] == "done"  # type: ignore
+    response_items = result.raw_responses[-1].to_input_items()
+    response_items[0]["content"][0]["text"] = "changed"  # type: ignore
+    assert result.new_items[-1].to_input_item()["content"][0]["text"] == "done"  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_allocations_per_turn_with_multimodal_history():
+    """Guards against copying the history on every turn: with a 5 MB history of images, a turn
+    should only allocate a fraction of what a deep copy of the history does."""
+    history = get_multimodal_history()
+    model = RecordingModel()
+    agent = get_tool_loop_agent(model, 6)
+
+    tracemalloc.start()
+    try:
+        model.reset()
+        deepcopied = copy.deepcopy(history)
+        deepcopy_size = tracemalloc.get_traced_memory()[1] - model._baseline
+        del deepcopied
+
+        model.reset()
+        await Runner.run(agent, history, run_config=RunConfig(tracing_disabled=True))
+    finally:
+        tracemalloc.stop()
+
+    # The first turn freezes the history once, which costs about as much as a deep copy. The
+    # strings, i.e. almost all of the 5 MB, are never copied.
+    assert model.peaks[0] < 4 * deepcopy_size < 5_000_000
+    later_turns = model.peaks[1:]
+    assert len(later_turns) == 5
+    assert max(later_turns) < deepcopy_size / 4
+
+
+@pytest.mark.asyncio
+async def test_unchanged_history_is_kept_on_handoff():
+    seen: list[HandoffInputData] = []
+
+    def keep_history(data: HandoffInputData) -> HandoffInputData:
+        seen.append(data)
+        return data
+
+    model = RecordingModel()
+    other = Agent(name="other", model=model)
+    agent = Agent(name="test", model=model, handoffs=[other])
+    model.add_multiple_turn_outputs([[get_handoff_tool_call(other)], [get_text_message("done")]])
+    history = get_multimodal_history(300_000)
+
+    result = await Runner.run(
+        agent, history, run_config=RunConfig(handoff_input_filter=keep_history)
+    )
+
+    assert result.final_output == "done"
+    assert len(seen) == 1
+    assert isinstance(result.input, list)
+    assert all(a is b for a, b in zip(result.input, model.inputs[0]))
+    assert all(a is b for a, b in zip(result.input, model.inputs[1]))
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from openai.types.responses import ResponseCompletedEvent, ResponseTextDeltaEvent
+
+from agents import Agent, HedgedModel, ModelSettings, Runner, UserError
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+from agents.usage import Usage
+
+from .fake_model import FakeModel, get_response_obj
+from .test_responses import get_text_message
+
+
+class DelayedModel(FakeModel):
+    """A fake model that answers each call after a delay, with a text message naming the call."""
+
+    def __init__(self, delays: list[float], error_calls: tuple[int, ...] = ()):
+        super().__init__()
+        self.delays = delays
+        self.error_calls = error_calls
+        self.calls = 0
+        self.cancelled_calls: list[int] = []
+
+    async def _wait(self, call: int) -> None:
+        try:
+            await asyncio.sleep(self.delays[call - 1] if call <= len(self.delays) else 0)
+        except asyncio.CancelledError:
+            self.cancelled_calls.append(call)
+            raise
+        if call in self.error_calls:
+            raise ValueError(f"call {call} failed")
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        self.calls += 1
+        call = self.calls
+        await self._wait(call)
+        return ModelResponse(
+            output=[get_text_message(f"call {call}")], usage=Usage(), referenceable_id=None
+        )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        self.calls += 1
+        call = self.calls
+        await self._wait(call)
+        yield ResponseTextDeltaEvent(
+            type="response.output_text.delta",
+            content_index=0,
+            delta=f"call {call}",
+            item_id="item",
+            output_index=0,
+        )
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            response=get_response_obj([get_text_message(f"call {call}")]),
+        )
+
+
+async def get_text(model: HedgedModel) -> str:
+    response = await model.get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+    return response.output[0].content[0].text  # type: ignore
+
+
+async def stream_deltas(model: HedgedModel) -> list[str]:
+    return [
+        event.delta
+        async for event in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+        if isinstance(event, ResponseTextDeltaEvent)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_and_loser_cancelled():
+    inner = DelayedModel([1.0, 0.0])
+    model = HedgedModel(inner, initial_delay=0.05, max_hedge_ratio=1)
+
+    assert await get_text(model) == "call 2"
+    assert inner.cancelled_calls == [1]
+    assert model.stats.requests == 1
+    assert model.stats.hedged_requests == 1
+    assert model.stats.hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_request_is_not_hedged():
+    inner = DelayedModel([0.0])
+    model = HedgedModel(inner, initial_delay=0.05, max_hedge_ratio=1)
+
+    assert await get_text(model) == "call 1"
+    assert inner.calls == 1
+    assert model.stats.hedged_requests == 0
+
+
+@pytest.mark.asyncio
+async def test_no_hedging_without_a_delay():
+    inner = DelayedModel([0.1])
+    model = HedgedModel(inner, max_hedge_ratio=1)
+
+    assert await get_text(model) == "call 1"
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_is_learned_from_recent_latencies():
+    model = HedgedModel(DelayedModel([0.0] * 10), percentile=90, min_samples=10)
+    assert model.response_hedge_delay is None
+
+    for latency in range(1, 11):
+        model._response_latencies.record(latency / 100)
+
+    assert model.response_hedge_delay == pytest.approx(0.09)
+    assert model.stream_hedge_delay is None
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_caps_extra_requests():
+    inner = DelayedModel([0.1] * 100)
+    model = HedgedModel(inner, initial_delay=0.01, max_hedge_ratio=0.25)
+
+    await asyncio.gather(*(get_text(model) for _ in range(20)))
+
+    assert model.stats.requests == 20
+    assert model.stats.hedged_requests == 5
+    assert inner.calls == 25
+
+
+@pytest.mark.asyncio
+async def test_hedge_answers_when_original_request_fails():
+    inner = DelayedModel([0.1, 0.1], error_calls=(1,))
+    model = HedgedModel(inner, initial_delay=0.01, max_hedge_ratio=1)
+
+    assert await get_text(model) == "call 2"
+
+
+@pytest.mark.asyncio
+async def test_error_is_raised_when_every_request_fails():
+    inner = DelayedModel([0.1, 0.1], error_calls=(1, 2))
+    model = HedgedModel(inner, initial_delay=0.01, max_hedge_ratio=1)
+
+    with pytest.raises(ValueError, match="call 1 failed"):
+        await get_text(model)
+
+
+@pytest.mark.asyncio
+async def test_hedge_requests_go_to_hedge_model():
+    inner = DelayedModel([1.0])
+    hedge = DelayedModel([0.0])
+    model = HedgedModel(inner, hedge_model=hedge, initial_delay=0.01, max_hedge_ratio=1)
+
+    assert await get_text(model) == "call 1"
+    assert hedge.calls == 1
+    assert inner.cancelled_calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_stream_commits_to_first_stream_with_output():
+    inner = DelayedModel([1.0, 0.0])
+    model = HedgedModel(inner, initial_delay=0.05, max_hedge_ratio=1)
+
+    assert await stream_deltas(model) == ["call 2"]
+    assert inner.cancelled_calls == [1]
+    assert model.stats.hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_is_not_hedged_once_output_arrived():
+    inner = DelayedModel([0.0])
+    model = HedgedModel(inner, initial_delay=0.05, max_hedge_ratio=1)
+
+    assert await stream_deltas(model) == ["call 1"]
+    assert inner.calls == 1
+    assert model.stats.hedged_requests == 0
+    assert len(model._first_event_latencies) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_model_in_runner():
+    inner = DelayedModel([1.0, 0.0, 1.0, 0.0])
+    agent = Agent(name="test", model=HedgedModel(inner, initial_delay=0.05, max_hedge_ratio=1))
+
+    result = await Runner.run(agent, input="hi")
+    assert result.final_output == "call 2"
+
+    streamed = Runner.run_streamed(agent, input="hi")
+    async for _ in streamed.stream_events():
+        pass
+    assert streamed.final_output == "call 4"
+
+
+def test_invalid_settings():
+    with pytest.raises(UserError):
+        HedgedModel(FakeModel(), percentile=0)
+    with pytest.raises(UserError):
+        HedgedModel(FakeModel(), min_samples=10, window_size=5)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from agents import (
+    HTTPClientPool,
+    OpenAIProvider,
+    UserError,
+    set_default_openai_http_client_pool,
+)
+from agents.models import _openai_shared
+from agents.models.openai_provider import shared_http_client
+
+
+class LocalHTTPServer:
+    """A minimal HTTP/1.1 server with keep-alive, that answers every request after a delay."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/"
+
+    async def __aenter__(self) -> LocalHTTPServer:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        assert self._server is not None
+        self._server.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                self.requests += 1
+                await asyncio.sleep(self.delay)
+                body = b"" if request_line.startswith(b"HEAD") else b"ok"
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\n" + body
+                )
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+@pytest.mark.asyncio
+async def test_requests_wait_for_a_connection_when_pool_is_full():
+    pool = HTTPClientPool(max_connections=1)
+    async with LocalHTTPServer(delay=0.1) as server:
+        client = pool.get_client()
+        responses = await asyncio.gather(*(client.get(server.url) for _ in range(3)))
+
+        assert [response.text for response in responses] == ["ok"] * 3
+        assert server.connections == 1
+        await pool.aclose()
+
+    stats = pool.get_stats()
+    assert stats.requests == 3
+    assert stats.connections_opened == 1
+    assert stats.pool_waits == 3
+    assert stats.max_pool_wait_time >= 0.15
+    assert stats.total_pool_wait_time >= 0.25
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connections_ahead_of_requests():
+    pool = HTTPClientPool()
+    async with LocalHTTPServer(delay=0.05) as server:
+        await pool.warm_up(server.url, connections=3)
+        assert server.connections == 3
+        assert pool.get_stats().connections_opened == 3
+
+        client = pool.get_client()
+        await asyncio.gather(*(client.get(server.url) for _ in range(3)))
+
+        assert server.connections == 3
+        assert pool.get_stats().connections_opened == 3
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_ignores_unreachable_servers():
+    pool = HTTPClientPool()
+    await pool.warm_up("http://127.0.0.1:1/")
+    await pool.aclose()
+
+
+def test_each_event_loop_gets_its_own_client():
+    pool = HTTPClientPool()
+
+    async def get_client():
+        client = pool.get_client()
+        assert pool.get_client() is client
+        return client
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+    assert first is not second
+
+    async def count_clients():
+        pool.get_client()
+        return len(pool._clients._values)
+
+    # The clients of closed event loops are discarded
+    assert asyncio.run(count_clients()) == 1
+
+    clients = []
+    threads = [
+        threading.Thread(target=lambda: clients.append(asyncio.run(get_client()))) for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(client) for client in clients}) == 3
+
+
+@pytest.mark.asyncio
+async def test_closed_client_is_replaced():
+    pool = HTTPClientPool()
+    client = pool.get_client()
+    await pool.aclose()
+
+    assert client.is_closed
+    assert pool.get_client() is not client
+
+
+def test_limits_are_applied():
+    pool = HTTPClientPool(max_connections=5, max_keepalive_connections=2, keepalive_expiry=30)
+
+    assert pool.limits.max_connections == 5
+    assert pool.limits.max_keepalive_connections == 2
+    assert pool.limits.keepalive_expiry == 30
+
+
+def test_http2_requires_h2():
+    try:
+        import h2  # type: ignore # noqa: F401
+    except ImportError:
+        with pytest.raises(UserError, match="h2"):
+            HTTPClientPool(http2=True)
+    else:
+        assert HTTPClientPool(http2=True).http2
+
+
+def test_provider_creates_an_openai_client_per_event_loop():
+    provider = OpenAIProvider(api_key="sk-test")
+
+    async def get_client():
+        client = provider._get_client()
+        assert provider._get_client() is client
+        assert client._client is shared_http_client()
+        return client
+
+    assert asyncio.run(get_client()) is not asyncio.run(get_client())
+
+
+@pytest.mark.asyncio
+async def test_provider_uses_its_own_or_the_default_pool():
+    pool = HTTPClientPool()
+    provider = OpenAIProvider(api_key="sk-test", http_client_pool=pool)
+    assert provider._get_client()._client is pool.get_client()
+
+    default_pool = HTTPClientPool()
+    set_default_openai_http_client_pool(default_pool)
+    assert _openai_shared.get_default_http_client_pool() is default_pool
+    assert OpenAIProvider(api_key="sk-test")._get_client()._client is default_pool.get_client()
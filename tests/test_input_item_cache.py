@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from openai.types.responses import (
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+)
+
+from agents import Agent, MessageOutputItem, ModelResponse, RunItem, ToolCallItem, Usage
+
+from .test_responses import get_function_tool_call, get_text_message
+
+
+def count_model_dumps(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    calls = [0]
+    for cls in (ResponseOutputMessage, ResponseFunctionToolCall):
+        original = cls.model_dump
+
+        def model_dump(self: Any, *args: Any, _original: Any = original, **kwargs: Any) -> Any:
+            calls[0] += 1
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(cls, "model_dump", model_dump)
+    return calls
+
+
+def get_run_items(count: int) -> list[RunItem]:
+    agent = Agent(name="test")
+    items: list[RunItem] = []
+    for i in range(count // 2):
+        call = get_function_tool_call("foo", f'{{"i": {i}}}')
+        assert isinstance(call, ResponseFunctionToolCall)
+        message = get_text_message(f"message {i}")
+        assert isinstance(message, ResponseOutputMessage)
+        items.append(ToolCallItem(agent=agent, raw_item=call))
+        items.append(MessageOutputItem(agent=agent, raw_item=message))
+    return items
+
+
+def test_history_rebuilt_many_times_is_converted_once(monkeypatch: pytest.MonkeyPatch):
+    items = get_run_items(200)
+    expected = [item.raw_item.model_dump(exclude_unset=True) for item in items]  # type: ignore
+    calls = count_model_dumps(monkeypatch)
+
+    histories = [[item._to_frozen_input_item() for item in items] for _ in range(50)]
+
+    assert calls[0] == 200
+    assert histories[0] == expected
+    assert all(a is b for history in histories[1:] for a, b in zip(histories[0], history))
+
+
+def test_cached_item_is_read_only():
+    item = get_run_items(2)[1]
+
+    input_item = item._to_frozen_input_item()
+
+    with pytest.raises(TypeError, match="read-only"):
+        input_item["role"] = "user"  # type: ignore
+    with pytest.raises(TypeError):
+        input_item["content"][0]["text"] = "changed"  # type: ignore
+    assert item.raw_item.content[0].text == "message 0"  # type: ignore
+
+
+def test_public_input_item_is_a_mutable_copy():
+    item = get_run_items(2)[1]
+
+    input_item = item.to_input_item()
+    input_item["content"][0]["text"] = "changed"  # type: ignore
+
+    assert type(input_item) is dict
+    assert item.to_input_item()["content"][0]["text"] == "message 0"  # type: ignore
+    assert item._to_frozen_input_item()["content"][0]["text"] == "message 0"  # type: ignore
+
+
+def test_item_is_converted_again_when_raw_item_is_replaced(monkeypatch: pytest.MonkeyPatch):
+    call_item, message_item = get_run_items(2)
+    first = call_item._to_frozen_input_item()
+    calls = count_model_dumps(monkeypatch)
+
+    assert call_item._to_frozen_input_item() is first
+    call_item.raw_item = get_function_tool_call("bar", "{}")
+    assert call_item._to_frozen_input_item()["name"] == "bar"  # type: ignore
+    assert call_item._to_frozen_input_item() is call_item._to_frozen_input_item()
+    assert first["name"] == "foo"  # type: ignore
+
+    assert calls[0] == 1
+
+
+def test_nested_changes_need_the_raw_item_to_be_replaced():
+    item = get_run_items(2)[1]
+    assert isinstance(item, MessageOutputItem)
+    item.to_input_item()
+
+    # Redacting a message in place isn't picked up, as documented on `raw_item`
+    item.raw_item.content[0].text = "redacted"  # type: ignore
+    assert item.to_input_item()["content"][0]["text"] == "message 0"  # type: ignore
+    item.raw_item = item.raw_item.model_copy()
+
+    assert item.to_input_item()["content"][0]["text"] == "redacted"  # type: ignore
+    assert item._to_frozen_input_item()["content"][0]["text"] == "redacted"  # type: ignore
+
+
+def test_items_with_long_lists_are_converted_once(monkeypatch: pytest.MonkeyPatch):
+    # Longer than the range of ints that CPython caches
+    message = ResponseOutputMessage(
+        id="1",
+        content=[
+            ResponseOutputText(annotations=[], text=str(i), type="output_text") for i in range(300)
+        ],
+        role="assistant",
+        status="completed",
+        type="message",
+    )
+    item = MessageOutputItem(agent=Agent(name="test"), raw_item=message)
+    response = ModelResponse(
+        output=[get_text_message("hi")] * 300, usage=Usage(), referenceable_id=None
+    )
+    calls = count_model_dumps(monkeypatch)
+
+    for _ in range(3):
+        item._to_frozen_input_item()
+        response._to_frozen_input_items()
+
+    assert calls[0] == 1 + 300
+
+
+def test_model_response_input_items_are_cached(monkeypatch: pytest.MonkeyPatch):
+    response = ModelResponse(
+        output=[get_text_message("hi"), get_function_tool_call("foo", "{}")],
+        usage=Usage(),
+        referenceable_id=None,
+    )
+    calls = count_model_dumps(monkeypatch)
+
+    first = response._to_frozen_input_items()
+    second = response._to_frozen_input_items()
+
+    assert calls[0] == 2
+    assert first == second and first is not second
+    assert all(a is b for a, b in zip(first, second))
+
+    response.output.append(get_text_message("bye"))
+    assert len(response._to_frozen_input_items()) == 3
+    assert calls[0] == 5
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import sys
+import tracemalloc
+from typing import Any
+
+import pytest
+from openai.types.responses import ResponseFunctionToolCall
+
+from agents import (
+    Agent,
+    MessageOutputItem,
+    ModelResponse,
+    RunItem,
+    RunItemStreamEvent,
+    StreamEvent,
+    ToolCallItem,
+    ToolCallOutputItem,
+    Usage,
+)
+from agents._run_impl import NextStepRunAgain, SingleStepResult
+from agents.items import TResponseInputItem
+from agents.tracing.span_data import CustomSpanData, GenerationSpanData
+from agents.tracing.spans import NoOpSpan
+
+from .test_responses import get_function_tool_call, get_text_message
+
+requires_slots = pytest.mark.skipif(sys.version_info < (3, 10), reason="slots require 3.10+")
+
+# Bytes per generated item, including its cached input item, its stream event and its share of
+# the model response and step result of its turn. Slotted classes take 400-470 bytes; plain
+# dataclasses, with a `__dict__` per instance, take 570-610 bytes.
+MAX_BYTES_PER_ITEM = 520
+
+
+def get_raw_items(count: int) -> list[tuple[ResponseFunctionToolCall, TResponseInputItem]]:
+    raw_items = []
+    for i in range(count // 2):
+        call = get_function_tool_call("foo", "{}")
+        assert isinstance(call, ResponseFunctionToolCall)
+        output: TResponseInputItem = {
+            "type": "function_call_output",
+            "call_id": str(i),
+            "output": "result",
+        }
+        raw_items.append((call, output))
+    return raw_items
+
+
+def build_run(
+    agent: Agent[Any], raw_items: list[tuple[ResponseFunctionToolCall, TResponseInputItem]]
+) -> tuple[list[RunItem], list[StreamEvent], list[SingleStepResult]]:
+    """Builds what a run keeps for its items: a turn per tool call, with a stream event per item,
+    and the input item that each item caches."""
+    items: list[RunItem] = []
+    events: list[StreamEvent] = []
+    steps: list[SingleStepResult] = []
+    for call, output in raw_items:
+        new_items: list[RunItem] = [
+            ToolCallItem(agent=agent, raw_item=call),
+            ToolCallOutputItem(agent=agent, raw_item=output, output="result"),  # type: ignore
+        ]
+        items.extend(new_items)
+        # The runner converts the items to input items on every turn, and they cache the result
+        for item in new_items:
+            item._to_frozen_input_item()
+        events.extend(RunItemStreamEvent(name="tool_called", item=item) for item in new_items)
+        response = ModelResponse(
+            output=[call],
+            usage=Usage(requests=1, input_tokens=10, output_tokens=5, total_tokens=15),
+            referenceable_id=None,
+        )
+        steps.append(
+            SingleStepResult(
+                original_input="hi",
+                model_response=response,
+                pre_step_items=[],
+                new_step_items=new_items,
+                next_step=NextStepRunAgain(),
+            )
+        )
+    return items, events, steps
+
+
+@requires_slots
+def test_run_objects_have_no_instance_dict():
+    agent = Agent(name="test")
+    message = get_text_message("hi")
+    item = MessageOutputItem(agent=agent, raw_item=message)  # type: ignore[arg-type]
+    objects = [
+        item,
+        RunItemStreamEvent(name="message_output_created", item=item),
+        ModelResponse(output=[message], usage=Usage(), referenceable_id=None),
+        Usage(),
+        CustomSpanData(name="custom", data={}),
+        GenerationSpanData(),
+        NoOpSpan(CustomSpanData(name="custom", data={})),
+    ]
+
+    for obj in objects:
+        assert not hasattr(obj, "__dict__"), type(obj).__name__
+
+
+@requires_slots
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_bytes_per_run(count: int):
+    agent = Agent(name="test")
+    raw_items = get_raw_items(count)
+    # Warm up, so that only the run's objects are measured
+    build_run(agent, raw_items)
+
+    tracemalloc.start()
+    try:
+        run = build_run(agent, raw_items)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert len(run[0]) == count
+    bytes_per_item = size / count
+    assert bytes_per_item < MAX_BYTES_PER_ITEM, (
+        f"A run of {count} items takes {size} bytes ({bytes_per_item:.0f} bytes per item)"
+    )
@@ -235,6 +235,7 @@ async def test_fetch_response_non_stream(monkeypatch) -> None:
     assert kwargs["tool_choice"] is NOT_GIVEN
     assert kwargs["response_format"] is NOT_GIVEN
     assert kwargs["stream_options"] is NOT_GIVEN
+    assert kwargs["timeout"] is NOT_GIVEN
 
 
 @pytest.mark.asyncio
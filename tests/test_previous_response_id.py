@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+from openai.types.responses import ResponseCompletedEvent
+
+from agents import (
+    Agent,
+    ModelSettings,
+    OpenAIResponsesModel,
+    RunConfig,
+    Runner,
+    handoff,
+    trace,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+from agents.tracing.span_data import CustomSpanData
+from agents.usage import Usage
+
+from .fake_model import FakeModel, get_response_obj
+from .test_agent_runner import remove_new_items
+from .test_responses import (
+    get_function_tool,
+    get_function_tool_call,
+    get_handoff_tool_call,
+    get_text_message,
+)
+from .testing_processor import fetch_ordered_spans
+
+USE_PREVIOUS_RESPONSE_ID = RunConfig(use_previous_response_id=True)
+
+
+class ServerConversationModel(FakeModel):
+    """A fake model that records the input and previous response ID of each call, and gives each
+    response an ID. If `reject_previous_response_ids` is set, calls that refer to a previous
+    response fail like the Responses API does for unknown IDs."""
+
+    def __init__(self, reject_previous_response_ids: bool = False):
+        super().__init__()
+        self.reject_previous_response_ids = reject_previous_response_ids
+        self.calls: list[tuple[list[TResponseInputItem], str | None]] = []
+
+    def _record_call(self, input: str | list[TResponseInputItem], model_settings: ModelSettings):
+        assert isinstance(input, list)
+        self.calls.append((input, model_settings.previous_response_id))
+        if self.reject_previous_response_ids and model_settings.previous_response_id:
+            raise openai.BadRequestError(
+                "Previous response not found",
+                response=httpx.Response(400, request=httpx.Request("POST", "https://test")),
+                body=None,
+            )
+        return f"resp_{len(self.calls)}"
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        response_id = self._record_call(input, model_settings)
+        output = self.get_next_output()
+        if isinstance(output, Exception):
+            raise output
+        return ModelResponse(output=output, usage=Usage(), referenceable_id=response_id)
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        response_id = self._record_call(input, model_settings)
+        output = self.get_next_output()
+        if isinstance(output, Exception):
+            raise output
+        yield ResponseCompletedEvent(
+            type="response.completed", response=get_response_obj(output, response_id)
+        )
+
+
+def get_tool_loop_agent(model: ServerConversationModel) -> Agent[Any]:
+    model.add_multiple_turn_outputs(
+        [
+            [get_text_message("a"), get_function_tool_call("foo")],
+            [get_function_tool_call("foo")],
+            [get_text_message("done")],
+        ]
+    )
+    return Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+
+
+@pytest.mark.asyncio
+async def test_full_input_is_sent_by_default():
+    model = ServerConversationModel()
+    result = await Runner.run(get_tool_loop_agent(model), input="hi")
+
+    assert result.final_output == "done"
+    assert [previous_response_id for _, previous_response_id in model.calls] == [None] * 3
+    assert [len(input) for input, _ in model.calls] == [1, 4, 6]
+
+
+@pytest.mark.asyncio
+async def test_only_new_items_are_sent_with_previous_response_id():
+    model = ServerConversationModel()
+    result = await Runner.run(
+        get_tool_loop_agent(model), input="hi", run_config=USE_PREVIOUS_RESPONSE_ID
+    )
+
+    assert result.final_output == "done"
+    assert [previous_response_id for _, previous_response_id in model.calls] == [
+        None,
+        "resp_1",
+        "resp_2",
+    ]
+    # After the first turn, only the tool outputs are sent
+    assert [[item.get("type") for item in input] for input, _ in model.calls[1:]] == [
+        ["function_call_output"],
+        ["function_call_output"],
+    ]
+    # The run's history still contains everything
+    assert len(result.to_input_list()) == 7
+
+
+@pytest.mark.asyncio
+async def test_streamed_run_sends_only_new_items():
+    model = ServerConversationModel()
+    result = Runner.run_streamed(
+        get_tool_loop_agent(model), input="hi", run_config=USE_PREVIOUS_RESPONSE_ID
+    )
+    async for _ in result.stream_events():
+        pass
+
+    assert result.final_output == "done"
+    assert [previous_response_id for _, previous_response_id in model.calls] == [
+        None,
+        "resp_1",
+        "resp_2",
+    ]
+    assert [len(input) for input, _ in model.calls] == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_full_input_is_sent_after_handoff_input_filter():
+    model = ServerConversationModel()
+    agent_1 = Agent(name="agent_1", model=model)
+    agent_2 = Agent(
+        name="agent_2", model=model, handoffs=[handoff(agent_1, input_filter=remove_new_items)]
+    )
+    model.add_multiple_turn_outputs(
+        [[get_text_message("1"), get_handoff_tool_call(agent_1)], [get_text_message("done")]]
+    )
+
+    result = await Runner.run(agent_2, input="hi", run_config=USE_PREVIOUS_RESPONSE_ID)
+
+    assert result.final_output == "done"
+    # The filter removed the items the server holds, so there's nothing to continue from
+    assert model.calls[1][1] is None
+    assert model.calls[1][0] == [{"content": "hi", "role": "user"}]
+
+
+@pytest.mark.asyncio
+async def test_handoff_without_filter_continues_from_previous_response():
+    model = ServerConversationModel()
+    agent_1 = Agent(name="agent_1", model=model)
+    agent_2 = Agent(name="agent_2", model=model, handoffs=[agent_1])
+    model.add_multiple_turn_outputs([[get_handoff_tool_call(agent_1)], [get_text_message("done")]])
+
+    await Runner.run(agent_2, input="hi", run_config=USE_PREVIOUS_RESPONSE_ID)
+
+    assert model.calls[1][1] == "resp_1"
+    assert [item.get("type") for item in model.calls[1][0]] == ["function_call_output"]
+
+
+@pytest.mark.asyncio
+async def test_rejected_previous_response_id_falls_back_to_full_input():
+    model = ServerConversationModel(reject_previous_response_ids=True)
+    result = await Runner.run(
+        get_tool_loop_agent(model), input="hi", run_config=USE_PREVIOUS_RESPONSE_ID
+    )
+
+    assert result.final_output == "done"
+    assert [(len(input), previous_response_id) for input, previous_response_id in model.calls] == [
+        (1, None),
+        (1, "resp_1"),
+        (4, None),
+        (1, "resp_3"),
+        (6, None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_raised():
+    model = ServerConversationModel()
+    model.add_multiple_turn_outputs([[get_function_tool_call("foo")], ValueError("boom")])
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo")])
+
+    with pytest.raises(ValueError):
+        await Runner.run(agent, input="hi", run_config=USE_PREVIOUS_RESPONSE_ID)
+
+
+@pytest.mark.asyncio
+async def test_models_without_response_ids_get_the_full_input():
+    model = FakeModel()
+    model.add_multiple_turn_outputs([[get_function_tool_call("foo")], [get_text_message("done")]])
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo")])
+
+    result = await Runner.run(agent, input="hi", run_config=USE_PREVIOUS_RESPONSE_ID)
+
+    assert result.final_output == "done"
+
+
+@pytest.mark.asyncio
+async def test_bytes_saved_are_recorded_per_turn():
+    model = ServerConversationModel()
+    with trace("test"):
+        await Runner.run(
+            get_tool_loop_agent(model), input="hi", run_config=USE_PREVIOUS_RESPONSE_ID
+        )
+
+    spans = [
+        span.span_data.data
+        for span in fetch_ordered_spans()
+        if isinstance(span.span_data, CustomSpanData) and span.span_data.name == "Model input"
+    ]
+    assert [data["previous_response_id"] for data in spans] == [None, "resp_1", "resp_2"]
+    assert [data["input_items"] for data in spans] == [1, 4, 6]
+    assert [data["sent_items"] for data in spans] == [1, 1, 1]
+    assert spans[0]["saved_bytes"] == 0
+    for data in spans[1:]:
+        assert data["sent_bytes"] < data["input_bytes"]
+        assert data["saved_bytes"] == data["input_bytes"] - data["sent_bytes"]
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_responses_model_sends_previous_response_id():
+    requests: list[dict[str, Any]] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        response = get_response_obj([get_text_message("hi")], response_id="resp_2")
+        return httpx.Response(200, json=response.model_dump())
+
+    client = AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://responses.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+    model = OpenAIResponsesModel(model="gpt-4o", openai_client=client)
+
+    response = await model.get_response(
+        None,
+        "hi",
+        ModelSettings(previous_response_id="resp_1"),
+        [],
+        None,
+        [],
+        ModelTracing.DISABLED,
+    )
+    await model.get_response(None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED)
+
+    assert response.referenceable_id == "resp_2"
+    assert requests[0]["previous_response_id"] == "resp_1"
+    assert "previous_response_id" not in requests[1]
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+from openai.types.responses import ResponseCompletedEvent, ResponseUsage
+
+from agents import (
+    Agent,
+    ModelSettings,
+    OpenAIChatCompletionsModel,
+    OpenAIResponsesModel,
+    PrefixFingerprint,
+    RunConfig,
+    Runner,
+    SlidingWindowCompactor,
+    ToolSelection,
+    ToolSelector,
+    trace,
+)
+from agents.items import TResponseInputItem, TResponseOutputItem
+from agents.models.interface import ModelTracing
+from agents.prompt_cache import canonicalize
+from agents.result import RunResultBase
+from agents.tool import FunctionTool
+from agents.tracing.span_data import CustomSpanData
+from agents.usage import Usage
+
+from .fake_model import FakeModel, get_response_obj
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+from .testing_processor import fetch_ordered_spans
+
+
+def get_tool(schema: dict[str, Any]) -> FunctionTool:
+    async def on_invoke_tool(ctx: Any, args: str) -> str:
+        return "ok"
+
+    return FunctionTool(
+        name="lookup",
+        description="Looks something up",
+        params_json_schema=schema,
+        on_invoke_tool=on_invoke_tool,
+    )
+
+
+SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {"zeta": {"type": "string"}, "alpha": {"type": "integer"}},
+    "required": ["zeta", "alpha"],
+    "additionalProperties": False,
+}
+REORDERED_SCHEMA: dict[str, Any] = {
+    "additionalProperties": False,
+    "required": ["zeta", "alpha"],
+    "properties": {"zeta": {"type": "string"}, "alpha": {"type": "integer"}},
+    "type": "object",
+}
+
+
+def get_prefix_spans() -> list[dict[str, Any]]:
+    return [
+        span.span_data.data
+        for span in fetch_ordered_spans()
+        if isinstance(span.span_data, CustomSpanData)
+        and span.span_data.name == "Prompt prefix changed"
+    ]
+
+
+def test_canonicalize_sorts_keys_but_keeps_property_order():
+    canonical = canonicalize(REORDERED_SCHEMA)
+
+    assert json.dumps(canonical) == json.dumps(canonicalize(SCHEMA))
+    assert list(canonical) == ["additionalProperties", "properties", "required", "type"]
+    assert list(canonical["properties"]) == ["zeta", "alpha"]
+    assert canonical["required"] == ["zeta", "alpha"]
+
+
+def test_canonicalize_handles_properties_named_properties():
+    schema = {"properties": {"properties": {"type": "string", "description": "x"}}}
+
+    canonical = canonicalize(schema)
+
+    assert list(canonical["properties"]["properties"]) == ["description", "type"]
+
+
+def test_fingerprint_ignores_key_order_and_names_changed_parts():
+    fingerprint = PrefixFingerprint.compute("Be nice", [get_tool(SCHEMA)], [], None, "hi")
+
+    assert fingerprint == PrefixFingerprint.compute(
+        "Be nice", [get_tool(REORDERED_SCHEMA)], [], None, "hi"
+    )
+    other = PrefixFingerprint.compute("Be mean", [get_tool(SCHEMA)], [], None, "hello")
+    assert other.value != fingerprint.value
+    assert other.changed_parts(fingerprint) == ["instructions", "input"]
+
+
+def test_usage_adds_cached_tokens():
+    usage = Usage(requests=1, input_tokens=100, cached_input_tokens=80)
+    usage.add(Usage(requests=1, input_tokens=100, cached_input_tokens=90))
+
+    assert usage.cached_input_tokens == 170
+
+
+@pytest.mark.asyncio
+async def test_fingerprint_is_stable_across_turns_of_an_agent():
+    model = FakeModel()
+    model.add_multiple_turn_outputs(
+        [[get_function_tool_call("foo")], [get_function_tool_call("foo")], [get_text_message("hi")]]
+    )
+    agent = Agent(
+        name="test", instructions="Be nice", model=model, tools=[get_function_tool("foo")]
+    )
+
+    with trace("test"):
+        result = await Runner.run(agent, input="hello")
+
+    fingerprints = {response.prefix_fingerprint for response in result.raw_responses}
+    assert len(fingerprints) == 1
+    assert None not in fingerprints
+    assert get_prefix_spans() == []
+
+
+@pytest.mark.asyncio
+async def test_dynamic_instructions_are_reported():
+    model = FakeModel()
+    model.add_multiple_turn_outputs([[get_function_tool_call("foo")], [get_text_message("hi")]])
+    turns = iter(range(10))
+    agent = Agent(
+        name="test",
+        instructions=lambda ctx, agent: f"Turn {next(turns)}",
+        model=model,
+        tools=[get_function_tool("foo")],
+    )
+
+    with trace("test"):
+        result = await Runner.run(agent, input="hello")
+
+    spans = get_prefix_spans()
+    assert len(spans) == 1
+    assert spans[0]["agent"] == "test"
+    assert spans[0]["changed"] == ["instructions"]
+    assert spans[0]["previous_fingerprint"] == result.raw_responses[0].prefix_fingerprint
+    assert spans[0]["fingerprint"] == result.raw_responses[1].prefix_fingerprint
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streamed", [False, True])
+async def test_compacted_history_is_reported(streamed: bool):
+    model = FakeModel()
+    outputs: list[list[TResponseOutputItem] | Exception] = [
+        [get_function_tool_call("foo", f'{{"i": {i}}}')] for i in range(3)
+    ]
+    model.add_multiple_turn_outputs(outputs + [[get_text_message("hi")]])
+    agent = Agent(
+        name="test", instructions="Be nice", model=model, tools=[get_function_tool("foo")]
+    )
+    # Keeps the first user message and the latest tool call, so from the third turn on, the
+    # previous tool call is dropped from the start of the history
+    run_config = RunConfig(history_compactor=SlidingWindowCompactor(max_turns=1))
+
+    with trace("test"):
+        result: RunResultBase
+        if streamed:
+            streamed_result = Runner.run_streamed(agent, input="hello", run_config=run_config)
+            async for _ in streamed_result.stream_events():
+                pass
+            result = streamed_result
+        else:
+            result = await Runner.run(agent, input="hello", run_config=run_config)
+
+    fingerprints = [response.prefix_fingerprint for response in result.raw_responses]
+    assert fingerprints[0] == fingerprints[1]
+    assert len(set(fingerprints[1:])) == 3
+    spans = get_prefix_spans()
+    assert [span["changed"] for span in spans] == [["input"], ["input"]]
+    assert spans[-1]["fingerprint"] == fingerprints[-1]
+
+
+class AlternatingToolSelector(ToolSelector):
+    """Selects a different one of the agent's tools on each call."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def select_tools(
+        self,
+        agent: Agent[Any],
+        input: list[TResponseInputItem],
+        tool_choice: str | None = None,
+    ) -> ToolSelection:
+        self.calls += 1
+        return ToolSelection(tools=[agent.tools[self.calls % len(agent.tools)]])
+
+
+@pytest.mark.asyncio
+async def test_fingerprint_covers_the_tools_that_are_sent():
+    model = FakeModel()
+    model.add_multiple_turn_outputs([[get_function_tool_call("foo")], [get_text_message("hi")]])
+    agent = Agent(
+        name="test",
+        instructions="Be nice",
+        model=model,
+        tools=[get_function_tool("foo"), get_function_tool("bar")],
+    )
+
+    with trace("test"):
+        await Runner.run(
+            agent, input="hello", run_config=RunConfig(tool_selector=AlternatingToolSelector())
+        )
+
+    spans = get_prefix_spans()
+    assert len(spans) == 1
+    assert spans[0]["changed"] == ["tools"]
+
+    # Minified schemas are what the model gets, so they're what the fingerprint covers
+    fingerprints = []
+    for minify_schemas in [False, True]:
+        model.set_next_output([get_text_message("hi")])
+        agent.tools = [get_tool({**SCHEMA, "title": "Lookup"})]
+        result = await Runner.run(
+            agent, input="hello", run_config=RunConfig(minify_schemas=minify_schemas)
+        )
+        fingerprints.append(result.raw_responses[0].prefix_fingerprint)
+    assert fingerprints[0] != fingerprints[1]
+
+
+@pytest.mark.asyncio
+async def test_handoffs_are_not_reported():
+    model = FakeModel()
+    agent_1 = Agent(name="agent_1", instructions="Second", model=model)
+    agent_2 = Agent(name="agent_2", instructions="First", model=model, handoffs=[agent_1])
+    model.add_multiple_turn_outputs(
+        [[get_function_tool_call("transfer_to_agent_1")], [get_text_message("done")]]
+    )
+
+    with trace("test"):
+        result = await Runner.run(agent_2, input="hello")
+
+    assert result.raw_responses[0].prefix_fingerprint != result.raw_responses[1].prefix_fingerprint
+    assert get_prefix_spans() == []
+
+
+@pytest.mark.asyncio
+async def test_streamed_runs_capture_cached_tokens_and_fingerprint():
+    class CachedModel(FakeModel):
+        async def stream_response(self, *args, **kwargs):
+            response = get_response_obj([get_text_message("hi")])
+            response.usage = ResponseUsage.model_validate(
+                {
+                    "input_tokens": 100,
+                    "output_tokens": 5,
+                    "total_tokens": 105,
+                    "output_tokens_details": {"reasoning_tokens": 0},
+                    "input_tokens_details": {"cached_tokens": 64},
+                }
+            )
+            yield ResponseCompletedEvent(type="response.completed", response=response)
+
+    result = Runner.run_streamed(Agent(name="test", model=CachedModel()), input="hello")
+    async for _ in result.stream_events():
+        pass
+
+    assert result.raw_responses[0].usage.cached_input_tokens == 64
+    assert result.raw_responses[0].prefix_fingerprint is not None
+
+
+def get_client(handle) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://model.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_responses_model_sends_canonical_tools_and_reads_cached_tokens():
+    bodies: list[bytes] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.content)
+        response = get_response_obj([get_text_message("hi")]).model_dump()
+        response["usage"] = {
+            "input_tokens": 2000,
+            "output_tokens": 5,
+            "total_tokens": 2005,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "input_tokens_details": {"cached_tokens": 1920},
+        }
+        return httpx.Response(200, json=response)
+
+    model = OpenAIResponsesModel(model="gpt-4o", openai_client=get_client(handle))
+
+    responses = [
+        await model.get_response(
+            None, "hi", ModelSettings(), [get_tool(schema)], None, [], ModelTracing.DISABLED
+        )
+        for schema in (SCHEMA, REORDERED_SCHEMA)
+    ]
+
+    tools = [json.dumps(json.loads(body)["tools"]) for body in bodies]
+    assert tools[0] == tools[1]
+    assert responses[0].usage.cached_input_tokens == 1920
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_chat_completions_model_sends_canonical_tools_and_reads_cached_tokens():
+    bodies: list[bytes] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.content)
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "hi"},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 2000,
+                    "completion_tokens": 5,
+                    "total_tokens": 2005,
+                    "prompt_tokens_details": {"cached_tokens": 1024},
+                },
+            },
+        )
+
+    model = OpenAIChatCompletionsModel(model="gpt-4o", openai_client=get_client(handle))
+
+    responses = [
+        await model.get_response(
+            None, "hi", ModelSettings(), [get_tool(schema)], None, [], ModelTracing.DISABLED
+        )
+        for schema in (SCHEMA, REORDERED_SCHEMA)
+    ]
+
+    tools = [json.dumps(json.loads(body)["tools"]) for body in bodies]
+    assert tools[0] == tools[1]
+    assert responses[0].usage.cached_input_tokens == 1024
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, RateLimitError
+from openai.types.responses import ResponseCompletedEvent
+
+from agents import (
+    Agent,
+    OpenAIProvider,
+    RateLimit,
+    RateLimiter,
+    RunConfig,
+    Runner,
+    set_default_openai_rate_limiter,
+)
+from agents.items import TResponseInputItem, TResponseStreamEvent
+from agents.model_settings import ModelSettings
+from agents.models.interface import ModelTracing
+from agents.models.openai_responses import OpenAIResponsesModel
+from agents.models.rate_limiter import _parse_duration, estimate_request_tokens
+from agents.token_attribution import count_input_tokens
+
+from .fake_model import get_response_obj
+from .test_responses import get_text_message
+
+
+class RateLimitedServer:
+    """A local stand-in for the Responses API that enforces a requests-per-minute limit with a
+    token bucket, like the real API, and answers with 429 when it's exceeded.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: float, retry_after: float = 0.1):
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60
+        self.capacity = burst
+        self.level = burst
+        self.updated_at = time.monotonic()
+        self.retry_after = retry_after
+        self.accepted = 0
+        self.rejected = 0
+
+    def _headers(self) -> dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": str(self.requests_per_minute),
+            "x-ratelimit-remaining-requests": str(int(self.level)),
+        }
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/v1/responses"
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.level < 1 - 1e-9:
+            self.rejected += 1
+            return httpx.Response(
+                429,
+                json={"error": {"message": "Rate limit reached", "type": "requests"}},
+                headers={**self._headers(), "retry-after": str(self.retry_after)},
+            )
+
+        self.level -= 1
+        self.accepted += 1
+        # Simulate the latency of the model
+        await asyncio.sleep(0.01)
+        response = get_response_obj([get_text_message("hi")])
+        return httpx.Response(200, content=response.model_dump_json(), headers=self._headers())
+
+    def client(self, max_retries: int = 2) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key="fake",
+            base_url="http://stand-in/v1",
+            max_retries=max_retries,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle)),
+        )
+
+
+class StreamingServer:
+    """A local stand-in for the streamed Responses API, whose streams stay open until released."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.release = asyncio.Event()
+
+    async def _body(self) -> AsyncIterator[bytes]:
+        await self.release.wait()
+        event = ResponseCompletedEvent(
+            type="response.completed", response=get_response_obj([get_text_message("hi")])
+        )
+        yield f"event: response.completed\ndata: {event.model_dump_json()}\n\n".encode()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=self._body()
+        )
+
+    def client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key="fake",
+            base_url="http://stand-in/v1",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle)),
+        )
+
+
+async def call_model(model: OpenAIResponsesModel) -> None:
+    await model.get_response(
+        system_instructions=None,
+        input="hello",
+        model_settings=ModelSettings(),
+        tools=[],
+        output_schema=None,
+        handoffs=[],
+        tracing=ModelTracing.DISABLED,
+    )
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_without_limiter_concurrent_requests_are_rejected():
+    server = RateLimitedServer(requests_per_minute=3000, burst=5)
+    model = OpenAIResponsesModel(model="gpt-4o", openai_client=server.client(max_retries=0))
+
+    results = await asyncio.gather(*[call_model(model) for _ in range(20)], return_exceptions=True)
+
+    assert server.rejected > 0
+    assert any(isinstance(r, RateLimitError) for r in results)
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_limiter_keeps_throughput_near_limit_without_429s():
+    # 50 requests/second, with bursts of up to 5 requests. The client allows smaller bursts, to
+    # absorb the jitter between taking a token on the client and arriving at the server.
+    server = RateLimitedServer(requests_per_minute=3000, burst=5)
+    limiter = RateLimiter({"gpt-4o": RateLimit(requests_per_minute=3000, burst_seconds=0.06)})
+    model = OpenAIResponsesModel(
+        model="gpt-4o", openai_client=server.client(), rate_limiter=limiter
+    )
+
+    num_requests = 40
+    start = time.monotonic()
+    await asyncio.gather(*[call_model(model) for _ in range(num_requests)])
+    elapsed = time.monotonic() - start
+
+    assert server.rejected == 0
+    assert server.accepted == num_requests
+    # After the initial burst, requests are sent at the limit: (40 - 3) / 50 = 0.74s. Allow for
+    # scheduling overhead, but make sure we don't throttle far below the limit.
+    throughput = (num_requests - 3) / elapsed
+    assert throughput > 0.75 * server.rate
+    assert throughput <= 1.05 * server.rate
+
+    stats = limiter.get_stats("gpt-4o")
+    assert stats.requests == num_requests
+    assert stats.rate_limited_responses == 0
+    assert stats.total_wait_time > 0
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_limiter_learns_limits_from_429s_and_headers():
+    server = RateLimitedServer(requests_per_minute=1200, burst=20, retry_after=0.1)
+    # No configured limits: the limiter has to learn them from the server
+    limiter = RateLimiter(max_retries=5)
+    model = OpenAIResponsesModel(
+        model="gpt-4o", openai_client=server.client(), rate_limiter=limiter
+    )
+
+    await asyncio.gather(*[call_model(model) for _ in range(30)])
+    first_wave_rejections = server.rejected
+
+    stats = limiter.get_stats("gpt-4o")
+    assert server.accepted == 30, "all requests eventually succeed"
+    assert first_wave_rejections > 0
+    assert stats.rate_limited_responses == first_wave_rejections
+    assert stats.concurrency_limit is not None, "concurrency is limited after a 429"
+
+    # Having learned the limit from the response headers, the next wave causes no 429s
+    await asyncio.gather(*[call_model(model) for _ in range(30)])
+    assert server.rejected == first_wave_rejections
+    assert server.accepted == 60
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_runner_uses_default_rate_limiter():
+    server = RateLimitedServer(requests_per_minute=3000, burst=10)
+    limiter = RateLimiter({"gpt-4o": RateLimit(requests_per_minute=3000, burst_seconds=0.06)})
+    set_default_openai_rate_limiter(limiter)
+
+    agent = Agent(name="test", model="gpt-4o")
+    run_config = RunConfig(model_provider=OpenAIProvider(openai_client=server.client()))
+    results = await asyncio.gather(
+        *[Runner.run(agent, input="hello", run_config=run_config) for _ in range(10)]
+    )
+
+    assert all(result.final_output == "hi" for result in results)
+    assert server.rejected == 0
+    assert limiter.get_stats("gpt-4o").requests == 10
+
+
+@pytest.mark.asyncio
+async def test_tokens_per_minute_limit_delays_large_requests():
+    # 100 tokens per second, with bursts of up to 100 tokens
+    limiter = RateLimiter({"m": RateLimit(tokens_per_minute=6000)})
+
+    start = time.monotonic()
+    async with limiter.acquire("m", estimated_tokens=100):
+        pass
+    assert time.monotonic() - start < 0.05, "the first request fits in the burst"
+
+    async with limiter.acquire("m", estimated_tokens=30):
+        pass
+    assert time.monotonic() - start >= 0.25, "the second request waits for 30 tokens to refill"
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    limiter = RateLimiter({"m": RateLimit(max_concurrency=2)})
+    in_flight = 0
+    max_in_flight = 0
+
+    async def request() -> None:
+        nonlocal in_flight, max_in_flight
+        async with limiter.acquire("m", estimated_tokens=1):
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*[request() for _ in range(6)])
+    assert max_in_flight == 2
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_streams_count_towards_concurrency_until_closed():
+    server = StreamingServer()
+    limiter = RateLimiter({"gpt-4o": RateLimit(max_concurrency=1)})
+    model = OpenAIResponsesModel(
+        model="gpt-4o", openai_client=server.client(), rate_limiter=limiter
+    )
+
+    async def stream_model() -> list[TResponseStreamEvent]:
+        events = model.stream_response(
+            system_instructions=None,
+            input="hello",
+            model_settings=ModelSettings(),
+            tools=[],
+            output_schema=None,
+            handoffs=[],
+            tracing=ModelTracing.DISABLED,
+        )
+        return [event async for event in events]
+
+    first = asyncio.create_task(stream_model())
+    second = asyncio.create_task(stream_model())
+    await asyncio.sleep(0.05)
+    assert server.requests == 1, "the second stream waits until the first one is done"
+
+    server.release.set()
+    results = await asyncio.gather(first, second)
+    assert server.requests == 2
+    assert all(len(events) == 1 for events in results)
+    assert limiter._get_state("gpt-4o").in_flight == 0
+
+
+def test_estimate_request_tokens():
+    assert estimate_request_tokens("a" * 40) == 10
+    assert estimate_request_tokens("a" * 40, None, max_output_tokens=5) == 15
+    assert estimate_request_tokens([{"role": "user", "content": "hi"}]) > 0
+
+
+def test_estimate_request_tokens_counts_images_by_count_not_size():
+    image = "data:image/png;base64," + "A" * 3_000_000
+    responses_input: list[TResponseInputItem] = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "input_text", "text": "What is in this image?"},
+                {"type": "input_image", "image_url": image, "detail": "auto"},
+            ],
+        }
+    ]
+    chat_messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "What is in this image?"},
+                {"type": "image_url", "image_url": {"url": image, "detail": "low"}},
+            ],
+        }
+    ]
+
+    assert estimate_request_tokens(responses_input) == count_input_tokens(responses_input)
+    assert 765 < estimate_request_tokens(responses_input) < 1000
+    assert 85 < estimate_request_tokens(chat_messages) < 300
+
+
+def test_parse_reset_durations():
+    assert _parse_duration("1s") == 1
+    assert _parse_duration("6m0s") == 360
+    assert _parse_duration("20ms") == pytest.approx(0.02)
+    assert _parse_duration("") is None
+    assert _parse_duration("soon") is None
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from agents import (
+    Agent,
+    ModelSettings,
+    RetentionPolicy,
+    RunConfig,
+    Runner,
+    Usage,
+    UserError,
+    load_raw_responses,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseOutputItem
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+class UsageModel(FakeModel):
+    """Reports the usage of each response, and records the responses."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.responses: list[ModelResponse] = []
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        response = await super().get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+        response = dataclasses.replace(
+            response,
+            usage=Usage(requests=1, input_tokens=10, output_tokens=2, total_tokens=12),
+        )
+        self.responses.append(response)
+        return response
+
+
+def get_agent(model: FakeModel, turns: int) -> Agent[Any]:
+    outputs: list[list[TResponseOutputItem] | Exception] = [
+        [get_function_tool_call("foo", f'{{"turn": {i}}}')] for i in range(turns - 1)
+    ]
+    model.add_multiple_turn_outputs(outputs + [[get_text_message("done")]])
+    return Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+
+
+async def run(agent: Agent[Any], run_config: RunConfig, streamed: bool) -> Any:
+    if streamed:
+        result = Runner.run_streamed(agent, "hi", run_config=run_config, max_turns=20)
+        async for _ in result.stream_events():
+            pass
+        return result
+    return await Runner.run(agent, "hi", run_config=run_config, max_turns=20)
+
+
+@pytest.mark.asyncio
+async def test_all_responses_are_kept_by_default():
+    model = UsageModel()
+
+    result = await Runner.run(get_agent(model, 4), "hi")
+
+    assert result.raw_responses == model.responses
+    assert result.usage == Usage(requests=4, input_tokens=40, output_tokens=8, total_tokens=48)
+    assert result.raw_responses_path is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streamed", [False, True])
+async def test_only_the_last_responses_are_kept(streamed: bool):
+    model = UsageModel()
+
+    result = await run(
+        get_agent(model, 12), RunConfig(retention=RetentionPolicy(max_raw_responses=3)), streamed
+    )
+
+    assert result.final_output == "done"
+    assert len(result.raw_responses) == 3
+    assert result.raw_responses[-1].output == [get_text_message("done")]
+    # The run itself still has all of its items
+    assert len(result.new_items) == 11 * 2 + 1
+    if not streamed:
+        assert result.raw_responses == model.responses[-3:]
+        assert result.usage.requests == 12
+
+
+@pytest.mark.asyncio
+async def test_usage_only():
+    model = UsageModel()
+
+    result = await Runner.run(
+        get_agent(model, 5), "hi", run_config=RunConfig(retention=RetentionPolicy(0))
+    )
+
+    assert result.raw_responses == []
+    assert result.usage == Usage(requests=5, input_tokens=50, output_tokens=10, total_tokens=60)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streamed", [False, True])
+async def test_responses_are_spilled_to_disk(streamed: bool, tmp_path: Path):
+    model = FakeModel()
+    retention = RetentionPolicy(max_raw_responses=1, spill_directory=tmp_path / "responses")
+
+    result = await run(get_agent(model, 5), RunConfig(retention=retention), streamed)
+
+    assert len(result.raw_responses) == 1
+    assert result.raw_responses_path is not None
+    assert result.raw_responses_path.parent == tmp_path / "responses"
+    spilled = load_raw_responses(result.raw_responses_path)
+    assert [response.output for response in spilled] == [
+        [get_function_tool_call("foo", f'{{"turn": {i}}}')] for i in range(4)
+    ]
+    assert spilled[0].usage == Usage()
+
+    # Each run spills to its own file
+    other = await run(get_agent(model, 2), RunConfig(retention=retention), streamed)
+    assert other.raw_responses_path != result.raw_responses_path
+    assert len(load_raw_responses(other.raw_responses_path)) == 1
+
+
+def test_invalid_policies_raise(tmp_path: Path):
+    with pytest.raises(UserError):
+        RetentionPolicy(max_raw_responses=-1)
+    with pytest.raises(UserError):
+        RetentionPolicy(spill_directory=tmp_path)
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import random
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError, InternalServerError
+from typing_extensions import TypedDict
+
+from agents import (
+    Agent,
+    ModelSettings,
+    RoutingEndpoint,
+    RoutingModelProvider,
+    RunConfig,
+    Runner,
+    UserError,
+    trace,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import (
+    ModelResponse,
+    TResponseInputItem,
+    TResponseOutputItem,
+    TResponseStreamEvent,
+)
+from agents.models.interface import Model, ModelProvider, ModelTracing
+from agents.tool import Tool
+from agents.tracing.span_data import GenerationSpanData
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool_call, get_text_message
+from .testing_processor import fetch_ordered_spans
+
+
+class Output(TypedDict):
+    response: str
+
+
+REQUEST = httpx.Request("POST", "https://example.com/v1/responses")
+
+
+def server_error() -> Exception:
+    return InternalServerError(
+        "Server error", response=httpx.Response(500, request=REQUEST), body=None
+    )
+
+
+def bad_request() -> Exception:
+    return BadRequestError("Bad request", response=httpx.Response(400, request=REQUEST), body=None)
+
+
+class EndpointModel(FakeModel):
+    """A fake model that answers with the endpoint and model name, or with the errors (or
+    outputs) in `errors`, one per call."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        model_name: str | None,
+        errors: list[list[TResponseOutputItem] | Exception],
+    ):
+        super().__init__(tracing_enabled=True)
+        self.endpoint = endpoint
+        self.model_name = model_name
+        self.errors = errors
+        self.calls = 0
+
+    def get_next_output(self):
+        self.calls += 1
+        if self.errors:
+            return self.errors.pop(0)
+        return [get_text_message(f"{self.endpoint}:{self.model_name}")]
+
+
+class EndpointProvider(ModelProvider):
+    def __init__(
+        self,
+        name: str,
+        errors: dict[str | None, list[list[TResponseOutputItem] | Exception]] | None = None,
+    ):
+        self.name = name
+        self.errors = errors or {}
+        self.models: dict[str | None, EndpointModel] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        if model_name not in self.models:
+            self.models[model_name] = EndpointModel(
+                self.name, model_name, self.errors.get(model_name, [])
+            )
+        return self.models[model_name]
+
+    def calls(self, model_name: str | None = "gpt") -> int:
+        return self.models[model_name].calls if model_name in self.models else 0
+
+
+async def get_text(
+    provider: RoutingModelProvider,
+    model_name: str = "gpt",
+    output_schema: AgentOutputSchema | None = None,
+) -> str:
+    with trace("test"):
+        response = await provider.get_model(model_name).get_response(
+            None, "hi", ModelSettings(), [], output_schema, [], ModelTracing.ENABLED
+        )
+    return response.output[0].content[0].text  # type: ignore
+
+
+def routing_data() -> list[dict[str, Any] | None]:
+    """Returns the routing data of the generation span of each attempt."""
+    return [
+        span.span_data.routing
+        for span in fetch_ordered_spans()
+        if isinstance(span.span_data, GenerationSpanData)
+    ]
+
+
+def test_fast_idle_endpoints_get_more_traffic():
+    provider = RoutingModelProvider(
+        [
+            RoutingEndpoint("fast", EndpointProvider("fast")),
+            RoutingEndpoint("slow", EndpointProvider("slow")),
+        ],
+        rng=random.Random(0),
+    )
+    provider.get_stats("fast").latency = 0.1
+    provider.get_stats("slow").latency = 1.0
+
+    picks = [provider._select_endpoint("gpt", set()).name for _ in range(1000)]  # type: ignore
+    assert 850 < picks.count("fast") < 950
+
+    # The fast endpoint is busy, so the slow one takes a bigger share
+    provider.get_stats("fast").in_flight = 9
+    picks = [provider._select_endpoint("gpt", set()).name for _ in range(1000)]  # type: ignore
+    assert 400 < picks.count("fast") < 600
+
+
+def test_canary_gets_a_small_share_of_traffic():
+    provider = RoutingModelProvider(
+        [
+            RoutingEndpoint("stable", EndpointProvider("stable")),
+            RoutingEndpoint("canary", EndpointProvider("canary"), weight=0.05),
+        ],
+        rng=random.Random(0),
+    )
+
+    picks = [provider._select_endpoint("gpt", set()).name for _ in range(2000)]  # type: ignore
+    assert 40 < picks.count("canary") < 160
+
+
+def test_endpoints_only_serve_their_models():
+    provider = RoutingModelProvider(
+        [
+            RoutingEndpoint("local", EndpointProvider("local"), model_names=["llama"]),
+            RoutingEndpoint("openai", EndpointProvider("openai"), model_names=["gpt"]),
+        ]
+    )
+
+    assert provider._select_endpoint("gpt", set()).name == "openai"  # type: ignore
+    assert provider._select_endpoint("llama", set()).name == "local"  # type: ignore
+    assert provider._select_endpoint("other", set()) is None
+
+
+@pytest.mark.asyncio
+async def test_endpoint_failure_fails_over_to_another_endpoint():
+    broken = EndpointProvider("broken", {"gpt": [server_error()]})
+    provider = RoutingModelProvider(
+        [
+            RoutingEndpoint("broken", broken),
+            RoutingEndpoint("healthy", EndpointProvider("healthy"), weight=1e-9),
+        ]
+    )
+
+    assert await get_text(provider) == "healthy:gpt"
+    assert provider.get_stats("broken").failures == 1
+    assert provider.get_stats("broken").error_rate > 0
+    assert provider.get_stats("broken").in_flight == 0
+    assert provider.get_stats("healthy").latency is not None
+
+    failed, succeeded = routing_data()
+    assert failed == {
+        "model": "gpt",
+        "endpoint": "broken",
+        "routed_model": "gpt",
+        "fallback": False,
+        "attempts": [],
+    }
+    assert succeeded == {
+        "model": "gpt",
+        "endpoint": "healthy",
+        "routed_model": "gpt",
+        "fallback": False,
+        "attempts": [{"endpoint": "broken", "model": "gpt", "error": "InternalServerError"}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_failing_endpoint_is_ejected_for_cooldown():
+    connection_error = APIConnectionError(request=REQUEST)
+    broken = EndpointProvider("broken", {"gpt": [connection_error] * 3})
+    healthy = EndpointProvider("healthy")
+    provider = RoutingModelProvider(
+        [RoutingEndpoint("broken", broken), RoutingEndpoint("healthy", healthy, weight=1e-9)],
+        eject_after_failures=3,
+        ejection_cooldown=60,
+    )
+
+    for _ in range(3):
+        assert await get_text(provider) == "healthy:gpt"
+    assert provider.get_stats("broken").ejected_until is not None
+
+    # While ejected, the endpoint gets no traffic, despite its weight
+    for _ in range(5):
+        assert await get_text(provider) == "healthy:gpt"
+    assert broken.calls() == 3
+
+    # After the cool-down, it's used again
+    provider.get_stats("broken").ejected_until = 0
+    assert await get_text(provider) == "broken:gpt"
+
+
+@pytest.mark.asyncio
+async def test_ejected_endpoints_are_tried_if_there_is_no_other():
+    provider = RoutingModelProvider([RoutingEndpoint("only", EndpointProvider("only"))])
+    provider.get_stats("only").ejected_until = float("inf")
+
+    assert await get_text(provider) == "only:gpt"
+
+
+@pytest.mark.asyncio
+async def test_falls_back_along_model_chain():
+    endpoint = EndpointProvider(
+        "openai",
+        {
+            "gpt-big": [[get_function_tool_call("unknown_tool")]],
+            "gpt-medium": [server_error()],
+        },
+    )
+    provider = RoutingModelProvider(
+        [RoutingEndpoint("openai", endpoint)],
+        fallbacks={"gpt-big": ["gpt-medium", "gpt-small"]},
+    )
+
+    assert await get_text(provider, "gpt-big") == "openai:gpt-small"
+    routing = routing_data()[-1]
+    assert routing is not None
+    assert routing["model"] == "gpt-big"
+    assert routing["routed_model"] == "gpt-small"
+    assert routing["fallback"] is True
+    assert routing["attempts"] == [
+        {"endpoint": "openai", "model": "gpt-big", "error": "ModelBehaviorError"},
+        {"endpoint": "openai", "model": "gpt-medium", "error": "InternalServerError"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_falls_back_on_output_that_does_not_match_the_schema():
+    endpoint = EndpointProvider(
+        "openai",
+        {
+            "gpt-big": [[get_text_message("not json")]],
+            "gpt-small": [[get_text_message('{"response": "ok"}')]],
+        },
+    )
+    provider = RoutingModelProvider(
+        [RoutingEndpoint("openai", endpoint)], fallbacks={"gpt-big": ["gpt-small"]}
+    )
+
+    text = await get_text(provider, "gpt-big", AgentOutputSchema(Output))
+
+    assert text == '{"response": "ok"}'
+    assert endpoint.calls("gpt-big") == endpoint.calls("gpt-small") == 1
+    # The validation error of the first response isn't attached to the surrounding span
+    assert all(span.error is None for span in fetch_ordered_spans())
+
+
+@pytest.mark.asyncio
+async def test_last_model_output_is_left_to_the_runner():
+    endpoint = EndpointProvider("openai", {"gpt": [[get_function_tool_call("unknown_tool")]]})
+    provider = RoutingModelProvider([RoutingEndpoint("openai", endpoint)])
+
+    with trace("test"):
+        response = await provider.get_model("gpt").get_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.ENABLED
+        )
+
+    assert response.output == [get_function_tool_call("unknown_tool")]
+
+
+@pytest.mark.asyncio
+async def test_last_error_is_raised_when_everything_fails():
+    provider = RoutingModelProvider(
+        [RoutingEndpoint("a", EndpointProvider("a", {"gpt": [server_error()]}))]
+    )
+
+    with pytest.raises(InternalServerError):
+        await get_text(provider)
+
+
+@pytest.mark.asyncio
+async def test_request_errors_are_not_retried():
+    a = EndpointProvider("a", {"gpt": [bad_request()]})
+    b = EndpointProvider("b", {"gpt": [bad_request()]})
+    provider = RoutingModelProvider([RoutingEndpoint("a", a), RoutingEndpoint("b", b)])
+
+    with pytest.raises(BadRequestError):
+        await get_text(provider)
+    assert a.calls() + b.calls() == 1
+    assert provider.get_stats("a").failures == provider.get_stats("b").failures == 0
+
+
+class FailingStreamModel(FakeModel):
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        raise server_error()
+        yield  # Makes this an async generator
+
+    async def get_response(self, *args, **kwargs) -> ModelResponse:
+        raise server_error()
+
+
+class FailingStreamProvider(ModelProvider):
+    def get_model(self, model_name: str | None) -> Model:
+        return FailingStreamModel()
+
+
+@pytest.mark.asyncio
+async def test_runner_with_routing_provider():
+    provider = RoutingModelProvider(
+        [
+            RoutingEndpoint("broken", FailingStreamProvider()),
+            RoutingEndpoint("healthy", EndpointProvider("healthy"), weight=1e-9),
+        ],
+    )
+    agent = Agent(name="test", model="gpt")
+
+    result = await Runner.run(agent, input="hi", run_config=RunConfig(model_provider=provider))
+    assert result.final_output == "healthy:gpt"
+
+    streamed = Runner.run_streamed(agent, input="hi", run_config=RunConfig(model_provider=provider))
+    async for _ in streamed.stream_events():
+        pass
+    assert streamed.final_output == "healthy:gpt"
+    assert provider.get_stats("broken").failures == 2
+
+
+def test_invalid_endpoints():
+    with pytest.raises(UserError):
+        RoutingModelProvider([])
+    with pytest.raises(UserError):
+        RoutingModelProvider(
+            [
+                RoutingEndpoint("a", EndpointProvider("a")),
+                RoutingEndpoint("a", EndpointProvider("a")),
+            ]
+        )
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from agents import Agent, BatchRunResult, ModelSettings, Runner, UserError
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+from agents.usage import Usage
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+
+PREFIX_TOKENS = 1000
+
+
+class PromptCacheModel(FakeModel):
+    """A fake model with a prompt cache: a request's prefix (system prompt and all input items but
+    the last) is served from the cache if an earlier request that completed had the same prefix."""
+
+    def __init__(self, delay: float = 0.01, fail_on: str | None = None):
+        super().__init__()
+        self.delay = delay
+        self.fail_on = fail_on
+        self.cached_prefixes: set[str] = set()
+        self.requests: list[tuple[str, int | None]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        assert isinstance(input, list)
+        last_message = str(input[-1].get("content"))
+        self.requests.append((last_message, model_settings.max_tokens))
+        if last_message == self.fail_on:
+            raise ValueError("boom")
+
+        prefix = json.dumps([system_instructions, input[:-1]])
+        cached = prefix in self.cached_prefixes
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        self.cached_prefixes.add(prefix)
+
+        return ModelResponse(
+            output=[get_text_message(f"answer to {last_message}")],
+            usage=Usage(
+                requests=1,
+                input_tokens=PREFIX_TOKENS + 10,
+                cached_input_tokens=PREFIX_TOKENS if cached else 0,
+            ),
+            referenceable_id=None,
+        )
+
+
+def get_input(history: str, question: str) -> list[TResponseInputItem]:
+    return [
+        {"role": "user", "content": history},
+        {"role": "assistant", "content": "ok"},
+        {"role": "user", "content": question},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_results_are_in_input_order():
+    model = PromptCacheModel()
+    agent = Agent(name="test", instructions="You answer questions.", model=model)
+    inputs: list[str | list[TResponseInputItem]] = [
+        "q0",
+        get_input("doc A", "q1"),
+        "q2",
+        get_input("doc A", "q3"),
+    ]
+
+    result = await Runner.run_batch(agent, inputs)
+
+    assert isinstance(result, BatchRunResult)
+    assert [r.final_output for r in result.results] == [  # type: ignore[union-attr]
+        "answer to q0",
+        "answer to q1",
+        "answer to q2",
+        "answer to q3",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_runs_are_grouped_by_shared_prefix_and_primed():
+    model = PromptCacheModel()
+    agent = Agent(name="test", instructions="You answer questions.", model=model)
+    inputs: list[str | list[TResponseInputItem]] = [
+        get_input("doc A", "a1"),
+        "s1",
+        get_input("doc A", "a2"),
+        get_input("doc A", "a3"),
+        get_input("doc B", "b1"),
+        "s2",
+    ]
+
+    result = await Runner.run_batch(agent, inputs)
+
+    assert [group.input_indices for group in result.groups] == [[0, 2, 3], [1, 5], [4]]
+    assert [group.primed for group in result.groups] == [True, True, False]
+    # Each group's runs only start after its primer, so all of them hit the cache
+    assert [group.cached_token_ratio for group in result.groups] == [
+        pytest.approx(3 * PREFIX_TOKENS / (4 * (PREFIX_TOKENS + 10))),
+        pytest.approx(2 * PREFIX_TOKENS / (3 * (PREFIX_TOKENS + 10))),
+        0.0,
+    ]
+    primers = [request for request in model.requests if request[1] == 16]
+    assert len(primers) == 2
+    usage = result.usage
+    assert usage.requests == 8
+    assert result.cached_token_ratio == pytest.approx(
+        usage.cached_input_tokens / usage.input_tokens
+    )
+
+
+@pytest.mark.asyncio
+async def test_without_priming_concurrent_runs_miss_the_cache():
+    model = PromptCacheModel()
+    agent = Agent(name="test", model=model)
+
+    result = await Runner.run_batch(agent, ["a", "b", "c"], prime_cache=False)
+
+    assert result.groups[0].primed is False
+    assert result.cached_token_ratio == 0.0
+    assert len(model.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_are_returned_in_place():
+    model = PromptCacheModel(fail_on="b")
+    agent = Agent(name="test", model=model)
+
+    result = await Runner.run_batch(agent, ["a", "b", "c"])
+
+    assert isinstance(result.results[1], ValueError)
+    assert result.results[0].final_output == "answer to a"  # type: ignore[union-attr]
+    assert result.results[2].final_output == "answer to c"  # type: ignore[union-attr]
+
+
+@pytest.mark.asyncio
+async def test_failed_primer_does_not_stop_the_group():
+    model = PromptCacheModel(fail_on="Reply with OK.")
+    agent = Agent(name="test", model=model)
+
+    result = await Runner.run_batch(agent, ["a", "b"])
+
+    assert result.groups[0].primed is False
+    assert [r.final_output for r in result.results] == [  # type: ignore[union-attr]
+        "answer to a",
+        "answer to b",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_limited():
+    model = PromptCacheModel(delay=0.02)
+    agent = Agent(name="test", model=model)
+
+    await Runner.run_batch(agent, [f"q{i}" for i in range(10)], max_concurrency=3)
+
+    assert model.max_in_flight == 3
+
+    with pytest.raises(UserError):
+        await Runner.run_batch(agent, ["q"], max_concurrency=0)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from agents import (
+    Agent,
+    DeadlineExceeded,
+    RunConfig,
+    RunContextWrapper,
+    Runner,
+    function_tool,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from agents.model_settings import ModelSettings
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+class SlowModel(FakeModel):
+    """A fake model that takes `delays[i]` seconds to produce its i-th response."""
+
+    def __init__(self, delays: list[float]):
+        super().__init__()
+        self.delays = delays
+        self.model_settings: list[ModelSettings] = []
+
+    async def _wait(self, model_settings: ModelSettings) -> None:
+        self.model_settings.append(model_settings)
+        delay = self.delays.pop(0) if self.delays else 0
+        await asyncio.sleep(delay)
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        await self._wait(model_settings)
+        return await super().get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        await self._wait(model_settings)
+        async for event in super().stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        ):
+            yield event
+
+
+@pytest.mark.asyncio
+async def test_no_timeouts_by_default():
+    model = SlowModel(delays=[0])
+    model.set_next_output([get_text_message("done")])
+    agent = Agent(name="test", model=model)
+
+    result = await Runner.run(agent, input="test")
+    assert result.final_output == "done"
+    assert model.model_settings[0].timeout is None
+
+
+@pytest.mark.asyncio
+async def test_model_call_timeout_raises_deadline_exceeded():
+    model = SlowModel(delays=[10])
+    agent = Agent(name="test", model=model)
+
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        await Runner.run(agent, input="test", run_config=RunConfig(model_call_timeout=0.05))
+
+    assert exc_info.value.timeout_type == "model_call"
+    timeout = model.model_settings[0].timeout
+    assert timeout is not None and 0 < timeout <= 0.05, "budget should be passed to the model"
+
+
+@pytest.mark.asyncio
+async def test_model_settings_timeout_is_capped_by_remaining_budget():
+    model = SlowModel(delays=[0])
+    model.set_next_output([get_text_message("done")])
+    agent = Agent(name="test", model=model, model_settings=ModelSettings(timeout=100))
+
+    await Runner.run(agent, input="test", run_config=RunConfig(run_timeout=5))
+    timeout = model.model_settings[0].timeout
+    assert timeout is not None and timeout <= 5
+
+
+@pytest.mark.asyncio
+async def test_run_timeout_attaches_partial_results():
+    model = SlowModel(delays=[0, 10])
+    model.set_next_output([get_text_message("a_message"), get_function_tool_call("foo", "")])
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "tool_result")])
+
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        await Runner.run(agent, input="test", run_config=RunConfig(run_timeout=0.1))
+
+    assert exc_info.value.timeout_type == "run"
+    partial_result = exc_info.value.partial_result
+    assert partial_result is not None
+    assert partial_result.final_output is None
+    assert len(partial_result.raw_responses) == 1, "the first turn completed in time"
+    assert len(partial_result.new_items) == 3, "message, tool call and tool output from turn 1"
+
+
+@pytest.mark.asyncio
+async def test_turn_timeout_covers_tools_and_exposes_remaining_time():
+    remaining_times: list[float | None] = []
+
+    @function_tool
+    async def slow_tool(ctx: RunContextWrapper[None]) -> str:
+        remaining_times.append(ctx.remaining_time())
+        await asyncio.sleep(10)
+        return "unreachable"
+
+    model = SlowModel(delays=[0])
+    model.set_next_output([get_function_tool_call("slow_tool", "{}")])
+    agent = Agent(name="test", model=model, tools=[slow_tool])
+
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        await Runner.run(
+            agent, input="test", run_config=RunConfig(run_timeout=10, turn_timeout=0.1)
+        )
+
+    assert exc_info.value.timeout_type == "turn"
+    assert len(remaining_times) == 1
+    remaining = remaining_times[0]
+    assert remaining is not None and 0 < remaining <= 0.1
+
+
+@pytest.mark.asyncio
+async def test_run_completes_within_timeouts():
+    model = SlowModel(delays=[0, 0])
+    model.add_multiple_turn_outputs(
+        [
+            [get_function_tool_call("foo", "")],
+            [get_text_message("done")],
+        ]
+    )
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "tool_result")])
+
+    result = await Runner.run(
+        agent,
+        input="test",
+        run_config=RunConfig(run_timeout=5, turn_timeout=2, model_call_timeout=1),
+    )
+    assert result.final_output == "done"
+    assert all(s.timeout is not None and s.timeout <= 1 for s in model.model_settings)
+
+
+@pytest.mark.asyncio
+async def test_streamed_run_timeout():
+    model = SlowModel(delays=[0, 10])
+    model.set_next_output([get_text_message("a_message"), get_function_tool_call("foo", "")])
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "tool_result")])
+
+    # The first streamed response is slow to build when the pydantic models are still cold, so
+    # leave it some margin
+    result = Runner.run_streamed(agent, input="test", run_config=RunConfig(run_timeout=0.5))
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        async for _ in result.stream_events():
+            pass
+
+    assert exc_info.value.timeout_type == "run"
+    assert exc_info.value.partial_result is result
+    assert len(result.new_items) == 3
+    assert result.is_complete
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streamed", [False, True])
+async def test_other_timeout_errors_are_not_reported_as_deadlines(streamed: bool):
+    model = SlowModel(delays=[0])
+    model.set_next_output(asyncio.TimeoutError("Request timed out"))
+    agent = Agent(name="test", model=model)
+    run_config = RunConfig(run_timeout=10, turn_timeout=10, model_call_timeout=10)
+
+    with pytest.raises(asyncio.TimeoutError, match="Request timed out"):
+        if streamed:
+            result = Runner.run_streamed(agent, input="test", run_config=run_config)
+            async for _ in result.stream_events():
+                pass
+        else:
+            await Runner.run(agent, input="test", run_config=run_config)
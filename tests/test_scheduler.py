@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from agents import Agent, ModelCallScheduler, RunConfig, Runner, UserError
+from agents.tracing.span_data import CustomSpanData
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+from .testing_processor import fetch_ordered_spans
+
+
+class SchedulerAwareModel(FakeModel):
+    """Records how many calls the scheduler had in flight whenever the model was called."""
+
+    def __init__(self, scheduler: ModelCallScheduler):
+        super().__init__()
+        self.scheduler = scheduler
+        self.in_flight_during_calls: list[int] = []
+
+    async def get_response(self, *args, **kwargs):
+        self.in_flight_during_calls.append(self.scheduler.in_flight("SchedulerAwareModel"))
+        return await super().get_response(*args, **kwargs)
+
+    async def stream_response(self, *args, **kwargs):
+        async for event in super().stream_response(*args, **kwargs):
+            self.in_flight_during_calls.append(self.scheduler.in_flight("SchedulerAwareModel"))
+            yield event
+
+
+async def start_queued_call(
+    scheduler: ModelCallScheduler, started: list[str], name: str, **kwargs
+) -> asyncio.Task[None]:
+    async def run() -> None:
+        call = await scheduler.acquire(**kwargs)
+        started.append(name)
+        call.release()
+
+    task = asyncio.create_task(run())
+    # Let the call reach the queue, so that queue order matches creation order
+    await asyncio.sleep(0)
+    return task
+
+
+@pytest.mark.asyncio
+async def test_in_flight_calls_are_capped_per_provider():
+    scheduler = ModelCallScheduler(max_in_flight=2, max_in_flight_per_provider={"small": 1})
+    peak: dict[str, int] = {"default": 0, "small": 0}
+
+    async def call(provider: str) -> None:
+        async with scheduler.schedule(provider=provider):
+            peak[provider] = max(peak[provider], scheduler.in_flight(provider))
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call("default") for _ in range(6)), *(call("small") for _ in range(3)))
+
+    assert peak == {"default": 2, "small": 1}
+    assert scheduler.in_flight("default") == 0
+    assert scheduler.in_flight("small") == 0
+    stats = scheduler.get_stats("interactive")
+    assert stats.calls == 9
+    assert stats.queued_calls == 6
+    assert stats.max_wait_time > 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_start_before_batch_calls():
+    scheduler = ModelCallScheduler(max_in_flight=1)
+    blocker = await scheduler.acquire()
+    started: list[str] = []
+
+    tasks = [
+        await start_queued_call(scheduler, started, "batch_1", priority="batch"),
+        await start_queued_call(scheduler, started, "batch_2", priority="batch"),
+        await start_queued_call(scheduler, started, "interactive_1", priority="interactive"),
+        await start_queued_call(scheduler, started, "interactive_2", priority="interactive"),
+    ]
+    blocker.release()
+    await asyncio.gather(*tasks)
+
+    assert started == ["interactive_1", "interactive_2", "batch_1", "batch_2"]
+    assert scheduler.get_stats("batch").queued_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_tenants_share_slots_fairly():
+    scheduler = ModelCallScheduler(max_in_flight=1)
+    blocker = await scheduler.acquire()
+    started: list[str] = []
+
+    tasks = [await start_queued_call(scheduler, started, "a", tenant="a") for _ in range(4)]
+    tasks += [await start_queued_call(scheduler, started, "b", tenant="b") for _ in range(2)]
+    blocker.release()
+    await asyncio.gather(*tasks)
+
+    # Tenant b isn't stuck behind all of tenant a's calls
+    assert started == ["a", "b", "a", "b", "a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_tenant_weights():
+    scheduler = ModelCallScheduler(max_in_flight=1, tenant_weights={"big": 2})
+    blocker = await scheduler.acquire()
+    started: list[str] = []
+
+    tasks = [await start_queued_call(scheduler, started, "small", tenant="small") for _ in range(3)]
+    tasks += [await start_queued_call(scheduler, started, "big", tenant="big") for _ in range(6)]
+    blocker.release()
+    await asyncio.gather(*tasks)
+
+    assert started == ["big", "small", "big", "big", "small", "big", "big", "small", "big"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_call_gives_up_its_place():
+    scheduler = ModelCallScheduler(max_in_flight=1)
+    blocker = await scheduler.acquire()
+    started: list[str] = []
+
+    cancelled = await start_queued_call(scheduler, started, "cancelled")
+    waiting = await start_queued_call(scheduler, started, "waiting")
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    blocker.release()
+    await waiting
+
+    assert started == ["waiting"]
+    assert scheduler.in_flight("default") == 0
+
+
+def test_max_in_flight_must_be_positive():
+    with pytest.raises(UserError):
+        ModelCallScheduler(max_in_flight=0)
+
+
+@pytest.mark.asyncio
+async def test_runner_waits_for_scheduler_and_records_queue_wait():
+    scheduler = ModelCallScheduler(max_in_flight=1)
+    model = SchedulerAwareModel(scheduler)
+    model.set_next_output([get_text_message("done")])
+    agent = Agent(name="test", model=model)
+
+    blocker = await scheduler.acquire(provider="SchedulerAwareModel")
+    run = asyncio.create_task(
+        Runner.run(
+            agent,
+            input="hi",
+            run_config=RunConfig(scheduler=scheduler, priority="batch", tenant="acme"),
+        )
+    )
+    queue = scheduler._get_queue("SchedulerAwareModel")
+    while not queue._has_queued_calls():
+        await asyncio.sleep(0)
+    queued_at = time.monotonic()
+    await asyncio.sleep(0.01)
+    assert not run.done()
+    assert model.in_flight_during_calls == []
+
+    held_for = time.monotonic() - queued_at
+    blocker.release()
+    result = await run
+
+    assert result.final_output == "done"
+    assert model.in_flight_during_calls == [1]
+    assert scheduler.in_flight("SchedulerAwareModel") == 0
+    stats = scheduler.get_stats("batch")
+    assert stats.calls == 1
+    assert stats.queued_calls == 1
+    # The run was queued before `queued_at`, and got the slot after the blocker was released
+    assert stats.total_wait_time >= held_for
+
+    queue_spans = [
+        span
+        for span in fetch_ordered_spans()
+        if isinstance(span.span_data, CustomSpanData) and span.span_data.name == "Model call queue"
+    ]
+    assert len(queue_spans) == 1
+    data = queue_spans[0].span_data.data
+    assert data["priority"] == "batch"
+    assert data["tenant"] == "acme"
+    assert data["provider"] == "SchedulerAwareModel"
+    assert data["queue_wait_seconds"] == stats.total_wait_time
+
+
+@pytest.mark.asyncio
+async def test_streamed_run_holds_slot_for_the_whole_stream():
+    scheduler = ModelCallScheduler(max_in_flight=1)
+    model = SchedulerAwareModel(scheduler)
+    model.set_next_output([get_text_message("done")])
+    agent = Agent(name="test", model=model)
+
+    result = Runner.run_streamed(agent, input="hi", run_config=RunConfig(scheduler=scheduler))
+    async for _ in result.stream_events():
+        pass
+
+    assert result.final_output == "done"
+    assert model.in_flight_during_calls
+    assert all(n == 1 for n in model.in_flight_during_calls)
+    assert scheduler.in_flight("SchedulerAwareModel") == 0
+    assert scheduler.get_stats("interactive").calls == 1
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import copy
+import json
+from typing import Any
+
+import pytest
+from pydantic import BaseModel, Field
+
+from agents import (
+    Agent,
+    ModelSettings,
+    RunConfig,
+    Runner,
+    function_tool,
+    get_schema_minification_report,
+    handoff,
+    minify_json_schema,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem
+from agents.models.interface import ModelTracing
+from agents.strict_schema import resolve_ref
+from agents.tool import FunctionTool, Tool
+from agents.usage import Usage
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+    zip_code: str
+    country: str
+
+
+class Person(BaseModel):
+    name: str
+    home: Address = Field(description="Where the person lives")
+    work: Address = Field(description="Where the person works")
+
+
+class Order(BaseModel):
+    buyer: Person
+    seller: Person
+    note: str | None = None
+
+
+@function_tool
+def place_order(order: Order, priority: int = 1) -> str:
+    """Places an order."""
+    return "ok"
+
+
+def expand(schema: Any, root: dict[str, Any]) -> Any:
+    """Resolves every reference, and drops the definitions and titles, so that schemas that
+    accept the same values compare equal."""
+    if isinstance(schema, list):
+        return [expand(item, root) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    if "$ref" in schema:
+        resolved = resolve_ref(root=root, ref=schema["$ref"])
+        schema = {**resolved, **{k: v for k, v in schema.items() if k != "$ref"}}  # type: ignore
+    return {
+        key: value if key in ("required", "enum", "const", "default") else expand(value, root)
+        for key, value in schema.items()
+        if key not in ("$defs", "title")
+    }
+
+
+def assert_equivalent(minified: dict[str, Any], original: dict[str, Any]) -> None:
+    assert expand(minified, minified) == expand(original, original)
+
+
+def test_minified_tool_schema_is_smaller_and_equivalent():
+    schema = place_order.params_json_schema
+    original = copy.deepcopy(schema)
+
+    minified = minify_json_schema(schema)
+
+    assert schema == original
+    assert_equivalent(minified, original)
+    assert len(json.dumps(minified)) < len(json.dumps(original)) * 0.7
+    assert "title" not in json.dumps(minified)
+    # Person is used twice, so it stays a definition. The addresses differ by their descriptions,
+    # and references can't have sibling keywords in strict mode, so they stay inlined.
+    assert list(minified["$defs"]) == ["Person"]
+    assert minified["type"] == "object"
+    assert minified["additionalProperties"] is False
+
+
+def test_single_use_definitions_are_inlined_and_unused_ones_dropped():
+    schema = {
+        "$defs": {
+            "Used": {"type": "object", "properties": {"a": {"type": "string"}}, "title": "Used"},
+            "Unused": {"type": "integer"},
+        },
+        "type": "object",
+        "properties": {"x": {"$ref": "#/$defs/Used"}},
+    }
+
+    assert minify_json_schema(schema) == {
+        "type": "object",
+        "properties": {"x": {"type": "object", "properties": {"a": {"type": "string"}}}},
+    }
+
+
+def test_identical_definitions_are_merged():
+    body = {
+        "type": "object",
+        "properties": {"a": {"type": "string"}, "b": {"type": "string"}},
+        "required": ["a", "b"],
+    }
+    schema = {
+        "$defs": {"A": copy.deepcopy(body), "B": copy.deepcopy(body)},
+        "type": "object",
+        "properties": {"x": {"$ref": "#/$defs/A"}, "y": {"$ref": "#/$defs/B"}},
+    }
+
+    minified = minify_json_schema(schema)
+
+    assert minified["$defs"] == {"A": body}
+    assert minified["properties"] == {"x": {"$ref": "#/$defs/A"}, "y": {"$ref": "#/$defs/A"}}
+
+
+def test_repeated_subschemas_are_moved_to_definitions():
+    point = {
+        "type": "object",
+        "properties": {"x": {"type": "number"}, "y": {"type": "number"}},
+        "required": ["x", "y"],
+        "additionalProperties": False,
+    }
+    schema = {
+        "type": "object",
+        "properties": {name: copy.deepcopy(point) for name in ("a", "b", "c")},
+    }
+
+    minified = minify_json_schema(schema)
+
+    assert minified["$defs"] == {"S0": point}
+    assert minified["properties"] == {name: {"$ref": "#/$defs/S0"} for name in ("a", "b", "c")}
+    assert_equivalent(minified, schema)
+
+
+def test_recursive_definitions_are_kept():
+    schema = {
+        "$defs": {
+            "Node": {
+                "type": "object",
+                "properties": {"children": {"type": "array", "items": {"$ref": "#/$defs/Node"}}},
+            }
+        },
+        "type": "object",
+        "properties": {"root": {"$ref": "#/$defs/Node"}},
+    }
+
+    assert minify_json_schema(schema) == schema
+
+
+def test_no_op_keywords_are_removed_but_property_names_are_kept():
+    schema = {
+        "type": "object",
+        "title": "Args",
+        "description": "",
+        "properties": {
+            "title": {"type": "string", "title": "Title", "description": "The title"},
+            "count": {"type": "integer", "minimum": 0, "default": 0},
+            "tags": {
+                "type": "array",
+                "items": {"type": "string"},
+                "minItems": 0,
+                "uniqueItems": False,
+            },
+            "flag": {"allOf": [{"type": "boolean"}], "additionalProperties": True},
+        },
+    }
+
+    assert minify_json_schema(schema) == {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "The title"},
+            "count": {"type": "integer", "minimum": 0, "default": 0},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "flag": {"type": "boolean"},
+        },
+    }
+
+
+def test_report_estimates_savings_per_schema():
+    agent = Agent(
+        name="shop",
+        tools=[place_order],
+        handoffs=[handoff(Agent(name="support"))],
+        output_type=Order,
+    )
+
+    report = get_schema_minification_report(agent)
+
+    assert report.agent == "shop"
+    assert [(s.name, s.kind) for s in report.schemas] == [
+        ("place_order", "tool"),
+        ("transfer_to_support", "handoff"),
+        ("output", "output"),
+    ]
+    assert report.schemas[0].saved_tokens > 100
+    assert report.saved_tokens == report.original_tokens - report.minified_tokens > 0
+
+
+class SchemaRecordingModel(FakeModel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.tools: list[list[Tool]] = []
+        self.output_schemas: list[AgentOutputSchema | None] = []
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        self.tools.append(tools)
+        self.output_schemas.append(output_schema)
+        return ModelResponse(
+            output=self.get_next_output(),  # type: ignore[arg-type]
+            usage=Usage(),
+            referenceable_id=None,
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("minify_schemas", [False, True])
+async def test_runner_sends_minified_schemas(minify_schemas: bool):
+    model = SchemaRecordingModel()
+    address = Address(street="s", city="c", zip_code="z", country="x")
+    order = Order(
+        buyer=Person(name="a", home=address, work=address),
+        seller=Person(name="b", home=address, work=address),
+    )
+    model.set_next_output([get_text_message(json.dumps({"response": [order.model_dump()]}))])
+    agent = Agent(name="shop", model=model, tools=[place_order], output_type=list[Order])
+
+    result = await Runner.run(
+        agent, input="hi", run_config=RunConfig(minify_schemas=minify_schemas)
+    )
+
+    # Outputs are still validated against the output type
+    assert result.final_output == [order]
+    [tool] = model.tools[0]
+    assert isinstance(tool, FunctionTool)
+    output_schema = model.output_schemas[0]
+    assert output_schema is not None
+    if minify_schemas:
+        assert tool.params_json_schema == minify_json_schema(place_order.params_json_schema)
+        assert "title" not in json.dumps(output_schema.json_schema())
+        assert_equivalent(output_schema.json_schema(), AgentOutputSchema(list[Order]).json_schema())
+    else:
+        assert tool is place_order
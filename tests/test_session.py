@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from agents import (
+    Agent,
+    InMemorySession,
+    ModelSettings,
+    Runner,
+    Session,
+    SessionHistory,
+    SQLiteSession,
+    UserError,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+def user(content: str) -> TResponseInputItem:
+    return {"role": "user", "content": content}
+
+
+def output(call_id: str) -> TResponseInputItem:
+    return {"type": "function_call_output", "call_id": call_id, "output": "done"}
+
+
+def get_sessions(tmp_path: Path) -> list[Session]:
+    return [InMemorySession(), SQLiteSession("chat", tmp_path / "sessions.db")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_session_appends_and_loads_last_items(backend: str, tmp_path: Path):
+    session = get_sessions(tmp_path)[0 if backend == "memory" else 1]
+
+    await session.add_items([user("1"), user("2")])
+    await session.add_items([user("3")])
+
+    assert list(await session.get_items()) == [user("1"), user("2"), user("3")]
+    assert list(await session.get_items(limit=2)) == [user("2"), user("3")]
+    assert list(await session.get_items(limit=5)) == [user("1"), user("2"), user("3")]
+
+    await session.clear()
+    assert list(await session.get_items()) == []
+
+
+@pytest.mark.asyncio
+async def test_in_memory_history_is_a_view():
+    session = InMemorySession()
+    items = [user("1"), user("2")]
+    await session.add_items(items)
+
+    history = await session.get_items(limit=1)
+    await session.add_items([user("3")])
+    items[0]["content"] = "changed"  # type: ignore
+
+    assert isinstance(history, SessionHistory)
+    assert list(history) == [user("2")]
+    assert history[-1] == user("2")
+    assert history[:5] == [user("2")]
+    with pytest.raises(IndexError):
+        history[1]
+    assert (await session.get_items())[0] == user("1")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_sessions_persist_and_are_isolated(tmp_path: Path):
+    path = tmp_path / "sessions.db"
+    first = SQLiteSession("a", path)
+    await first.add_items([user("hi"), {"role": "assistant", "content": "hello"}])
+    await SQLiteSession("b", path).add_items([user("other")])
+    first.close()
+
+    reopened = SQLiteSession("a", path)
+
+    assert list(await reopened.get_items()) == [
+        user("hi"),
+        {"role": "assistant", "content": "hello"},
+    ]
+    await reopened.clear()
+    assert list(await SQLiteSession("b", path).get_items()) == [user("other")]
+
+
+@pytest.mark.asyncio
+async def test_bounded_history_drops_cut_off_tool_outputs():
+    session = InMemorySession(max_history_items=3)
+    await session.add_items(
+        [
+            user("hi"),
+            {"type": "function_call", "id": "fc", "call_id": "1", "name": "foo", "arguments": "{}"},
+            output("1"),
+            output("2"),
+            user("bye"),
+        ]
+    )
+
+    assert list(await session.get_history()) == [user("bye")]
+
+
+def test_invalid_arguments_raise(tmp_path: Path):
+    with pytest.raises(UserError):
+        InMemorySession(max_history_items=0)
+    with pytest.raises(UserError):
+        SQLiteSession("a", tmp_path / "db", table_name="items; DROP TABLE x")
+
+
+class RecordingModel(FakeModel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.inputs: list[list[TResponseInputItem]] = []
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        assert isinstance(input, list)
+        self.inputs.append(input)
+        return await super().get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+
+    async def stream_response(self, system_instructions, input, *args: Any, **kwargs: Any):
+        assert isinstance(input, list)
+        self.inputs.append(input)
+        async for event in super().stream_response(system_instructions, input, *args, **kwargs):
+            yield event
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+@pytest.mark.parametrize("streamed", [False, True])
+async def test_runner_continues_the_conversation(backend: str, streamed: bool, tmp_path: Path):
+    session = get_sessions(tmp_path)[0 if backend == "memory" else 1]
+    model = RecordingModel()
+    model.add_multiple_turn_outputs(
+        [
+            [get_function_tool_call("foo", "{}")],
+            [get_text_message("first")],
+            [get_text_message("second")],
+        ]
+    )
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+
+    async def run(input: str) -> Any:
+        if streamed:
+            result = Runner.run_streamed(agent, input, session=session)
+            async for _ in result.stream_events():
+                pass
+            return result
+        return await Runner.run(agent, input, session=session)
+
+    first = await run("hi")
+    second = await run("again")
+
+    assert first.final_output == "first"
+    assert second.final_output == "second"
+    assert model.inputs[0] == [user("hi")]
+    assert model.inputs[2] == first.to_input_list() + [user("again")]
+    assert second.input == first.to_input_list() + [user("again")]
+    assert list(await session.get_items()) == second.to_input_list()
+
+
+@pytest.mark.asyncio
+async def test_runner_does_not_copy_the_history():
+    session = InMemorySession()
+    await session.add_items([user("hi"), {"role": "assistant", "content": "hello"}])
+    model = FakeModel()
+    model.set_next_output([get_text_message("done")])
+
+    result = await Runner.run(Agent(name="test", model=model), "again", session=session)
+
+    history = await session.get_items()
+    assert isinstance(result.input, list)
+    assert result.input[0] is history[0]
+    assert result.input[1] is history[1]
+
+
+@pytest.mark.asyncio
+async def test_failed_runs_are_not_added_to_the_session():
+    session = InMemorySession()
+    model = FakeModel()
+    model.set_next_output(ValueError("model failed"))
+
+    with pytest.raises(ValueError):
+        await Runner.run(Agent(name="test", model=model), "hi", session=session)
+
+    assert list(await session.get_items()) == []
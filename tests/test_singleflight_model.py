@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from openai.types.responses import ResponseCompletedEvent, ResponseTextDeltaEvent
+
+from agents import Agent, ModelSettings, Runner, SingleflightModel
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+from agents.usage import Usage
+
+from .fake_model import FakeModel, get_response_obj
+from .test_responses import get_function_tool, get_text_message
+
+DETERMINISTIC = ModelSettings(temperature=0)
+
+
+class CountingModel(FakeModel):
+    """A fake model that answers each request after a delay, with a text message that counts the
+    requests it received."""
+
+    def __init__(self, delay: float = 0.05, error: Exception | None = None):
+        super().__init__()
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def _answer(self) -> str:
+        self.calls += 1
+        call = self.calls
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"answer {call}"
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        text = await self._answer()
+        return ModelResponse(output=[get_text_message(text)], usage=Usage(), referenceable_id=None)
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        text = await self._answer()
+        for word in text.split():
+            yield ResponseTextDeltaEvent(
+                type="response.output_text.delta",
+                content_index=0,
+                delta=word,
+                item_id="item",
+                output_index=0,
+            )
+            await asyncio.sleep(0.01)
+        yield ResponseCompletedEvent(
+            type="response.completed", response=get_response_obj([get_text_message(text)])
+        )
+
+
+async def get_text(
+    model: SingleflightModel,
+    input: str = "hi",
+    settings: ModelSettings = DETERMINISTIC,
+    tools: list[Tool] | None = None,
+) -> str:
+    response = await model.get_response(
+        None, input, settings, tools or [], None, [], ModelTracing.DISABLED
+    )
+    return response.output[0].content[0].text  # type: ignore
+
+
+async def stream_deltas(model: SingleflightModel, input: str = "hi") -> list[str]:
+    return [
+        event.delta
+        async for event in model.stream_response(
+            None, input, DETERMINISTIC, [], None, [], ModelTracing.DISABLED
+        )
+        if isinstance(event, ResponseTextDeltaEvent)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_share_one_call():
+    inner = CountingModel()
+    model = SingleflightModel(inner)
+
+    texts = await asyncio.gather(*(get_text(model) for _ in range(5)))
+
+    assert texts == ["answer 1"] * 5
+    assert inner.calls == 1
+    assert model.stats.requests == 5
+    assert model.stats.upstream_requests == 1
+    assert model.stats.shared_requests == 4
+
+
+@pytest.mark.asyncio
+async def test_different_requests_are_not_shared():
+    inner = CountingModel()
+    model = SingleflightModel(inner)
+
+    await asyncio.gather(
+        get_text(model, input="a"),
+        get_text(model, input="b"),
+        get_text(model, tools=[get_function_tool("tool")]),
+        get_text(model, settings=ModelSettings(temperature=0, max_tokens=10)),
+    )
+
+    assert inner.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_timeout_does_not_prevent_sharing():
+    inner = CountingModel()
+    model = SingleflightModel(inner)
+
+    await asyncio.gather(
+        get_text(model, settings=ModelSettings(temperature=0, timeout=5)),
+        get_text(model, settings=ModelSettings(temperature=0, timeout=10)),
+    )
+
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_completed_requests_are_not_cached():
+    inner = CountingModel(delay=0)
+    model = SingleflightModel(inner)
+
+    assert await get_text(model) == "answer 1"
+    assert await get_text(model) == "answer 2"
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_are_only_shared_when_configured():
+    inner = CountingModel()
+    await asyncio.gather(
+        *(get_text(SingleflightModel(inner), settings=ModelSettings()) for _ in range(3))
+    )
+    assert inner.calls == 3
+
+    inner = CountingModel()
+    model = SingleflightModel(inner, share_sampled_requests=True)
+    await asyncio.gather(
+        *(get_text(model, settings=ModelSettings(temperature=1)) for _ in range(3))
+    )
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_fanned_out():
+    inner = CountingModel(error=ValueError("boom"))
+    model = SingleflightModel(inner)
+
+    results = await asyncio.gather(*(get_text(model) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_first_caller_does_not_affect_the_others():
+    inner = CountingModel(delay=0.1)
+    model = SingleflightModel(inner)
+
+    first = asyncio.create_task(get_text(model))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(get_text(model))
+    await asyncio.sleep(0.02)
+    first.cancel()
+
+    assert await second == "answer 1"
+    assert inner.cancelled == 0
+
+
+@pytest.mark.asyncio
+async def test_request_is_cancelled_when_every_caller_is():
+    inner = CountingModel(delay=1)
+    model = SingleflightModel(inner)
+
+    tasks = [asyncio.create_task(get_text(model)) for _ in range(2)]
+    await asyncio.sleep(0.02)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert inner.cancelled == 1
+    assert model._responses == {}
+
+
+@pytest.mark.asyncio
+async def test_streams_are_fanned_out_from_a_shared_buffer():
+    inner = CountingModel()
+    model = SingleflightModel(inner)
+
+    first = asyncio.create_task(stream_deltas(model))
+    # A late joiner still receives the stream from the start
+    while not any(stream.events for stream in model._streams.values()):
+        await asyncio.sleep(0.005)
+    second = asyncio.create_task(stream_deltas(model))
+
+    assert await first == ["answer", "1"]
+    assert await second == ["answer", "1"]
+    assert inner.calls == 1
+    assert model.stats.shared_requests == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_keeps_going_when_one_subscriber_stops():
+    inner = CountingModel()
+    model = SingleflightModel(inner)
+
+    async def read_first_event() -> None:
+        async for _ in model.stream_response(
+            None, "hi", DETERMINISTIC, [], None, [], ModelTracing.DISABLED
+        ):
+            break
+
+    results = await asyncio.gather(read_first_event(), stream_deltas(model))
+
+    assert results[1] == ["answer", "1"]
+    assert inner.cancelled == 0
+
+
+@pytest.mark.asyncio
+async def test_singleflight_model_in_runner():
+    inner = CountingModel()
+    agent = Agent(
+        name="test", model=SingleflightModel(inner), model_settings=ModelSettings(temperature=0)
+    )
+
+    results = await asyncio.gather(*(Runner.run(agent, input="FAQ") for _ in range(3)))
+
+    assert [result.final_output for result in results] == ["answer 1"] * 3
+    assert inner.calls == 1
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agents import (
+    Agent,
+    Runner,
+    StreamBroadcaster,
+    StreamSubscriberDisconnected,
+)
+from agents.stream_broadcast import StreamSubscription
+from agents.stream_events import StreamEvent
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+def make_agent() -> tuple[Agent, FakeModel]:
+    model = FakeModel()
+    agent = Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+    model.add_multiple_turn_outputs(
+        [
+            [get_text_message("a"), get_function_tool_call("foo", "")],
+            [get_text_message("done")],
+        ]
+    )
+    return agent, model
+
+
+async def collect_events(result) -> list[StreamEvent]:
+    return [event async for event in result.stream_events()]
+
+
+async def collect_subscription(subscription: StreamSubscription) -> list[StreamEvent]:
+    return [event async for event in subscription]
+
+
+@pytest.mark.asyncio
+async def test_subscribers_receive_same_event_objects():
+    agent, _ = make_agent()
+    expected = await collect_events(Runner.run_streamed(agent, input="test"))
+
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    first = result.subscribe()
+    second = result.subscribe()
+
+    async def consume(subscription) -> list[StreamEvent]:
+        return [event async for event in subscription]
+
+    first_events, second_events = await asyncio.gather(consume(first), consume(second))
+
+    assert [e.type for e in first_events] == [e.type for e in expected]
+    assert len(first_events) == len(second_events)
+    assert all(a is b for a, b in zip(first_events, second_events)), "events are shared"
+    assert result.final_output == "done"
+
+
+@pytest.mark.asyncio
+async def test_late_joiner_replays_from_offset():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result)
+
+    live = [event async for event in broadcaster.subscribe()]
+    assert broadcaster.is_done
+
+    replayed = [event async for event in broadcaster.subscribe()]
+    assert replayed == live
+
+    tail = [event async for event in broadcaster.subscribe(offset=2)]
+    assert tail == live[2:]
+
+    nothing = [event async for event in broadcaster.subscribe(offset=broadcaster.next_offset)]
+    assert nothing == []
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_skips_oldest_events():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result, max_buffer_size=2, slow_consumer_policy="drop")
+
+    slow = broadcaster.subscribe()
+    # A blocking subscriber with a big buffer drives the broadcast to completion
+    fast_events = [event async for event in broadcaster.subscribe(max_buffer_size=100)]
+
+    slow_events = [event async for event in slow]
+    assert len(fast_events) > 2
+    assert slow_events == fast_events[-2:]
+    assert slow.dropped_events == len(fast_events) - 2
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_raises():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result, max_buffer_size=1, slow_consumer_policy="disconnect")
+
+    slow = broadcaster.subscribe()
+    fast_events = [event async for event in broadcaster.subscribe(slow_consumer_policy="block")]
+    assert len(fast_events) > 1
+
+    with pytest.raises(StreamSubscriberDisconnected):
+        async for _ in slow:
+            pass
+
+
+@pytest.mark.asyncio
+async def test_block_policy_applies_backpressure():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result, max_buffer_size=1, slow_consumer_policy="block")
+
+    subscription = broadcaster.subscribe()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert broadcaster.next_offset == 1, "the broadcaster waits for the subscriber"
+
+    events = [event async for event in subscription]
+    assert len(events) > 1
+    assert subscription.dropped_events == 0
+
+
+@pytest.mark.asyncio
+async def test_closed_subscriber_does_not_block():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result, max_buffer_size=1)
+
+    stalled = broadcaster.subscribe()
+    other = broadcaster.subscribe(max_buffer_size=100)
+    stalled.close()
+
+    events = [event async for event in other]
+    assert len(events) > 1
+    assert [event async for event in stalled] == []
+
+
+@pytest.mark.asyncio
+async def test_subscriber_that_breaks_out_does_not_block():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result, max_buffer_size=1)
+    other = broadcaster.subscribe(max_buffer_size=100)
+
+    async with broadcaster.subscribe() as early_exit:
+        async for _ in early_exit:
+            break
+
+    events = [event async for event in other]
+    assert len(events) > 1
+    assert broadcaster.is_done
+    assert [event async for event in early_exit] == []
+
+
+@pytest.mark.asyncio
+async def test_dropped_subscriber_does_not_block():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result, max_buffer_size=1)
+    other = broadcaster.subscribe(max_buffer_size=100)
+
+    async def read_first_event() -> None:
+        # Neither closed nor kept: the subscription is dropped after the loop
+        async for _ in broadcaster.subscribe():
+            break
+
+    await read_first_event()
+
+    events = await asyncio.wait_for(collect_subscription(other), timeout=5)
+    assert len(events) > 1
+    assert broadcaster.is_done
+
+
+@pytest.mark.asyncio
+async def test_retention_discards_read_events():
+    agent, _ = make_agent()
+    result = Runner.run_streamed(agent, input="test")
+    broadcaster = StreamBroadcaster(result, max_replay_events=1)
+
+    events = [event async for event in broadcaster.subscribe()]
+    assert len(broadcaster._log) == 1
+
+    late = broadcaster.subscribe()
+    assert [event async for event in late] == events[-1:]
+    assert late.dropped_events == len(events) - 1
+
+
+@pytest.mark.asyncio
+async def test_run_exception_propagates_to_all_subscribers():
+    model = FakeModel()
+    agent = Agent(name="test", model=model)
+    model.set_next_output(ValueError("boom"))
+
+    result = Runner.run_streamed(agent, input="test")
+    first = result.subscribe()
+    second = result.subscribe()
+
+    for subscription in (first, second):
+        with pytest.raises(ValueError, match="boom"):
+            async for _ in subscription:
+                pass
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from openai.types.responses import ResponseTextDeltaEvent
+
+from agents import (
+    Agent,
+    ModelStreamStalled,
+    RetryStreamEvent,
+    RunConfig,
+    Runner,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import TResponseInputItem, TResponseStreamEvent
+from agents.model_settings import ModelSettings
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+
+
+class StallingModel(FakeModel):
+    """A fake model whose first `stalls` response streams send a text delta and then stall."""
+
+    def __init__(self, stalls: int):
+        super().__init__()
+        self.stalls = stalls
+        self.calls = 0
+        self.closed_streams = 0
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        self.calls += 1
+        if self.calls <= self.stalls:
+            try:
+                yield ResponseTextDeltaEvent(
+                    type="response.output_text.delta",
+                    content_index=0,
+                    delta="partial",
+                    item_id="item",
+                    output_index=0,
+                )
+                await asyncio.sleep(1000)
+            finally:
+                self.closed_streams += 1
+            return
+
+        async for event in super().stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        ):
+            # A slow, but not stalled, stream
+            await asyncio.sleep(0.02)
+            yield event
+
+
+@pytest.mark.asyncio
+async def test_stalled_stream_fails_fast_without_retries():
+    model = StallingModel(stalls=1)
+    agent = Agent(name="test", model=model)
+
+    result = Runner.run_streamed(
+        agent, input="test", run_config=RunConfig(stream_idle_timeout=0.05)
+    )
+    with pytest.raises(ModelStreamStalled):
+        async for _ in result.stream_events():
+            pass
+
+    assert model.calls == 1
+    assert model.closed_streams == 1, "the stalled stream should have been closed"
+
+
+@pytest.mark.asyncio
+async def test_stalled_stream_is_retried():
+    model = StallingModel(stalls=2)
+    model.set_next_output([get_text_message("done")])
+    agent = Agent(name="test", model=model)
+
+    result = Runner.run_streamed(
+        agent,
+        input="test",
+        run_config=RunConfig(stream_idle_timeout=0.25, stream_stall_retries=2),
+    )
+    events = [event async for event in result.stream_events()]
+
+    assert result.final_output == "done"
+    assert model.calls == 3
+    assert model.closed_streams == 2
+
+    types = [event.type for event in events]
+    assert types == [
+        "agent_updated_stream_event",
+        "raw_response_event",  # partial text of the first attempt
+        "retry_stream_event",
+        "raw_response_event",  # partial text of the second attempt
+        "retry_stream_event",
+        "raw_response_event",  # response completed
+        "run_item_stream_event",
+    ]
+    retries = [event for event in events if isinstance(event, RetryStreamEvent)]
+    assert [r.attempt for r in retries] == [2, 3]
+    assert "stalled" in retries[0].reason
+
+
+@pytest.mark.asyncio
+async def test_stream_idle_timeout_raised_after_retries_exhausted():
+    model = StallingModel(stalls=3)
+    agent = Agent(name="test", model=model)
+
+    result = Runner.run_streamed(
+        agent,
+        input="test",
+        run_config=RunConfig(stream_idle_timeout=0.05, stream_stall_retries=1),
+    )
+    with pytest.raises(ModelStreamStalled):
+        async for _ in result.stream_events():
+            pass
+
+    assert model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_idle_timeout_does_not_affect_healthy_stream():
+    model = StallingModel(stalls=0)
+    model.set_next_output([get_text_message("done")])
+    agent = Agent(name="test", model=model)
+
+    # Each event takes 0.02s, well within the idle timeout, even though the whole stream takes
+    # longer than a single timeout period would allow.
+    result = Runner.run_streamed(agent, input="test", run_config=RunConfig(stream_idle_timeout=0.5))
+    async for _ in result.stream_events():
+        pass
+
+    assert result.final_output == "done"
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import base64
+import sys
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from agents import (
+    Agent,
+    BPETokenizer,
+    HeuristicTokenizer,
+    ModelSettings,
+    OpenAIChatCompletionsModel,
+    OpenAIResponsesModel,
+    Tokenizer,
+    UserError,
+    attribute_tokens,
+    handoff,
+    set_default_tokenizer,
+    trace,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.items import TResponseInputItem
+from agents.models.interface import ModelTracing
+from agents.models.rate_limiter import estimate_request_tokens
+from agents.tool import Tool
+from agents.tracing.span_data import GenerationSpanData, ResponseSpanData
+
+from .fake_model import get_response_obj
+from .test_responses import get_function_tool, get_text_message
+from .testing_processor import fetch_ordered_spans
+
+MERGES = [b"he", b"ll", b"hell", b"hello", b" w", b"or"]
+
+
+@pytest.fixture
+def vocab_file(tmp_path: Path) -> Path:
+    tokens = [bytes([i]) for i in range(256)] + MERGES
+    path = tmp_path / "test.tiktoken"
+    path.write_bytes(
+        b"\n".join(
+            base64.b64encode(token) + b" " + str(rank).encode() for rank, token in enumerate(tokens)
+        )
+    )
+    return path
+
+
+class WordTokenizer(Tokenizer):
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def test_heuristic_tokenizer_counts_characters():
+    assert HeuristicTokenizer().count("a" * 40) == 10
+    assert HeuristicTokenizer().count("a" * 41) == 11
+    assert HeuristicTokenizer(chars_per_token=2).count("a" * 40) == 20
+    assert HeuristicTokenizer().count("") == 0
+
+
+def test_bpe_tokenizer_merges_by_rank(vocab_file: Path):
+    tokenizer = BPETokenizer.from_file(vocab_file)
+
+    # "hello" is a token; " world" is split by merging " w", then "or"
+    assert tokenizer.encode("hello world") == [259, 260, 261, ord("l"), ord("d")]
+    assert tokenizer.count("hello world") == 5
+    assert tokenizer.count("hello world") == 5  # Cached
+    # Bytes of characters that aren't in the vocabulary are encoded one by one
+    assert tokenizer.encode("héllo") == [ord("h"), 0xC3, 0xA9, 257, ord("o")]
+
+
+def test_bpe_tokenizer_splits_words_numbers_and_punctuation(vocab_file: Path):
+    tokenizer = BPETokenizer.from_file(vocab_file)
+
+    pieces = tokenizer._pattern.findall("I'll pay 12345 dollars!\n\n  ok")
+
+    assert pieces == ["I", "'ll", " pay", " ", "123", "45", " dollars", "!\n\n", " ", " ok"]
+
+
+def test_invalid_vocab_file_raises(tmp_path: Path):
+    path = tmp_path / "bad.tiktoken"
+    path.write_bytes(b"aGk= 0\nnot a token line\n")
+
+    with pytest.raises(UserError, match="line 2"):
+        BPETokenizer.from_file(path)
+
+
+def test_unicode_property_patterns_require_regex(vocab_file: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setitem(sys.modules, "regex", None)
+
+    with pytest.raises(UserError, match="regex"):
+        BPETokenizer.from_file(vocab_file, pattern=r"\p{L}+")
+
+
+def test_default_tokenizer_is_used_for_estimates():
+    set_default_tokenizer(WordTokenizer())
+    try:
+        assert estimate_request_tokens("one two three", max_output_tokens=2) == 5
+    finally:
+        set_default_tokenizer(None)
+
+    assert estimate_request_tokens("a" * 40) == 10
+
+
+def get_input() -> list[TResponseInputItem]:
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "input_text", "text": "What is in this image?"},
+                {
+                    "type": "input_image",
+                    "image_url": "data:image/png;base64," + "A" * 100_000,
+                    "detail": "low",
+                },
+            ],
+        },
+        {"type": "function_call", "id": "fc_1", "call_id": "c1", "name": "foo", "arguments": "{}"},
+        {"type": "function_call_output", "call_id": "c1", "output": "x" * 400},
+        {
+            "type": "computer_call_output",
+            "call_id": "c2",
+            "output": {"type": "computer_screenshot", "image_url": "data:image/png;base64,AAAA"},
+        },
+    ]
+
+
+def test_attribution_splits_input_tokens_by_source():
+    tools: list[Tool] = [get_function_tool(f"tool_{i}") for i in range(80)]
+
+    attribution = attribute_tokens(
+        "Be nice",
+        get_input(),
+        tools,
+        [handoff(Agent(name="other"))],
+        AgentOutputSchema(list[int]),
+        HeuristicTokenizer(),
+    )
+
+    assert attribution.system_instructions == 2
+    assert len(attribution.tools) == 80
+    assert attribution.tool_schemas == sum(attribution.tools.values()) > 80 * 10
+    assert attribution.handoff_schemas > 0
+    assert attribution.output_schema > 0
+    # The image data isn't counted as text
+    assert 0 < attribution.history_messages < 100
+    assert 100 < attribution.tool_outputs < 150
+    assert attribution.images == 85 + 765
+    assert attribution.total == sum(
+        value for key, value in attribution.export().items() if key not in ("tools", "total")
+    )
+
+
+def get_client(handle) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://model.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_attribution_is_attached_to_response_spans(monkeypatch):
+    calls = []
+
+    def counting_attribute_tokens(*args: Any) -> Any:
+        calls.append(args)
+        return attribute_tokens(*args)
+
+    monkeypatch.setattr("agents.token_attribution.attribute_tokens", counting_attribute_tokens)
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        response = get_response_obj([get_text_message("hi")])
+        return httpx.Response(200, json=response.model_dump())
+
+    model = OpenAIResponsesModel(model="gpt-4o", openai_client=get_client(handle))
+
+    with trace("test"):
+        await model.get_response(
+            "Be nice",
+            "hello",
+            ModelSettings(),
+            [get_function_tool("foo")],
+            None,
+            [],
+            ModelTracing.ENABLED_WITHOUT_DATA,
+        )
+
+    # The attribution is only computed when it's read, and only once
+    assert calls == []
+    [span] = [s for s in fetch_ordered_spans() if isinstance(s.span_data, ResponseSpanData)]
+    attribution: dict[str, Any] = span.span_data.token_attribution
+    assert span.span_data.token_attribution is attribution
+    assert len(calls) == 1
+    assert attribution["system_instructions"] == 2
+    assert attribution["tools"]["foo"] == attribution["tool_schemas"] > 0
+    assert attribution["history_messages"] > 0
+    assert attribution["total"] > attribution["tool_schemas"]
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_attribution_is_attached_to_generation_spans():
+    def handle(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "hi"},
+                    }
+                ],
+            },
+        )
+
+    model = OpenAIChatCompletionsModel(model="gpt-4o", openai_client=get_client(handle))
+
+    with trace("test"):
+        await model.get_response(None, "hello", ModelSettings(), [], None, [], ModelTracing.ENABLED)
+
+    [span] = [s for s in fetch_ordered_spans() if isinstance(s.span_data, GenerationSpanData)]
+    attribution: dict[str, Any] = span.span_data.token_attribution
+    assert attribution["system_instructions"] == 0
+    assert attribution["history_messages"] == attribution["total"] > 0
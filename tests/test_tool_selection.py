@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from agents import (
+    Agent,
+    BM25ToolSelector,
+    FunctionTool,
+    ModelSettings,
+    RunConfig,
+    Runner,
+    UserError,
+    WebSearchTool,
+    function_tool,
+    trace,
+)
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem
+from agents.models.interface import ModelTracing
+from agents.tool import Tool
+from agents.tracing.span_data import CustomSpanData
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool_call, get_text_message
+from .testing_processor import fetch_ordered_spans
+
+TOOLS = {
+    "get_weather": "Returns the weather forecast for a city.",
+    "send_email": "Sends an email to a recipient.",
+    "create_calendar_event": "Creates an event in the user's calendar.",
+    "list_calendar_events": "Lists the events in the user's calendar for a day.",
+    "search_flights": "Searches for flights between two airports.",
+    "book_hotel": "Books a hotel room in a city.",
+    "convert_currency": "Converts an amount of money between currencies.",
+    "get_stock_price": "Returns the current price of a stock.",
+    "translate_text": "Translates text to another language.",
+    "create_ticket": "Opens a support ticket.",
+    "lookupOrderStatus": "Returns the shipping status of a customer order.",
+    "refund_order": "Refunds a customer order.",
+}
+
+
+def make_tool(name: str, description: str) -> FunctionTool:
+    def city_tool(city: str) -> str:
+        """
+        Args:
+            city: The name of the city.
+        """
+        return name
+
+    def other_tool(query: str) -> str:
+        return name
+
+    return function_tool(
+        city_tool if "city" in description else other_tool,
+        name_override=name,
+        description_override=description,
+    )
+
+
+def make_tools() -> list[Tool]:
+    return [make_tool(name, description) for name, description in TOOLS.items()]
+
+
+def user(content: str) -> TResponseInputItem:
+    return {"role": "user", "content": content}
+
+
+def call(name: str) -> TResponseInputItem:
+    return {"type": "function_call", "id": "fc", "call_id": name, "name": name, "arguments": "{}"}
+
+
+def output(name: str) -> TResponseInputItem:
+    return {"type": "function_call_output", "call_id": name, "output": "done"}
+
+
+def names(tools: list[Tool]) -> list[str]:
+    return [tool.name for tool in tools]
+
+
+def test_selects_the_most_relevant_tools():
+    agent = Agent(name="assistant", tools=make_tools())
+    selector = BM25ToolSelector(top_k=2)
+
+    selection = selector.select_tools(agent, [user("What's the weather like in Paris tomorrow?")])
+
+    assert names(selection.tools)[0] == "get_weather"
+    assert len(selection.tools) <= 2
+    assert list(selection.scores)[0] == "get_weather"
+
+    # Words are matched across snake_case and camelCase names, and plurals
+    selection = selector.select_tools(agent, [user("Where are my orders?")])
+    assert set(names(selection.tools)) == {"lookupOrderStatus", "refund_order"}
+
+
+def test_only_the_current_turn_is_used_as_query():
+    agent = Agent(name="assistant", tools=make_tools())
+    selector = BM25ToolSelector(top_k=1, recent_turns=0)
+
+    selection = selector.select_tools(
+        agent,
+        [
+            user("What's the weather in Paris?"),
+            {"role": "assistant", "content": "Sunny."},
+            user("Translate 'sunny' to French"),
+        ],
+    )
+
+    assert names(selection.tools) == ["translate_text"]
+
+
+def test_pinned_referenced_and_hosted_tools_are_always_selected():
+    tools = make_tools() + [WebSearchTool()]
+    agent = Agent(name="assistant", tools=tools)
+    selector = BM25ToolSelector(top_k=1, pinned_tools=["create_ticket"], recent_turns=2)
+
+    selection = selector.select_tools(
+        agent,
+        [
+            user("Book a hotel in Rome"),
+            call("book_hotel"),
+            output("book_hotel"),
+            user("Now send an email to Bob"),
+            call("send_email"),
+            output("send_email"),
+        ],
+    )
+
+    # In the order of the agent's tools
+    assert names(selection.tools) == ["send_email", "create_ticket", "web_search_preview"]
+    assert selection.pinned == ["create_ticket"]
+    assert selection.referenced == ["send_email"]
+    assert selection.scores == {}
+
+
+def test_all_tools_are_selected_if_there_are_few():
+    agent = Agent(name="assistant", tools=make_tools()[:3])
+
+    selection = BM25ToolSelector(top_k=3).select_tools(agent, [user("unrelated")])
+
+    assert selection.tools is agent.tools
+
+
+def test_all_tools_are_selected_if_none_match():
+    agent = Agent(name="assistant", tools=make_tools())
+    selector = BM25ToolSelector(top_k=2)
+
+    for message in ["hola, necesito ayuda", "yes, go ahead"]:
+        selection = selector.select_tools(agent, [user(message)])
+        assert selection.tools is agent.tools
+
+
+def test_tool_named_by_tool_choice_is_always_selected():
+    agent = Agent(name="assistant", tools=make_tools())
+    selector = BM25ToolSelector(top_k=1)
+
+    selection = selector.select_tools(
+        agent, [user("What is the weather in Paris?")], tool_choice="refund_order"
+    )
+
+    assert names(selection.tools) == ["get_weather", "refund_order"]
+    assert selection.pinned == ["refund_order"]
+    for tool_choice in ["auto", "required", "none"]:
+        selection = selector.select_tools(
+            agent, [user("What is the weather in Paris?")], tool_choice=tool_choice
+        )
+        assert names(selection.tools) == ["get_weather"]
+
+
+def test_index_is_cached_per_agent_and_rebuilt_when_tools_change():
+    agent = Agent(name="assistant", tools=make_tools())
+    other_agent = Agent(name="other", tools=make_tools())
+    selector = BM25ToolSelector(top_k=2)
+
+    index = selector._get_index(agent)
+    assert selector._get_index(agent) is index
+    assert selector._get_index(other_agent) is not index
+
+    agent.tools.append(make_tool("get_time", "Returns the time in a city."))
+    assert selector._get_index(agent) is not index
+    selection = selector.select_tools(agent, [user("What time is it in Tokyo?")])
+    assert names(selection.tools) == ["get_time"]
+
+
+def test_invalid_arguments_raise():
+    with pytest.raises(UserError):
+        BM25ToolSelector(top_k=0)
+    with pytest.raises(UserError):
+        BM25ToolSelector(recent_turns=-1)
+
+
+class ToolRecordingModel(FakeModel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.tools: list[list[str]] = []
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        self.tools.append(names(tools))
+        return await super().get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, *args: Any):
+        self.tools.append(names(tools))
+        async for event in super().stream_response(
+            system_instructions, input, model_settings, tools, *args
+        ):
+            yield event
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streamed", [False, True])
+async def test_runner_sends_selected_tools_and_traces_the_selection(streamed: bool):
+    model = ToolRecordingModel()
+    model.add_multiple_turn_outputs(
+        [[get_function_tool_call("refund_order", "{}")], [get_text_message("Refunded")]]
+    )
+    agent = Agent(name="assistant", model=model, tools=make_tools())
+    run_config = RunConfig(tool_selector=BM25ToolSelector(top_k=1))
+
+    with trace("test"):
+        if streamed:
+            result = Runner.run_streamed(
+                agent, input="Please refund my last order", run_config=run_config
+            )
+            async for _ in result.stream_events():
+                pass
+        else:
+            result = await Runner.run(  # type: ignore[assignment]
+                agent, input="Please refund my last order", run_config=run_config
+            )
+
+    assert result.final_output == "Refunded"
+    assert model.tools == [["refund_order"], ["refund_order"]]
+    spans = [
+        span.span_data.data
+        for span in fetch_ordered_spans()
+        if isinstance(span.span_data, CustomSpanData) and span.span_data.name == "Tool selection"
+    ]
+    assert len(spans) == 2
+    assert spans[0]["selector"] == "BM25ToolSelector"
+    assert spans[0]["available_tools"] == len(TOOLS)
+    assert spans[0]["selected_tools"] == ["refund_order"]
+    assert list(spans[0]["scores"]) == ["refund_order"]
+    assert spans[1]["referenced"] == ["refund_order"]
+
+
+@pytest.mark.asyncio
+async def test_runner_sends_the_tool_forced_by_tool_choice():
+    model = ToolRecordingModel()
+    model.set_next_output([get_text_message("Done")])
+    agent = Agent(
+        name="assistant",
+        model=model,
+        tools=make_tools(),
+        model_settings=ModelSettings(tool_choice="refund_order"),
+    )
+
+    await Runner.run(
+        agent,
+        input="What is the weather in Paris?",
+        run_config=RunConfig(tool_selector=BM25ToolSelector(top_k=1)),
+    )
+
+    assert model.tools == [["get_weather", "refund_order"]]